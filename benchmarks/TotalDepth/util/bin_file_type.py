@@ -0,0 +1,57 @@
+import io
+
+from TotalDepth.util import bin_file_type
+
+
+LIS_PR = b'\x00\x3e\x00\x00\x80\x00' + bytes(56)
+RP66V1_SUL = b'   1' + b'V1.00' + b'RECORD' + b' 8192' + b'Default Storage Set'.ljust(60)
+RP66V2_LABEL = b'   1' + b'V1.00' + b'RECORD' + b'B8  ' + b'      8192' + b'         1' + b'01-JAN-2019' \
+               + b'X' * 12 + b' ' * 6 + b'Storage set'.ljust(60)
+
+#: A sample of each supported file type.
+SIGNATURE_CORPUS = {
+    'XML': b'<?xml version="1.0"?>',
+    'PDF': b'%PDF-1.4',
+    'PS': b'%!Ps-Adobe-3.0',
+    'ZIP': b'PK\x03\x04' + bytes(100),
+    'TIFF': b'II*\x00' + bytes(100),
+    'SEGY': b'\xc3\x40' * 1600,
+    'LAS1.2': b'~VERSION\n VERS. 1.2: CWLS\n',
+    'LAS2.0': b'~VERSION\n VERS. 2.0: CWLS\n',
+    'LAS3.0': b'~VERSION\n VERS. 3.0: CWLS\n',
+    'LIS': LIS_PR,
+    'LISt': bytes(8) + b'\x4a\x00\x00\x00' + LIS_PR,
+    'LIStr': bytes(8) + b'\x00\x00\x00\x4a' + LIS_PR,
+    'RP66V1': RP66V1_SUL,
+    'RP66V1t': bytes(8) + b'\x5c\x00\x00\x00' + RP66V1_SUL,
+    'RP66V1tr': bytes(8) + b'\x00\x00\x00\x5c' + RP66V1_SUL,
+    'RP66V2': RP66V2_LABEL,
+    'ASCII': b'Some text.',
+}
+
+
+def linear_match(fobj: io.BytesIO) -> bin_file_type.FileTypeMatch:
+    """Tries every signature in order without the dispatch table, for comparison."""
+    header = bin_file_type.HeaderBuffer(fobj)
+    for signature in bin_file_type.SIGNATURES:
+        header.seek(signature.offset)
+        if signature.magic and header.read(len(signature.magic)) != signature.magic:
+            continue
+        header.seek(0)
+        if signature.validator is None or signature.validator(header) == 0:
+            return bin_file_type.FileTypeMatch(signature.bin_type, signature.detector, signature.confidence)
+    return bin_file_type.NO_MATCH
+
+
+class BinaryFileTypeMatch:
+    params = sorted(SIGNATURE_CORPUS.keys())
+    param_names = ['bin_type']
+
+    def setup(self, bin_type):
+        self.by = SIGNATURE_CORPUS[bin_type]
+
+    def time_binary_file_type_match(self, bin_type):
+        bin_file_type.binary_file_type_match(io.BytesIO(self.by))
+
+    def time_linear_match(self, bin_type):
+        linear_match(io.BytesIO(self.by))
@@ -1,8 +1,17 @@
 """
 Strip TIF markers from a file or scan a file and reporting errors in TIF markers.
+
+Files are memory mapped and the TIF marker chain is followed with :py:meth:`struct.Struct.unpack_from` so scanning does
+not read the data between the markers. Stripping writes the extents between the markers either with
+:py:func:`os.copy_file_range`, which stays in the kernel, or with ``writelines()`` of memoryview slices.
+A directory of files can be de-TIF'd by a process pool.
 """
 import argparse
+import concurrent.futures
+import contextlib
+import io
 import logging
+import mmap
 import os
 import struct
 import sys
@@ -93,27 +102,49 @@ def has_tif(path: str) -> bool:
         return has_tif_file(fobj_in)
 
 
-def tif_scan_file_object(fobj: typing.BinaryIO) -> typing.List[TifMarker]:
-    """Scan a file object and return the list of TIF markers."""
+@contextlib.contextmanager
+def _map_file_object(fobj: typing.BinaryIO) -> typing.Iterator[typing.Union[mmap.mmap, bytes]]:
+    """Yields a read only buffer of the whole of a file object, memory mapped if it is a non-empty file on disc,
+    otherwise read into memory."""
+    try:
+        fileno = fobj.fileno()
+    except (AttributeError, io.UnsupportedOperation):
+        fileno = -1
+    if fileno >= 0 and os.fstat(fileno).st_size > 0:
+        with mmap.mmap(fileno, 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+    else:
+        fobj.seek(0)
+        yield fobj.read()
+
+
+def tif_scan_buffer(buffer: typing.Union[mmap.mmap, bytes]) -> typing.List[TifMarker]:
+    """Scan a buffer of the whole file and return the list of TIF markers."""
     tifs: typing.List[TifMarker] = []
-    fobj.seek(0)
     try:
-        tifs.append(_read_tifs(fobj))
+        tifs.append(TifMarker(0, *TIFS_STRUCT.unpack_from(buffer, 0)))
     except struct.error as err:
         raise DeTifExceptionRead(f'Could not read TIF marker: {err}')
     if not tifs[-1].is_tif_start:
         raise DeTifExceptionRead(f'Initial TIF marker is wrong type: {tifs[-1]}')
     logger.debug(f'[{len(tifs):8,d}] {tifs[-1]}')
+    buffer_len = len(buffer)
     while True:
-        fobj.seek(tifs[-1].next)
-        try:
-            tifs.append(_read_tifs(fobj))
-        except struct.error:
+        tell = tifs[-1].next
+        # A next pointer that does not move forward would loop forever.
+        if tell <= tifs[-1].tell or tell + TIF_TRIPLET_NUM_BYTES > buffer_len:
             break
+        tifs.append(TifMarker(tell, *TIFS_STRUCT.unpack_from(buffer, tell)))
         logger.debug(f'[{len(tifs):8,d}] {tifs[-1]}')
     return tifs
 
 
+def tif_scan_file_object(fobj: typing.BinaryIO) -> typing.List[TifMarker]:
+    """Scan a file object and return the list of TIF markers."""
+    with _map_file_object(fobj) as buffer:
+        return tif_scan_buffer(buffer)
+
+
 def tif_scan_path(path: str) -> typing.List[TifMarker]:
     """Scan a file at path and return the list of TIF markers."""
     with open(path, 'rb') as fobj:
@@ -166,35 +197,63 @@ def get_errors(tifs: typing.List[TifMarker], file_size: int) -> typing.List[str]
     return ret
 
 
+def tif_extents(tifs: typing.List[TifMarker], file_size: int) -> typing.List[typing.Tuple[int, int]]:
+    """Returns the (position, length) of the data following each TIF marker, empty extents are omitted and the last
+    extent is truncated to the file size. The only error detected is negative reads."""
+    ret = []
+    for tif in tifs:
+        if tif.read_len < 0:
+            raise DeTifExceptionRead(f'TIF marker suggests negative block size: {tif}')
+        start = tif.tell + TIF_TRIPLET_NUM_BYTES
+        length = min(tif.read_len, file_size - start)
+        if length > 0:
+            ret.append((start, length))
+    return ret
+
+
 def strip_tif(file_in: typing.BinaryIO, file_out: typing.BinaryIO) -> typing.Tuple[int, int]:
     """Read file_in then strip TIF markers and write to file_out.
     The only error detected is negative reads.
     Returns a tuple of (tif_markers_stripped, bytes_written)."""
-    file_in.seek(0)
     file_out.seek(0)
-    tif = _read_tifs(file_in)
-    if not tif.is_tif_start:
-        raise DeTifExceptionRead(f'Initial TIF marker is wrong type: {tif}')
-    tif_markers_stripped = 1
-    bytes_written = 0
-    while True:
-        if tif.read_len < 0:
-            raise DeTifExceptionRead(f'TIF marker suggests negative block size: {tif}')
-        logging.debug(f'Writing 0x{tif.read_len:08x} bytes from 0x{file_in.tell():08x}')
-        file_out.write(file_in.read(tif.read_len))
-        bytes_written += tif.read_len
-        try:
-            tif = _read_tifs(file_in)
-        except struct.error:
-            break
-        tif_markers_stripped += 1
-    return tif_markers_stripped, bytes_written
+    with _map_file_object(file_in) as buffer:
+        tifs = tif_scan_buffer(buffer)
+        extents = tif_extents(tifs, len(buffer))
+        with memoryview(buffer) as view:
+            file_out.writelines(view[start:start + length] for start, length in extents)
+    return len(tifs), sum(length for _start, length in extents)
+
+
+def _copy_extents(fobj_in: typing.BinaryIO, fobj_out: typing.BinaryIO,
+                  extents: typing.List[typing.Tuple[int, int]]) -> None:
+    """Copies the extents of fobj_in to the start of fobj_out with os.copy_file_range().
+    May raise OSError if that is not supported for these files."""
+    fd_in = fobj_in.fileno()
+    fd_out = fobj_out.fileno()
+    for start, length in extents:
+        while length > 0:
+            num_bytes = os.copy_file_range(fd_in, fd_out, length, start)
+            if num_bytes == 0:
+                raise DeTifExceptionRead(f'Unexpected EOF at 0x{start:08x}')
+            start += num_bytes
+            length -= num_bytes
 
 
 def strip_path(path_in: str, path_out: str) -> typing.Tuple[int, int]:
-    """Read path_in then strip TIF markers and write to path_out."""
+    """Read path_in then strip TIF markers and write to path_out.
+    This uses os.copy_file_range() if available falling back to strip_tif()."""
     with open(path_in, 'rb') as fobj_in:
         with open(path_out, 'wb') as fobj_out:
+            if hasattr(os, 'copy_file_range'):
+                tifs = tif_scan_file_object(fobj_in)
+                extents = tif_extents(tifs, os.fstat(fobj_in.fileno()).st_size)
+                try:
+                    _copy_extents(fobj_in, fobj_out, extents)
+                except OSError as err:
+                    logger.debug(f'os.copy_file_range() failed with "{err}", using strip_tif()')
+                    fobj_out.truncate(0)
+                else:
+                    return len(tifs), sum(length for _start, length in extents)
             return strip_tif(fobj_in, fobj_out)
 
 
@@ -221,6 +280,40 @@ def de_tif_file(path_in: str, path_out: str, nervous: bool, over_write: bool) ->
     return files_copied, tif_count, byte_count
 
 
+def _de_tif_file_in_out(file_in_out: typing.Tuple[str, str], nervous: bool, over_write: bool) \
+        -> typing.Tuple[int, int, int]:
+    """Process pool entry point, never raises so that one bad file does not stop a batch."""
+    try:
+        return de_tif_file(file_in_out[0], file_in_out[1], nervous, over_write)
+    except Exception:
+        logger.exception(f'Can not De-TIF {file_in_out[0]}')
+        return 0, 0, 0
+
+
+def de_tif_directory(path_in: str, path_out: str, recurse: bool, nervous: bool, over_write: bool,
+                     jobs: int = 1) -> typing.Tuple[int, int, int]:
+    """De-TIFs the files in a directory writing to path_out. Returns a tuple of (files_copied, tif_count, byte_count)
+    totalled over all files, see de_tif_file(). If jobs > 1 then a process pool of that size is used."""
+    file_in_outs = [
+        tuple(v) for v in dirWalk(path_in, path_out, theFnMatch='', recursive=recurse, bigFirst=False)
+    ]
+    if jobs > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(
+                executor.map(
+                    _de_tif_file_in_out, file_in_outs,
+                    [nervous] * len(file_in_outs), [over_write] * len(file_in_outs),
+                    chunksize=max(1, len(file_in_outs) // (jobs * 4)),
+                )
+            )
+    else:
+        results = [_de_tif_file_in_out(v, nervous, over_write) for v in file_in_outs]
+    files_copied = sum(r[0] for r in results)
+    tif_count = sum(r[1] for r in results)
+    byte_count = sum(r[2] for r in results)
+    return files_copied, tif_count, byte_count
+
+
 def main() -> int:
     description = """usage: %(prog)s [options] file
 Scans a file for TIF markers or can copy a directory of files with TIF markers removed."""
@@ -229,7 +322,7 @@ Scans a file for TIF markers or can copy a directory of files with TIF markers r
         description, prog='TotalDepth.DeTif.main', version=__version__, epilog=__rights__
     )
     cmn_cmd_opts.add_log_level(parser, level=20)
-    # cmn_cmd_opts.add_multiprocessing(parser)
+    cmn_cmd_opts.add_multiprocessing(parser)
     parser.add_argument(
         '-n', '--nervous', action='store_true',
         help='Nervous mode, don\'t do anything but report what would be done. [default: %(default)s]',
@@ -255,13 +348,15 @@ Scans a file for TIF markers or can copy a directory of files with TIF markers r
         if os.path.isfile(args.path_in):
             files_copied, tif_count, bytes_copied = de_tif_file(args.path_in, args.path_out, args.nervous, args.over_write)
         else:
-            for file_in_out in dirWalk(args.path_in, args.path_out, theFnMatch='', recursive=args.recurse, bigFirst=False):
-                _files_copied, _tif_count, _byte_count = de_tif_file(
-                    file_in_out.filePathIn, file_in_out.filePathOut, args.nervous, args.over_write
-                )
-                files_copied += _files_copied
-                tif_count += _tif_count
-                bytes_copied += _byte_count
+            if args.jobs < 0:
+                jobs = 1
+            elif args.jobs == 0:
+                jobs = os.cpu_count() or 1
+            else:
+                jobs = args.jobs
+            files_copied, tif_count, bytes_copied = de_tif_directory(
+                args.path_in, args.path_out, args.recurse, args.nervous, args.over_write, jobs
+            )
         print(f'Files: {files_copied:,d} 12 byte TIF markers removed: {tif_count:,d} bytes: {bytes_copied:,d}')
     clk_exec = time.perf_counter() - clk_start
     print('Execution time = %8.3f (S)' % clk_exec)
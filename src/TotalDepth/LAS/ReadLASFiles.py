@@ -41,11 +41,22 @@ import re
 import traceback
 
 from TotalDepth.LAS.core import LASRead
+from TotalDepth.common import cmn_cmd_opts
+
+#: Number of files given to each task when multiprocessing
+MP_FILES_PER_TASK = 64
 
 class ReadLASFiles(object):
     RE_DESC = re.compile(r'^\s*(\d+)\s*(.+)$')
     """Class documentation."""
-    def __init__(self, path):
+    def __init__(self, path, loadArray=True, jobs=-1):
+        """Reads LAS files in path. If loadArray is False only the header
+        sections are read and frames and data points are not counted.
+        If path is None nothing is read, the results of other ReadLASFiles
+        objects can then be merged into this one with +=.
+        jobs is the number of processes to use for a directory, 0 uses the
+        number of CPUs and -1 (the default) reads in this process."""
+        self._loadArray = loadArray
         self._cntrs = collections.defaultdict(int)
         # All mnemonics
         # {mnem : {desc : count, ...}, ...}
@@ -60,19 +71,72 @@ class ReadLASFiles(object):
         self._wsdMnemCount = collections.defaultdict(int)
         # {bytes : [seconds, ...], ...}
         self._sizeTimeMap = {}
-        if os.path.isdir(path):
+        timStart = time.perf_counter()
+        if path is None:
+            pass
+        elif os.path.isdir(path):
+            myFpS = []
             for dirpath, dirnames, filenames in os.walk(path):
                 for aName in filenames:
                     if aName == '.DS_Store':
                         continue
-                    s, t = self._processFile(os.path.join(dirpath, aName))
-                    self._addSizeTime(s, t)
+                    myFpS.append(os.path.join(dirpath, aName))
+            if jobs == -1:
+                self.processFiles(myFpS)
+            else:
+                self._processFilesMP(myFpS, jobs)
         elif os.path.isfile(path):
-            s, t = self._processFile(path)
-            self._addSizeTime(s, t)
+            self.processFiles([path])
         else:
             logging.error('Unknown path: {:s}'.format(path))
-            
+        # Wall clock time for processing
+        self._execTime = time.perf_counter() - timStart
+
+    def __iadd__(self, other):
+        """Merges the results of another ReadLASFiles object into this one."""
+        for k, v in other._cntrs.items():
+            self._cntrs[k] += v
+        for myMap, otherMap in (
+                (self._mnemDescMap, other._mnemDescMap),
+                (self._curveDescMap, other._curveDescMap),
+                (self._unitDescMap, other._unitDescMap),
+            ):
+            for m, descMap in otherMap.items():
+                if m not in myMap:
+                    myMap[m] = collections.defaultdict(int)
+                for d, c in descMap.items():
+                    myMap[m][d] += c
+        for m, c in other._wsdMnemCount.items():
+            self._wsdMnemCount[m] += c
+        for s, tS in other._sizeTimeMap.items():
+            for t in tS:
+                self._addSizeTime(s, t)
+        return self
+
+    def processFiles(self, theFpS):
+        """Process a list of file paths in this process."""
+        for fp in theFpS:
+            s, t = self._processFile(fp)
+            self._addSizeTime(s, t)
+
+    def _processFilesMP(self, theFpS, jobs):
+        """Process a list of file paths with a multiprocessing pool, each task
+        returns a ReadLASFiles object that is merged into this one."""
+        if jobs < 1:
+            jobs = multiprocessing.cpu_count()
+        logging.info('ReadLASFiles._processFilesMP(): Setting multi-processing jobs to %d' % jobs)
+        myPool = multiprocessing.Pool(processes=jobs)
+        try:
+            myTaskS = [
+                (theFpS[i:i + MP_FILES_PER_TASK], self._loadArray) \
+                    for i in range(0, len(theFpS), MP_FILES_PER_TASK)
+            ]
+            for r in [myPool.apply_async(readLASFiles, t) for t in myTaskS]:
+                self += r.get()
+        finally:
+            myPool.close()
+            myPool.join()
+
     def _addSizeTime(self, s, t):
         try:
             self._sizeTimeMap[s].append(t)
@@ -82,13 +146,14 @@ class ReadLASFiles(object):
     def _processFile(self, fp):
         """Process a single file. Returns the size of the file and the time taken to process."""
         rSize = os.path.getsize(fp)
-        clkStart = time.clock()
+        clkStart = time.perf_counter()
         try:
-            myLr = LASRead.LASRead(fp)
+            myLr = LASRead.LASRead(fp, loadArray=self._loadArray)
             self._cntrs['byte'] += rSize
             self._cntrs['sect'] += len(myLr)
-            self._cntrs['fram'] += myLr.numFrames()
-            self._cntrs['data'] += myLr.numDataPoints()
+            if self._loadArray:
+                self._cntrs['fram'] += myLr.numFrames()
+                self._cntrs['data'] += myLr.numDataPoints()
             self._procLAS(myLr)
         except LASRead.ExceptionLASRead as err:
             logging.error('File: "{:s}", Error: {!r:s}'.format(fp, err))
@@ -98,7 +163,7 @@ class ReadLASFiles(object):
             logging.critical(traceback.format_exc())
             self._cntrs['crit'] += 1
         self._cntrs['file'] += 1
-        return rSize, time.clock() - clkStart 
+        return rSize, time.perf_counter() - clkStart
     
     def _procLAS(self, las):
         self._updateDescMaps(las)
@@ -106,6 +171,9 @@ class ReadLASFiles(object):
         
     def _updateDescMaps(self, las):
         for s in las.genSects():
+            if s.type == 'A':
+                # No descriptions in the array section
+                continue
             self._updateMnemDescMapFromSect(s, self._mnemDescMap)
             self._updateUnitDescMapFromSect(s, self._unitDescMap)
             if s.type == 'C':
@@ -242,10 +310,30 @@ class ReadLASFiles(object):
         r.append('Files OK: {:10d}'.format(self._cntrs['file'] - self._cntrs['erro'] - self._cntrs['crit']))
         r.append('   Bytes: {:10d} ({:g} Mb)'.format(self._cntrs['byte'], self._cntrs['byte'] / 1024**2))
         r.append('Sections: {:10d}'.format(self._cntrs['sect']))
-        r.append('  Frames: {:10d}'.format(self._cntrs['fram']))
-        r.append('    Data: {:10d} ({:g} M)'.format(self._cntrs['data'], self._cntrs['data'] / 1024**2))
+        if self._loadArray:
+            r.append('  Frames: {:10d}'.format(self._cntrs['fram']))
+            r.append('    Data: {:10d} ({:g} M)'.format(self._cntrs['data'], self._cntrs['data'] / 1024**2))
+        r.append('    Time: {:10.3f} (S)'.format(self._execTime))
+        if self._execTime > 0:
+            r.append(' Files/S: {:10.1f}'.format(self._cntrs['file'] / self._execTime))
+            r.append('    MB/S: {:10.3f}'.format(self._cntrs['byte'] / 1024**2 / self._execTime))
         return '\n'.join(r)
 
+################################
+# Section: Multiprocessing code.
+################################
+def readLASFiles(theFpS, loadArray):
+    """Reads a list of LAS files and returns a ReadLASFiles object with the
+    results that can be merged with +=."""
+    myReader = ReadLASFiles(None, loadArray=loadArray)
+    timStart = time.perf_counter()
+    myReader.processFiles(theFpS)
+    myReader._execTime = time.perf_counter() - timStart
+    return myReader
+################################
+# End: Multiprocessing code.
+################################
+
 def main():
     """Main entry point."""
     usage = """usage: %prog [options] dir
@@ -256,15 +344,17 @@ Recursively reads LAS files in a directory reporting information about their con
 #                      help="Keep going as far as sensible. [default: %default]")
 #    optParser.add_option("-r", "--recursive", action="store_true", dest="recursive", default=False, 
 #                      help="Process input recursively. [default: %default]")
-#    optParser.add_option(
-#            "-j", "--jobs",
-#            type="int",
-#            dest="jobs",
-#            default=-1,
-#            help="Max processes when multiprocessing. Zero uses number of native CPUs [%d]. -1 disables multiprocessing." \
-#                    % multiprocessing.cpu_count() \
-#                    + " [default: %default]" 
-#        )      
+    optParser.add_option(
+            "-j", "--jobs",
+            type="int",
+            dest="jobs",
+            default=-1,
+            help="Max processes when multiprocessing. Zero uses number of native CPUs [%d]. -1 disables multiprocessing." \
+                    % multiprocessing.cpu_count() \
+                    + " [default: %default]" 
+        )      
+    optParser.add_option("-H", "--headers-only", action="store_false", dest="loadArray", default=True,
+                      help="Only read the header sections, frames are not counted. [default: %default]")
     optParser.add_option(
             "-l", "--loglevel",
             type="int",
@@ -272,8 +362,10 @@ Recursively reads LAS files in a directory reporting information about their con
             default=40,
             help="Log Level (debug=10, info=20, warning=30, error=40, critical=50) [default: %default]"
         )      
+    cmn_cmd_opts.add_profile_optparse(optParser)
     opts, args = optParser.parse_args()
-    clkStart = time.clock()
+    cmn_cmd_opts.set_profile(opts)
+    clkStart = time.perf_counter()
     timStart = time.time()
     # Initialise logging etc.
     logging.basicConfig(level=opts.loglevel,
@@ -285,7 +377,7 @@ Recursively reads LAS files in a directory reporting information about their con
         optParser.print_help()
         optParser.error("I need a directory to read from!")
         return 1
-    myReader = ReadLASFiles(args[0])
+    myReader = ReadLASFiles(args[0], loadArray=opts.loadArray, jobs=opts.jobs)
     myReader.pprintMnemDesc()
     myReader.pprintCurveDesc()
     myReader.pprintUnitDesc()
@@ -293,7 +385,7 @@ Recursively reads LAS files in a directory reporting information about their con
     myReader.pprintWsd()
     # myReader.pprintSizeTime()
     print(myReader.results())
-    print('  CPU time = %8.3f (S)' % (time.clock() - clkStart))
+    print('  CPU time = %8.3f (S)' % (time.perf_counter() - clkStart))
     print('Exec. time = %8.3f (S)' % (time.time() - timStart))
     print('Bye, bye!')
     return 0
@@ -29,9 +29,14 @@ __version__ = '0.1.0'
 __rights__  = 'Copyright (c) 2012 Paul Ross.'
 
 import logging
+import mmap
 import os
 import re
 import collections
+import warnings
+
+import numpy
+
 from TotalDepth.LIS.core import EngVal
 
 from TotalDepth.LAS import ExceptionTotalDepthLAS
@@ -75,6 +80,7 @@ DEBUG_LINE_BY_LINE = False
 def genLines(f):
     """Given an file-like object this generates non-blank, non-comment lines.
     It's a co-routine so can accept a line to put back.
+    LASRead now uses LASScanner instead.
     """
     n = 0
     while 1:
@@ -91,6 +97,113 @@ def genLines(f):
                 yield None
                 yield n, l
 
+#: Size of the chunks that LASScanner reads
+READ_CHUNK_SIZE = 64 * 1024
+
+class LASScanner(object):
+    """Reads LAS text from a file like object in large chunks and splits it into
+    sections by finding the '~' at the start of a line. This does not look
+    inside the sections so the array section is handed over as a single block
+    of text.
+    theEncoding is used by tellBytes(), if None the encoding of theFile is
+    used or 'utf-8' if it has none."""
+    def __init__(self, theFile, chunkSize=READ_CHUNK_SIZE, theEncoding=None):
+        self._file = theFile
+        self._chunkSize = chunkSize
+        self.encoding = theEncoding or getattr(theFile, 'encoding', None) or 'utf-8'
+        # Text read but not yet consumed
+        self._text = ''
+        # Number of bytes consumed so far in self.encoding, see tellBytes()
+        self._consumedBytes = 0
+        # Line number of the start of self._text
+        self._lineNum = 1
+
+    def _read(self):
+        """Returns the next chunk, empty at EOF."""
+        return self._file.read(self._chunkSize)
+
+    def _consume(self, theText):
+        """Records theText as having been consumed."""
+        self._consumedBytes += len(theText.encode(self.encoding))
+        self._lineNum += theText.count('\n')
+
+    def _readToHead(self):
+        """Returns the text up to the next section head and leaves self._text
+        starting with that head. At EOF all the text is returned and self._text
+        will be empty. self._text must be at the start of a line."""
+        myPieceS = []
+        myText = self._text
+        while True:
+            if myText.startswith('~'):
+                i = 0
+            else:
+                i = myText.find('\n~')
+                if i != -1:
+                    i += 1
+            if i != -1:
+                myPieceS.append(myText[:i])
+                self._text = myText[i:]
+                break
+            myChunk = self._read()
+            if not myChunk:
+                myPieceS.append(myText)
+                self._text = ''
+                break
+            # Keep any partial line so that the search starts at a line start
+            j = myText.rfind('\n') + 1
+            myPieceS.append(myText[:j])
+            myText = myText[j:] + myChunk
+        return ''.join(myPieceS)
+
+    def _readHeadLine(self):
+        """Returns the section head line, including any newline, from the start of self._text."""
+        assert(self._text.startswith('~'))
+        while True:
+            i = self._text.find('\n')
+            if i != -1:
+                break
+            myChunk = self._read()
+            if not myChunk:
+                i = len(self._text) - 1
+                break
+            self._text += myChunk
+        r = self._text[:i + 1]
+        self._text = self._text[i + 1:]
+        return r
+
+    def genSections(self, stopAtArray=False):
+        """Generates (line_number, head, text) for each section. head is the
+        section head line without a newline and line_number is its line number.
+        text is the remaining lines of the section. Any text before the first
+        section is yielded with a head of None.
+        If stopAtArray is True then on reaching the array section this yields
+        its head with text None and stops, tellBytes() and remainder() can then
+        be used to locate the array section."""
+        myText = self._readToHead()
+        if myText != '':
+            yield self._lineNum, None, myText
+            self._consume(myText)
+        while self._text != '':
+            myLineNum = self._lineNum
+            myHead = self._readHeadLine()
+            self._consume(myHead)
+            myHead = myHead.rstrip('\r\n')
+            if stopAtArray and myHead.startswith('~A'):
+                yield myLineNum, myHead, None
+                return
+            myText = self._readToHead()
+            yield myLineNum, myHead, myText
+            self._consume(myText)
+
+    def tellBytes(self):
+        """The number of bytes consumed so far if the text was read with
+        self.encoding and without newline translation."""
+        return self._consumedBytes
+
+    def remainder(self):
+        """The text that has been read but not consumed."""
+        return self._text
+
 #: All section identifiers
 SECT_TYPES                  = 'VWCPOA'
 #: Section with data lines
@@ -287,7 +400,13 @@ class LASSection():
         return -1
 
 class LASSectionArray(LASSection):
-    """Contains data on an array section."""
+    """Contains data on an array section.
+    Frames can be added a line at a time with addMemberLine() or as a block of
+    text with addMemberText(). Once finalise() is called the frames are held
+    as a 2-D numpy array of float64, one row per frame, one column per curve.
+    
+    Loading can be deferred with setLazyLoad(), in that case the frames are
+    loaded and finalised on first access."""
     def __init__(self, sectType, wrap, curvSect, null=-999.25):
         assert(sectType == 'A')
         self._wrap = wrap
@@ -299,6 +418,63 @@ class LASSectionArray(LASSection):
 #            raise ExceptionLASReadSectionArray('Wrapped array section with a single curve makes no sense')
         super().__init__(sectType)
         self._null = null
+        # Flat numpy arrays of values from addMemberText(), these are
+        # reshaped to frames by finalise()
+        self._flatBufS = []
+        # Callable that populates this section on first access, see setLazyLoad()
+        self._lazyLoad = None
+
+    def setLazyLoad(self, theFn):
+        """Defers loading of the frames until first access. theFn will be called
+        with this section as its only argument and is expected to populate it
+        with addMemberText() or addMemberLine(). finalise() is then called."""
+        self._lazyLoad = theFn
+
+    def isLoaded(self):
+        """Returns False if the frames are yet to be loaded by the callable given
+        to setLazyLoad()."""
+        return self._lazyLoad is None
+
+    def _load(self):
+        """Loads and finalises the frames if this has been deferred."""
+        if self._lazyLoad is not None:
+            myFn = self._lazyLoad
+            self._lazyLoad = None
+            try:
+                myFn(self)
+                self.finalise()
+            except Exception:
+                # Discard any partial data so that the next access raises again
+                self._members = []
+                self._unwrapBuf = []
+                self._flatBufS = []
+                self._lazyLoad = myFn
+                raise
+
+    def __len__(self):
+        """Number of frames."""
+        self._load()
+        return super().__len__()
+
+    def __contains__(self, theX):
+        """Membership test of an index value."""
+        self._load()
+        return super().__contains__(theX)
+
+    def __getitem__(self, key):
+        """Returns a frame as a view of the array."""
+        self._load()
+        return super().__getitem__(key)
+
+    def keys(self):
+        """Returns the index values."""
+        self._load()
+        return super().keys()
+
+    def find(self, m):
+        """Returns the frame ordinal for index value m or -1 if not found."""
+        self._load()
+        return super().find(m)
 
     def _addBuf(self, lineNum):
         """Adds the temporary buffer to the array. This is associated with the given line number."""
@@ -314,9 +490,9 @@ class LASSectionArray(LASSection):
             self._members.append(self._unwrapBuf)
             self._unwrapBuf = []
 
-    def addMemberLine(self, i, l):
-        """Process a line in an array section."""
-        # Convert to float inserting null where that can not be done
+    def _retLineValues(self, i, l):
+        """Returns a list of floats from line l, i is the line number. Values
+        that can not be converted are replaced by the null value."""
         valS = []
         for v in l.strip().split():
             try:
@@ -324,6 +500,12 @@ class LASSectionArray(LASSection):
             except ValueError:
                 logging.warning('LASSectionArray.addMemberLine(): line [{:d}], can not convert "{:s}" to float.'.format(i, v))
                 valS.append(self._null)
+        return valS
+
+    def addMemberLine(self, i, l):
+        """Process a line in an array section."""
+        # Convert to float inserting null where that can not be done
+        valS = self._retLineValues(i, l)
         # Add it to the members
         if len(valS) > 0:
             if not self._wrap:
@@ -355,13 +537,117 @@ class LASSectionArray(LASSection):
                     'Line [{:d}] array overflow; frame length {:d} which should be length {:d}'.format(
                         i, len(self._unwrapBuf), len(self._mnemUnitS),
                 ))
-                
+
+    def addMemberText(self, i, theText):
+        """Process a block of lines in an array section in one go, i is the line
+        number of the first line. theText must not contain comment lines.
+        The values are converted in bulk and only if that fails is the text
+        converted line by line inserting null where that can not be done.
+        In wrap mode the values are reshaped to the frame size by finalise()
+        so, unlike addMemberLine(), there is no check that each index value is
+        on a line of its own. Without wrap any line that is not a complete
+        frame is padded with null or truncated with a warning."""
+        try:
+            with warnings.catch_warnings():
+                # Older versions of numpy warn rather than raise on unmatched data
+                warnings.simplefilter('error', DeprecationWarning)
+                myVals = numpy.fromstring(theText, dtype=numpy.float64, sep=' ')
+        except (ValueError, DeprecationWarning):
+            myVals = numpy.array(
+                [v for n, l in enumerate(theText.splitlines()) for v in self._retLineValues(i + n, l)],
+                dtype=numpy.float64,
+            )
+        if not self._wrap:
+            # Check that every line is a complete frame, if not then pad short
+            # lines with null and truncate long ones.
+            myCounts = self._retLineValueCounts(theText)
+            if numpy.any((myCounts != 0) & (myCounts != len(self._mnemUnitS))):
+                myVals = numpy.array(
+                    [v for n, l in enumerate(theText.splitlines()) for v in self._retFrameValues(i + n, l)],
+                    dtype=numpy.float64,
+                )
+        self._flatBufS.append(myVals)
+
+    @staticmethod
+    def _retLineValueCounts(theText):
+        """Returns a numpy array of the number of whitespace separated values
+        on each line of theText."""
+        myBytes = numpy.frombuffer(theText.encode('utf-8', 'replace'), dtype=numpy.uint8)
+        myIsSpace = (myBytes == ord(' ')) | (myBytes == ord('\t')) | (myBytes == ord('\n')) | (myBytes == ord('\r'))
+        # A value starts with a non-space that follows a space or the start of text
+        myStarts = ~myIsSpace
+        myStarts[1:] &= myIsSpace[:-1]
+        myLineNums = numpy.cumsum(myBytes == ord('\n'))
+        return numpy.bincount(myLineNums[myStarts], minlength=myLineNums[-1] + 1 if myBytes.size else 0)
+
+    def _retFrameValues(self, i, l):
+        """Returns a list of floats from line l, i is the line number, padded
+        with null or truncated to the frame length. An empty list is returned
+        for a blank line."""
+        valS = self._retLineValues(i, l)
+        if len(valS) not in (0, len(self._mnemUnitS)):
+            logging.warning(
+                'LASSectionArray.addMemberText(): line [{:d}] has {:d} values, frame length should be {:d}.'.format(
+                    i, len(valS), len(self._mnemUnitS),
+                )
+            )
+            valS = (valS + [self._null] * len(self._mnemUnitS))[:len(self._mnemUnitS)]
+        return valS
+
     def finalise(self):
-        """Finalisation.
-        TODO: Make a numpy array and get rid of the members. Need to overload __getitem__."""
+        """Finalisation, this converts the frames to a 2-D numpy array.
+        This does nothing if loading has been deferred by setLazyLoad()."""
+        if self._lazyLoad is not None:
+            return
         self._addBuf(-1)
+        myFrameSize = self.frameSize()
+        myArrayS = []
+        if len(self._members) > 0:
+            try:
+                myArrayS.append(numpy.array(self._members, dtype=numpy.float64))
+            except ValueError as err:
+                raise ExceptionLASReadSectionArray('Frames of unequal length: {!s:s}'.format(err))
+        if len(self._flatBufS) > 0:
+            myVals = numpy.concatenate(self._flatBufS)
+            self._flatBufS = []
+            if myFrameSize == 0 or myVals.size % myFrameSize != 0:
+                raise ExceptionLASReadSectionArray(
+                    'Can not reshape {:d} values into frames of length {:d}'.format(myVals.size, myFrameSize)
+                )
+            myArrayS.append(myVals.reshape((myVals.size // myFrameSize, myFrameSize)))
+        for a in myArrayS:
+            if a.shape[1:] != (myFrameSize,):
+                raise ExceptionLASReadSectionArray(
+                    'Frames of length {!s:s} which should be length {:d}'.format(a.shape[1:], myFrameSize)
+                )
+        if len(myArrayS) == 0:
+            self._members = numpy.empty((0, myFrameSize), dtype=numpy.float64)
+        elif len(myArrayS) == 1:
+            self._members = myArrayS[0]
+        else:
+            self._members = numpy.vstack(myArrayS)
         self._createIndex()
-    
+
+    def _createIndex(self):
+        """Creates an index of {depth : ordinal, ...} from the first column."""
+        self._indexMap = {}
+        for m, k in enumerate(self._members[:, 0].tolist() if len(self._members) else []):
+            if k in self._indexMap:
+                logging.warning('Ignoring duplicate menmonic "{:s}", was {:s} dupe is {:s}'.format(
+                    str(k),
+                    str(self._members[self._indexMap[k]].tolist()),
+                    str(self._members[m].tolist()),
+                    )
+                )
+            else:
+                self._indexMap[k] = m
+
+    @property
+    def array(self):
+        """The frames as a 2-D numpy array of float64, only valid after finalise()."""
+        self._load()
+        return self._members
+
     def frameSize(self):
         """Returns the number of data points in a frame."""
         return len(self._mnemUnitS)
@@ -414,7 +700,7 @@ class LASBase(object):
     def numFrames(self):
         """Returns the number of frames of data in an 'A' record if I have one."""
         try:
-            return len(self._sects[self._sectMap['A']])
+            return len(self['A'])
         except KeyError:
             pass
         return 0
@@ -584,18 +870,29 @@ class LASBase(object):
         assert(self.hasOutpMnem(theMnem))
         arrayIndex = self._findCurveOrAltCurve(theMnem)
         assert(arrayIndex != -1)
-        sectArray = self['A']
-        numFrames = len(sectArray)
-        for f in range(numFrames):
-            yield sectArray[f][0], sectArray[f][arrayIndex]
+        myArray = self['A'].array
+        yield from zip(myArray[:, 0].tolist(), myArray[:, arrayIndex].tolist())
+
+    def outpPointArrays(self, theMnem):
+        """Returns the same points as genOutpPoints() as a pair of numpy
+        arrays (X axis, values)."""
+        assert(self.hasOutpMnem(theMnem))
+        arrayIndex = self._findCurveOrAltCurve(theMnem)
+        assert(arrayIndex != -1)
+        myArray = self['A'].array
+        return myArray[:, 0], myArray[:, arrayIndex]
         #--------------------------
         # End: Channel data access.
         #--------------------------
 
 class LASRead(LASBase):
     """Reads a LAS file."""
-    def __init__(self, theFp, theFileID=None):
-        """Reads a LAS file from theFp that is either a string (file path) or a file like object."""
+    def __init__(self, theFp, theFileID=None, loadArray=True):
+        """Reads a LAS file from theFp that is either a string (file path) or a file like object.
+        If loadArray is False then reading stops at the array section which is
+        only loaded on first access. If theFp is a file path the array section
+        is then read with mmap, otherwise theFp must be seekable and remain open
+        and is seeked back to the array section when that is loaded."""
         self._sectDespatchMap = {
             'V' : self._procSectV,
             'W' : self._procSect,
@@ -604,69 +901,90 @@ class LASRead(LASBase):
             'O' : self._procSect,
             'A' : self._procSectA,
         }
+        self._loadArray = loadArray
+        # The file path, if any, used for lazy loading of the array section
+        self._path = None
         if isinstance(theFp, str):
-            theFp = open(theFp)
+            self._path = theFp
+            # No newline translation so that LASScanner.tellBytes() is accurate
+            theFp = open(theFp, newline='')
+        self._file = theFp
         myFileID = theFileID
         try:
             myFileID = theFp.name
         except AttributeError:
             pass
         super().__init__(myFileID)
-        self._procFile(genLines(theFp))
+        try:
+            self._procFile(LASScanner(theFp))
+        finally:
+            if self._path is not None and self._file is not None:
+                self._file.close()
+                self._file = None
         self._finalise()
         
-    def _procFile(self, gen):
-        for i, l in gen:
-            m = RE_SECT_HEAD.match(l)
+    def _procFile(self, theScanner):
+        for i, myHead, myText in theScanner.genSections(stopAtArray=not self._loadArray):
+            m = None
+            if myHead is not None:
+                if 'A' in self._sectMap:
+                    raise ExceptionLASRead('Line: {:d}. Found section header line "{:s}" after array section'.format(i, myHead))
+                m = RE_SECT_HEAD.match(myHead)
             if m is not None:
-                self._sectDespatchMap[m.group(1)](m, gen)
+                if myText is None:
+                    # Array section is read lazily so stop here
+                    self._procSectALazy(m, i, theScanner)
+                    break
+                self._sectDespatchMap[m.group(1)](m, i, myText)
             else:
-#                raise ExceptionLASRead('LASRead._procFile(): Line: {:d} Unknown line: "{:s}"'.format(i, l))
-                logging.warning('LASRead._procFile(): Line: {:d} Unknown line: "{:s}"'.format(i, l.replace('\n', '\\n')))
-                # Consume following non-section lines
-                numLines = 0
-                for i, l in gen:
-                    m = RE_SECT_HEAD.match(l)
-                    if m is not None:
-                        gen.send(l)
-                        break
-                    numLines += 1
-                logging.warning('LASRead._procFile(): Consumed {:d} succeeding lines.'.format(numLines))
-
-    def _procSectGeneric(self, mtch, gen):
+                myLineS = list(self._genLines(i if myHead is None else i + 1, myText))
+                if myHead is not None:
+                    myLineS.insert(0, (i, myHead))
+                if len(myLineS) > 0:
+#                    raise ExceptionLASRead('LASRead._procFile(): Line: {:d} Unknown line: "{:s}"'.format(i, l))
+                    logging.warning('LASRead._procFile(): Line: {:d} Unknown line: "{:s}"'.format(*myLineS[0]))
+                    logging.warning('LASRead._procFile(): Consumed {:d} succeeding lines.'.format(len(myLineS) - 1))
+
+    def _genLines(self, theLineNum, theText):
+        """Generates (line_number, line) for the non-blank, non-comment lines
+        in theText which starts at line theLineNum."""
+        for n, l in enumerate(theText.splitlines(), theLineNum):
+            if l != '' and not RE_COMMENT.match(l):
+                yield n, l
+
+    def _procSectGeneric(self, mtch, theLineNum, theText):
         mySect = LASSection(mtch.group(1))
-        for i, l in gen:
-            # Bail out if start of new section
-            if l.startswith('~'):#RE_SECT_HEAD.match(l) is not None:
-                gen.send(l)
-                break
+        for i, l in self._genLines(theLineNum + 1, theText):
             mySect.addMemberLine(i, l)
         return mySect
     
-    def _procSectV(self, mtch, gen):
+    def _procSectV(self, mtch, theLineNum, theText):
         logging.debug('_procSectV(): Start')
         assert(mtch is not None)
         if len(self._sects) != 0:
             raise ExceptionLASRead('Version section must be first one.')
-        mySect = self._procSectGeneric(mtch, gen)
+        mySect = self._procSectGeneric(mtch, theLineNum, theText)
         self._finaliseSectAndAdd(mySect)
         self._wrap = mySect['WRAP'].valu
         logging.debug('_procSectV(): End')
 
-    def _procSect(self, mtch, gen):
+    def _procSect(self, mtch, theLineNum, theText):
         logging.debug('_procSect(): Start: {:s}'.format(mtch.group(1)))
         assert(mtch is not None)
         if len(self._sects) == 0:
             raise ExceptionLASRead('Non-version section can not be the first one.')
-        self._finaliseSectAndAdd(self._procSectGeneric(mtch, gen))
+        self._finaliseSectAndAdd(self._procSectGeneric(mtch, theLineNum, theText))
         logging.debug('_procSect(): End: {:s}'.format(mtch.group(1)))
 
-    def _procSectA(self, mtch, gen):
-        logging.debug('_procSectA(): Start')
+    def _checkSectA(self, mtch):
+        """Checks that an array section can be read now."""
         assert(mtch is not None)
         if len(self._sects) == 0:
             raise ExceptionLASRead('Non-version section can not be the first one.')
         assert(self._wrap is not None)
+
+    def _retCurveSection(self):
+        """Returns the curve section that describes the array section."""
         curvIdx = 0
         for s in self._sects:
             if s.type == 'C':
@@ -674,13 +992,67 @@ class LASRead(LASBase):
             curvIdx += 1
         if curvIdx > len(self._sects)-1:
             raise ExceptionLASRead('No curve section to describe array section.')
-        mySect = LASSectionArray(mtch.group(1), self._wrap, self._sects[curvIdx])
-        for i, l in gen:
-            # Bail out if start of new section
-            if l.startswith('~'):#RE_SECT_HEAD.match(l) is not None:
-                gen.send(l)
-                raise ExceptionLASRead('Line: {:d}. Found section header line "{:s}" after array section'.format(i, l))
-                #break
-            mySect.addMemberLine(i, l)
+        return self._sects[curvIdx]
+
+    def _procSectA(self, mtch, theLineNum, theText):
+        """Reads the array section now."""
+        logging.debug('_procSectA(): Start')
+        self._checkSectA(mtch)
+        mySect = LASSectionArray(mtch.group(1), self._wrap, self._retCurveSection())
+        self._addSectAText(mySect, theLineNum + 1, theText)
         self._finaliseSectAndAdd(mySect)
         logging.debug('_procSectA(): End')
+
+    def _procSectALazy(self, mtch, theLineNum, theScanner):
+        """Records the position of the array section and defers reading it.
+        theScanner has consumed the section header line."""
+        logging.debug('_procSectALazy(): Start')
+        self._checkSectA(mtch)
+        mySect = LASSectionArray(mtch.group(1), self._wrap, self._retCurveSection())
+        if self._path is not None:
+            myEncoding = theScanner.encoding
+            myTell = theScanner.tellBytes()
+            mySect.setLazyLoad(
+                lambda s: self._loadSectAFromPath(s, self._path, myTell, myEncoding, theLineNum + 1)
+            )
+        else:
+            myFile = self._file
+            # The scanner has read ahead so the array section starts with the
+            # remainder and continues from the current file position.
+            myText = theScanner.remainder()
+            myTell = myFile.tell()
+            mySect.setLazyLoad(lambda s: self._loadSectAFromFile(s, myFile, myText, myTell, theLineNum + 1))
+        self._finaliseSectAndAdd(mySect)
+        logging.debug('_procSectALazy(): End')
+
+    def _loadSectAFromFile(self, theSect, theFile, theText, theTell, theLineNum):
+        """Populates the array section from a seekable file like object. theText
+        is the start of the section that has already been read and theTell the
+        position of the file following theText."""
+        theFile.seek(theTell)
+        self._addSectAText(theSect, theLineNum, theText + theFile.read())
+
+    def _loadSectAFromPath(self, theSect, thePath, theTell, theEncoding, theLineNum):
+        """Populates the array section from the file at thePath with mmap. theTell
+        is the byte offset of the first line after the section header."""
+        with open(thePath, 'rb') as myF:
+            if os.fstat(myF.fileno()).st_size <= theTell:
+                return
+            with mmap.mmap(myF.fileno(), 0, access=mmap.ACCESS_READ) as myMm:
+                myText = myMm[theTell:].decode(theEncoding)
+        self._addSectAText(theSect, theLineNum, myText)
+
+    def _addSectAText(self, theSect, theLineNum, theText):
+        """Adds the text of an array section removing comment lines and raising
+        if a section header follows the array section."""
+        if '#' in theText or '~' in theText:
+            myLineS = []
+            for i, l in enumerate(theText.splitlines(True)):
+                if l.startswith('~'):
+                    raise ExceptionLASRead('Line: {:d}. Found section header line "{:s}" after array section'.format(
+                        theLineNum + i, l))
+                if not RE_COMMENT.match(l):
+                    myLineS.append(l)
+            theText = ''.join(myLineS)
+        if theText != '':
+            theSect.addMemberText(theLineNum, theText)
@@ -32,19 +32,22 @@ import time
 import sys
 import os
 import logging
+import multiprocessing
 from optparse import OptionParser
 
 #from TotalDepth.LIS import ExceptionTotalDepthLIS
 from TotalDepth.LIS.core import File
 from TotalDepth.LIS.core import FileIndexer
 from TotalDepth.LIS.core import FrameSet
+from TotalDepth.common import cmn_cmd_opts
 
-def dumpFrameSets(fp, keepGoing, summaryOnly, channels):
+def dumpFrameSets(fp, keepGoing, summaryOnly, channels, jobs=-1):
     """Dump the frame values to stdout.
 
     keepGoing is a bool.
     SummaryOnly is a bool to emit a summary only, if false all the data and the summary is written out.
-    Channels is a set of Mnems, if non-empty then only these channels, if present, are written out."""
+    Channels is a set of Mnems, if non-empty then only these channels, if present, are written out.
+    jobs is the number of processes to load each FrameSet with, 0 is the number of CPUs, -1 loads in this process."""
     logging.info('Index.indexFile(): {:s}'.format(fp))
     assert(os.path.isfile(fp))
     myFi = File.FileRead(fp, theFileId=fp, keepGoing=keepGoing)
@@ -55,7 +58,10 @@ def dumpFrameSets(fp, keepGoing, summaryOnly, channels):
         if aLp.logPass.totalFrames == 0:
             print('No frames to load.')
         else:
-            aLp.logPass.setFrameSet(myFi, None, None)
+            if jobs < 0:
+                aLp.logPass.setFrameSet(myFi, None, None)
+            else:
+                aLp.logPass.setFrameSetMP(fp, None, None, jobs=jobs, keepGoing=keepGoing)
             myFrSet = aLp.logPass.frameSet
             if not summaryOnly:
                 # Print the channels and units
@@ -131,8 +137,19 @@ Reads a LIS file and writes out tab separated values of each frame."""
                       help="Display summary only. [default: %default]")
     optParser.add_option("-c", "--channels", action="append", type="str",
                          help="Only dump these named curves.", default=[])
+    optParser.add_option(
+            "-j", "--jobs",
+            type="int",
+            dest="jobs",
+            default=-1,
+            help="Max processes when loading frames. Zero uses number of native CPUs [%d]. -1 disables multiprocessing." \
+                    % multiprocessing.cpu_count() \
+                    + " [default: %default]"
+        )
+    cmn_cmd_opts.add_profile_optparse(optParser)
     opts, args = optParser.parse_args()
-    clkStart = time.clock()
+    cmn_cmd_opts.set_profile(opts)
+    clkStart = time.perf_counter()
     # Initialise logging etc.
     logging.basicConfig(level=opts.loglevel,
                     format='%(asctime)s %(levelname)-8s %(message)s',
@@ -143,8 +160,8 @@ Reads a LIS file and writes out tab separated values of each frame."""
         optParser.print_help()
         optParser.error("I can't do much without a path to the LIS file.")
         return 1
-    dumpFrameSets(args[0], opts.keepGoing, opts.summary, set([v.encode('ascii') for v in opts.channels]))
-    clkExec = time.clock() - clkStart
+    dumpFrameSets(args[0], opts.keepGoing, opts.summary, set([v.encode('ascii') for v in opts.channels]), opts.jobs)
+    clkExec = time.perf_counter() - clkStart
     print('CPU time = %8.3f (S)' % clkExec)
     print('Bye, bye!')
     return 0
@@ -99,6 +99,8 @@ import pickle
 import json
 import pprint
 
+from TotalDepth.common import cmn_cmd_opts
+from TotalDepth.common import process
 from TotalDepth.LIS import ExceptionTotalDepthLIS
 from TotalDepth.LIS.core import File
 from TotalDepth.LIS.core import FileIndexer
@@ -133,7 +135,7 @@ class IndexTimer(object):
     def addSizeTime(self, s, t):
         self._sizeTime.append((s,t))
 
-def indexFile(fp, numTimes, verbose, keepGoing, convertJson):
+def indexFile(fp, numTimes, verbose, keepGoing, convertJson, useMmap=False):
     logging.info('Index.indexFile(): {:s}'.format(fp))
     assert(os.path.isfile(fp))
     retIt = IndexTimer()
@@ -142,14 +144,15 @@ def indexFile(fp, numTimes, verbose, keepGoing, convertJson):
         myLenJson = -1
         timeS = []
         for t in range(numTimes):
-            clkStart = time.clock()
-            myFi = File.FileRead(fp, theFileId=fp, keepGoing=keepGoing)
-            try:
-                myIdx = FileIndexer.FileIndex(myFi)
-            except ExceptionTotalDepthLIS as err:
-                logging.error('{:s}'.format(str(err)))
-                continue
-            timeS.append(time.clock() - clkStart)
+            clkStart = time.process_time()
+            with process.stage('index'):
+                myFi = File.FileRead(fp, theFileId=fp, keepGoing=keepGoing, useMmap=useMmap)
+                try:
+                    myIdx = FileIndexer.FileIndex(myFi)
+                except ExceptionTotalDepthLIS as err:
+                    logging.error('{:s}'.format(str(err)))
+                    continue
+            timeS.append(time.process_time() - clkStart)
             if verbose:
                 print(myIdx.longDesc())
                 print(' All records '.center(75, '='))
@@ -168,7 +171,8 @@ def indexFile(fp, numTimes, verbose, keepGoing, convertJson):
                 print(' Plot Records DONE '.center(75, '='))
             #print('CPU time = %8.3f (S)' % timeS[-1])
             if t == 0:
-                pikBy = pickle.dumps(myIdx)
+                with process.stage('pickle'):
+                    pikBy = pickle.dumps(myIdx)
                 #print('Pickled: file={:10d} size={:10d} {:8.3f}%'.format(
                 #    os.path.getsize(fp),
                 #    len(pikBy),
@@ -178,9 +182,10 @@ def indexFile(fp, numTimes, verbose, keepGoing, convertJson):
                 myLenPickle = len(pikBy)
                 #print('{:d}\t{:d}\t{:.3f} #Pickled'.format(os.path.getsize(fp), len(pikBy), len(pikBy)*100/os.path.getsize(fp)))
                 if convertJson:
-                    jsonObj = myIdx.jsonObject()
-                    # pprint.pprint(jsonObj)
-                    jsonBytes = json.dumps(jsonObj, sort_keys=True, indent=4)
+                    with process.stage('json'):
+                        jsonObj = myIdx.jsonObject()
+                        # pprint.pprint(jsonObj)
+                        jsonBytes = json.dumps(jsonObj, sort_keys=True, indent=4)
                     myLenJson = len(jsonBytes)
                     if verbose:
                         print(' JSON [{:d}] '.format(myLenJson).center(75, '='))
@@ -213,21 +218,23 @@ def indexFile(fp, numTimes, verbose, keepGoing, convertJson):
                 )
             )
             retIt.addSizeTime(mySiz, refTime)
+            process.count('files_in')
+            process.count('bytes_in', mySiz)
     except ExceptionTotalDepthLIS as err:
         retIt.addErr()
         traceback.print_exc()
     return retIt
 
-def indexDirSingleProcess(d, r, t, v, k, j):
+def indexDirSingleProcess(d, r, t, v, k, j, m=False):
     """Recursively process a directory using a single process."""
     assert(os.path.isdir(d))
     retIt = IndexTimer()
     for n in os.listdir(d):
         fp = os.path.join(d, n)
         if os.path.isfile(fp):
-            retIt += indexFile(fp, t, v, k, j)
+            retIt += indexFile(fp, t, v, k, j, m)
         elif os.path.isdir(fp) and r:
-            retIt += indexDirSingleProcess(fp, r, t, v, k, j)
+            retIt += indexDirSingleProcess(fp, r, t, v, k, j, m)
     return retIt
 
 ################################
@@ -244,19 +251,22 @@ def genFp(d, r):
             for aFp in genFp(fp, r):
                 yield aFp
 
-def indexDirMultiProcess(dir, recursive, numT, verbose, keepGoing, convertJson, jobs):
+def indexDirMultiProcess(dir, recursive, numT, verbose, keepGoing, convertJson, jobs, useMmap=False):
     if jobs < 1:
         jobs = multiprocessing.cpu_count()
     logging.info('indexDirMultiProcess(): Setting MP jobs to %d' % jobs)
     myPool = multiprocessing.Pool(processes=jobs)
-    myTaskS = [(fp, numT, verbose, keepGoing, convertJson) for fp in genFp(dir, recursive)]
+    myTaskS = [(fp, numT, verbose, keepGoing, convertJson, useMmap) for fp in genFp(dir, recursive)]
     retResult = IndexTimer()
     #print('myTaskS', myTaskS)
-    myResults = [
-        r.get() for r in [
-            myPool.apply_async(indexFile, t) for t in myTaskS
-        ]
-    ]
+    myResults = []
+    for r in [myPool.apply_async(process.call_with_stages, (indexFile,) + t) for t in myTaskS]:
+        myResult, myStages = r.get()
+        process.merge_stage_data(myStages)
+        myResults.append(myResult)
+    # Workers write any profile data on exit.
+    myPool.close()
+    myPool.join()
     for r in myResults:
         retResult += r
     return retResult
@@ -291,14 +301,18 @@ Indexes LIS files recursively."""
             help="Number of times to repeat the read [default: %default]"
         )
     optParser.add_option("-s", "--statistics", action="store_true", dest="statistics", default=False, 
-                      help="Dump timing statistics. [default: %default]")
+                      help="Dump timing statistics and the timing of each stage. [default: %default]")
     optParser.add_option("-v", "--verbose", action="store_true", dest="verbose", default=False, 
                       help="Verbose Output. [default: %default]")
     optParser.add_option("-r", "--recursive", action="store_true", dest="recursive", default=False, 
                       help="Process input recursively. [default: %default]")
     optParser.add_option("-J", "--JSON", action="store_true", dest="json", default=False,
                       help="Convert index to JSON, if verbose then dump it out as well. [default: %default]")
+    optParser.add_option("-m", "--mmap", action="store_true", dest="mmap", default=False,
+                      help="Memory map the LIS files, faster for files with TIF markers. [default: %default]")
+    cmn_cmd_opts.add_profile_optparse(optParser)
     opts, args = optParser.parse_args()
+    cmn_cmd_opts.set_profile(opts)
     # Initialise logging etc.
     logging.basicConfig(level=opts.loglevel,
                     format='%(asctime)s %(levelname)-8s %(message)s',
@@ -306,7 +320,7 @@ Indexes LIS files recursively."""
                     stream=sys.stdout)
     # Your code here
     #print('opts', opts)
-    clkStart = time.clock()
+    clkStart = time.process_time()
     myIt = IndexTimer()
     if len(args) != 1:
         optParser.print_help()
@@ -317,22 +331,23 @@ Indexes LIS files recursively."""
         return 1
     if os.path.isfile(args[0]):
         # Single file so always single process code
-        myIt += indexFile(args[0], opts.times, opts.verbose, opts.keepGoing, opts.json)
+        myIt += indexFile(args[0], opts.times, opts.verbose, opts.keepGoing, opts.json, opts.mmap)
     elif os.path.isdir(args[0]):
         if opts.jobs == -1:
             # Single process code
-            myIt += indexDirSingleProcess(args[0], opts.recursive, opts.times, opts.verbose, opts.keepGoing, opts.json)
+            myIt += indexDirSingleProcess(args[0], opts.recursive, opts.times, opts.verbose, opts.keepGoing, opts.json, opts.mmap)
         else:
             # Multiprocess code 
-            myIt += indexDirMultiProcess(args[0], opts.recursive, opts.times, opts.verbose, opts.keepGoing, opts.json, opts.jobs)
+            myIt += indexDirMultiProcess(args[0], opts.recursive, opts.times, opts.verbose, opts.keepGoing, opts.json, opts.jobs, opts.mmap)
     print('Summary:')
     if opts.statistics:
         print(myIt)
+        print('\n'.join(process.format_stage_data(process.stage_data())))
     else:
         print('Results: {:8d}'.format(len(myIt)))
         print(' Errors: {:8d}'.format(myIt.errCount))
         print('  Total: {:8d}'.format(len(myIt)+myIt.errCount))
-    clkExec = time.clock() - clkStart
+    clkExec = time.process_time() - clkStart
     print('CPU time = %8.3f (S)' % clkExec)
     print('Bye, bye!')
     return 0
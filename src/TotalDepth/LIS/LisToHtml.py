@@ -43,6 +43,8 @@ from TotalDepth.LIS.core import Mnem
 from TotalDepth.util import XmlWrite
 from TotalDepth.LIS.core import FrameSet
 from TotalDepth.LIS.core import FileIndexer
+from TotalDepth.common import cmn_cmd_opts
+from TotalDepth.common import process
 
 CSS_CONTENT = """body {
 font-size:      12px;
@@ -243,7 +245,7 @@ class IndexSummary(object):
         with open(os.path.join(theOutDir, self.CSS_FILE_PATH), 'w') as f:
             f.write(CSS_CONTENT_INDEX)
         # Now Generate the HTML
-        with XmlWrite.XhtmlStream(open(os.path.join(theOutDir, 'index.html'), 'w')) as myS:
+        with XmlWrite.XhtmlStream(open(os.path.join(theOutDir, 'index.html'), 'w'), theBufSize=XmlWrite.DEFAULT_BUFFER_SIZE) as myS:
             with XmlWrite.Element(myS, 'head'):
                 with XmlWrite.Element(
                         myS,
@@ -708,7 +710,8 @@ class LisToHtml(ProcLISPath.ProcLISPathBase):
         self._writeCss(fpOut)
         numEntries = 0
         # Now Generate the HTML
-        with XmlWrite.XhtmlStream(open(fpOut, 'w')) as myS:
+        with process.stage('html'), \
+                XmlWrite.XhtmlStream(open(fpOut, 'w'), theBufSize=XmlWrite.DEFAULT_BUFFER_SIZE) as myS:
             with XmlWrite.Element(myS, 'head'):
                 with XmlWrite.Element(
                         myS,
@@ -744,6 +747,7 @@ class LisToHtml(ProcLISPath.ProcLISPathBase):
                         )
                     )
         # Update the counter
+        process.count('logical_records', numEntries)
         self._summary.add(fpIn, fpOut, numEntries, time.clock() - clkStart)
                 
 def processFile(fpIn, fpOut, keepGoing):
@@ -799,7 +803,9 @@ Generates HTML from input LIS file or directory to an output destination."""
         )      
     optParser.add_option("-r", "--recursive", action="store_true", dest="recursive", default=False, 
                       help="Process input recursively. [default: %default]")
+    cmn_cmd_opts.add_profile_optparse(optParser)
     opts, args = optParser.parse_args()
+    cmn_cmd_opts.set_profile(opts)
     clkStart = time.clock()
     timStart = time.time()
     # Initialise logging etc.
@@ -845,6 +851,7 @@ Generates HTML from input LIS file or directory to an output destination."""
     #myResult.writeHTML(os.path.join(args[1], 'index.html'))
     print('plotLogInfo:')
     print(str(myResult))
+    print('\n'.join(process.format_stage_data(process.stage_data())))
     print('  CPU time = %8.3f (S)' % (time.clock() - clkStart))
     print('Exec. time = %8.3f (S)' % (time.time() - timStart))
     print('Bye, bye!')
@@ -46,6 +46,7 @@ from TotalDepth.util.plot import PRESCfgXML
 from TotalDepth.util import DictTree
 from TotalDepth.util import DirWalk
 from TotalDepth.util import XmlWrite
+from TotalDepth.common import cmn_cmd_opts
 #from TotalDepth.util import HtmlUtils
 
 CSS_CONTENT_INDEX = """body {
@@ -202,7 +203,7 @@ class PlotLogInfo(object):
         with open(os.path.join(os.path.dirname(theFilePath), self.CSS_FILE_PATH), 'w') as f:
             f.write(CSS_CONTENT_INDEX)
         # Write the index
-        with XmlWrite.XhtmlStream(open(theFilePath, 'w')) as myS:
+        with XmlWrite.XhtmlStream(open(theFilePath, 'w'), theBufSize=XmlWrite.DEFAULT_BUFFER_SIZE) as myS:
             with XmlWrite.Element(myS, 'head'):
                 with XmlWrite.Element(
                         myS,
@@ -613,7 +614,9 @@ Generates plot(s) from input LIS file or directory to an output destination."""
         )
     optParser.add_option("-x", "--xml", action="append", dest="LgFormat", default=[],
                       help="Add an XML LgFormat to use for plotting. Value is the UniqueId. Use -x? to see what LgFormats are available. [default: %default]")
+    cmn_cmd_opts.add_profile_optparse(optParser)
     opts, args = optParser.parse_args()
+    cmn_cmd_opts.set_profile(opts)
     clkStart = time.clock()
     timStart = time.time()
     # Initialise logging etc.
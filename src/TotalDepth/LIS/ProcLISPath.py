@@ -33,6 +33,7 @@ import multiprocessing
 
 from TotalDepth.LIS.core import File
 from TotalDepth.LIS.core import FileIndexer
+from TotalDepth.common import process
 from TotalDepth.util import DirWalk
 
 class ProcLISPathBase(object):
@@ -69,8 +70,11 @@ class ProcLISPathBase(object):
         May raises an ExceptionTotalDepthLIS."""
         assert(os.path.isfile(fpIn))
         logging.info('ProcLISPathBase._retLisFileAndIndex(): Reading LIS file {:s}'.format(fpIn))
-        myFi = File.FileRead(fpIn, theFileId=fpIn, keepGoing=self._keepGoing)
-        myIdx = FileIndexer.FileIndex(myFi)
+        with process.stage('index'):
+            myFi = File.FileRead(fpIn, theFileId=fpIn, keepGoing=self._keepGoing)
+            myIdx = FileIndexer.FileIndex(myFi)
+        process.count('files_in')
+        process.count('bytes_in', os.path.getsize(fpIn))
         return myFi, myIdx
 
     def processFile(self, fpIn, fpOut):
@@ -100,8 +104,8 @@ def procLISPath(dIn, dOut, fnMatch, recursive, keepGoing, jobs, fileFn, resultOb
     return procLISPathMP(dIn, dOut, fnMatch, recursive, keepGoing, jobs, fileFn, resultObj)
 
 def procLISPathSP(dIn, dOut, fnMatch, recursive, keepGoing, fileFn, resultObj=None):
-    for fpIn, fpOut in DirWalk.dirWalk(dIn, dOut, fnMatch, recursive):
-        result = fileFn(fpIn, fpOut, keepGoing)
+    for fileInOut in DirWalk.dirWalk(dIn, dOut, fnMatch, recursive):
+        result = fileFn(fileInOut.filePathIn, fileInOut.filePathOut, keepGoing)
         if result is not None and resultObj is not None:
             resultObj += result
     return resultObj
@@ -121,6 +125,7 @@ def procLISPathMP(dIn, dOut, fnMatch, recursive, keepGoing, jobs, fileFn, result
         (fIn, fOut, keepGoing) and return a result that can be added to
         the resultObj or None.
         This should not raise.
+        The stages of fileFn in each worker are merged into this process.
 
     resultObj is accumulation of the results of fileFn or None, this it returned."""
     if jobs < 1:
@@ -129,12 +134,10 @@ def procLISPathMP(dIn, dOut, fnMatch, recursive, keepGoing, jobs, fileFn, result
     myPool = multiprocessing.Pool(processes=jobs)
     myTaskS = [(t.filePathIn, t.filePathOut, keepGoing) for t in DirWalk.dirWalk(dIn, dOut, fnMatch, recursive)]
     #print('myTaskS', myTaskS)
-    myResults = [
-        r.get() for r in [
-            myPool.apply_async(fileFn, t) for t in myTaskS
-        ]
-    ]
-    for r in myResults:
+    myAsyncResults = [myPool.apply_async(process.call_with_stages, (fileFn,) + t) for t in myTaskS]
+    for myAsyncResult in myAsyncResults:
+        r, myStages = myAsyncResult.get()
+        process.merge_stage_data(myStages)
         if r is not None and resultObj is not None:
             resultObj += r
     return resultObj
@@ -41,6 +41,7 @@ import cProfile
 from TotalDepth.LIS.core import File
 from TotalDepth.LIS.core import FileIndexer
 from TotalDepth.LIS.core import FrameSet
+from TotalDepth.LIS.core import EngVal
 
 LOOPS_TO_TEST = 1
 FRAMES_TO_READ = 2048
@@ -115,21 +116,27 @@ class ResultS(object):
             )
         return 'NO results.'
 
-def _loadFrameSetAndAccumulate(theF, theLp, theFrameSlice, theChList):
-    tS = time.clock()
-    theLp.setFrameSet(theF, theFrSl=theFrameSlice, theChList=theChList)
-    tE_load = time.clock() - tS
-    tS = time.clock()
+def _loadFrameSetAndAccumulate(theF, theLp, theFrameSlice, theChList, theXRange=None):
+    """Loads a FrameSet by frame slice or, if theXRange is a pair of EngVal,
+    by X axis range and calculates the min/max/mean for each channel."""
+    tS = time.perf_counter()
+    if theXRange is None:
+        theLp.setFrameSet(theF, theFrSl=theFrameSlice, theChList=theChList)
+    else:
+        theLp.setFrameSetX(theF, theXRange[0], theXRange[1], theChList)
+        theFrameSlice = '{!s:s} to {!s:s}'.format(*theXRange)
+    tE_load = time.perf_counter() - tS
+    tS = time.perf_counter()
     #print('theFrameSlice', theFrameSlice)
     myAcc = theLp.frameSet.accumulate([FrameSet.AccMin, FrameSet.AccMax, FrameSet.AccMean,])
     #print(myAcc)
-    tE_acc = time.clock() - tS
+    tE_acc = time.perf_counter() - tS
     numVals = theLp.frameSet.numValues
     mbRead = numVals * 4 / 2**20
     loadCost = 1000 * tE_load / mbRead
     accCost = 1000 * tE_acc / mbRead
     print(PRINT_FORMAT.format(
-            theFrameSlice,
+            str(theFrameSlice),
             tE_load,
             loadCost,
             tE_acc,
@@ -278,12 +285,39 @@ def frameSetLoadAll(theF, theLp):
     print(str(myRes))
     return myRes
 
+def frameSetLoadRandomX(theF, theLp):
+    numFramesInPass = theLp.rle.totalFrames()
+    numChannels = len(theLp.dfsr.dsbBlocks)
+    if numFramesInPass < 2 or numChannels < 1:
+        return
+    framesToRead = min(FRAMES_TO_READ, numFramesInPass)
+    channelsToRead = min(CHANNELS_TO_READ, numChannels)
+    loopsToTest = LOOPS_TO_TEST
+    print('Loading X axis range of ~{:d} frames, {:d} random channels. Calculating the min/max/mean for each channel.'.format(framesToRead, channelsToRead))
+    xFirst = theLp.xAxisFirstVal
+    xLast = theLp.xAxisLastVal
+    xRange = theLp.xAxisSpacing * (framesToRead - 1)
+    myRes = ResultS()
+    for i in range(loopsToTest):
+        xStart = random.uniform(xFirst, xLast - xRange)
+        xStop = xStart + xRange
+        chList = [c for c in theLp.outpMnemS()]
+        random.shuffle(chList)
+        res = _loadFrameSetAndAccumulate(
+            theF, theLp, None, chList[:channelsToRead],
+            (EngVal.EngVal(xStart, theLp.xAxisUnits), EngVal.EngVal(xStop, theLp.xAxisUnits)),
+        )
+        myRes.append(res)
+    print(str(myRes))
+    return myRes
+
 TEST_TYPE = {
     'A' : (frameSetLoadAll, ''),
     'B' : (frameSetLoadAllCh, ''),
     'C' : (frameSetLoadSequential, ''),
     'D' : (frameSetLoadSequentialRandCh, ''),
     'E' : (frameSetLoadRandom, ''),
+    'F' : (frameSetLoadRandomX, ''),
 }
 
 def processFile(f, tests, keepGoing, resultMap):
@@ -293,10 +327,10 @@ def processFile(f, tests, keepGoing, resultMap):
         myFi = File.FileRead(f, theFileId=f, keepGoing=keepGoing)
         #a = r'W:\LISTestData\logPassStd256MB.lis'
         #myFi = File.FileRead(a, theFileId=a)
-        clkStart = time.clock()
+        clkStart = time.perf_counter()
         myIdx = FileIndexer.FileIndex(myFi)
         #print(myIdx.longDesc())
-        print('Index time: {:.3f}'.format(time.clock() - clkStart))
+        print('Index time: {:.3f}'.format(time.perf_counter() - clkStart))
     except Exception as err:
         logging.error(str(err))
         traceback.print_exc()
@@ -366,13 +400,14 @@ B - Random sequential set of frames, all channels.
 C - Random sequential set of frames, random sequential set of channels.
 D - Random sequential set of frames, random non-sequential set of channels..
 E - Random frames, random channels.
+F - Random X axis range, random channels.
 [default: %default]""")
     optParser.add_option("-s", action="store_true", dest="regex", default=False, 
                       help="Treat the input file as stdout and regex for fields. [default: %default]")
     opts, args = optParser.parse_args()
     global LOOPS_TO_TEST
     LOOPS_TO_TEST = opts.numTests
-    clkStart = time.clock()
+    clkStart = time.perf_counter()
     # Initialise logging etc.
     logging.basicConfig(level=opts.loglevel,
                     format='%(asctime)s %(levelname)-8s %(message)s',
@@ -383,7 +418,7 @@ E - Random frames, random channels.
     # {test : {file : [LogPass_ResultS, ...], ...}, ...}
     resultMap = {}
     myTests = ''.join(sorted(list(set(''.join(opts.tests)))))
-    for t in 'ABCDE':
+    for t in 'ABCDEF':
         resultMap[t] = {}
     if len(args) == 1:
         if opts.regex:
@@ -400,7 +435,7 @@ E - Random frames, random channels.
         optParser.print_help()
         optParser.error("Wrong number of arguments, I need one only.")
         return 1
-    clkExec = time.clock() - clkStart
+    clkExec = time.perf_counter() - clkStart
     print('CPU time = %8.3f (S)' % clkExec)
     print('Bye, bye!')
     return 0
@@ -35,6 +35,7 @@ import struct
 
 from TotalDepth.LIS.core import PhysRec
 from TotalDepth.util import Histogram
+from TotalDepth.common import cmn_cmd_opts
 
 # How much of the logical data to display
 LEN_TRUNCATE = 32
@@ -126,7 +127,9 @@ Scans a LIS79 file and dumps logical record data."""
         )      
     optParser.add_option("-v", "--verbose", action="store_true", dest="verbose", default=False, 
                       help="Verbose Output. [default: %default]")
+    cmn_cmd_opts.add_profile_optparse(optParser)
     opts, args = optParser.parse_args()
+    cmn_cmd_opts.set_profile(opts)
     clkStart = time.clock()
     # Initialise logging etc.
     logging.basicConfig(level=opts.loglevel,
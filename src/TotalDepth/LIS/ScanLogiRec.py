@@ -36,6 +36,7 @@ import struct
 from TotalDepth.LIS import ExceptionTotalDepthLIS
 from TotalDepth.LIS.core import File
 from TotalDepth.LIS.core import LogiRec
+from TotalDepth.common import cmn_cmd_opts
 
 def dumpTable(lr, theS=sys.stdout):
     for aRow in lr.genRows():
@@ -118,7 +119,9 @@ Scans a LIS79 file and dumps Logical Records."""
         )      
     optParser.add_option("-v", "--verbose", action="store_true", dest="verbose", default=False, 
                       help="Verbose Output. [default: %default]")
+    cmn_cmd_opts.add_profile_optparse(optParser)
     opts, args = optParser.parse_args()
+    cmn_cmd_opts.set_profile(opts)
     clkStart = time.clock()
     # Initialise logging etc.
     logging.basicConfig(level=opts.loglevel,
@@ -35,6 +35,7 @@ import struct
 
 from TotalDepth.LIS.core import PhysRec
 from TotalDepth.util import Histogram
+from TotalDepth.common import cmn_cmd_opts
 
 # One byte for type, on for attributes
 LD_STRUCT_HEAD = struct.Struct('>BB')
@@ -106,7 +107,9 @@ Scans a LIS79 file and reports Physical Record structure."""
             default=20,
             help="Log Level (debug=10, info=20, warning=30, error=40, critical=50) [default: %default]"
         )      
+    cmn_cmd_opts.add_profile_optparse(optParser)
     opts, args = optParser.parse_args()
+    cmn_cmd_opts.set_profile(opts)
     clkStart = time.clock()
     # Initialise logging etc.
     logging.basicConfig(level=opts.loglevel,
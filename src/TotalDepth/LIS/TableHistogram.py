@@ -40,6 +40,7 @@ from TotalDepth.LIS import ExceptionTotalDepthLIS
 from TotalDepth.LIS.core import File
 from TotalDepth.LIS.core import LogiRec
 from TotalDepth.LIS.core import FileIndexer
+from TotalDepth.common import cmn_cmd_opts
 
 class TableHistogram(object):
     def __init__(self):
@@ -215,7 +216,9 @@ Provides a count of elements in LIS tables."""
             default=20,
             help="Log Level (debug=10, info=20, warning=30, error=40, critical=50) [default: %default]"
         )      
+    cmn_cmd_opts.add_profile_optparse(optParser)
     opts, args = optParser.parse_args()
+    cmn_cmd_opts.set_profile(opts)
     clkStart = time.clock()
     # Initialise logging etc.
     logging.basicConfig(level=opts.loglevel,
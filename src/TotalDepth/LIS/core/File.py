@@ -69,16 +69,19 @@ class FileRead(FileBase):
     theFileId - File identifier, this could be a path for example. If None the RawStream will try and cope with it.
 
     keepGoing - If True we do our best to keep going.
+
+    useMmap - If True the file is memory mapped, this is faster for files with many small reads such as TIF markers.
     """
-    def __init__(self, theFile, theFileId=None, keepGoing=False):
+    def __init__(self, theFile, theFileId=None, keepGoing=False, useMmap=False):
         """Constructor with:
         theFile - A file like object or string, if the latter it assumed to be a path.
         theFileId - File identifier, this could be a path for example. If None the RawStream will try and cope with it.
         keepGoing - If True we do our best to keep going.
+        useMmap - If True the file is memory mapped.
         """
         super(FileRead, self).__init__(theFile, theFileId, 'r', keepGoing)
         try:
-            self._prh = PhysRec.PhysRecRead(self.file, self.fileId, self.keepGoing)
+            self._prh = PhysRec.PhysRecRead(self.file, self.fileId, self.keepGoing, useMmap)
         except PhysRec.ExceptionPhysRec as e:
             raise ExceptionFileRead('FileRead.__init__(): error "%s"' % str(e))
 
@@ -27,6 +27,7 @@ Created on 10 Feb 2011
 #import time
 #import sys
 import logging
+import zlib
 
 from TotalDepth.LIS import ExceptionTotalDepthLIS
 #from TotalDepth.LIS.core import EngVal
@@ -387,7 +388,10 @@ class FileIndex(object):
     """Create an index for the LIS file, theF is a LIS File object.
     
     xAxisIndex is the channel index that is regarded as the X axis (default 0).
-    This is currently ignored in the absence of a reasonable use case."""
+    This is currently ignored in the absence of a reasonable use case.
+    
+    If the file is subsequently appended to then update() extends this index
+    with the new Logical Records."""
     def __init__(self, theF, xAxisIndex=0):
         self._fileId = theF.fileId
         self._xAxisIndex = xAxisIndex
@@ -433,6 +437,52 @@ class FileIndex(object):
             LogiRec.LR_TYPE_PICTURE             : IndexUnknownInternalFormat,
             LogiRec.LR_TYPE_IMAGE               : IndexUnknownInternalFormat,
         }
+        # The file position, length and CRC of the last Logical Record indexed
+        # so that update() can check that the file has only been appended to.
+        self._tailTell = None
+        self._tailLen = None
+        self._tailCrc = None
+        self._indexLogicalRecords(theF)
+
+    def update(self, theF):
+        """Extends the index with Logical Records that have been appended to the
+        file since it was indexed. theF is a LIS File object of the same file, for
+        example a new one for a file that is still being written.
+        
+        This reads the last Logical Record that was indexed and raises an
+        ExceptionFileIndex if that has changed, the caller should then create a
+        new FileIndex. Any IndexLogPass is extended in place.
+        
+        Returns the number of Logical Records read."""
+        if theF.fileId != self._fileId:
+            raise ExceptionFileIndex(
+                'FileIndex.update(): mismatched file ID was: {!s:s} now: {!s:s}'.format(self._fileId, theF.fileId)
+            )
+        if self._tailTell is None:
+            theF.rewind()
+        else:
+            if (self._tailLen, self._tailCrc) != self._retLrLenCrc(theF, self._tailTell):
+                raise ExceptionFileIndex(
+                    'FileIndex.update(): Logical Record at 0x{:x} has changed.'.format(self._tailTell)
+                )
+        return self._indexLogicalRecords(theF)
+
+    def _retLrLenCrc(self, theF, tell):
+        """Returns the (length, CRC32) of the Logical Record at tell and leaves
+        theF positioned at the start of the following Logical Record."""
+        theF.seekLr(tell)
+        myBy = theF.readLrBytes() or b''
+        # Reading all the logical data can consume the header of the next
+        # Logical Record so seek back and skip over this one.
+        theF.seekLr(tell)
+        theF.skipToNextLr()
+        return len(myBy), zlib.crc32(myBy)
+
+    def _indexLogicalRecords(self, theF):
+        """Indexes Logical Records from the current file position to EOF.
+        Returns the number of Logical Records read."""
+        lrCount = 0
+        tailTell = None
         while not theF.isEOF:
             # Grab the file position
             t = theF.tellLr()
@@ -461,6 +511,17 @@ class FileIndex(object):
                     elif lrTy == LogiRec.LR_TYPE_DATA_FORMAT:
                         # DFSR so update the map to point at the latest index
                         self._logPassIndexMap[self._idx[-1].iflrType()] = len(self._idx)-1
+            lrCount += 1
+            tailTell = t
+        if tailTell is not None:
+            self._tailTell = tailTell
+            try:
+                self._tailLen, self._tailCrc = self._retLrLenCrc(theF, tailTell)
+            except ExceptionTotalDepthLIS as err:
+                # update() will raise
+                logging.warning('FileIndex._indexLogicalRecords(): Can not read last Logical Record: {!s:s}'.format(err))
+                self._tailLen = self._tailCrc = None
+        return lrCount
 
     def longDesc(self):
         """Returns a string that is the long description of this object."""
@@ -604,6 +604,26 @@ class FrameSet(object):
             self._frames.resize()
         if self._xAxisDecl.recordingMode:
             self._indrXVector = numpy.empty((numFrames,), self.NUMPY_DATA_TYPE)
+
+    def setFrameBuffers(self, theFrames, theIndrXVector=None):
+        """Replaces the underlying numpy arrays with ones supplied by the caller,
+        for example views of shared memory so that several processes can each
+        populate their own frames.
+        theFrames must have the same shape as the existing frame array.
+        theIndrXVector is required if, and only if, the X axis is indirect."""
+        if self._frames.shape != theFrames.shape:
+            raise ExceptionFrameSet(
+                'FrameSet.setFrameBuffers() shape was {!r:s} now {!r:s}'.format(self._frames.shape, theFrames.shape)
+            )
+        if self._xAxisDecl.recordingMode:
+            if theIndrXVector is None or theIndrXVector.shape != self._indrXVector.shape:
+                raise ExceptionFrameSet('FrameSet.setFrameBuffers() needs an indirect X vector of {:d} values'.format(
+                    len(self._indrXVector))
+                )
+        elif theIndrXVector is not None:
+            raise ExceptionFrameSet('FrameSet.setFrameBuffers() indirect X vector when direct X axis')
+        self._frames = theFrames
+        self._indrXVector = theIndrXVector
     
 #    def clear(self):
 #        """Removes all frames."""
@@ -1054,6 +1074,26 @@ class FrameSet(object):
                     for p in self._genChScPointsSingle(frOfs):
                         yield p
 
+    def chScPointArrays(self, ch, sc=0, chIsExt=True):
+        """Returns a pair of numpy arrays (xAxis, values) for the external
+        channel and sub-channel. These are the same points, in the same order,
+        as genChScPoints() would generate.
+        If chIsExt is True then ch is the external channel index otherwise
+        it is the internal index."""
+        if self.numFrames == 0:
+            return numpy.empty((0,), self.NUMPY_DATA_TYPE), numpy.empty((0,), self.NUMPY_DATA_TYPE)
+        chInt = self.internalChIdx(ch) if chIsExt else ch
+        if self._catS[chInt].numValues == 1:
+            # Single sub-channel, single value so just slice the frames
+            if self.isIndirectX:
+                myXS = self._indrXVector
+            else:
+                myXS = self._frames[:, self._xAxisFrOffs]
+            return myXS, self._frames[:, self._intChValIdxS[chInt]]
+        # Multiple values per frame, let genChScPoints() do the hard work
+        myPoints = numpy.array(list(self.genChScPoints(ch, sc, chIsExt)), self.NUMPY_DATA_TYPE).reshape((-1, 2))
+        return myPoints[:, 0], myPoints[:, 1]
+
     def _checkShapes(self, theIntChScS):
         """Checks a non-empty list of (ch,sc) and returns the tuple of
         shape (samples, bursts).
@@ -32,12 +32,14 @@ __rights__  = 'Copyright (c) Paul Ross'
 #import time
 #import sys
 import logging
+import multiprocessing
 #import collections
 #import array
-#import numpy
+import numpy
 #import pprint
 
 from TotalDepth.LIS import ExceptionTotalDepthLIS
+from TotalDepth.LIS.core import File
 from TotalDepth.LIS.core import Type01Plan
 from TotalDepth.LIS.core import Units
 from TotalDepth.LIS.core import Rle
@@ -46,6 +48,11 @@ from TotalDepth.LIS.core import LogiRec
 from TotalDepth.LIS.core import FrameSet
 from TotalDepth.LIS.core import EngVal
 from TotalDepth.LIS.core import Mnem
+try:
+    from TotalDepth.LIS.core.cFrameSet import applyPlan
+except ImportError:
+    # cFrameSet built without applyPlan()
+    from TotalDepth.LIS.core.Type01Plan import applyPlan
 
 class ExceptionLogPass(ExceptionTotalDepthLIS):
     """Specialisation of exception for LogPass."""
@@ -386,13 +393,15 @@ class LogPass(object):
         #return self._dfsr.ebs.opticalLogScale
 
     def frameFromX(self, theEv):
-        """Returns the estimated frame number from the X axis, and EngValue."""
+        """Returns the estimated frame number from the X axis, and EngValue.
+        This uses the RLE index so takes account of changes in the X axis between
+        Logical Records. Will raise an ExceptionLogPass if out of range."""
         myEv = theEv.newEngValInUnits(self.xAxisUnits)
-        retVal = int((myEv.value - self.xAxisFirstVal) // self.xAxisSpacing)
-        if retVal < 0 or retVal >= self._rle.totalFrames():
+        retVal = self._rle.frameForXaxis(myEv.value)
+        if retVal is None or retVal < 0 or retVal >= self._rle.totalFrames():
             raise ExceptionLogPass(
                 'FrameSet.frameFromX():'
-                ' EngVal={!s:s} results in frame index {:d}'
+                ' EngVal={!s:s} results in frame index {!r:s}'
                 ' out of range 0->{:d}'.format(theEv, retVal, self._rle.totalFrames()))
         return retVal
     #========================
@@ -534,6 +543,44 @@ class LogPass(object):
         # Populate the FrameSet
         return self.setFrameSet(theFi, theFrSl=myFrSl, theChList=myChIdxS)
     
+    def setFrameSetX(self, theFile, xStart, xStop, theChS=None, frStep=1):
+        """Loads a FramesSet from a File object for a range of X axis values.
+        This differs from setFrameSetChX() in that xStart and xStop are clipped to
+        the X axis range of this LogPass and can be in either order.
+        As with setFrameSetChX() the range of frames is half open so the last
+        frame of the range, in the direction of the log, is not included
+        unless the range extends beyond the end of this LogPass.
+        Where an X value falls between frames the frame before it (in the
+        direction of the log) is used.
+        
+        theFile - The File object.
+        
+        xStart, xStop - EngVal of the start stop, these can be in any compatible units.
+        
+        theChS - A list of channel mnemonics or None for all channels.
+        
+        frStep - Number of frames to step over, default means all frames.
+        
+        Will raise an ExceptionLogPass if there are no frames in the range.
+        """
+        if self._rle.totalFrames() == 0:
+            raise ExceptionLogPass('LogPass.setFrameSetX(): no frames to load.')
+        if theChS is None:
+            myChIdxS = None
+        else:
+            myChIdxS = self.retExtChIndexList(theChS)
+        frStart = self._rle.frameForXaxis(xStart.newEngValInUnits(self.xAxisUnits).value)
+        frStop = self._rle.frameForXaxis(xStop.newEngValInUnits(self.xAxisUnits).value)
+        if frStart > frStop:
+            frStart, frStop = frStop, frStart
+        frStart = max(0, frStart)
+        frStop = min(self._rle.totalFrames(), frStop)
+        if frStart >= frStop:
+            raise ExceptionLogPass(
+                'LogPass.setFrameSetX(): no frames between {!s:s} and {!s:s}'.format(xStart, xStop)
+            )
+        return self.setFrameSet(theFile, theFrSl=slice(frStart, frStop, frStep), theChList=myChIdxS)
+
     def setFrameSet(self, theFile, theFrSl=None, theChList=None):
         """Populates the frames set.
         
@@ -565,12 +612,159 @@ class LogPass(object):
         )
         if self._frameSet.numFrames == 0:
             return
+        # Note: We take the list of channel indexes from the frameSet as the
+        # frameSet is free to add mandatory channels such as the X axis
+        self._populateFrameSet(theFile, 0, self._retFrameSetLrS(myFrSl), list(self._frameSet.genExtChIndexes()))
+
+    def setFrameSetMP(self, theFilePath, theFrSl=None, theChList=None, jobs=0, keepGoing=False, useMmap=False):
+        """Populates the frames set using a pool of processes. This is worthwhile
+        for LogPasses with many frames.
+        
+        theFilePath - The path to the LIS file. Each process opens its own File
+        object with this path and the file ID given to the constructor.
+        
+        theFrSl, theChList - As setFrameSet().
+        
+        jobs - The maximum number of processes, zero uses the number of native CPUs.
+        If the work can not be divided between processes the frames are loaded in
+        this process. This is also the case if the platform can not 'fork' as each
+        process inherits this LogPass rather than pickling it.
+        
+        keepGoing, useMmap - Passed to each File.FileRead().
+        
+        The RLE gives the position of every Logical Record so the frames are divided
+        into runs of whole Logical Records and each process populates its own frames
+        in a FrameSet that is held in shared memory.
+        The result is the same as setFrameSet() except, for an indirect X axis,
+        where the frame slice starts part way through the first Logical Record of
+        a run. In that case the X axis is extrapolated from the X axis value of
+        that Logical Record rather than from the previous frame.
+        """
+        if self._rle.totalFrames() == 0:
+            raise ExceptionLogPass('LogPass.setFrameSetMP(): no frames to load.')
+        myFrSl = theFrSl or slice(0, self._rle.totalFrames(), 1)
+        if jobs < 1:
+            jobs = multiprocessing.cpu_count()
+        # Release any previous FrameSet before the workers inherit this LogPass
+        del self._frameSet
+        self._frameSet = None
+        myFrSet = FrameSet.FrameSet(
+            self._dfsr,
+            myFrSl,
+            theChList,
+            self._xAxisIndex,
+        )
+        if myFrSet.numFrames == 0:
+            self._frameSet = myFrSet
+            return
+        myChList = list(myFrSet.genExtChIndexes())
+        myRunS = self._retFrameSetRuns(self._retFrameSetMap(myFrSl), jobs)
+        if len(myRunS) < 2 or 'fork' not in multiprocessing.get_all_start_methods():
+            self._frameSet = myFrSet
+            myFile = File.FileRead(theFilePath, theFileId=self._fileId, keepGoing=keepGoing, useMmap=useMmap)
+            self._populateFrameSet(myFile, 0, self._retFrameSetLrS(myFrSl), myChList)
+            return
+        # Shared memory, each worker writes to a disjoint set of rows
+        myShape = myFrSet.frames.shape
+        myFrames = multiprocessing.RawArray('d', myShape[0] * myShape[1])
+        myIndrX = None
+        if myFrSet.isIndirectX:
+            myIndrX = multiprocessing.RawArray('d', myShape[0])
+        myPool = multiprocessing.get_context('fork').Pool(
+            processes=min(jobs, len(myRunS)),
+            initializer=_initFrameSetWorker,
+            initargs=(self, theFilePath, keepGoing, useMmap, myFrSl, myChList, myFrames, myIndrX),
+        )
+        try:
+            myPool.map(_loadFrameSetRun, myRunS)
+        finally:
+            myPool.close()
+            myPool.join()
+        myFrSet.setFrameBuffers(*_retSharedFrameArrays(myShape, myFrames, myIndrX))
+        self._frameSet = myFrSet
+
+    def _attachSharedFrameSet(self, theFrSl, theChList, theFrames, theIndrX):
+        """Used by a setFrameSetMP() worker to create a FrameSet backed by shared memory."""
+        self._frameSet = FrameSet.FrameSet(
+            self._dfsr,
+            theFrSl,
+            theChList,
+            self._xAxisIndex,
+        )
+        self._frameSet.setFrameBuffers(*_retSharedFrameArrays(self._frameSet.frames.shape, theFrames, theIndrX))
+
+    def _populateFrameSet(self, theFile, theFrIntStart, theLrS, theChList):
+        """Reads the File and populates the FrameSet for a run of Logical Records
+        starting at internal frame theFrIntStart. theLrS is a list of
+        [(seek, [frame_offsets, ...]), ...] and theChList the external channels.
+        This uses the compiled plan where possible, otherwise the events from the
+        plan."""
+        myPlan = self._plan.compiledPlan(theChList)
+        if myPlan is None or len(myPlan) == 0:
+            self._populateFrameSetFromEvents(
+                theFile,
+                self._genFrameSetRunEvents(theFrIntStart, theLrS, theChList),
+                theFrIntStart,
+            )
+        else:
+            self._populateFrameSetFromPlan(theFile, theFrIntStart, theLrS, myPlan)
+
+    def _populateFrameSetFromPlan(self, theFile, theFrIntStart, theLrS, thePlan):
+        """Populates the FrameSet by applying a compiled plan to the whole of
+        each Logical Record. Indirect X axis values are computed in the same way
+        as _populateFrameSetFromEvents()."""
+        frInt = theFrIntStart
+        for lrSeek, myBuf in theLrS:
+            theFile.seekLr(lrSeek)
+            myLrh = theFile.readLrBytes(LogiRec.LR_HEADER_LENGTH)
+            if myLrh[0] != self._dfsr.ebs.dataType:
+                raise ExceptionLogPass(
+                    'LogPass.setFrameSet() record at 0x{:x} is type {:d}, not type {:d}'.format(lrSeek, myLrh[0], self._dfsr.ebs.dataType,
+                ))
+            myBy = theFile.readLrBytes() or b''
+            try:
+                applyPlan(
+                    myBy,
+                    self._plan.indirectSize,
+                    self._plan.frameSize,
+                    numpy.array(myBuf, dtype=numpy.intp),
+                    thePlan,
+                    self._frameSet.frames,
+                    frInt,
+                )
+            except (IndexError, ValueError) as err:
+                raise ExceptionLogPass('LogPass.setFrameSet() record at 0x{:x}: {!s:s}'.format(lrSeek, err))
+            if self._plan.indirectSize > 0:
+                self._setIndirectXFromLr(myBy, myBuf, frInt, theFrIntStart)
+            frInt += len(myBuf)
+
+    def _setIndirectXFromLr(self, theBy, theFrOffsS, theFrInt, theFrIntStart):
+        """Sets the indirect X axis for the frames theFrOffsS of a Logical Record
+        whose Logical Data is theBy starting at internal frame theFrInt.
+        As with EVENT_EXTRAPOLATE, if the first frame is not the first in the
+        Logical Record and is not the first frame of the run then the value is
+        extrapolated from the previous frame."""
+        try:
+            xVal = RepCode.readBytes(self._dfsr.ebs.depthRepCode, theBy[:self._plan.indirectSize])
+        except RepCode.ExceptionRepCode as err:
+            raise ExceptionLogPass('LogPass.setFrameSet() can not read indirect X axis: {!s:s}'.format(err))
+        if theFrOffsS[0] > 0 and theFrInt > theFrIntStart:
+            xVal = self._frameSet.xAxisValue(theFrInt - 1)
+        frPrev = 0
+        for i, f in enumerate(theFrOffsS):
+            if f != frPrev:
+                xVal += self._frameSet.xAxisStep(f - frPrev)
+            self._frameSet.setIndirectX(theFrInt + i, xVal)
+            frPrev = f
+
+    def _populateFrameSetFromEvents(self, theFile, theEvents, theFrIntStart=0):
+        """Reads the File and populates the FrameSet from an iterable of events.
+        theFrIntStart is the first internal frame that these events populate.
+        This is the reference implementation for _populateFrameSetFromPlan()."""
         # Iterate through frame plane for this LR
         xVal = None
         #print('setFrameSet.setFrameSet():')
-        # Note: We take the list of channel indexes from the frameSet as the
-        # frameSet is free to add mandatory channels such as the X axis
-        for ty, siz, frInt, chFrom, chTo in self._genFrameSetEvents(myFrSl, list(self._frameSet.genExtChIndexes())):
+        for ty, siz, frInt, chFrom, chTo in theEvents:
             #print('LogPass.setFrameSet(): type={:s} siz={:s} frInt={:s} chFrom={:s} chTo={:s}'.format(ty, str(siz), str(frInt), str(chFrom), str(chTo)))
             #print('LogPass.setFrameSet(): type={:s} frInt={:s}'.format(ty, str(frInt)))
             # Note: fr is frame number in this LR
@@ -587,8 +781,8 @@ class LogPass(object):
                 # If frInt > 0 then we read frInt-1, if frInt == 0 we take
                 # the [0] value, previously read, extrapolate and write it back.
                 # The latter can happen if we specify slice(>1, ..., ...).
-                assert(frInt >= 0), 'frInt={:d}'.format(frInt)
-                if frInt == 0:
+                assert(frInt >= theFrIntStart), 'frInt={:d}'.format(frInt)
+                if frInt == theFrIntStart:
                     xVal = self._frameSet.xAxisValue(frInt)
                 else:
                     xVal = self._frameSet.xAxisValue(frInt-1)
@@ -630,13 +824,41 @@ class LogPass(object):
                 rMap[lrSeek] = [fOffs,]
         return rMap
     
+    def _retFrameSetRuns(self, theSeFrMap, numRuns):
+        """Given a map {seek : [frame_offsets, ...], ...} from _retFrameSetMap()
+        this returns a list of up to numRuns runs of consecutive Logical Records
+        with approximately equal numbers of frames. Each run is a tuple of:
+        (first_internal_frame, [(seek, [frame_offsets, ...]), ...])"""
+        myLrS = [(k, theSeFrMap[k]) for k in sorted(theSeFrMap.keys())]
+        frPerRun = max(1, -(-sum(len(v) for _k, v in myLrS) // max(1, numRuns)))
+        retVal = []
+        frInt = 0
+        frInRun = 0
+        for lrSeek, myBuf in myLrS:
+            if len(retVal) == 0 or frInRun >= frPerRun:
+                retVal.append((frInt, []))
+                frInRun = 0
+            retVal[-1][1].append((lrSeek, myBuf))
+            frInRun += len(myBuf)
+            frInt += len(myBuf)
+        return retVal
+
+    def _retFrameSetLrS(self, theFrSl):
+        """Returns a list of [(seek, [frame_offsets, ...]), ...] in file order for a frame slice."""
+        mySeFrMap = self._retFrameSetMap(theFrSl)
+        return [(k, mySeFrMap[k]) for k in sorted(mySeFrMap.keys())]
+
     def _genFrameSetEvents(self, theFrSl, theChList):
         """Generate events that iterate through a frame slice and channel list.
         Events are a 5 member event tuple."""
-        mySeFrMap = self._retFrameSetMap(theFrSl)
-        frInt = 0
-        for lrSeek in sorted(mySeFrMap.keys()):
-            myBuf = mySeFrMap[lrSeek]
+        yield from self._genFrameSetRunEvents(0, self._retFrameSetLrS(theFrSl), theChList)
+
+    def _genFrameSetRunEvents(self, theFrIntStart, theLrS, theChList):
+        """Generate events for a run of Logical Records starting at internal
+        frame theFrIntStart. theLrS is a list of [(seek, [frame_offsets, ...]), ...]
+        Events are a 5 member event tuple."""
+        frInt = theFrIntStart
+        for lrSeek, myBuf in theLrS:
             #logging.debug('LogPass._genFrameSetEvents(): A lrBuffer={:s}'.format(myBuf))
             #logging.debug('LogPass._genFrameSetEvents(): A type="{:s}" siz={:d}'.format(EVENT_SEEK_LR, lrSeek))
             yield (EVENT_SEEK_LR, lrSeek, None, None, None)
@@ -656,6 +878,12 @@ class LogPass(object):
         fsCh, fsSc = self._mnemToChSc(theMnem)
         return self._frameSet.genChScPoints(fsCh, fsSc, chIsExt=True)
 
+    def outpPointArrays(self, theMnem):
+        """Returns the same points as genOutpPoints() as a pair of numpy
+        arrays (X axis, values)."""
+        fsCh, fsSc = self._mnemToChSc(theMnem)
+        return self._frameSet.chScPointArrays(fsCh, fsSc, chIsExt=True)
+
     def jsonObject(self):
         """Return an Python object that can be JSON encoded."""
         d = {
@@ -687,3 +915,35 @@ class LogPass(object):
 ##############
 # End: LogPass
 ##############
+
+#=========================================
+# Section: setFrameSetMP() worker process.
+#=========================================
+#: State of a setFrameSetMP() worker process, set by _initFrameSetWorker()
+_frameSetWorker = {}
+
+def _retSharedFrameArrays(theShape, theFrames, theIndrX):
+    """Returns a pair of numpy arrays (frames, indirect_X) that are views of
+    the shared memory arrays. indirect_X is None for a direct X axis."""
+    myFrames = numpy.frombuffer(theFrames, dtype=FrameSet.FrameSet.NUMPY_DATA_TYPE).reshape(theShape)
+    if theIndrX is None:
+        return myFrames, None
+    return myFrames, numpy.frombuffer(theIndrX, dtype=FrameSet.FrameSet.NUMPY_DATA_TYPE)
+
+def _initFrameSetWorker(theLogPass, theFilePath, keepGoing, useMmap, theFrSl, theChList, theFrames, theIndrX):
+    """Pool initialiser for setFrameSetMP(), this opens the file and attaches
+    the LogPass to the shared FrameSet."""
+    theLogPass._attachSharedFrameSet(theFrSl, theChList, theFrames, theIndrX)
+    _frameSetWorker['logPass'] = theLogPass
+    _frameSetWorker['chList'] = theChList
+    _frameSetWorker['file'] = File.FileRead(
+        theFilePath, theFileId=theLogPass._fileId, keepGoing=keepGoing, useMmap=useMmap
+    )
+
+def _loadFrameSetRun(theRun):
+    """Populates the shared FrameSet with a run from LogPass._retFrameSetRuns().
+    Returns the number of frames populated."""
+    myLogPass = _frameSetWorker['logPass']
+    frIntStart, myLrS = theRun
+    myLogPass._populateFrameSet(_frameSetWorker['file'], frIntStart, myLrS, _frameSetWorker['chList'])
+    return sum(len(v) for _k, v in myLrS)
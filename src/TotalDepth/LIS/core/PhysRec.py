@@ -324,14 +324,18 @@ class PhysRecBase(object):
 
 class PhysRecRead(PhysRecBase):
     """Specialisation of PhysRecBase for reading streams."""
-    def __init__(self, theFile, theFileId=None, keepGoing=False):
+    def __init__(self, theFile, theFileId=None, keepGoing=False, useMmap=False):
         """Constructor with a file path or file-like object.
+        If useMmap is True the file is memory mapped with a RawStream.RawStreamMmap.
         TODO: checksum.
         """
         super(PhysRecRead, self).__init__(theFileId, keepGoing)
         try:
-            self.stream = RawStream.RawStream(theFile, mode='rb', fileId=self.fileId)
-        except IOError:
+            if useMmap:
+                self.stream = RawStream.RawStreamMmap(theFile, mode='rb', fileId=self.fileId)
+            else:
+                self.stream = RawStream.RawStream(theFile, mode='rb', fileId=self.fileId)
+        except (IOError, RawStream.ExceptionRawStream):
             raise ExceptionPhysRec('PhysRecRead: Can not open LIS file "%s" for read' % self.fileId)
         # Rewind to start of file
         self.stream.seek(0)
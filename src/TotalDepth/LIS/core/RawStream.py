@@ -24,8 +24,10 @@ __date__ = '2010-11-05'
 __version__ = '0.1.2'
 __copyright__ = '(c) 2010 Paul Ross.'
 
+import io
+import mmap
 import os
-#import struct
+import struct
 from TotalDepth.LIS import ExceptionTotalDepthLIS
 
 class ExceptionRawStream(ExceptionTotalDepthLIS):
@@ -145,3 +147,98 @@ class RawStream(object):
 #        except struct.error as err:
 #            raise ExceptionRawStream(str(err))
 #===============================================================================
+
+class RawStreamMmap(RawStream):
+    """Specialisation of RawStream that memory maps the file and reads from
+    the map rather than making a system call for every read. This is read only
+    and is a drop in replacement for RawStream when reading.
+    
+    f - A file like object or string, if the latter it assumed to be a path.
+    If a file like object this must either support fileno() or, like io.BytesIO,
+    getbuffer().
+
+    mode - The file mode, must be binary read.
+
+    fileId - As RawStream.
+    """
+    def __init__(self, f, mode='rb', fileId=None):
+        if mode != 'rb':
+            raise ExceptionRawStream('RawStreamMmap.__init__(): mode must be \'rb\' not \'{:s}\''.format(mode))
+        super().__init__(f, mode, fileId)
+        try:
+            myFileno = self._stream.fileno()
+        except (AttributeError, io.UnsupportedOperation):
+            try:
+                self._buffer = self._stream.getbuffer()
+            except AttributeError:
+                raise ExceptionRawStream('RawStreamMmap.__init__(): can not map {!r:s}'.format(self._stream))
+        else:
+            if os.fstat(myFileno).st_size == 0:
+                # Can not mmap an empty file
+                self._buffer = b''
+            else:
+                self._buffer = mmap.mmap(myFileno, 0, access=mmap.ACCESS_READ)
+        self._pos = 0
+
+    @property
+    def buffer(self):
+        """Exposes the underlying buffer, typically a mmap.mmap object."""
+        return self._buffer
+
+    def tell(self):
+        """Return the current position in the buffer."""
+        return self._pos
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        """Set the current position in the buffer, like stdio's fseek.
+        As with files seeking beyond the end is permitted, subsequent reads
+        will return no data."""
+        if whence == os.SEEK_SET:
+            myPos = offset
+        elif whence == os.SEEK_CUR:
+            myPos = self._pos + offset
+        elif whence == os.SEEK_END:
+            myPos = len(self._buffer) + offset
+        else:
+            raise ExceptionRawStream('RawStreamMmap.seek(): invalid whence {!r:s}'.format(whence))
+        if myPos < 0:
+            raise ExceptionRawStream('RawStreamMmap.seek(): negative seek position {:d}'.format(myPos))
+        self._pos = myPos
+
+    def read(self, theLen):
+        """Reads and returns up to theLen bytes, all remaining bytes if theLen is -ve or None."""
+        if theLen is None or theLen < 0:
+            theLen = max(0, len(self._buffer) - self._pos)
+        myBuf = bytes(self._buffer[self._pos:self._pos + theLen])
+        self._pos += len(myBuf)
+        return myBuf
+
+    def write(self, theB):
+        """Always raises as this is read only."""
+        raise ExceptionRawStream('RawStreamMmap.write(): stream is read only.')
+
+    def close(self):
+        """Closes the memory map and the underlying stream."""
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+        elif isinstance(self._buffer, memoryview):
+            self._buffer.release()
+        self._buffer = b''
+        super().close()
+
+    def readAndUnpack(self, theStruct):
+        """Unpacks binary data directly from the buffer according to the
+        struct module format. This returns a tuple.
+
+        theStruct - A formated instance of struct.Struct()."""
+        try:
+            retVal = theStruct.unpack_from(self._buffer, self._pos)
+        except struct.error:
+            raise ExceptionRawStreamEOF('RawStreamMmap.readAndUnpack(): EOF; at %d but need %d bytes' \
+                                     % (self._pos, theStruct.size))
+        self._pos += theStruct.size
+        return retVal
+
+    def packAndWrite(self, theStruct, *args):
+        """Always raises as this is read only."""
+        raise ExceptionRawStream('RawStreamMmap.packAndWrite(): stream is read only.')
@@ -46,6 +46,8 @@ API Reference
 ===============
 
 """
+import bisect
+
 from TotalDepth.common.Rle import RLEItem, RLE
 
 __author__  = 'Paul Ross'
@@ -130,6 +132,27 @@ class RLEItemType01(RLEItem):
         """Returns the first X-axis value loaded."""
         return self._rleXaxis.last()
 
+    def frameForXaxis(self, xVal, frameSpacing):
+        """Returns the integer frame number, relative to the first frame of
+        this item, at or immediately before the X axis value xVal.
+        frameSpacing is the X axis frame spacing, -ve for up logs.
+        The result is not bounded so may be -ve or beyond totalFrames()."""
+        # Find the last X axis RLE entry that starts at or before xVal
+        lrBase = lrCount = 0
+        xItem = None
+        for anItem in self._rleXaxis.rle_items:
+            if xItem is not None and (xVal - anItem.datum) * frameSpacing < 0:
+                break
+            xItem = anItem
+            lrBase = lrCount
+            lrCount += len(anItem)
+        # Index of the Logical Record within that entry
+        lrIdx = 0
+        if xItem.repeat > 0 and xItem.stride != 0:
+            lrIdx = max(0, min(int((xVal - xItem.datum) // xItem.stride), xItem.repeat))
+        xLr = xItem.datum + lrIdx * xItem.stride
+        return (lrBase + lrIdx) * self._numFrames + int((xVal - xLr) // frameSpacing)
+
 class RLEType01(RLE):
     """Class that represents Run Length Encoding for type 0/1 logical records.
     
@@ -137,6 +160,9 @@ class RLEType01(RLE):
     def __init__(self, theXUnits, *args):
         super().__init__(*args)
         self._xUnits = theXUnits
+        # Lazily built by _retFrameIndex() and _retXaxisIndex(), invalidated by add()
+        self._frameIndex = None
+        self._xAxisIndex = None
         #logging.debug('RLEType01.__init__({:s}) {:s}'.format(theXUnits, repr(self)))
         
     def __str__(self):
@@ -161,6 +187,8 @@ class RLEType01(RLE):
         #logging.debug('RLEType01.add(0x{:x}, {:d}, {:f})'.format(tellLrPos, numFrameS, xAxisValue))
         if self.function is not None:
             tellLrPos = self.function(tellLrPos)
+        self._frameIndex = None
+        self._xAxisIndex = None
         # NOTE: Side effect in second test
         #logging.debug('RLEType01.add(): self._rleS={:s}'.format(self._rleS))
         if len(self.rle_items) == 0 \
@@ -169,22 +197,61 @@ class RLEType01(RLE):
             self.rle_items.append(RLEItemType01(tellLrPos, numFrameS, xAxisValue))
             #logging.debug('RLEType01.add(...) self._rleS now={:s}'.format(self))
 
+    def _retFrameIndex(self):
+        """Returns a list of the cumulative frame number at the start of each
+        RLEItemType01 with the total number of frames appended.
+        This is cached until the next add()."""
+        if self._frameIndex is None:
+            self._frameIndex = [0]
+            for r in self.rle_items:
+                self._frameIndex.append(self._frameIndex[-1] + r.totalFrames())
+        return self._frameIndex
+
+    def _retXaxisIndex(self, sign):
+        """Returns a list of the X axis value at the start of each RLEItemType01
+        multiplied by sign so that the list is increasing for up or down logs.
+        This is cached until the next add()."""
+        if self._xAxisIndex is None or self._xAxisIndex[0] != sign:
+            self._xAxisIndex = sign, [sign * r.xAxisFirst() for r in self.rle_items]
+        return self._xAxisIndex[1]
+
     def tellLrForFrame(self, fNum):
         """Returns the (lr_seek, frame_offset) i.e. the Logical Record position
         that contains the integer frame number and the number of excess frames."""
         #logging.debug('RLEType01.tellLrForFrame({:d})'.format(fNum))
-        if fNum < 0:
+        myIdx = self._retFrameIndex()
+        if fNum < 0 or fNum >= myIdx[-1]:
             raise IndexError('list index out of range')
-        for r in self.rle_items:
-            fNum, v = r.tellLrForFrame(fNum)
-            if v is not None:
-                return v[0], fNum
-        raise IndexError('list index out of range')
+        i = bisect.bisect_right(myIdx, fNum) - 1
+        fNum, v = self.rle_items[i].tellLrForFrame(fNum - myIdx[i])
+        assert(v is not None)
+        return v[0], fNum
 
     def totalFrames(self):
         """Returns the total number of frames in this RLE object."""
         #logging.debug('RLEType01.totalFrames() self._rleS={:s}'.format(self))
-        return sum([r.totalFrames() for r in self.rle_items])
+        return self._retFrameIndex()[-1]
+
+    def frameForXaxis(self, xVal):
+        """Returns the integer frame number at or immediately before the X axis
+        value xVal (in the X axis units). This bisects the X axis values at the
+        start of each RLEItemType01 so assumes that the X axis is monotonic.
+        The result is not bounded so may be -ve or >= totalFrames() if xVal is
+        outside the range of X axis values. Returns None if nothing loaded."""
+        if len(self.rle_items) == 0:
+            return None
+        frame_spacing = self.frameSpacing()
+        if not frame_spacing:
+            return 0
+        # Bisection keys increase regardless of log direction
+        sign = 1 if frame_spacing > 0 else -1
+        i = max(0, bisect.bisect_right(self._retXaxisIndex(sign), sign * xVal) - 1)
+        myIdx = self._retFrameIndex()
+        fNum = self.rle_items[i].frameForXaxis(xVal, frame_spacing)
+        if i < len(self.rle_items) - 1:
+            # Gap between this item and the next, use the last frame of this item
+            fNum = min(fNum, self.rle_items[i].totalFrames() - 1)
+        return myIdx[i] + fNum
 
     def xAxisFirst(self):
         """Returns the first X-axis value loaded or None if nothing loaded."""
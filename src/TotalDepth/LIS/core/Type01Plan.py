@@ -31,6 +31,8 @@ __rights__  = 'Copyright (c) Paul Ross'
 #import logging
 #import collections
 
+import numpy
+
 from TotalDepth.LIS import ExceptionTotalDepthLIS
 from TotalDepth.LIS.core import RepCode
 
@@ -53,6 +55,30 @@ EVENT_SKIP          = 'skip'
 #: Extrapolate event
 EVENT_EXTRAPOLATE   = 'extrapolate'
 
+#: Representation Codes that can be used in a compiled plan, see FrameSetPlan.compiledPlan()
+COMPILED_PLAN_REP_CODES = (49, 50, 56, 66, 68, 70, 73, 77, 79)
+
+def applyPlan(by, byOfs, frameSize, frameNums, plan, frames, rowStart):
+    """Populates frames from the Logical Data of a single Logical Record.
+    by is the Logical Data, byOfs is the offset of the first frame, for example
+    the size of any indirect X axis value.
+    frameNums are the frame numbers in the Logical Record to read, these are
+    written to frames[rowStart:rowStart+len(frameNums)].
+    plan is from FrameSetPlan.compiledPlan(), each row is:
+    (offset_in_frame, length, column, rep_code)
+    
+    This is the reference implementation of cFrameSet.applyPlan()."""
+    if len(frames) < rowStart + len(frameNums):
+        raise IndexError('applyPlan(): {:d} frames will not fit in array of {:d} rows'.format(
+            rowStart + len(frameNums), len(frames)))
+    myPlan = [tuple(int(v) for v in p) for p in plan]
+    for i, f in enumerate(frameNums):
+        base = byOfs + int(f) * frameSize
+        if f < 0 or base + frameSize > len(by):
+            raise IndexError('applyPlan(): frame {:d} beyond Logical Data of length {:d}'.format(int(f), len(by)))
+        for ofs, siz, col, rc in myPlan:
+            frames[rowStart + i, col] = RepCode.readBytes(rc, by[base+ofs:base+ofs+siz])
+
 class FrameSetPlan(object):
     """Given a DFSR the FrameSetPlan gives offsets to any part of the frame set
     within a Logical Record.
@@ -66,6 +92,8 @@ class FrameSetPlan(object):
             self._indirectSize = 0
         # Individual channel sizes
         self._channelSizes = [b.size for b in dfsr.dsbBlocks]
+        # Retained for compiledPlan()
+        self._dsbBlocks = dfsr.dsbBlocks
         # Sum the frame size
         self._frameSize = sum(self._channelSizes)
         # Set up skip lists [integer_byte_length, ...]
@@ -178,6 +206,31 @@ class FrameSetPlan(object):
                 yield f, c, self.chOffset(f, c)
             f += 1
 
+    def compiledPlan(self, theChIndexS):
+        """Returns the plan for reading every value of the channels in a frame
+        as a numpy array of shape (values, 4), each row being:
+        (offset_in_frame, length, column, rep_code)
+        Columns are numbered consecutively across the channels in the order of
+        the sorted channel list, this is the same as a FrameSet.
+        This returns None if any channel uses a Representation Code that is
+        not in COMPILED_PLAN_REP_CODES, dipmeter channels for example, in that
+        case the caller should use genEvents().
+        Will raise ExceptionFrameSetPlanNegLen if any channel negative.
+        Will raise ExceptionFrameSetPlanOverrun if any channel index is out of range."""
+        myRows = []
+        col = 0
+        for c in self._checkChIdx(theChIndexS):
+            rc = self._dsbBlocks[c].repCode
+            if rc not in COMPILED_PLAN_REP_CODES:
+                return None
+            wl = RepCode.wordLength(rc)
+            if self._channelSizes[c] % wl != 0:
+                return None
+            for v in range(self._channelSizes[c] // wl):
+                myRows.append((self._skipToChStart[c] + v * wl, wl, col, rc))
+                col += 1
+        return numpy.array(myRows, dtype=numpy.intp).reshape((len(myRows), 4))
+
     def _raiseOnFrameSlice(self, fSlice):
         if fSlice.stop < 0:
             raise ExceptionFrameSetPlanNegLen(
@@ -24,9 +24,11 @@
 #__version__ = '0.8.0'
 #__rights__  = 'Copyright (c) Paul Ross'
 
+cimport cython
+from libc.math cimport ldexp
+
 #import numpy as np
 #cimport numpy
-#cimport cython
 #
 #@cython.boundscheck(False)
 #def dec(numpy.ndarray[np.float64_t, ndim=1] a not None):
@@ -87,3 +89,98 @@ def decEqInc(a):
                 ri += 1
         prev = a[i]
     return rd, re, ri
+
+#=================================================
+# Section: Applying a compiled Type01Plan to frames
+#=================================================
+cdef double _fromBytes(const unsigned char[:] by, Py_ssize_t o, Py_ssize_t rc):
+    """Returns the value of the Representation Code rc at offset o in by.
+    This mirrors the from...() functions in cRepCode.pyx."""
+    cdef unsigned long long w
+    cdef int mant
+    cdef int exp
+    cdef double val
+    if rc == 68:
+        w = (<unsigned long long> by[o] << 24) | (by[o+1] << 16) | (by[o+2] << 8) | by[o+3]
+        if w & 0x80000000:
+            mant = -8388608
+        else:
+            mant = 0
+        mant |= w & 0x007FFFFF
+        exp = (w & 0x7F800000) >> 23
+        if w & 0x80000000:
+            exp = 104 - exp
+        else:
+            exp -= 151
+        return ldexp(mant, exp)
+    elif rc == 73:
+        w = (<unsigned long long> by[o] << 24) | (by[o+1] << 16) | (by[o+2] << 8) | by[o+3]
+        return <double> (<signed int> (<unsigned int> w))
+    elif rc == 79:
+        return <double> (<signed short> ((by[o] << 8) | by[o+1]))
+    elif rc == 56:
+        return <double> (<signed char> by[o])
+    elif rc == 66 or rc == 77:
+        return <double> by[o]
+    elif rc == 49:
+        w = (by[o] << 8) | by[o+1]
+        mant = w & 0xFFF0
+        if w & 0x8000:
+            mant -= 0x10000
+        return ldexp(mant / 32768.0, w & 0x0F)
+    elif rc == 50:
+        w = (<unsigned long long> by[o] << 24) | (by[o+1] << 16) | (by[o+2] << 8) | by[o+3]
+        mant = w & 0xFFFF
+        exp = ((w >> 16) & 0x03FF) - 15
+        if w & 0x8000:
+            mant -= 0x10000
+        if w & 0x80000000:
+            exp -= 0x10000
+        return ldexp(mant, exp)
+    elif rc == 70:
+        w = (<unsigned long long> by[o] << 24) | (by[o+1] << 16) | (by[o+2] << 8) | by[o+3]
+        val = (w >> 16) & 0xFFFF
+        val += (w & 0xFFFF) / 65536.0
+        if w & 0x80000000:
+            val -= 0x10000
+        return val
+    raise ValueError('applyPlan(): Unsupported representation code {:d}'.format(rc))
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def applyPlan(
+        const unsigned char[:] by,
+        Py_ssize_t byOfs,
+        Py_ssize_t frameSize,
+        const Py_ssize_t[:] frameNums,
+        const Py_ssize_t[:, :] plan,
+        double[:, :] frames,
+        Py_ssize_t rowStart):
+    """Populates frames from the Logical Data of a single Logical Record.
+    by is the Logical Data, byOfs is the offset of the first frame, for example
+    the size of any indirect X axis value.
+    frameNums are the frame numbers in the Logical Record to read, these are
+    written to frames[rowStart:rowStart+len(frameNums)].
+    plan is from FrameSetPlan.compiledPlan(), each row is:
+    (offset_in_frame, length, column, rep_code)
+    See Type01Plan.applyPlan() for the reference implementation."""
+    cdef Py_ssize_t i, p, f, base
+    cdef Py_ssize_t numPlan = plan.shape[0]
+    if frames.shape[0] < rowStart + frameNums.shape[0]:
+        raise IndexError('applyPlan(): {:d} frames will not fit in array of {:d} rows'.format(
+            rowStart + frameNums.shape[0], frames.shape[0]))
+    for p in range(numPlan):
+        if plan[p, 0] < 0 or plan[p, 0] + plan[p, 1] > frameSize \
+        or plan[p, 2] < 0 or plan[p, 2] >= frames.shape[1]:
+            raise IndexError('applyPlan(): plan entry {:d} out of range'.format(p))
+    for i in range(frameNums.shape[0]):
+        f = frameNums[i]
+        base = byOfs + f * frameSize
+        if f < 0 or base + frameSize > by.shape[0]:
+            raise IndexError('applyPlan(): frame {:d} beyond Logical Data of length {:d}'.format(f, by.shape[0]))
+        for p in range(numPlan):
+            frames[rowStart + i, plan[p, 2]] = _fromBytes(by, base + plan[p, 0], plan[p, 3])
+
+#=============================================
+# End: Applying a compiled Type01Plan to frames
+#=============================================
@@ -34,6 +34,7 @@ import logging
 import multiprocessing
 import collections
 import traceback
+import json
 #from optparse import OptionParser
 
 # LIS support
@@ -48,6 +49,7 @@ from TotalDepth.LAS import ExceptionTotalDepthLAS
 import TotalDepth.LAS.core.LASRead
 # Utilities - plotting
 from TotalDepth.util.plot import Plot
+from TotalDepth.util.plot import Coord
 from TotalDepth.util.plot import FILMCfgXML
 #from TotalDepth.util.plot import PRESCfgXML
 from TotalDepth.util.plot import XMLMatches
@@ -56,6 +58,7 @@ from TotalDepth.util import DictTree
 from TotalDepth.util import DirWalk
 from TotalDepth.util import XmlWrite
 from TotalDepth.common import cmn_cmd_opts
+from TotalDepth.common import process
 
 CSS_CONTENT_INDEX = """body {
 font-size:      12px;
@@ -100,6 +103,16 @@ th, td {
 # The field names are not (yet) used.
 IndexTableValue = collections.namedtuple('IndexTableValue', 'scale evFirst evLast evInterval curves numPoints outPath')
 
+#: A single plot of a (LogPass, FILM ID) pair, or one tile of it, for PlotLogPasses._runPlotTasks().
+#: fn is called as fn(file, *args, tile), plot is the Plot.Plot, filmId the FILM ID
+#: or LgFormat UniqueId, logPass is the LIS LogPass or None for LAS and tile is a PlotTile.
+PlotTask = collections.namedtuple('PlotTask', 'fn args plot filmId logPass tile')
+
+#: The X axis interval of a PlotTask. index is the tile number, the first tile has the API header,
+#: xStart and xStop are EngVal, filePath is the SVG file, titleSuffix is appended to the plot title.
+#: outFilePath is the path of the untiled plot and filmName the FILM ID, these identify the tile manifest.
+PlotTile = collections.namedtuple('PlotTile', 'index xStart xStop filePath titleSuffix outFilePath filmName')
+
 class PlotLogInfo(object):
     """Class that collates information about the results of plotting log passes.
     This can, for example, write out an index.html page with links to SVG pages."""
@@ -222,7 +235,7 @@ class PlotLogInfo(object):
         with open(os.path.join(os.path.dirname(theFilePath), self.CSS_FILE_PATH), 'w') as f:
             f.write(CSS_CONTENT_INDEX)
         # Write the index
-        with XmlWrite.XhtmlStream(open(theFilePath, 'w')) as myS:
+        with XmlWrite.XhtmlStream(open(theFilePath, 'w'), theBufSize=XmlWrite.DEFAULT_BUFFER_SIZE) as myS:
             with XmlWrite.Element(myS, 'head'):
                 with XmlWrite.Element(
                         myS,
@@ -318,6 +331,10 @@ class PlotLogPasses(object):
 
         apiHeader is a flag to control whether a API header is extracted from CONS tables
             is to be plotted on the top of the log.
+
+        jobs is the maximum number of processes used to plot the (LogPass, FILM ID)
+            pairs of a file concurrently, zero uses the number of native CPUs and
+            a negative value plots serially.
         """
         self._fpIn = fpIn
         self._fpOut = fpOut
@@ -330,6 +347,11 @@ class PlotLogPasses(object):
         self._apiHeader = opts.apiHeader
         self._lgFormatMinCurves = opts.LgFormat_min
         self._scale = opts.scale
+        self._decimate = opts.decimate
+        self._tileDepth = opts.tile
+        self._jobs = opts.jobs
+        # True while the plot tasks use LogPass FrameSets loaded by _runPlotTasks()
+        self._frameSetsShared = False
         self.plotLogInfo = PlotLogInfo()
         self._processPath(self._fpIn, self._fpOut)
         
@@ -377,8 +399,9 @@ class PlotLogPasses(object):
         assert(os.path.exists(os.path.dirname(fpOut)))
         try:
             # Try to read as LIS file
-            myFi = TotalDepth.LIS.core.File.FileRead(fpIn, theFileId=fpIn, keepGoing=self._keepGoing)
-            myIdx = TotalDepth.LIS.core.FileIndexer.FileIndex(myFi)
+            with process.stage('index'):
+                myFi = TotalDepth.LIS.core.File.FileRead(fpIn, theFileId=fpIn, keepGoing=self._keepGoing)
+                myIdx = TotalDepth.LIS.core.FileIndexer.FileIndex(myFi)
         except ExceptionTotalDepthLIS as err:
             # Failed to read file of create index so not a LIS file
             logging.error('PlotLogPasses._processFileLIS(): Failed with error {!r:s}'.format(err))
@@ -389,16 +412,19 @@ class PlotLogPasses(object):
             return False
         try:
             self.plotLogInfo.logPassCntr += myIdx.numLogPasses()
-            # Iterate through the PlotRecordSet objects
+            # Iterate through the PlotRecordSet objects to create the plot
+            # tasks for every (LogPass, FILM ID) then plot them.
+            myTaskS = []
             for lpIdx, aPrs in enumerate(myIdx.genPlotRecords(fromInternalRecords=self.usesInternalRecords)):
 #                print('lpIdx:', lpIdx)
 #                print(' aPrs:', aPrs)
                 if self.usesInternalRecords:
                     # Use internal FILM/PRES plotting specification
-                    self._plotUsingLISLogicalRecords(myFi, lpIdx, aPrs, fpOut)
+                    myTaskS += self._retTasksUsingLISLogicalRecords(myFi, lpIdx, aPrs, fpOut)
                 else:
                     # Plot using external plot specification
-                    self._plotLISUsingLgFormats(myFi, lpIdx, aPrs, fpOut)
+                    myTaskS += self._retTasksLISUsingLgFormats(myFi, lpIdx, aPrs, fpOut)
+            self._runPlotTasks(myFi, myTaskS, fpIn)
         except ExceptionTotalDepthLIS as err:
             logging.error(
                 'PlotLogPasses._processFileLIS(): Can not process as LIS: "{!r:s}", error: {!r:s}'.format(fpIn, err)
@@ -412,6 +438,8 @@ class PlotLogPasses(object):
             logging.critical(traceback.format_exc())
             return False
         self.plotLogInfo.lisFileCntr += 1
+        process.count('files_in')
+        process.count('bytes_in', os.path.getsize(fpIn))
         logging.info('PlotLogPasses._processFileLIS(): Done LIS file {:s}'.format(fpIn))
         return True
 
@@ -425,8 +453,9 @@ class PlotLogPasses(object):
             # LAS logs do not have internal records that can describe plots
             return False
         try:
-            myLasFile = TotalDepth.LAS.core.LASRead.LASRead(fpIn)
-            self._plotLASUsingLgFormats(myLasFile, fpOut)
+            with process.stage('read'):
+                myLasFile = TotalDepth.LAS.core.LASRead.LASRead(fpIn)
+            self._runPlotTasks(myLasFile, self._retTasksLASUsingLgFormats(myLasFile, fpOut))
             self.plotLogInfo.logPassCntr += 1 # Only one pass per file in LAS, well LAS 1.2 2.0 anyway
         except ExceptionTotalDepthLAS as err:
             logging.error(
@@ -438,9 +467,84 @@ class PlotLogPasses(object):
             logging.critical(traceback.format_exc())
             return False
         self.plotLogInfo.lasFileCntr += 1
+        process.count('files_in')
+        process.count('bytes_in', os.path.getsize(fpIn))
         logging.info('PlotLogPasses._processFileLAS(): Done LAS file {:s}'.format(fpIn))
         return True
     
+    #=======================
+    # Sect.: Plot task graph.
+    #=======================
+    def _plotsInParallel(self, theTaskS):
+        """Returns True if the tasks are to be plotted by a pool of processes.
+        The processes are forked so that they inherit the plot objects and
+        LogPass FrameSets rather than having them pickled. This is not
+        possible in a daemonic process such as a plotLogPassesMP() worker."""
+        return self._jobs >= 0 \
+            and len(theTaskS) > 1 \
+            and 'fork' in multiprocessing.get_all_start_methods() \
+            and not multiprocessing.current_process().daemon
+
+    def _loadSharedFrameSets(self, theFi, theTaskS):
+        """Loads the FrameSet of each LIS LogPass in theTaskS once with the
+        channels needed by all of its plots. The frames are the same as those
+        that Plot._loadFrameSet() loads for the whole LogPass."""
+        myChMap = collections.OrderedDict()
+        for aTask in theTaskS:
+            if aTask.logPass is not None:
+                myChS = myChMap.setdefault(id(aTask.logPass), (aTask.logPass, []))[1]
+                myChS.extend(
+                    m for m in aTask.plot.retFrameSetChIDsLIS(aTask.logPass, aTask.filmId) if m not in myChS
+                )
+        with process.stage('frames'):
+            for myLogPass, myChS in myChMap.values():
+                myLogPass.setFrameSetX(theFi, myLogPass.xAxisFirstEngVal, myLogPass.xAxisLastEngVal, myChS)
+
+    def _runPlotTasks(self, theFi, theTaskS, theFilePath=None):
+        """Plots each PlotTask in theTaskS with the LIS File or LAS file theFi.
+        If multiprocessing the tasks, including the tiles of a single plot, are
+        plotted concurrently. Without tiling the FrameSet of each LogPass is
+        loaded once here and shared read only by the worker processes, otherwise
+        each tile loads its own frames.
+        Worker processes open their own LIS File from theFilePath.
+        The PlotLogInfo results and the stages are merged into self.plotLogInfo
+        and this process and then any tile manifests are written."""
+        if not self._plotsInParallel(theTaskS):
+            for aTask in theTaskS:
+                _plotTask(theFi, aTask)
+            self._writeTileManifests(theTaskS)
+            return
+        if self._jobs < 1:
+            jobs = multiprocessing.cpu_count()
+        else:
+            jobs = self._jobs
+        logging.info('PlotLogPasses._runPlotTasks(): {:d} plots with {:d} processes.'.format(len(theTaskS), jobs))
+        if self._tileDepth == 0:
+            self._loadSharedFrameSets(theFi, theTaskS)
+            self._frameSetsShared = True
+        myPool = multiprocessing.get_context('fork').Pool(
+            processes=min(jobs, len(theTaskS)),
+            initializer=_initPlotWorker,
+            initargs=(self, theFi, theFilePath, theTaskS),
+        )
+        try:
+            myAsyncResultS = [
+                myPool.apply_async(process.call_with_stages, (_runPlotTask, i)) for i in range(len(theTaskS))
+            ]
+            myResultS = [r.get() for r in myAsyncResultS]
+        finally:
+            myPool.close()
+            myPool.join()
+            self._frameSetsShared = False
+        for r, myStages in myResultS:
+            # r is a PlotLogInfo object
+            self.plotLogInfo += r
+            process.merge_stage_data(myStages)
+        self._writeTileManifests(theTaskS)
+    #=====================
+    # End: Plot task graph.
+    #=====================
+
     #===================================================================
     # Sect.: Plotting LIS using LIS Logical Records to specify the plot.
     #===================================================================
@@ -463,7 +567,7 @@ class PlotLogPasses(object):
             myLrPip = TotalDepth.LIS.core.LogiRec.LrTableRead(theFi)
         else:
             myLrPip = None
-        myPlot = Plot.PlotReadLIS(myLrFilm, myLrPres, myLrArea, myLrPip, self._scale)
+        myPlot = Plot.PlotReadLIS(myLrFilm, myLrPres, myLrArea, myLrPip, self._scale, self._decimate)
         return myPlot, thePrs.logPass, self._retCONSRecS(theFi, thePrs)
     
     def _retCONSRecS(self, theFi, thePrs):
@@ -476,55 +580,74 @@ class PlotLogPasses(object):
                 consRecS.append(TotalDepth.LIS.core.LogiRec.LrTableRead(theFi))
             return consRecS
     
-    def _plotUsingLISLogicalRecords(self, theFi, theLpIdx, thePrs, theFpOut):
-        """Plots a LogPass from a LIS file using the LIS Logical Records to
-        specify the plot.
+    def _retTasksUsingLISLogicalRecords(self, theFi, theLpIdx, thePrs, theFpOut):
+        """Returns a list of PlotTask to plot a LogPass from a LIS file using
+        the LIS Logical Records to specify the plot.
         theFi - the LIS File object.
         theLpIdx - integer for the LogPass in the LIS File.
         thePrs - a PlotRecord Set that holds the seek positions of the appropriate
             LIS Logical Records.
         theFpOut - Output file path for the SVG file(s), one per FILM ID.
         """
+        retTaskS = []
         myPlot, myLogPass, myCONSRecS = self._retPlotFromIntPlotRecordSet(theFi, thePrs)
         for aFilmId in myPlot.filmIdS():
-            logging.info('PlotLogPasses._plotUsingLISLogicalRecords(): FILM ID={:s}.'.format(aFilmId.pStr(strip=True)))
+            logging.info('PlotLogPasses._retTasksUsingLISLogicalRecords(): FILM ID={:s}.'.format(aFilmId.pStr(strip=True)))
             if myPlot.hasDataToPlotLIS(myLogPass, aFilmId):
-                myOutFilePath = '{:s}_{:04d}_{:s}.svg'.format(theFpOut, theLpIdx, aFilmId.pStr(strip=True))
-#                myFout = open(myOutFilePath, 'w')
-                myCurvIDs, numPoints = myPlot.plotLogPassLIS(
-                        theFi,
-                        myLogPass,
-                        myLogPass.xAxisFirstEngVal,
-                        myLogPass.xAxisLastEngVal,
-                        aFilmId,
-                        myOutFilePath,
-#                        myFout,
-                        frameStep=1,
-                        title="Plot: {:s} LogPass: {:d} FILM ID={:s}".format(
-                            os.path.abspath(myOutFilePath),
-                            theLpIdx,
-                            aFilmId.pStr(strip=True),
-                        ),
-                        lrCONS=myCONSRecS,
-                    )
-                assert(myCurvIDs is not None and numPoints is not None)
-                # So here the essential data that we have to put in the index.html is:
-                # Key: myOutFilePath or input file fp, lpIdx, aFilmId,
-                # Value: (myPlot.xScale(aFilmId), myLogPass.xAxisFirstEngVal, myLogPass.xAxisLastEngVal, myCurvIDs)
-                self.plotLogInfo.addPlotResult(
-                    theFi.fileId,
-                    myOutFilePath,
-                    theLpIdx,
-                    aFilmId.pStr(),
-                    myPlot.xScale(aFilmId),
+                retTaskS += self._retTileTaskS(
+                    self._plotUsingLISLogicalRecords,
+                    (theLpIdx, myPlot, myLogPass, aFilmId, myCONSRecS),
+                    myPlot,
+                    aFilmId,
+                    myLogPass,
                     myLogPass.xAxisFirstEngVal,
                     myLogPass.xAxisLastEngVal,
-                    theCurveS=myCurvIDs,
-                    ptsPlotted=numPoints)
+                    '{:s}_{:04d}_{:s}.svg'.format(theFpOut, theLpIdx, aFilmId.pStr(strip=True)),
+                    aFilmId.pStr(strip=True),
+                )
             else:
                 logging.info(
-                    'PlotLogPasses._plotUsingLISLogicalRecords(): No data to plot for FILM ID {!r:s}'.format(aFilmId)
+                    'PlotLogPasses._retTasksUsingLISLogicalRecords(): No data to plot for FILM ID {!r:s}'.format(aFilmId)
                 )
+        return retTaskS
+    
+    def _plotUsingLISLogicalRecords(self, theFi, theLpIdx, thePlot, theLogPass, theFilmId, theCONSRecS, theTile):
+        """Plots a LogPass, or one tile of it, from a LIS file for a single
+        FILM ID using the LIS Logical Records to specify the plot."""
+#        myFout = open(theTile.filePath, 'w')
+        myCurvIDs, numPoints = thePlot.plotLogPassLIS(
+                theFi,
+                theLogPass,
+                theTile.xStart,
+                theTile.xStop,
+                theFilmId,
+                theTile.filePath,
+#                myFout,
+                frameStep=1,
+                title="Plot: {:s} LogPass: {:d} FILM ID={:s}{:s}".format(
+                    os.path.abspath(theTile.filePath),
+                    theLpIdx,
+                    theFilmId.pStr(strip=True),
+                    theTile.titleSuffix,
+                ),
+                # API header on the first tile only
+                lrCONS=theCONSRecS if theTile.index == 0 else None,
+                loadFrameSet=not self._frameSetsShared,
+            )
+        assert(myCurvIDs is not None and numPoints is not None)
+        # So here the essential data that we have to put in the index.html is:
+        # Key: myOutFilePath or input file fp, lpIdx, aFilmId,
+        # Value: (myPlot.xScale(aFilmId), myLogPass.xAxisFirstEngVal, myLogPass.xAxisLastEngVal, myCurvIDs)
+        self.plotLogInfo.addPlotResult(
+            theFi.fileId,
+            theTile.filePath,
+            theLpIdx,
+            theFilmId.pStr(),
+            thePlot.xScale(theFilmId),
+            theTile.xStart,
+            theTile.xStop,
+            theCurveS=myCurvIDs,
+            ptsPlotted=numPoints)
     #=================================================================
     # End: Plotting LIS using LIS Logical Records to specify the plot.
     #=================================================================
@@ -536,7 +659,7 @@ class PlotLogPasses(object):
         assert(len(self._lgFormatS) > 0)
         assert(theUniqueId in self._lgFormatS)
         myFcfg = FILMCfgXML.FilmCfgXMLRead()
-        return Plot.PlotReadXML(myFcfg[theUniqueId], self._scale), theIdxLogPass.logPass
+        return Plot.PlotReadXML(myFcfg[theUniqueId], self._scale, self._decimate), theIdxLogPass.logPass
     
     def _retOutPathTitle(self, theFpOut, theLpIdx, aUniqueId):
         fp = '{:s}_{:04d}_{:s}.svg'.format(theFpOut, theLpIdx, aUniqueId)
@@ -550,6 +673,79 @@ class PlotLogPasses(object):
             ),
         )
     
+    def _retPlotRangeS(self, thePlot, theFilmId, theXStart, theXStop, theOutFilePath):
+        """Returns a list of (xStart, xStop, outFilePath, titleSuffix) for the
+        plots to make for a single FILM ID. Without tiling this is the whole
+        interval to theOutFilePath, when tiling there is one entry for each tile
+        with the tile number in the file name."""
+        if self._tileDepth > 0:
+            myXRangeS = list(thePlot.genTileXRanges(
+                theFilmId,
+                theXStart,
+                theXStop,
+                Coord.Dim(self._tileDepth, 'in'),
+            ))
+            myRoot = os.path.splitext(theOutFilePath)[0]
+            return [
+                (x0, x1, '{:s}_tile_{:04d}.svg'.format(myRoot, i), ' Tile: {:d}/{:d}'.format(i + 1, len(myXRangeS)))
+                    for i, (x0, x1) in enumerate(myXRangeS)
+            ]
+        return [(theXStart, theXStop, theOutFilePath, '')]
+    
+    def _retTileTaskS(self, theFn, theArgS, thePlot, theFilmId, theLogPass, theXStart, theXStop, theOutFilePath,
+                      theFilmName):
+        """Returns a list of PlotTask for a single FILM ID, one for each of the
+        ranges from _retPlotRangeS() so that the tiles can be plotted concurrently.
+        theFn is called as theFn(file, *theArgS, aPlotTile)."""
+        return [
+            PlotTask(
+                theFn,
+                theArgS,
+                thePlot,
+                theFilmId,
+                theLogPass,
+                PlotTile(i, x0, x1, fp, titleSuffix, theOutFilePath, theFilmName),
+            ) for i, (x0, x1, fp, titleSuffix) in enumerate(
+                self._retPlotRangeS(thePlot, theFilmId, theXStart, theXStop, theOutFilePath)
+            )
+        ]
+    
+    def _writeTileManifests(self, theTaskS):
+        """If tiling this writes the manifest of the tiles of each plot in
+        theTaskS, this is done once all the tiles have been plotted."""
+        if self._tileDepth > 0:
+            myPlotMap = collections.OrderedDict()
+            for aTask in theTaskS:
+                myPlotMap.setdefault(aTask.tile.outFilePath, (aTask, []))[1].append(
+                    (aTask.tile.filePath, aTask.tile.xStart, aTask.tile.xStop)
+                )
+            for myOutFilePath, (myTask, myTileS) in myPlotMap.items():
+                self._writeTileManifest(
+                    myOutFilePath, myTask.tile.filmName, myTask.plot.xScale(myTask.filmId), myTileS
+                )
+    
+    def _writeTileManifest(self, theOutFilePath, theFilmId, theScale, theTileS):
+        """If tiling this writes a JSON manifest of the tiles beside
+        theOutFilePath with the extension '.json' so that a viewer can load the
+        tiles as required. theTileS is a list of (filePath, xStart, xStop)."""
+        if self._tileDepth > 0:
+            myManifest = {
+                'film'      : theFilmId,
+                'scale'     : theScale,
+                'tileDepth' : self._tileDepth,
+                'tileDepthUnits' : 'in',
+                'xUnits'    : theTileS[0][1].uom.decode('ascii', 'replace').strip() if len(theTileS) else '',
+                'tiles'     : [
+                    {
+                        'file'      : os.path.basename(fp),
+                        'xStart'    : x0.value,
+                        'xStop'     : x1.value,
+                    } for fp, x0, x1 in theTileS
+                ],
+            }
+            with open(os.path.splitext(theOutFilePath)[0] + '.json', 'w') as f:
+                json.dump(myManifest, f, indent=4)
+    
     def _retUniqueIdS(self, theLpOrLasFile):
         """Returns a list of UniqueID strings depending on my constructor."""
         assert(not self.usesInternalRecords)
@@ -571,9 +767,9 @@ class PlotLogPasses(object):
     #=========================================================
     # Sect.: Plotting LIS using XML files to specify the plot.
     #=========================================================
-    def _plotLISUsingLgFormats(self, theFi, theLpIdx, thePrs, theFpOut):
-        """Plots a LogPass from a LIS file using the LgFormat XML files
-        specify the plot.
+    def _retTasksLISUsingLgFormats(self, theFi, theLpIdx, thePrs, theFpOut):
+        """Returns a list of PlotTask to plot a LogPass from a LIS file using
+        the LgFormat XML files specify the plot.
         theFi - the LIS File object.
         theLpIdx - integer for the LogPass in the LIS File.
         thePrs - a PlotRecord Set that holds the seek positions of the appropriate
@@ -581,41 +777,59 @@ class PlotLogPasses(object):
         theFpOut - Output file path for the SVG file(s), one per FILM ID.
         """
         assert(not self.usesInternalRecords)
-        logging.debug('PlotLogPasses._plotLISUsingLgFormats(): PlotRecords={:s}.'.format(str(thePrs)))
+        logging.debug('PlotLogPasses._retTasksLISUsingLgFormats(): PlotRecords={:s}.'.format(str(thePrs)))
+        retTaskS = []
         myCONSRecS = self._retCONSRecS(theFi, thePrs)
         for aUniqueId in self._retUniqueIdS(thePrs.logPass):
-            logging.info('PlotLogPasses._plotLISUsingLgFormats(): UniqueId={:s}.'.format(aUniqueId))
-            myPlot = Plot.PlotReadXML(aUniqueId, self._scale)
+            logging.info('PlotLogPasses._retTasksLISUsingLgFormats(): UniqueId={:s}.'.format(aUniqueId))
+            myPlot = Plot.PlotReadXML(aUniqueId, self._scale, self._decimate)
             if myPlot.hasDataToPlotLIS(thePrs.logPass, aUniqueId):
-                # Create output path and plot it
-                myOutFilePath, myTitle = self._retOutPathTitle(theFpOut, theLpIdx, aUniqueId)
-                myCurvIDs, numPoints = myPlot.plotLogPassLIS(
-                        theFi,
-                        thePrs.logPass,
-                        thePrs.logPass.xAxisFirstEngVal,
-                        thePrs.logPass.xAxisLastEngVal,
-                        aUniqueId,
-                        myOutFilePath,
-                        frameStep=1,
-                        title=myTitle,
-                        lrCONS=myCONSRecS,
-                    )
-                assert(myCurvIDs is not None and numPoints is not None)
-                # So here the essential data that we have to put in the index.html is:
-                # Key: myOutFilePath or input file fp, lpIdx, aFilmId,
-                # Value: (myPlot.xScale(aFilmId), myLogPass.xAxisFirstEngVal, myLogPass.xAxisLastEngVal, myCurvIDs)
-                self.plotLogInfo.addPlotResult(
-                    theFi.fileId,
-                    myOutFilePath,
-                    theLpIdx,
+                retTaskS += self._retTileTaskS(
+                    self._plotLISUsingLgFormats,
+                    (theLpIdx, myPlot, thePrs.logPass, aUniqueId, myCONSRecS, theFpOut),
+                    myPlot,
                     aUniqueId,
-                    myPlot.xScale(aUniqueId),
+                    thePrs.logPass,
                     thePrs.logPass.xAxisFirstEngVal,
                     thePrs.logPass.xAxisLastEngVal,
-                    theCurveS=myCurvIDs,
-                    ptsPlotted=numPoints)
+                    self._retOutPathTitle(theFpOut, theLpIdx, aUniqueId)[0],
+                    aUniqueId,
+                )
             else:
-                logging.info('PlotLogPasses._plotLISUsingLgFormats(): No data to plot for FILM ID {:s}'.format(aUniqueId))
+                logging.info('PlotLogPasses._retTasksLISUsingLgFormats(): No data to plot for FILM ID {:s}'.format(aUniqueId))
+        return retTaskS
+    
+    def _plotLISUsingLgFormats(self, theFi, theLpIdx, thePlot, theLogPass, theUniqueId, theCONSRecS, theFpOut, theTile):
+        """Plots a LogPass, or one tile of it, from a LIS file using a single
+        LgFormat XML file to specify the plot."""
+        myTitle = self._retOutPathTitle(theFpOut, theLpIdx, theUniqueId)[1]
+        myCurvIDs, numPoints = thePlot.plotLogPassLIS(
+                theFi,
+                theLogPass,
+                theTile.xStart,
+                theTile.xStop,
+                theUniqueId,
+                theTile.filePath,
+                frameStep=1,
+                title=myTitle + theTile.titleSuffix,
+                # API header on the first tile only
+                lrCONS=theCONSRecS if theTile.index == 0 else None,
+                loadFrameSet=not self._frameSetsShared,
+            )
+        assert(myCurvIDs is not None and numPoints is not None)
+        # So here the essential data that we have to put in the index.html is:
+        # Key: myOutFilePath or input file fp, lpIdx, aFilmId,
+        # Value: (myPlot.xScale(aFilmId), myLogPass.xAxisFirstEngVal, myLogPass.xAxisLastEngVal, myCurvIDs)
+        self.plotLogInfo.addPlotResult(
+            theFi.fileId,
+            theTile.filePath,
+            theLpIdx,
+            theUniqueId,
+            thePlot.xScale(theUniqueId),
+            theTile.xStart,
+            theTile.xStop,
+            theCurveS=myCurvIDs,
+            ptsPlotted=numPoints)
     #=======================================================
     # End: Plotting LIS using XML files to specify the plot.
     #=======================================================
@@ -623,44 +837,63 @@ class PlotLogPasses(object):
     #=========================================================
     # Sect.: Plotting LAS using XML files to specify the plot.
     #=========================================================
-    def _plotLASUsingLgFormats(self, theLasFile, theFpOut):
-        """Plots a LogPass from a LAS file using the LgFormat XML files
-        specify the plot.
+    def _retTasksLASUsingLgFormats(self, theLasFile, theFpOut):
+        """Returns a list of PlotTask to plot a LogPass from a LAS file using
+        the LgFormat XML files specify the plot.
         theFi - the LASFile object.
         theFpOut - Output file path for the SVG file(s), one per XML UniqueId.
         """
         assert(not self.usesInternalRecords)
+        retTaskS = []
         for aUniqueId in self._retUniqueIdS(theLasFile):
-            logging.info('PlotLogPasses._plotLASUsingLgFormats(): UniqueId={:s}.'.format(aUniqueId))
-            # Note: Only one log pass per LAS file so index 0
-            myOutFilePath, myTitle = self._retOutPathTitle(theFpOut, 0, aUniqueId)
-            myPlot = Plot.PlotReadXML(aUniqueId, self._scale)
+            logging.info('PlotLogPasses._retTasksLASUsingLgFormats(): UniqueId={:s}.'.format(aUniqueId))
+            myPlot = Plot.PlotReadXML(aUniqueId, self._scale, self._decimate)
             if myPlot.hasDataToPlotLAS(theLasFile, aUniqueId):
-                myCurvIDs, numPoints = myPlot.plotLogPassLAS(
-                    theLasFile,
+                # Note: Only one log pass per LAS file so index 0
+                retTaskS += self._retTileTaskS(
+                    self._plotLASUsingLgFormats,
+                    (myPlot, aUniqueId, theFpOut),
+                    myPlot,
+                    aUniqueId,
+                    None,
                     theLasFile.xAxisStart,
                     theLasFile.xAxisStop,
+                    self._retOutPathTitle(theFpOut, 0, aUniqueId)[0],
                     aUniqueId,
-                    myOutFilePath,
-                    frameStep=1,
-                    title=myTitle,
-                    plotHeader=self._apiHeader,
                 )
-#                logging.fatal('Plot curves: {:s} and points: {:s}'.format(str(myCurvIDs), str(numPoints)))
-                assert(myCurvIDs is not None and numPoints is not None)
-                # So here the essential data that we have to put in the index.html is:
-                # Key: myOutFilePath or input file fp, lpIdx, aFilmId,
-                # Value: (myPlot.xScale(aFilmId), myLogPass.xAxisFirstEngVal, myLogPass.xAxisLastEngVal, myCurvIDs)
-                self.plotLogInfo.addPlotResult(
-                    theLasFile.id,
-                    myOutFilePath,
-                    0,
-                    aUniqueId,
-                    myPlot.xScale(aUniqueId),
-                    theLasFile.xAxisStart,
-                    theLasFile.xAxisStop,
-                    theCurveS=myCurvIDs,
-                    ptsPlotted=numPoints)
+        return retTaskS
+    
+    def _plotLASUsingLgFormats(self, theLasFile, thePlot, theUniqueId, theFpOut, theTile):
+        """Plots a LogPass, or one tile of it, from a LAS file using a single
+        LgFormat XML file to specify the plot."""
+        # Note: Only one log pass per LAS file so index 0
+        myTitle = self._retOutPathTitle(theFpOut, 0, theUniqueId)[1]
+        myCurvIDs, numPoints = thePlot.plotLogPassLAS(
+            theLasFile,
+            theTile.xStart,
+            theTile.xStop,
+            theUniqueId,
+            theTile.filePath,
+            frameStep=1,
+            title=myTitle + theTile.titleSuffix,
+            # API header on the first tile only
+            plotHeader=self._apiHeader and theTile.index == 0,
+        )
+#        logging.fatal('Plot curves: {:s} and points: {:s}'.format(str(myCurvIDs), str(numPoints)))
+        assert(myCurvIDs is not None and numPoints is not None)
+        # So here the essential data that we have to put in the index.html is:
+        # Key: myOutFilePath or input file fp, lpIdx, aFilmId,
+        # Value: (myPlot.xScale(aFilmId), myLogPass.xAxisFirstEngVal, myLogPass.xAxisLastEngVal, myCurvIDs)
+        self.plotLogInfo.addPlotResult(
+            theLasFile.id,
+            theTile.filePath,
+            0,
+            theUniqueId,
+            thePlot.xScale(theUniqueId),
+            theTile.xStart,
+            theTile.xStop,
+            theCurveS=myCurvIDs,
+            ptsPlotted=numPoints)
     #=======================================================
     # End: Plotting LAS using XML files to specify the plot.
     #=======================================================
@@ -668,6 +901,33 @@ class PlotLogPasses(object):
 ################################
 # Section: Multiprocessing code.
 ################################
+#: State of a PlotLogPasses._runPlotTasks() worker process, set by _initPlotWorker()
+_plotWorker = {}
+
+def _initPlotWorker(thePlp, theFi, theFilePath, theTaskS):
+    """Pool initialiser for PlotLogPasses._runPlotTasks(). A LIS File is
+    opened again so that the workers do not share a file position, a LAS file
+    is held in memory so is used as it is."""
+    if theFilePath is not None:
+        theFi = TotalDepth.LIS.core.File.FileRead(theFilePath, theFileId=theFi.fileId, keepGoing=thePlp._keepGoing)
+    _plotWorker['plp'] = thePlp
+    _plotWorker['file'] = theFi
+    _plotWorker['tasks'] = theTaskS
+
+def _plotTask(theFi, theTask):
+    """Plots a single PlotTask, or one tile of it, with the LIS File or LAS file theFi."""
+    with process.stage('plot'):
+        theTask.fn(theFi, *theTask.args, theTask.tile)
+        process.count('files_out')
+
+def _runPlotTask(theTaskIdx):
+    """Plots a single PlotTask from PlotLogPasses._runPlotTasks() and returns
+    a PlotLogInfo of the result."""
+    myPlp = _plotWorker['plp']
+    myPlp.plotLogInfo = PlotLogInfo()
+    _plotTask(_plotWorker['file'], _plotWorker['tasks'][theTaskIdx])
+    return myPlp.plotLogInfo
+
 def processFile(fpIn, fpOut, opts):
     if not os.path.exists(os.path.dirname(fpOut)):
         try:
@@ -678,7 +938,11 @@ def processFile(fpIn, fpOut, opts):
     return myPlp.plotLogInfo
 
 def plotLogPassesMP(dIn, dOut, opts):
-    """Multiprocessing code to plot log passes. Returns a PlotLogInfo object."""
+    """Multiprocessing code to plot log passes. Returns a PlotLogInfo object.
+    A single file is plotted in this process so that its (LogPass, FILM ID)
+    pairs are plotted concurrently, otherwise each file is plotted by a worker."""
+    if os.path.isfile(dIn):
+        return PlotLogPasses(dIn, dOut, opts).plotLogInfo
     if opts.jobs < 1:
         jobs = multiprocessing.cpu_count()
     else:
@@ -690,13 +954,11 @@ def plotLogPassesMP(dIn, dOut, opts):
             for t in DirWalk.dirWalk(dIn, dOut, opts.glob, opts.recurse, bigFirst=True)
     ]
     retResult = PlotLogInfo()
-    myResults = [
-        r.get() for r in [
-            myPool.apply_async(processFile, t) for t in myTaskS
-        ]
-    ]
-    for r in myResults:
+    myAsyncResults = [myPool.apply_async(process.call_with_stages, (processFile,) + t) for t in myTaskS]
+    for myAsyncResult in myAsyncResults:
         # r is a PlotLogInfo object
+        r, myStages = myAsyncResult.get()
+        process.merge_stage_data(myStages)
         retResult += r
     return retResult
 ################################
@@ -730,12 +992,17 @@ def main():
     #        help="File format to assume for the input, AUTO will do it's best. [default: \"AUTO\"].")
     parser.add_argument("-s", "--scale", action="append", type=int, dest="scale", default=0,
             help="Scale of X axis to use (an integer). [default: 0].")
+    parser.add_argument("-d", "--decimate", type=float, dest="decimate", default=0.0,
+            help="Decimate curves to this tolerance in pixels, spikes are retained. 0 is no decimation. [default: %(default)s].")
+    parser.add_argument("-T", "--tile", type=float, dest="tile", default=0.0,
+            help="Split each plot into SVG tiles with a main pane of this depth in inches"
+            " and write a JSON manifest of the tiles. 0 is no tiling. [default: %(default)s].")
     args = parser.parse_args()
     # Initialise logging etc.
     cmn_cmd_opts.set_log_level(args)
     # print('args', args)
     # return 0
-    start_clock = time.clock()
+    start_clock = time.process_time()
     start_time = time.time()
     # Your code here
     if '?' in ''.join(args.LgFormat):
@@ -745,22 +1012,23 @@ def main():
         print(myFg.longStr(''.join(args.LgFormat).count('?')))
         return 1
     if cmn_cmd_opts.multiprocessing_requested(args):
-        myPlp = PlotLogPasses(
+        myResult = plotLogPassesMP(
             args.path_in,
             args.path_out,
             args,
         )
-        myResult = myPlp.plotLogInfo
     else:
-        myResult = plotLogPassesMP(
+        myPlp = PlotLogPasses(
             args.path_in,
             args.path_out,
             args,
         )
+        myResult = myPlp.plotLogInfo
     if os.path.isdir(args.path_out):
         myResult.writeHTML(os.path.join(args.path_out, 'index.html'), args.path_in)
     print('plotLogInfo', str(myResult))
-    print('  CPU time = %8.3f (S)' % (time.clock() - start_clock))
+    print('\n'.join(process.format_stage_data(process.stage_data())))
+    print('  CPU time = %8.3f (S)' % (time.process_time() - start_clock))
     print('Exec. time = %8.3f (S)' % (time.time() - start_time))
     print('Bye, bye!')
     return 0
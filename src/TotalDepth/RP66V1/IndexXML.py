@@ -1,3 +1,4 @@
+import contextlib
 import datetime
 import io
 import logging
@@ -287,7 +288,8 @@ class IndexResult(typing.NamedTuple):
 
 def index_a_single_file(path_in: str, path_out: str, private: bool) -> IndexResult:
     # logging.info(f'index_a_single_file(): "{path_in}" to "{path_out}"')
-    bin_file_type = binary_file_type_from_path(path_in)
+    with process.stage('file_type'):
+        bin_file_type = binary_file_type_from_path(path_in)
     if bin_file_type == 'RP66V1':
         if path_out:
             out_dir = os.path.dirname(path_out)
@@ -297,17 +299,23 @@ def index_a_single_file(path_in: str, path_out: str, private: bool) -> IndexResu
         logger.info(f'Indexing {path_in} to {path_out}')
         try:
             t_start = time.perf_counter()
-            with LogicalFile.LogicalIndex(path_in) as logical_index:
-                if path_out:
-                    with open(path_out + '.xml', 'w') as f_out:
-                        write_logical_file_sequence_to_xml(logical_index, f_out, private)
-                    index_size = os.path.getsize(path_out + '.xml')
-                else:
-                    xml_fobj = io.StringIO()
-                    write_logical_file_sequence_to_xml(logical_index, xml_fobj, private)
-                    index_output = xml_fobj.getvalue()
-                    index_size = len(index_output)
-                    print(index_output)
+            with contextlib.ExitStack() as exit_stack:
+                with process.stage('index'):
+                    logical_index = exit_stack.enter_context(LogicalFile.LogicalIndex(path_in))
+                with process.stage('xml'):
+                    if path_out:
+                        with open(path_out + '.xml', 'w') as f_out:
+                            write_logical_file_sequence_to_xml(logical_index, f_out, private)
+                        index_size = os.path.getsize(path_out + '.xml')
+                    else:
+                        xml_fobj = io.StringIO()
+                        write_logical_file_sequence_to_xml(logical_index, xml_fobj, private)
+                        index_output = xml_fobj.getvalue()
+                        index_size = len(index_output)
+                        print(index_output)
+                process.count('files_in')
+                process.count('bytes_in', os.path.getsize(path_in))
+                process.count('bytes_out', index_size)
                 result = IndexResult(
                     path_in,
                     os.path.getsize(path_in),
@@ -343,11 +351,12 @@ def index_dir_multiprocessing(dir_in: str, dir_out: str, private: bool, jobs: in
     # print('tasks:')
     # pprint.pprint(tasks, width=200)
     # return {}
-    results = [
-        r.get() for r in [
-            pool.apply_async(index_a_single_file, t) for t in tasks
-        ]
-    ]
+    async_results = [pool.apply_async(process.call_with_stages, (index_a_single_file,) + t) for t in tasks]
+    results = []
+    for async_result in async_results:
+        result, stages = async_result.get()
+        process.merge_stage_data(stages)
+        results.append(result)
     return {r.path_input : r for r in results}
 
 
@@ -477,22 +486,14 @@ def main() -> int:
     # Your code here
     clk_start = time.perf_counter()
     ret_val = 0
-    if os.path.isdir(args.path_in) and cmn_cmd_opts.multiprocessing_requested(args):
-        result: typing.Dict[str, IndexResult] = index_dir_multiprocessing(
-            args.path_in,
-            args.path_out,
-            args.private,
-            args.jobs,
-        )
-    else:
-        if args.log_process > 0.0:
-            with process.log_process(args.log_process):
-                result: typing.Dict[str, IndexResult] = index_dir_or_file(
-                    args.path_in,
-                    args.path_out,
-                    args.recurse,
-                    args.private,
-                )
+    with process.log_process(args.log_process):
+        if os.path.isdir(args.path_in) and cmn_cmd_opts.multiprocessing_requested(args):
+            result: typing.Dict[str, IndexResult] = index_dir_multiprocessing(
+                args.path_in,
+                args.path_out,
+                args.private,
+                args.jobs,
+            )
         else:
             result: typing.Dict[str, IndexResult] = index_dir_or_file(
                 args.path_in,
@@ -11,7 +11,6 @@ This produces text output at various levels of encapsulation:
     --LR ~ All data, including frame data from all Logical Records.
 
 """
-import argparse
 import collections
 import contextlib
 import logging
@@ -33,7 +32,9 @@ from TotalDepth.RP66V1.core.LogicalRecord import EFLR
 from TotalDepth.RP66V1.core.LogicalRecord import IFLR
 from TotalDepth.common import Rle, statistics
 from TotalDepth.common import Slice
+from TotalDepth.common import cmn_cmd_opts
 from TotalDepth.common import data_table
+from TotalDepth.common import process
 from TotalDepth.util import bin_file_type
 from TotalDepth.util import gnuplot
 from TotalDepth.util.DirWalk import dirWalk
@@ -516,7 +517,8 @@ IndexResult = collections.namedtuple('IndexResult', 'size_input, size_output, ti
 
 def scan_a_single_file(path_in: str, path_out: str, output_extension: str, function: typing.Callable, **kwargs) -> IndexResult:
     # logging.info(f'index_a_single_file(): "{path_in}" to "{path_out}"')
-    binary_file_type = bin_file_type.binary_file_type_from_path(path_in)
+    with process.stage('file_type'):
+        binary_file_type = bin_file_type.binary_file_type_from_path(path_in)
     if binary_file_type == 'RP66V1':
         logger.info(f'Scanning "{path_in}" to "{path_out}"')
         with open(path_in, 'rb') as fobj:
@@ -528,12 +530,15 @@ def scan_a_single_file(path_in: str, path_out: str, output_extension: str, funct
                     if not os.path.exists(out_dir):
                         logger.info(f'Making directory: {out_dir}')
                         os.makedirs(out_dir, exist_ok=True)
-                    with open(file_path_out, 'w') as fout:
+                    with open(file_path_out, 'w') as fout, process.stage('scan'), process.stage(function.__name__):
                         function(fobj, fout, **kwargs)
                     len_scan_output = os.path.getsize(file_path_out)
                 else:
-                    function(fobj, sys.stdout, **kwargs)
+                    with process.stage('scan'), process.stage(function.__name__):
+                        function(fobj, sys.stdout, **kwargs)
                     len_scan_output = -1
+                process.count('files_in')
+                process.count('bytes_in', os.path.getsize(path_in))
                 result = IndexResult(
                     os.path.getsize(path_in),
                     len_scan_output,
@@ -674,7 +679,7 @@ def main() -> int:
     """
     print('Cmd: %s' % ' '.join(sys.argv))
     # TODO: Use cmn_cmd_opts
-    parser = argparse.ArgumentParser(
+    parser = cmn_cmd_opts.ArgumentParser(
         description=description,
         epilog=__rights__,
         prog=sys.argv[0],
@@ -764,7 +769,8 @@ def main() -> int:
         '-T', '--test-data', action='store_true',
         help='Dump the file as annotated bytes, useful for creating test data. [default: %(default)s]',
     )
-
+    process.add_process_logger_to_argument_parser(parser)
+    cmn_cmd_opts.add_profile(parser)
     args = parser.parse_args()
     print('args:', args)
 
@@ -784,66 +790,67 @@ def main() -> int:
     # Your code here
     result: typing.Dict[str, IndexResult] = {}
     output_extension = '.txt'
-    if args.VR or args.LRSH:
-        result = scan_dir_or_file(
-            args.path_in,
-            args.path_out,
-            scan_RP66V1_file_visible_records,
-            args.recurse,
-            output_extension,
-            # kwargs passed to scanning function
-            lrsh_dump=args.LRSH,
-            verbose=args.verbose,
-        )
-    if args.LD:
-        result = scan_dir_or_file(
-            args.path_in,
-            args.path_out,
-            scan_RP66V1_file_logical_data,
-            args.recurse,
-            output_extension,
-            # kwargs passed to scanning function
-            dump_bytes=args.dump_bytes,
-            dump_raw_bytes=args.dump_raw_bytes,
-            verbose=args.verbose,
-        )
-    if args.EFLR or args.IFLR:
-        result = scan_dir_or_file(
-            args.path_in,
-            args.path_out,
-            scan_RP66V1_file_EFLR_IFLR,
-            args.recurse,
-            output_extension,
-            # kwargs passed to scanning function
-            verbose=args.verbose,
-            encrypted=args.encrypted,
-            keep_going=args.keep_going,
-            eflr_set_type=[bytes(v, 'ascii') for v in args.eflr_set_type],
-            iflr_set_type=[bytes(v, 'ascii') for v in args.iflr_set_type],
-            iflr_dump=args.IFLR,
-            eflr_dump=args.EFLR,
-            rp66v1_path=args.path_in,
-        )
-    if args.LR:
-        result = scan_dir_or_file(
-            args.path_in,
-            args.path_out,
-            scan_RP66V1_file_data_content,
-            args.recurse,
-            output_extension,
-            rp66v1_path=args.path_in,
-            frame_slice=Slice.create_slice_or_sample(args.frame_slice),
-            eflr_as_table=args.eflr_as_table,
-        )
-    if args.test_data:
-        result = scan_dir_or_file(
-            args.path_in,
-            args.path_out,
-            dump_RP66V1_test_data,
-            args.recurse,
-            output_extension,
-            verbose=args.verbose,
-        )
+    with process.log_process(args.log_process):
+        if args.VR or args.LRSH:
+            result = scan_dir_or_file(
+                args.path_in,
+                args.path_out,
+                scan_RP66V1_file_visible_records,
+                args.recurse,
+                output_extension,
+                # kwargs passed to scanning function
+                lrsh_dump=args.LRSH,
+                verbose=args.verbose,
+            )
+        if args.LD:
+            result = scan_dir_or_file(
+                args.path_in,
+                args.path_out,
+                scan_RP66V1_file_logical_data,
+                args.recurse,
+                output_extension,
+                # kwargs passed to scanning function
+                dump_bytes=args.dump_bytes,
+                dump_raw_bytes=args.dump_raw_bytes,
+                verbose=args.verbose,
+            )
+        if args.EFLR or args.IFLR:
+            result = scan_dir_or_file(
+                args.path_in,
+                args.path_out,
+                scan_RP66V1_file_EFLR_IFLR,
+                args.recurse,
+                output_extension,
+                # kwargs passed to scanning function
+                verbose=args.verbose,
+                encrypted=args.encrypted,
+                keep_going=args.keep_going,
+                eflr_set_type=[bytes(v, 'ascii') for v in args.eflr_set_type],
+                iflr_set_type=[bytes(v, 'ascii') for v in args.iflr_set_type],
+                iflr_dump=args.IFLR,
+                eflr_dump=args.EFLR,
+                rp66v1_path=args.path_in,
+            )
+        if args.LR:
+            result = scan_dir_or_file(
+                args.path_in,
+                args.path_out,
+                scan_RP66V1_file_data_content,
+                args.recurse,
+                output_extension,
+                rp66v1_path=args.path_in,
+                frame_slice=Slice.create_slice_or_sample(args.frame_slice),
+                eflr_as_table=args.eflr_as_table,
+            )
+        if args.test_data:
+            result = scan_dir_or_file(
+                args.path_in,
+                args.path_out,
+                dump_RP66V1_test_data,
+                args.recurse,
+                output_extension,
+                verbose=args.verbose,
+            )
     clk_exec = time.perf_counter() - clk_start
     size_scan = size_input = 0
     failures = 0
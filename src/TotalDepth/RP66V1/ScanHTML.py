@@ -1,6 +1,7 @@
 """
 Scans a RP66V1 file an writes out the summary in HTML.
 """
+import contextlib
 import logging
 import multiprocessing
 import os
@@ -540,7 +541,9 @@ def html_scan_RP66V1_file_data_content(path_in: str, fout: typing.TextIO, label_
     Similar to TotalDepth.RP66V1.core.Scan.scan_RP66V1_file_data_content
     Returns the text to use as a link.
     """
-    with LogicalFile.LogicalIndex(path_in) as logical_index:
+    with contextlib.ExitStack() as exit_stack:
+        with process.stage('index'):
+            logical_index = exit_stack.enter_context(LogicalFile.LogicalIndex(path_in))
         if label_process:
             process.add_message_to_queue(os.path.basename(path_in))
         logger.info(
@@ -553,7 +556,8 @@ def html_scan_RP66V1_file_data_content(path_in: str, fout: typing.TextIO, label_
         logger.info(f'html_scan_RP66V1_file_data_content(): Writing HTML')
         if label_process:
             process.add_message_to_queue('Writing HTML')
-        with XmlWrite.XhtmlStream(fout) as xhtml_stream:
+        with process.stage('html'), \
+                XmlWrite.XhtmlStream(fout, theBufSize=XmlWrite.DEFAULT_BUFFER_SIZE) as xhtml_stream:
             with XmlWrite.Element(xhtml_stream, 'head'):
                 with XmlWrite.Element(xhtml_stream, 'meta', {
                     'charset': "UTF-8",
@@ -594,6 +598,8 @@ def scan_a_single_file(path_in: str, path_out: str, label_process: bool,
             else:
                 html_summary = html_scan_RP66V1_file_data_content(path_in, sys.stdout, label_process, frame_slice)
                 len_scan_output = -1
+            process.count('files_in')
+            process.count('bytes_in', os.path.getsize(path_in))
             result = HTMLResult(
                 path_in,
                 file_path_out,
@@ -699,7 +705,7 @@ def _write_low_level_indexes(path_out: str, index: typing.Dict[str, HTMLResult])
         if len(files_to_link_to):
             with open(os.path.join(root, INDEX_FILE), 'w') as fout:
                 logging.info(f'_write_low_level_indexes(): to "{os.path.join(root, INDEX_FILE)}"')
-                with XmlWrite.XhtmlStream(fout) as xhtml_stream:
+                with XmlWrite.XhtmlStream(fout, theBufSize=XmlWrite.DEFAULT_BUFFER_SIZE) as xhtml_stream:
                     with XmlWrite.Element(xhtml_stream, 'head'):
                         with XmlWrite.Element(xhtml_stream, 'meta', {
                             'charset': "UTF-8",
@@ -794,7 +800,7 @@ def _write_top_level_index(path_out: str, index_map: typing.Dict[str, HTMLResult
     index_file_path = os.path.join(path_out, INDEX_FILE)
     logging.info(f'_write_top_level_index(): to "{index_file_path}"')
     with open(index_file_path, 'w') as fout:
-        with XmlWrite.XhtmlStream(fout) as xhtml_stream:
+        with XmlWrite.XhtmlStream(fout, theBufSize=XmlWrite.DEFAULT_BUFFER_SIZE) as xhtml_stream:
             with XmlWrite.Element(xhtml_stream, 'head'):
                 with XmlWrite.Element(xhtml_stream, 'meta', {
                     'charset': "UTF-8",
@@ -872,11 +878,16 @@ def scan_dir_multiprocessing(dir_in, dir_out, jobs,
     # print('tasks:')
     # pprint.pprint(tasks, width=200)
     # return {}
-    results = [
-        r.get() for r in [
-            pool.apply_async(scan_a_single_file, t) for t in tasks
-        ]
+    async_results = [
+        pool.apply_async(process.call_with_stages, (scan_a_single_file,) + t) for t in tasks
     ]
+    results = []
+    for async_result in async_results:
+        result, stages = async_result.get()
+        process.merge_stage_data(stages)
+        results.append(result)
+    pool.close()
+    pool.join()
     _write_indexes(dir_out, {r.path_output : r for r in results})
     return {r.path_input: r for r in results}
 
@@ -1053,16 +1064,7 @@ def main() -> int:
     # return 0
     clk_start = time.perf_counter()
     # Your code here
-    if args.log_process > 0.0:
-        with process.log_process(args.log_process):
-            result: typing.Dict[str, HTMLResult] = scan_dir_or_file(
-                args.path_in,
-                args.path_out,
-                args.recurse,
-                label_process=True,
-                frame_slice=Slice.create_slice_or_sample(args.frame_slice),
-            )
-    else:
+    with process.log_process(args.log_process):
         if cmn_cmd_opts.multiprocessing_requested(args) and os.path.isdir(args.path_in):
             result: typing.Dict[str, HTMLResult] = scan_dir_multiprocessing(
                 args.path_in,
@@ -1075,7 +1077,7 @@ def main() -> int:
                 args.path_in,
                 args.path_out,
                 args.recurse,
-                label_process=False,
+                label_process=args.log_process > 0.0,
                 frame_slice=Slice.create_slice_or_sample(args.frame_slice),
             )
     if args.log_process > 0.0:
@@ -454,7 +454,7 @@ def write_logical_index_to_las(
                 file_path_out = las_file_name(path_out, lf, frame_array.ident.I)
                 os.makedirs(os.path.dirname(file_path_out), exist_ok=True)
                 logger.info(f'Starting LAS output file {file_path_out}')
-                with open(file_path_out, 'w') as ostream:
+                with open(file_path_out, 'w') as ostream, process.stage('write'):
                     # Write each section
                     _write_las_header(
                         os.path.basename(logical_index.id),
@@ -471,7 +471,7 @@ def write_logical_index_to_las(
         else:
             file_path_out = las_file_name(path_out, lf, b'')
             os.makedirs(os.path.dirname(file_path_out), exist_ok=True)
-            with open(file_path_out, 'w') as ostream:
+            with open(file_path_out, 'w') as ostream, process.stage('write'):
                 _write_las_header(
                     os.path.basename(logical_index.id),
                     logical_file, lf, '', ostream
@@ -492,18 +492,40 @@ def single_rp66v1_file_to_las(
         float_format: str,
 ) -> LASWriteResult:
     """Convert a single RP66V1 file to a set of LAS files."""
+    with process.stage('to_las'):
+        return _single_rp66v1_file_to_las(
+            path_in, array_reduction, path_out, frame_slice, channels, field_width, float_format
+        )
+
+
+def _single_rp66v1_file_to_las(
+        path_in: str,
+        array_reduction: str,
+        path_out: str,
+        frame_slice: Slice.Slice,
+        channels: typing.Set[str],
+        field_width: int,
+        float_format: str,
+) -> LASWriteResult:
     # logging.info(f'index_a_single_file(): "{path_in}" to "{path_out}"')
     assert array_reduction in ARRAY_REDUCTIONS
-    binary_file_type = bin_file_type.binary_file_type_from_path(path_in)
+    with process.stage('file_type'):
+        binary_file_type = bin_file_type.binary_file_type_from_path(path_in)
     if binary_file_type == 'RP66V1':
         logger.info(f'Converting RP66V1 {path_in} to LAS {os.path.splitext(path_out)[0]}*')
         try:
             t_start = time.perf_counter()
-            with LogicalFile.LogicalIndex(path_in) as logical_index:
+            with contextlib.ExitStack() as exit_stack:
+                with process.stage('index'):
+                    logical_index = exit_stack.enter_context(LogicalFile.LogicalIndex(path_in))
                 las_files_written = write_logical_index_to_las(
                     logical_index, array_reduction, path_out, frame_slice, channels, field_width, float_format
                 )
                 output_size = sum(os.path.getsize(f) for f in las_files_written)
+                process.count('files_in')
+                process.count('bytes_in', os.path.getsize(path_in))
+                process.count('las_files_out', len(las_files_written))
+                process.count('bytes_out', output_size)
                 result = LASWriteResult(
                     path_in,
                     os.path.getsize(path_in),
@@ -552,11 +574,16 @@ def convert_rp66v1_dir_or_file_to_las_multiprocessing(
     # print('tasks:')
     # pprint.pprint(tasks, width=200)
     # return {}
-    results = [
-        r.get() for r in [
-            pool.apply_async(single_rp66v1_file_to_las, t) for t in tasks
-        ]
+    async_results = [
+        pool.apply_async(process.call_with_stages, (single_rp66v1_file_to_las,) + t) for t in tasks
     ]
+    results = []
+    for async_result in async_results:
+        result, stages = async_result.get()
+        process.merge_stage_data(stages)
+        results.append(result)
+    pool.close()
+    pool.join()
     return {r.path_input: r for r in results}
 
 
@@ -799,31 +826,19 @@ Reads RP66V1 file(s) and writes them out as LAS files."""
         for ch in args.channels.strip().split(','):
             if ch.strip() != '':
                 channel_set.add(ch.strip())
-        if cmn_cmd_opts.multiprocessing_requested(args) and os.path.isdir(args.path_in):
-            result = convert_rp66v1_dir_or_file_to_las_multiprocessing(
-                args.path_in,
-                args.path_out,
-                args.recurse,
-                args.array_reduction,
-                Slice.create_slice_or_sample(args.frame_slice),
-                channel_set,
-                args.field_width,
-                args.float_format,
-                args.jobs,
-            )
-        else:
-            if args.log_process > 0.0:
-                with process.log_process(args.log_process):
-                    result = convert_rp66v1_dir_or_file_to_las(
-                        args.path_in,
-                        args.path_out,
-                        args.recurse,
-                        args.array_reduction,
-                        Slice.create_slice_or_sample(args.frame_slice),
-                        channel_set,
-                        args.field_width,
-                        args.float_format,
-                    )
+        with process.log_process(args.log_process):
+            if cmn_cmd_opts.multiprocessing_requested(args) and os.path.isdir(args.path_in):
+                result = convert_rp66v1_dir_or_file_to_las_multiprocessing(
+                    args.path_in,
+                    args.path_out,
+                    args.recurse,
+                    args.array_reduction,
+                    Slice.create_slice_or_sample(args.frame_slice),
+                    channel_set,
+                    args.field_width,
+                    args.float_format,
+                    args.jobs,
+                )
             else:
                 result = convert_rp66v1_dir_or_file_to_las(
                     args.path_in,
@@ -22,10 +22,22 @@ interface consistency among command line applications.
 
 Copyright (c) 2010-2019 Paul Ross. All rights reserved.
 """
+import atexit
+import collections
+import cProfile
+import io
+import json
 import logging
 import multiprocessing
+import multiprocessing.util
 import argparse
+import optparse
+import os
+import pstats
+import signal
 import sys
+import tracemalloc
+import typing
 
 __author__  = 'Paul Ross'
 __date__    = '2011-05-23'
@@ -33,6 +45,14 @@ __version__ = '0.1.0'
 __rights__  = 'Copyright (c) 2010-2019 Paul Ross. All rights reserved.'
 
 
+class ArgumentParser(argparse.ArgumentParser):
+    """Argument parser that starts the profiler if ``--profile`` is given, see :py:func:`add_profile`."""
+    def parse_known_args(self, args=None, namespace=None):
+        namespace, args = super().parse_known_args(args, namespace)
+        set_profile(namespace)
+        return namespace, args
+
+
 def arg_parser(desc, prog=None, version=None, **kwargs):
     """Return an command line parser with the standard pre-set options.
     
@@ -43,8 +63,10 @@ def arg_parser(desc, prog=None, version=None, **kwargs):
     ``-l``: Log level.
 
     ``-v``: Verbosity.
+
+    ``--profile``: Profile the process and any multiprocessing workers, see :py:func:`add_profile`.
     """
-    parser = argparse.ArgumentParser(description=desc, prog=prog, **kwargs)
+    parser = ArgumentParser(description=desc, prog=prog, **kwargs)
     if version is not None:
         parser.add_argument('--version', action='version', version='%(prog)s '+version)
     # Adding arguments in, well sort of, alphabetical order (not really)
@@ -54,6 +76,7 @@ def arg_parser(desc, prog=None, version=None, **kwargs):
         "-v", "--verbose", action='count', default=0,
         help="Increase verbosity, additive [default: %(default)s]",
     )
+    add_profile(parser)
     return parser
 
 
@@ -147,3 +170,244 @@ def number_multiprocessing_jobs(parsed_args) -> int:
     return 1
 
 # ============ END: Multiprocessing ==================
+
+# ============ Profiling ==================
+
+#: The profilers that can be selected with ``--profile``.
+PROFILE_MODES = ('cprofile', 'tracemalloc', 'sample')
+#: Default number of entries in the profile summary.
+DEFAULT_OPT_PROFILE_TOP = 20
+#: Sampling interval in seconds of CPU time for the 'sample' profiler.
+PROFILE_SAMPLE_INTERVAL = 0.005
+#: Environment variable that passes the profile settings to spawned worker processes.
+PROFILE_ENVIRONMENT_VARIABLE = 'TOTALDEPTH_PROFILE'
+
+
+def add_profile(parser: argparse.ArgumentParser) -> None:
+    """Adds profiling options to the argument parser as ``--profile``, ``--profile-dir`` and ``--profile-top``.
+    Each process, including multiprocessing workers, writes its profile data and a summary of the top entries to
+    the profile directory when it exits."""
+    parser.add_argument(
+        '--profile', choices=PROFILE_MODES, default=None,
+        help='Profile each process with cProfile, tracemalloc or a low overhead sampling profiler.'
+             ' [default: %(default)s]',
+    )
+    parser.add_argument(
+        '--profile-dir', type=str, default='.',
+        help='Directory to write the profile output to. [default: %(default)s]',
+    )
+    parser.add_argument(
+        '--profile-top', type=int, default=DEFAULT_OPT_PROFILE_TOP,
+        help='Number of entries in the profile summary. [default: %(default)s]',
+    )
+
+
+def add_profile_optparse(opt_parser: optparse.OptionParser) -> None:
+    """Adds the profiling options of :py:func:`add_profile` to an :py:class:`optparse.OptionParser`.
+    Call :py:func:`set_profile` with the parsed options to start profiling."""
+    opt_parser.add_option(
+        '--profile', type='choice', choices=PROFILE_MODES, dest='profile', default=None,
+        help=f'Profile each process with one of {PROFILE_MODES}. [default: %default]',
+    )
+    opt_parser.add_option(
+        '--profile-dir', type='str', dest='profile_dir', default='.',
+        help='Directory to write the profile output to. [default: %default]',
+    )
+    opt_parser.add_option(
+        '--profile-top', type='int', dest='profile_top', default=DEFAULT_OPT_PROFILE_TOP,
+        help='Number of entries in the profile summary. [default: %default]',
+    )
+
+
+def set_profile(parsed_args) -> None:
+    """Starts profiling if the ``--profile`` option was given."""
+    mode = getattr(parsed_args, 'profile', None)
+    if mode:
+        start_profile(
+            mode,
+            getattr(parsed_args, 'profile_dir', '.'),
+            getattr(parsed_args, 'profile_top', DEFAULT_OPT_PROFILE_TOP),
+        )
+
+
+class ProfilerCProfile:
+    """Deterministic profile with cProfile. Writes a ``.prof`` file readable by :py:mod:`pstats`."""
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self) -> None:
+        self._profile.enable()
+
+    def discard(self) -> None:
+        self._profile.disable()
+
+    def stop(self, path_stem: str, top: int) -> typing.List[str]:
+        self._profile.disable()
+        self._profile.dump_stats(path_stem + '.prof')
+        ostream = io.StringIO()
+        pstats.Stats(self._profile, stream=ostream).sort_stats('cumulative').print_stats(top)
+        return ostream.getvalue().splitlines()
+
+
+class ProfilerTracemalloc:
+    """Memory allocation profile with tracemalloc. Writes a ``.tracemalloc`` snapshot."""
+    def start(self) -> None:
+        tracemalloc.stop()
+        tracemalloc.start()
+
+    def discard(self) -> None:
+        tracemalloc.stop()
+
+    def stop(self, path_stem: str, top: int) -> typing.List[str]:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        snapshot.dump(path_stem + '.tracemalloc')
+        ret = [f'Traced memory current: {current:,d} peak: {peak:,d} (bytes)']
+        ret.extend(str(stat) for stat in snapshot.statistics('lineno')[:top])
+        return ret
+
+
+class ProfilerSample:
+    """Statistical profile of the main thread that samples the stack on a ``SIGPROF`` timer of CPU time.
+    Writes a ``.folded`` file of collapsed stacks suitable for flame graphs."""
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples: typing.Counter[typing.Tuple[typing.Tuple[str, int, str], ...]] = collections.Counter()
+
+    def _handler(self, _signum, frame) -> None:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        self.samples[tuple(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self.samples.clear()
+        signal.signal(signal.SIGPROF, self._handler)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def discard(self) -> None:
+        signal.setitimer(signal.ITIMER_PROF, 0.0)
+        signal.signal(signal.SIGPROF, signal.SIG_DFL)
+
+    def stop(self, path_stem: str, top: int) -> typing.List[str]:
+        self.discard()
+        own: typing.Counter[typing.Tuple[str, int, str]] = collections.Counter()
+        cumulative: typing.Counter[typing.Tuple[str, int, str]] = collections.Counter()
+        with open(path_stem + '.folded', 'w') as ostream:
+            for stack, count in self.samples.items():
+                ostream.write(';'.join(f'{os.path.basename(f)}:{name}' for f, _line, name in stack))
+                ostream.write(f' {count:d}\n')
+                own[stack[-1]] += count
+                for function in set(stack):
+                    cumulative[function] += count
+        total = sum(self.samples.values())
+        ret = [f'Samples: {total:,d} at {self.interval * 1000:.1f} (ms)', f'{"Own":>8} {"Cumul.":>8} Function']
+        for function, count in own.most_common(top):
+            ret.append(f'{count:8d} {cumulative[function]:8d} {function[0]}:{function[1]}({function[2]})')
+        return ret
+
+
+PROFILERS = {
+    'cprofile': ProfilerCProfile,
+    'tracemalloc': ProfilerTracemalloc,
+    'sample': ProfilerSample,
+}
+
+
+class _ProfileState:
+    """The profile settings and the running profiler of this process."""
+    def __init__(self, mode: str, profile_dir: str, top: int):
+        self.mode = mode
+        self.profile_dir = profile_dir
+        self.top = top
+        self.profiler = None
+
+    def path_stem(self) -> str:
+        name = os.path.splitext(os.path.basename(sys.argv[0]))[0] or 'python'
+        return os.path.join(self.profile_dir, f'{name}_{self.mode}_{os.getpid()}')
+
+    def start(self) -> None:
+        self.profiler = PROFILERS[self.mode]()
+        self.profiler.start()
+
+    def stop(self) -> typing.List[str]:
+        """Stops the profiler, writes the profile data and summary and returns the summary."""
+        path_stem = self.path_stem()
+        ret = self.profiler.stop(path_stem, self.top)
+        self.profiler = None
+        with open(path_stem + '.txt', 'w') as ostream:
+            ostream.write('\n'.join(ret))
+            ostream.write('\n')
+        return ret
+
+
+_profile_state: typing.Optional[_ProfileState] = None
+
+
+def _profile_after_fork(state: _ProfileState) -> None:
+    """Called in a new multiprocessing worker, restarts profiling in that process and writes the profile when the
+    worker exits."""
+    global _profile_state
+    _profile_state = state
+    if state.profiler is not None:
+        # Discard the profiler inherited by a fork without writing anything.
+        state.profiler.discard()
+    state.start()
+    multiprocessing.util.Finalize(None, _stop_profile_worker, exitpriority=10)
+
+
+def _stop_profile_worker() -> None:
+    if _profile_state is not None and _profile_state.profiler is not None:
+        _profile_state.stop()
+
+
+def start_profile(mode: str, profile_dir: str = '.', top: int = DEFAULT_OPT_PROFILE_TOP) -> None:
+    """Starts profiling this process and any multiprocessing workers that it creates. Each process writes its profile
+    data and summary to profile_dir when it exits. In this process the summary is also printed.
+    Profiling that has already been started is not changed."""
+    global _profile_state
+    if mode not in PROFILERS:
+        raise ValueError(f'Profile must be one of {PROFILE_MODES} not {mode!r}')
+    if _profile_state is not None:
+        return
+    profile_dir = os.path.abspath(profile_dir)
+    os.makedirs(profile_dir, exist_ok=True)
+    _profile_state = _ProfileState(mode, profile_dir, top)
+    # Spawned workers get the settings from the environment, forked ones from the after fork hook.
+    os.environ[PROFILE_ENVIRONMENT_VARIABLE] = json.dumps([mode, profile_dir, top])
+    multiprocessing.util.register_after_fork(_profile_state, _profile_after_fork)
+    atexit.register(stop_profile)
+    _profile_state.start()
+
+
+def stop_profile() -> typing.List[str]:
+    """Stops profiling this process, writes the profile data and prints the summary. Returns the summary.
+    Multiprocessing workers write their profiles when they exit."""
+    global _profile_state
+    ret = []
+    if _profile_state is not None:
+        if _profile_state.profiler is not None:
+            ret = _profile_state.stop()
+            print(f'Profile [{_profile_state.mode}] written to {_profile_state.path_stem()}.*')
+            print('\n'.join(ret))
+        _profile_state = None
+        os.environ.pop(PROFILE_ENVIRONMENT_VARIABLE, None)
+    return ret
+
+
+def _profile_spawned_worker() -> None:
+    """When this module is imported by a spawned multiprocessing worker this starts profiling the worker.
+    The import might be before or after the worker starts so profiling is restarted if the worker has yet to start."""
+    settings = os.environ.get(PROFILE_ENVIRONMENT_VARIABLE)
+    if settings and multiprocessing.current_process().name != 'MainProcess' and _profile_state is None:
+        state = _ProfileState(*json.loads(settings))
+        _profile_after_fork(state)
+        multiprocessing.util.register_after_fork(state, _profile_after_fork)
+
+
+_profile_spawned_worker()
+
+# ============ END: Profiling ==================
@@ -11,6 +11,15 @@ There are several DoF here:
 
 Also need to add a log parser to, well what?
 
+Stages of processing can be timed and counted with named hierarchical timers and counters, for example::
+
+    with process.stage('index'):
+        ...
+        with process.stage('decode'):
+            process.count('frames', len(frames))
+
+These are accumulated as 'index' and 'index.decode' and written with the process data as the key 'stages'.
+Multiprocessing workers return their stages to the parent with each result, see :py:func:`call_with_stages`.
 """
 import argparse
 import contextlib
@@ -28,6 +37,7 @@ import typing
 
 import psutil
 
+from TotalDepth.common import cmn_cmd_opts
 from TotalDepth.util import gnuplot
 
 logger = logging.getLogger(__file__)
@@ -50,6 +60,10 @@ KEY_ELAPSED_TIME = 'elapsed_time'
 KEY_LABEL = 'label'
 #: The JSON key that is the process ID
 KEY_PROCESS_ID = 'pid'
+#: The JSON key that is the stage timers and counters
+KEY_STAGES = 'stages'
+#: Separator of hierarchical stage names
+STAGE_SEPARATOR = '.'
 #: psutil.Process().as_dict() has the following keys:
 PSUTIL_PROCESS_AS_DICT_KEYS = [
     'cmdline', 'connections', 'cpu_percent', 'cpu_times', 'create_time', 'cwd', 'environ', 'exe', 'gids',
@@ -229,6 +243,142 @@ def add_message_to_queue(msg: str) -> None:
     process_queue.put(msg)
 
 
+class StageTimer:
+    """Accumulated count, wall clock time and CPU time of a stage."""
+    __slots__ = ('count', 'wall', 'cpu')
+
+    def __init__(self, count: int = 0, wall: float = 0.0, cpu: float = 0.0):
+        self.count = count
+        self.wall = wall
+        self.cpu = cpu
+
+    def add(self, count: int, wall: float, cpu: float) -> None:
+        self.count += count
+        self.wall += wall
+        self.cpu += cpu
+
+    def to_dict(self) -> typing.Dict[str, typing.Union[int, float]]:
+        return {'count': self.count, 'wall': self.wall, 'cpu': self.cpu}
+
+
+#: Timers and counters keyed by hierarchical name.
+_stage_timers: typing.Dict[str, StageTimer] = {}
+_stage_counters: typing.Dict[str, int] = {}
+_stage_lock = threading.Lock()
+#: Each thread has its own stack of stage names.
+_stage_local = threading.local()
+
+
+def _stage_stack() -> typing.List[str]:
+    try:
+        return _stage_local.stack
+    except AttributeError:
+        _stage_local.stack = []
+        return _stage_local.stack
+
+
+def _stage_name(name: str) -> str:
+    return STAGE_SEPARATOR.join(_stage_stack() + [name])
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """Context manager that times a stage. Stages can be nested, the name is then hierarchical such as
+    'index.decode'."""
+    full_name = _stage_name(name)
+    stack = _stage_stack()
+    stack.append(name)
+    t_start = time.perf_counter()
+    c_start = time.process_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - t_start
+        cpu = time.process_time() - c_start
+        stack.pop()
+        with _stage_lock:
+            if full_name not in _stage_timers:
+                _stage_timers[full_name] = StageTimer()
+            _stage_timers[full_name].add(1, wall, cpu)
+
+
+def count(name: str, value: int = 1) -> None:
+    """Increments a counter within the current stage."""
+    full_name = _stage_name(name)
+    with _stage_lock:
+        _stage_counters[full_name] = _stage_counters.get(full_name, 0) + value
+
+
+def merge_stage_data(data: typing.Dict[str, typing.Dict[str, typing.Any]]) -> None:
+    """Adds stage data, as returned by stage_data(), to the timers and counters in this process."""
+    with _stage_lock:
+        for name, value in data.get('timers', {}).items():
+            if name not in _stage_timers:
+                _stage_timers[name] = StageTimer()
+            _stage_timers[name].add(value['count'], value['wall'], value['cpu'])
+        for name, value in data.get('counters', {}).items():
+            _stage_counters[name] = _stage_counters.get(name, 0) + value
+
+
+def stage_data() -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+    """Returns the timers and counters as a JSON compatible dict."""
+    with _stage_lock:
+        return {
+            'timers': {k: _stage_timers[k].to_dict() for k in sorted(_stage_timers)},
+            'counters': {k: _stage_counters[k] for k in sorted(_stage_counters)},
+        }
+
+
+def reset_stages() -> None:
+    """Clears all the timers and counters in this process."""
+    with _stage_lock:
+        _stage_timers.clear()
+        _stage_counters.clear()
+
+
+def call_with_stages(function: typing.Callable, *args, **kwargs) -> typing.Tuple[typing.Any, typing.Dict]:
+    """For use in a multiprocessing worker. Calls function and returns its result and the stage data of just that
+    call. The parent then calls :py:func:`merge_stage_data` with the stage data, for example::
+
+        results = [pool.apply_async(process.call_with_stages, (function,) + args) for args in tasks]
+        for async_result in results:
+            result, stages = async_result.get()
+            process.merge_stage_data(stages)
+    """
+    # A forked worker inherits the stages of the parent and a worker process is reused for other tasks so set aside
+    # any existing stages.
+    previous = stage_data()
+    reset_stages()
+    try:
+        result = function(*args, **kwargs)
+    finally:
+        data = stage_data()
+        reset_stages()
+        merge_stage_data(previous)
+    return result, data
+
+
+def extract_stages_from_json(json_data: typing.List[typing.Dict[str, typing.Any]]) \
+        -> typing.Dict[int, typing.Dict[str, typing.Dict[str, typing.Any]]]:
+    """Returns the last stage data for each process ID from the JSON data."""
+    return {v[KEY_PROCESS_ID]: v[KEY_STAGES] for v in json_data if KEY_STAGES in v}
+
+
+def format_stage_data(data: typing.Dict[str, typing.Dict[str, typing.Any]]) -> typing.List[str]:
+    """Returns stage data as lines of a table indented by the stage hierarchy."""
+    ret = [f'{"Stage":40} {"Count":>10} {"Wall(s)":>12} {"CPU(s)":>12} {"Wall/Count(ms)":>16}']
+    for name, value in data.get('timers', {}).items():
+        depth = name.count(STAGE_SEPARATOR)
+        label = '  ' * depth + name.split(STAGE_SEPARATOR)[-1]
+        per_count = 1000 * value['wall'] / value['count'] if value['count'] else 0.0
+        ret.append(f'{label:40} {value["count"]:10,d} {value["wall"]:12.3f} {value["cpu"]:12.3f} {per_count:16.3f}')
+    if data.get('counters'):
+        ret.append(f'{"Counter":40} {"Value":>10}')
+        for name, value in data['counters'].items():
+            ret.append(f'{name:40} {value:10,d}')
+    return ret
+
+
 class ProcessLoggingThread(threading.Thread):
     """Thread that regularly logs out process parameters."""
     def __init__(self, group=None, target=None, name=None, args=(), kwargs=None, *, daemon=None):
@@ -252,6 +402,9 @@ class ProcessLoggingThread(threading.Thread):
         )
         ret[KEY_ELAPSED_TIME] = time.time() - self._process.create_time()
         ret[KEY_PROCESS_ID] = self._process.pid
+        stages = stage_data()
+        if stages['timers'] or stages['counters']:
+            ret[KEY_STAGES] = stages
         # WARNING: This is super verbose and leaks information such as user, environment etc. into the log file.
         # ret.update(self._process.as_dict())
         # kwargs trump everything
@@ -284,7 +437,11 @@ class ProcessLoggingThread(threading.Thread):
 
 @contextlib.contextmanager
 def log_process(*args, **kwargs):
-    """Context manager to log process data at regular intervals."""
+    """Context manager to log process data at regular intervals. An interval of zero or less does nothing."""
+    interval = args[0] if len(args) else kwargs['interval']
+    if interval <= 0.0:
+        yield
+        return
     process_thread = ProcessLoggingThread(args=args, kwargs=kwargs)
     process_thread.start()
     try:
@@ -304,12 +461,13 @@ def add_process_logger_to_argument_parser(parser: argparse.ArgumentParser) -> No
 
 def main() -> int:
     """Main CLI entry point. For testing."""
-    parser = argparse.ArgumentParser(
+    parser = cmn_cmd_opts.ArgumentParser(
         prog='process.py',
         description="""Reads an annotated log of a process and writes a Gnuplot graph.""",
     )
     parser.add_argument('path_in', type=str, help='Input path.', nargs='?')
     parser.add_argument('path_out', type=str, help='Output path.', nargs='?')
+    cmn_cmd_opts.add_profile(parser)
     logging.basicConfig(
         level=logging.DEBUG,
         format='%(asctime)s - %(filename)s - %(process)5d - (%(threadName)-10s) - %(levelname)-8s - %(message)s',
@@ -318,6 +476,10 @@ def main() -> int:
     if args.path_in and args.path_out:
         logger.info(f'Extracting data from a log at {args.path_in} to {args.path_out}')
         invoke_gnuplot(args.path_in, args.path_out)
+        with open(args.path_in) as instream:
+            for pid, stages in extract_stages_from_json(extract_json(instream)).items():
+                print(f'Stages for PID {pid}:')
+                print('\n'.join(format_stage_data(stages)))
     else:
         logger.info('Demonstration of logging a process')
         with log_process(0.1):
@@ -1,25 +1,222 @@
 """
 Copies files of a specific type from one file tree to another.
+
+Copying is pipelined, files are classified by one pool of threads and the selected ones copied by another. The number
+of files waiting to be classified or copied is bounded so memory use is independent of the size of the tree.
+Copies use :py:func:`os.copy_file_range` where available, otherwise :py:func:`shutil.copyfile` which uses
+:py:func:`os.sendfile` on Linux. A move on the same device is a rename.
+
+Each completed source file can be recorded in a journal, re-running with the same journal skips those files so that an
+interrupted copy of a large delivery can be resumed.
 """
-import argparse
+import collections
+import concurrent.futures
+import errno
+import json
 import logging
 import os
 import shutil
 import sys
+import tempfile
+import threading
 import time
 import typing
 import zipfile
 
+from TotalDepth.common import cmn_cmd_opts
 from TotalDepth.util import DirWalk, bin_file_type
 
 
 logger = logging.getLogger(__file__)
 
 
+#: Number of files waiting to be classified, and to be copied, per thread.
+COPY_QUEUE_PER_THREAD = 16
+#: Maximum bytes for a single call to os.copy_file_range().
+COPY_FILE_RANGE_SIZE = 1024**3
+#: Nested ZIP archives up to this size are spooled in memory, larger ones to a temporary file.
+ZIP_SPOOL_MAX_MEMORY = 16 * 1024**2
+#: Suffix of the temporary file that a copy is written to before being renamed.
+TEMP_SUFFIX = '.tdcopy'
+#: Minimum interval in seconds between progress reports.
+PROGRESS_INTERVAL = 10.0
+
+
+class CopyJournal:
+    """An append only journal of source files that have been copied so that an interrupted copy_files() can be
+    resumed. Each line is JSON ``[path_in, size, mtime_ns, [path_out, ...], [file_type, ...], path_out_root]``.
+    Only entries with the same file types and output root as this copy are loaded, a source file is done if it has
+    an entry with the same size and mtime and all its destination files exist. With no journal_path nothing is
+    recorded."""
+    def __init__(self, journal_path: typing.Optional[str] = None,
+                 binary_file_types: typing.AbstractSet[str] = frozenset(), path_out: str = ''):
+        self.journal_path = journal_path
+        self._key = [sorted(binary_file_types), os.path.abspath(path_out)]
+        self._entries: typing.Dict[str, typing.Tuple[int, int, typing.List[str]]] = {}
+        self._lock = threading.Lock()
+        self._fobj: typing.Optional[typing.TextIO] = None
+        if journal_path is not None:
+            complete_line = True
+            if os.path.isfile(journal_path):
+                with open(journal_path) as fobj:
+                    for line in fobj:
+                        complete_line = line.endswith('\n')
+                        try:
+                            path_in, size, mtime_ns, paths_out, *key = json.loads(line)
+                        except ValueError:
+                            # The last line may be incomplete after an interruption.
+                            logger.warning(f'Ignoring malformed journal line: {line!r}')
+                            continue
+                        if key == self._key:
+                            self._entries[path_in] = (size, mtime_ns, paths_out)
+                logger.info(f'Loaded {len(self._entries):,d} entries from journal {journal_path}')
+            self._fobj = open(journal_path, 'a')
+            if not complete_line:
+                self._fobj.write('\n')
+
+    def done(self, path_in: str, size: int, mtime_ns: int) -> typing.Optional[typing.List[str]]:
+        """Returns the destination paths if the source file has already been copied, None otherwise."""
+        entry = self._entries.get(path_in)
+        if entry is not None and entry[0] == size and entry[1] == mtime_ns \
+                and all(os.path.exists(path) for path in entry[2]):
+            return entry[2]
+        return None
+
+    def record(self, path_in: str, size: int, mtime_ns: int, paths_out: typing.List[str]) -> None:
+        """Records that the source file has been copied to the destination paths."""
+        with self._lock:
+            self._entries[path_in] = (size, mtime_ns, paths_out)
+            if self._fobj is not None:
+                self._fobj.write(json.dumps([path_in, size, mtime_ns, paths_out] + self._key) + '\n')
+                self._fobj.flush()
+
+    def close(self) -> None:
+        if self._fobj is not None:
+            self._fobj.close()
+            self._fobj = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+class CopyStats:
+    """Throughput and backlog metrics for copy_files(), updated by many threads.
+    The backlog is the number of classified files waiting for, or being processed by, the copy pool."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.files_scanned = 0
+        self.files_copied = 0
+        self.bytes_copied = 0
+        self.files_resumed = 0
+        self.errors = 0
+        self.backlog = 0
+        self.backlog_max = 0
+        self.clk_start = time.perf_counter()
+        self._clk_report = self.clk_start
+
+    def scanned(self) -> None:
+        with self._lock:
+            self.files_scanned += 1
+
+    def queued(self) -> None:
+        with self._lock:
+            self.backlog += 1
+            self.backlog_max = max(self.backlog_max, self.backlog)
+
+    def dequeued(self) -> None:
+        with self._lock:
+            self.backlog -= 1
+
+    def copied(self, num_bytes: int) -> None:
+        with self._lock:
+            self.files_copied += 1
+            self.bytes_copied += num_bytes
+
+    def resumed(self) -> None:
+        with self._lock:
+            self.files_resumed += 1
+
+    def error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def report(self, force: bool = False) -> None:
+        """Logs the progress at most once every PROGRESS_INTERVAL seconds unless force is True."""
+        clk = time.perf_counter()
+        if force or clk - self._clk_report >= PROGRESS_INTERVAL:
+            self._clk_report = clk
+            logger.info(f'copy_files(): {self}')
+
+    def __str__(self):
+        clk_exec = max(time.perf_counter() - self.clk_start, 1e-9)
+        return (
+            f'scanned {self.files_scanned:,d} copied {self.files_copied:,d} files'
+            f' {self.bytes_copied:,d} bytes ({self.bytes_copied / clk_exec / 1024**2:,.1f} MB/s'
+            f' {self.files_copied / clk_exec:,.1f} files/s)'
+            f' resumed {self.files_resumed:,d} errors {self.errors:,d}'
+            f' backlog {self.backlog:,d} (max {self.backlog_max:,d})'
+        )
+
+
+def _copy_file_range(path_in: str, path_out: str) -> None:
+    """Copies a file with os.copy_file_range() which copies within the kernel and, on file systems such as Btrfs and
+    XFS, may share the extents. Raises OSError if that is not supported for these files."""
+    with open(path_in, 'rb') as fobj_in, open(path_out, 'wb') as fobj_out:
+        while os.copy_file_range(fobj_in.fileno(), fobj_out.fileno(), COPY_FILE_RANGE_SIZE):
+            pass
+
+
+def copy_file(path_in: str, path_out: str, move: bool) -> str:
+    """Copies or moves a file preserving its metadata like shutil.copy2() and returns path_out.
+    A move on the same device is a rename. Otherwise the file is copied to a temporary file that is then renamed so
+    that an interruption never leaves a partial file at path_out."""
+    if move:
+        try:
+            os.replace(path_in, path_out)
+            return path_out
+        except OSError as err:
+            if err.errno != errno.EXDEV:
+                raise
+    temp_path = path_out + TEMP_SUFFIX
+    try:
+        if hasattr(os, 'copy_file_range'):
+            try:
+                _copy_file_range(path_in, temp_path)
+            except OSError as err:
+                logger.debug(f'copy_file(): os.copy_file_range() failed with "{err}", using shutil.copyfile()')
+                shutil.copyfile(path_in, temp_path)
+        else:
+            shutil.copyfile(path_in, temp_path)
+        shutil.copystat(path_in, temp_path)
+        os.replace(temp_path, path_out)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if move:
+        os.remove(path_in)
+    return path_out
+
+
+def _member_path_out(path_out: str, filename: str) -> typing.Optional[str]:
+    """Returns the destination of a ZIP member or None if the member name would escape path_out."""
+    norm_name = os.path.normpath(filename)
+    if os.path.isabs(norm_name) or norm_name.split(os.sep)[0] == os.pardir:
+        return None
+    return os.path.join(path_out, norm_name)
+
+
 def _recurse_copy_zip_archive(
         instream: typing.BinaryIO,
-        path_out: str, binary_file_types: typing.Set[str], nervous: bool) -> typing.List[str]:
-    """Recursively extract ZIP archives."""
+        path_out: str, binary_file_types: typing.Set[str], nervous: bool,
+        stats: typing.Optional[CopyStats] = None) -> typing.List[str]:
+    """Recursively extract ZIP archives.
+    Members are classified from their first few kilobytes and then streamed to disc so that they are never held in
+    memory. Nested ZIP archives are spooled to a temporary file and extracted to a directory named after them."""
     logger.debug(f'_recurse_zip_archive(): path_out="{path_out}"')
     ret = []
     instream.seek(0)
@@ -27,60 +224,87 @@ def _recurse_copy_zip_archive(
         zip_info: zipfile.ZipInfo
         for zip_info in zip_file.infolist():
             logger.debug(f'_recurse_zip_archive(): zip_info="{zip_info}"')
-            if not zip_info.is_dir():
-                with zip_file.open(zip_info.filename) as zip_stream:
-                    bin_type = bin_file_type.binary_file_type(zip_stream)
-                    zip_stream.seek(0)
-                    if bin_type == 'ZIP':
-                        # Recurse
+            if zip_info.is_dir():
+                logger.debug(f'_recurse_zip_archive(): Ignoring directory "{zip_info}"')
+                continue
+            file_path_out = _member_path_out(path_out, zip_info.filename)
+            if file_path_out is None:
+                logger.warning(f'_recurse_zip_archive(): Ignoring member outside of the archive "{zip_info.filename}"')
+                continue
+            with zip_file.open(zip_info) as zip_stream:
+                header = bin_file_type.HeaderBuffer(zip_stream)
+                bin_type = bin_file_type.binary_file_type(header)
+                header.seek(0)
+                if bin_type == 'ZIP':
+                    # Recurse
+                    with tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX_MEMORY) as spool:
+                        header.copy_to(spool)
                         try:
                             ret.extend(
-                                _recurse_copy_zip_archive(zip_stream, os.path.dirname(file_path_out), binary_file_types, nervous)
+                                _recurse_copy_zip_archive(
+                                    spool, os.path.splitext(file_path_out)[0], binary_file_types, nervous, stats
+                                )
                             )
                         except zipfile.BadZipFile:
-                            logger.debug(f'_recurse_zip_archive(): Appears to be "{bin_type}" but _recurse_zip_archive() raises.')
-                    elif len(binary_file_types) == 0 or bin_type in binary_file_types:
-                        file_path_out = os.path.join(path_out, zip_info.filename)
-                        # Extract
-                        if nervous:
-                            print(
-                                f'_recurse_zip_archive(): Would extract {zip_info.filename} to "{file_path_out}"')
-                        else:
-                            logger.debug(f'_recurse_zip_archive(): creating directory "{os.path.dirname(file_path_out)}"')
-                            os.makedirs(os.path.dirname(file_path_out), exist_ok=True)
-                            logger.info(f'_recurse_zip_archive(): WRITING "{file_path_out}"')
-                            with open(file_path_out, 'wb') as ostream:
-                                ostream.write(zip_stream.read())
-                        ret.append(file_path_out)
+                            logger.debug(
+                                f'_recurse_zip_archive(): Appears to be "{bin_type}" but _recurse_zip_archive() raises.'
+                            )
+                elif len(binary_file_types) == 0 or bin_type in binary_file_types:
+                    # Extract
+                    if nervous:
+                        print(f'_recurse_zip_archive(): Would extract {zip_info.filename} to "{file_path_out}"')
                     else:
-                        logger.debug(f'_recurse_zip_archive(): Ignoring type "{bin_type}" at "{zip_info.filename}"')
-            else:
-                logger.debug(f'_recurse_zip_archive(): Ignoring directory "{zip_info}"')
+                        logger.debug(f'_recurse_zip_archive(): creating directory "{os.path.dirname(file_path_out)}"')
+                        os.makedirs(os.path.dirname(file_path_out), exist_ok=True)
+                        logger.info(f'_recurse_zip_archive(): WRITING "{file_path_out}"')
+                        temp_path = file_path_out + TEMP_SUFFIX
+                        with open(temp_path, 'wb') as ostream:
+                            num_bytes = header.copy_to(ostream)
+                        os.replace(temp_path, file_path_out)
+                        if stats is not None:
+                            stats.copied(num_bytes)
+                    ret.append(file_path_out)
+                else:
+                    logger.debug(f'_recurse_zip_archive(): Ignoring type "{bin_type}" at "{zip_info.filename}"')
     return ret
 
 
-# def _analyse_zip_archive(path_in: str, path_out: str, binary_file_types: typing.Set[str], nervous: bool) -> typing.List[str]:
-#     assert zipfile.is_zipfile(path_in)
-#     logger.debug(f'_analyse_zip_archive(): At "{path_in}" path_out: "{path_out}"')
-#     with open(path_in, 'rb') as instream:
-#         try:
-#             return _recurse_zip_archive(instream, path_out, binary_file_types, nervous)
-#         except Exception:
-#             logger.exception('_recurse_zip_archive() FAILED')
+class _Classified(typing.NamedTuple):
+    """A file from the directory walk that has been classified."""
+    file_in_out: DirWalk.FileInOut
+    bin_type: str
+    is_zip: bool
+    size: int
+    mtime_ns: int
 
 
-def copy_files(path_in: str, path_out: str, binary_file_types: typing.Set[str], move: bool, nervous: bool) -> typing.List[str]:
-    """
-    Copies binary files from path_in to path_out.
+def _classify(file_in_out: DirWalk.FileInOut, journal: CopyJournal) \
+        -> typing.Tuple[_Classified, typing.Optional[typing.List[str]]]:
+    """Classify a file, this is run by the classification pool.
+    Returns (classified file, destination paths) where the paths are None if not already copied. A file that the
+    journal records as copied is not opened."""
+    os_stat = os.stat(file_in_out.filePathIn)
+    paths_out = journal.done(file_in_out.filePathIn, os_stat.st_size, os_stat.st_mtime_ns)
+    if paths_out is not None:
+        return _Classified(file_in_out, '', False, os_stat.st_size, os_stat.st_mtime_ns), paths_out
+    try:
+        with open(file_in_out.filePathIn, 'rb') as fobj:
+            bin_type = bin_file_type.binary_file_type(fobj)
+            is_zip = zipfile.is_zipfile(fobj)
+    except OSError:
+        logger.exception(f'copy_files(): Can not classify "{file_in_out.filePathIn}"')
+        bin_type = ''
+        is_zip = False
+    return _Classified(file_in_out, bin_type, is_zip, os_stat.st_size, os_stat.st_mtime_ns), None
 
-    If move is True the file is moved, if False the file is copied.
-    Returns a list of destination paths.
-    """
-    logger.debug(f'copy_files(): "{path_in}" to "{path_out}" ')
+
+def _copy_classified(classified: _Classified, binary_file_types: typing.Set[str], move: bool, nervous: bool,
+                     journal: CopyJournal, stats: CopyStats) -> typing.List[str]:
+    """Copy, move or extract a classified file and return the destination paths, this is run by the copy pool."""
+    file_in_out = classified.file_in_out
     ret = []
-    for file_in_out in DirWalk.dirWalk(path_in, path_out, theFnMatch='', recursive=True, bigFirst=False):
-        bin_type = bin_file_type.binary_file_type_from_path(file_in_out.filePathIn)
-        if len(binary_file_types) == 0 or bin_type in binary_file_types:
+    try:
+        if len(binary_file_types) == 0 or classified.bin_type in binary_file_types:
             if nervous:
                 print(f'copy_files(): Would create destination directory at {file_in_out.filePathOut}')
                 if move:
@@ -93,24 +317,101 @@ def copy_files(path_in: str, path_out: str, binary_file_types: typing.Set[str],
                 os.makedirs(os.path.dirname(file_in_out.filePathOut), exist_ok=True)
                 if move:
                     logger.info(f'copy_files(): Moving "{file_in_out.filePathIn}" to "{file_in_out.filePathOut}" ')
-                    # move() uses copy2() function by default
-                    ret.append(shutil.move(file_in_out.filePathIn, file_in_out.filePathOut))
                 else:
                     logger.info(f'copy_files(): Copying "{file_in_out.filePathIn}" to "{file_in_out.filePathOut}" ')
-                    # copy2 attempts to preserve metadata
-                    ret.append(shutil.copy2(file_in_out.filePathIn, file_in_out.filePathOut))
-        elif zipfile.is_zipfile(file_in_out.filePathIn):
+                ret.append(copy_file(file_in_out.filePathIn, file_in_out.filePathOut, move))
+                stats.copied(classified.size)
+        elif classified.is_zip:
             zip_out_path = os.path.splitext(file_in_out.filePathOut)[0]
-            # ret.extend(_analyse_zip_archive(file_in_out.filePathIn, zip_out_path, binary_file_types, nervous))
             logger.debug(f'_analyse_zip_archive(): At "{file_in_out.filePathIn}" path_out: "{zip_out_path}"')
             with open(file_in_out.filePathIn, 'rb') as zip_instream:
-                try:
-                    return _recurse_copy_zip_archive(zip_instream, zip_out_path, binary_file_types, nervous)
-                except Exception:
-                    logger.exception('_recurse_copy_zip_archive() FAILED')
+                ret.extend(_recurse_copy_zip_archive(zip_instream, zip_out_path, binary_file_types, nervous, stats))
+        else:
+            logger.debug(f'copy_files(): Ignoring type "{classified.bin_type}" at "{file_in_out.filePathOut}"')
+            return ret
+    except Exception:
+        logger.exception(f'copy_files(): FAILED on "{file_in_out.filePathIn}"')
+        stats.error()
+        return []
+    if not nervous:
+        journal.record(file_in_out.filePathIn, classified.size, classified.mtime_ns, ret)
+    return ret
+
 
+def copy_files(path_in: str, path_out: str, binary_file_types: typing.Set[str], move: bool, nervous: bool,
+               jobs: int = 1, journal_path: typing.Optional[str] = None,
+               stats: typing.Optional[CopyStats] = None) -> typing.List[str]:
+    """
+    Copies binary files from path_in to path_out.
+
+    If move is True the file is moved, if False the file is copied.
+    Files in ZIP archives, including nested archives, are extracted.
+    If jobs > 1 then files are classified by one pool of that many threads and copied by another.
+    If journal_path is given then completed source files are recorded there and skipped if already recorded by a copy
+    with the same binary_file_types and path_out.
+    Returns a list of destination paths in the order of the directory walk.
+    """
+    logger.debug(f'copy_files(): "{path_in}" to "{path_out}" ')
+    if stats is None:
+        stats = CopyStats()
+    ret = []
+
+    def _gen_classified(classify_map: typing.Callable) \
+            -> typing.Iterator[typing.Tuple[_Classified, typing.Optional[typing.List[str]]]]:
+        """Generates (classified file, destination paths) where the paths are None if not already copied."""
+        file_in_outs = DirWalk.dirWalk(path_in, path_out, theFnMatch='', recursive=True, bigFirst=False)
+        for classified, paths_out in classify_map(file_in_outs):
+            stats.scanned()
+            if paths_out is not None:
+                logger.debug(f'copy_files(): Already copied "{classified.file_in_out.filePathIn}"')
+                stats.resumed()
+            yield classified, paths_out
+
+    with CopyJournal(journal_path, binary_file_types, path_out) as journal:
+        if jobs <= 1:
+            for classified, paths_out in _gen_classified(lambda it: (_classify(f, journal) for f in it)):
+                if paths_out is None:
+                    paths_out = _copy_classified(classified, binary_file_types, move, nervous, journal, stats)
+                ret.extend(paths_out)
+                stats.report()
         else:
-            logger.debug(f'copy_files(): Ignoring type "{bin_type}" at "{file_in_out.filePathOut}"')
+            with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as classify_executor, \
+                    concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as copy_executor:
+                max_queue = jobs * COPY_QUEUE_PER_THREAD
+
+                def _classify_map(file_in_outs: typing.Iterable[DirWalk.FileInOut]) \
+                        -> typing.Iterator[typing.Tuple[_Classified, typing.Optional[typing.List[str]]]]:
+                    classify_futures: typing.Deque[concurrent.futures.Future] = collections.deque()
+                    for file_in_out in file_in_outs:
+                        classify_futures.append(classify_executor.submit(_classify, file_in_out, journal))
+                        if len(classify_futures) >= max_queue:
+                            yield classify_futures.popleft().result()
+                    while classify_futures:
+                        yield classify_futures.popleft().result()
+
+                copy_futures: typing.Deque[concurrent.futures.Future] = collections.deque()
+
+                def _pop_copy() -> None:
+                    ret.extend(copy_futures.popleft().result())
+                    stats.dequeued()
+                    stats.report()
+
+                for classified, paths_out in _gen_classified(_classify_map):
+                    stats.queued()
+                    if paths_out is None:
+                        copy_future = copy_executor.submit(
+                            _copy_classified, classified, binary_file_types, move, nervous, journal, stats
+                        )
+                    else:
+                        # Already copied, keep its place in the results.
+                        copy_future = concurrent.futures.Future()
+                        copy_future.set_result(paths_out)
+                    copy_futures.append(copy_future)
+                    if len(copy_futures) >= max_queue:
+                        _pop_copy()
+                while copy_futures:
+                    _pop_copy()
+    stats.report(force=True)
     return ret
 
 
@@ -119,7 +420,7 @@ def main() -> int:
     description = """Copies of moves particular file types from one tree to another."""
     print('Cmd: %s' % ' '.join(sys.argv))
     # TODO: Use cmn_cmd_opts
-    parser = argparse.ArgumentParser(
+    parser = cmn_cmd_opts.ArgumentParser(
         description=description,
         prog='TotalDepth.RP66V1.util.CopyBinFiles.main',
     )
@@ -140,6 +441,13 @@ def main() -> int:
         '-n', '--nervous', action='store_true',
         help='Nervous mode, report on stdout but don\'t do anything. [default: %(default)s]',
     )
+    parser.add_argument(
+        '--journal', type=str, default='',
+        help='Path to a journal of copied files, an interrupted copy can be resumed by using the same journal.'
+             ' [default: %(default)s]',
+    )
+    cmn_cmd_opts.add_multiprocessing(parser)
+    cmn_cmd_opts.add_profile(parser)
     log_level_help_mapping = ', '.join(
         ['{:d}<->{:s}'.format(level, logging._levelToName[level]) for level in sorted(logging._levelToName.keys())]
     )
@@ -166,18 +474,28 @@ def main() -> int:
                         stream=sys.stdout)
     clk_start = time.perf_counter()
     bytes_done = 0
-    if args.file_types.strip() in ('?', '??'):
+    if args.file_types is not None and args.file_types.strip() in ('?', '??'):
         print('Binary file types supported:', end='')
         if args.file_types.strip() == '?':
             print(f' {bin_file_type.summary_file_types_supported(short=True)}')
         else:
             print(f'\n{bin_file_type.summary_file_types_supported(short=False)}')
     else:
-        file_types = set(args.file_types.strip().split(','))
-        result = copy_files(args.path_in, args.path_out, file_types, move=args.move, nervous=args.nervous)
-        if len(result) and not args.nervous:
-            bytes_done = sum(os.path.getsize(f) for f in result)
+        file_types = set(t for t in (args.file_types or '').strip().split(',') if t)
+        if args.jobs < 0:
+            jobs = 1
+        elif args.jobs == 0:
+            jobs = os.cpu_count() or 1
+        else:
+            jobs = args.jobs
+        stats = CopyStats()
+        result = copy_files(
+            args.path_in, args.path_out, file_types, move=args.move, nervous=args.nervous,
+            jobs=jobs, journal_path=args.journal or None, stats=stats,
+        )
+        bytes_done = stats.bytes_copied
         print(f'Files: {len(result):,d} output bytes {bytes_done:,d}')
+        print(f'Summary: {stats}')
     clk_exec = time.perf_counter() - clk_start
     print(f'Execution time = {clk_exec:8.3f} (S) {bytes_done / clk_exec / 1024:,.0f} kb/s')
     print('Bye, bye!')
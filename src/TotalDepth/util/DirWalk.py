@@ -41,6 +41,8 @@ from TotalDepth import ExceptionTotalDepth
 class FileInOut(typing.NamedTuple):
     filePathIn: str
     filePathOut: str
+    #: Size of the input file in bytes so that pool dispatchers can balance by bytes, -1 if not known.
+    size: int = -1
 
     @property
     def commonprefix(self):
@@ -52,23 +54,44 @@ class ExceptionDirWalk(ExceptionTotalDepth):
     pass
 
 
+def _sorted_entries(directory: str) -> typing.List[os.DirEntry]:
+    """Returns the os.DirEntry objects in a directory sorted by name."""
+    with os.scandir(directory) as it:
+        return sorted(it, key=lambda e: e.name)
+
+
 def gen_big_first(directory):
     """Generator that yields the biggest files (name not path) first.
     This is fairly simple in that it it only looks the current directory not
-    only sub-directories. Useful for multiprocessing."""
-    size_paths = []
-    for name in os.listdir(directory):
-        path = os.path.join(directory, name)
-        if os.path.isfile(path):
-            size_paths.append((os.path.getsize(path), name))
-    # print(size_paths)
-    for size, name in sorted(size_paths):
+    only sub-directories, see dirWalk() for the whole tree. Useful for multiprocessing."""
+    size_names = []
+    for entry in _sorted_entries(directory):
+        if entry.is_file():
+            size_names.append((-entry.stat().st_size, entry.name))
+    for _size, name in sorted(size_names):
         yield name
 
 
+def _gen_file_in_out(theIn: str, theOut: str, theFnMatch: str, recursive: bool) -> typing.Iterator[FileInOut]:
+    """Generates FileInOut objects with the size in alphanumeric order, directories are recursed where they occur.
+    This uses os.scandir() and the cached os.DirEntry.stat() so that there is one stat per file."""
+    for entry in _sorted_entries(theIn):
+        if entry.is_file():
+            if not theFnMatch or fnmatch.fnmatch(entry.path, theFnMatch):
+                out_file = ''
+                if theOut:
+                    out_file = os.path.join(theOut, entry.name)
+                yield FileInOut(entry.path, out_file, entry.stat().st_size)
+        elif recursive and entry.is_dir():
+            out_path = ''
+            if theOut:
+                out_path = os.path.join(theOut, entry.name)
+            yield from _gen_file_in_out(entry.path, out_path, theFnMatch, recursive)
+
+
 def dirWalk(theIn: str, theOut: str = '', theFnMatch: str = '',
             recursive: bool = False, bigFirst: bool = False) -> typing.Sequence[FileInOut]:
-    """Walks a directory tree generating file paths as FileInOut(in, out) objects.
+    """Walks a directory tree generating file paths as FileInOut(in, out, size) objects.
 
     theIn - The input directory.
 
@@ -80,42 +103,16 @@ def dirWalk(theIn: str, theOut: str = '', theFnMatch: str = '',
 
     recursive - Boolean to recurse or not.
 
-    bigFirst - If True then the largest files in  directory are given first. If False it is alphabetical.
+    bigFirst - If True then the largest files in the whole tree are given first, files of equal size are in path order.
+    This is the order that multiprocessing schedulers need. If False it is alphabetical.
     """
     # print(f'theIn="{theIn}" theOut="{theOut}"')
     if not os.path.isdir(theIn):
         raise ExceptionDirWalk('{:s} is not a directory.'.format(theIn))
     if bigFirst:
-        # First files
-        for fn in gen_big_first(theIn):
-            fp = os.path.join(theIn, fn)
-            if not theFnMatch or fnmatch.fnmatch(fp, theFnMatch):
-                out_file = ''
-                if theOut:
-                    out_file = os.path.join(theOut, fn)
-                yield FileInOut(fp, out_file)
-        # Now directories
-        if recursive:
-            for n in sorted(os.listdir(theIn)):
-                fp = os.path.join(theIn, n)
-                if os.path.isdir(fp):
-                    out_path = ''
-                    if theOut:
-                        out_path = os.path.join(theOut, n)
-                    for aFp in dirWalk(fp, out_path, theFnMatch, recursive, bigFirst):
-                        yield aFp
+        yield from sorted(
+            _gen_file_in_out(theIn, theOut, theFnMatch, recursive), key=lambda f: (-f.size, f.filePathIn)
+        )
     else:
         # Straightforward list in alphanumeric order
-        for n in sorted(os.listdir(theIn)):
-            fp = os.path.join(theIn, n)
-            if os.path.isfile(fp) and (not theFnMatch or fnmatch.fnmatch(fp, theFnMatch)):
-                out_file = ''
-                if theOut:
-                    out_file = os.path.join(theOut, n)
-                yield FileInOut(fp, out_file)
-            elif os.path.isdir(fp) and recursive:
-                out_path = ''
-                if theOut:
-                    out_path = os.path.join(theOut, n)
-                for aFp in dirWalk(fp, out_path, theFnMatch, recursive):
-                    yield aFp
+        yield from _gen_file_in_out(theIn, theOut, theFnMatch, recursive)
@@ -19,6 +19,10 @@
 # Paul Ross: apaulross@gmail.com
 """Searches for runs of data in binary files.
 
+Files are processed in chunks of :py:data:`CHUNK_SIZE` bytes, memory mapped where possible, so that arbitrarily large
+files can be searched. Byte histograms use ``numpy.bincount()`` and runs of a class of characters are found from the
+edges of a boolean class mask.
+
 Created on Oct 24, 2011
 
 @author: paulross
@@ -30,6 +34,7 @@ __version__ = '0.1.0'
 __rights__  = 'Copyright (c) 2011 Paul Ross.'
 
 import sys
+import io
 import logging
 import time
 import multiprocessing
@@ -37,64 +42,115 @@ import argparse
 import collections
 import string
 
+import numpy as np
+
 from TotalDepth.common import cmn_cmd_opts
 
 DEFAULT_MIN_RUN_LENGTH = 2
 PRINT_WIDTH = 120
-
-
-def _retHistAll(theFile):
+#: Number of bytes processed at a time.
+CHUNK_SIZE = 16 * 1024**2
+
+
+def _genChunks(theFile, theChunkSize=CHUNK_SIZE):
+    """Generates (file_position, numpy uint8 array) from the current file position to EOF in chunks of theChunkSize.
+    A file on disc is memory mapped, otherwise it is read. On completion the file is at EOF."""
+    myTell = theFile.tell()
+    try:
+        myMap = np.memmap(theFile, dtype=np.uint8, mode='r')
+    except (AttributeError, io.UnsupportedOperation, ValueError, OSError):
+        # Not a file on disc or an empty file, np.memmap() may have moved the file position.
+        myMap = None
+        theFile.seek(myTell)
+    if myMap is not None:
+        for myStart in range(myTell, len(myMap), theChunkSize):
+            yield myStart, myMap[myStart:myStart + theChunkSize]
+        theFile.seek(0, io.SEEK_END)
+    else:
+        while True:
+            myBytes = theFile.read(theChunkSize)
+            if len(myBytes) == 0:
+                break
+            yield myTell, np.frombuffer(myBytes, dtype=np.uint8)
+            myTell += len(myBytes)
+
+
+def _retHistAll(theFile, theChunkSize=CHUNK_SIZE):
+    """Returns a histogram of {byte : count, ...} from the current file position."""
+    myCounts = np.zeros(256, dtype=np.int64)
+    for _tell, myChunk in _genChunks(theFile, theChunkSize):
+        myCounts += np.bincount(myChunk, minlength=256)
     hist = collections.defaultdict(int)
-    while True:
-        c = theFile.read(1)
-        if len(c) == 0:
-            break
-        hist[c] += 1
+    for c in np.flatnonzero(myCounts):
+        hist[bytes([c])] = int(myCounts[c])
     return hist
 
 
-def _retHistMatch(thePatt, theFile, theS=sys.stdout, showTell=False):
+def _retHistMatch(thePatt, theFile, theS=sys.stdout, showTell=False, theChunkSize=CHUNK_SIZE):
+    """Returns a histogram of {thePatt : count} of non-overlapping occurrences of thePatt. The end of each chunk that
+    might be the start of a match is carried over to the next chunk."""
     hist = collections.defaultdict(int)
-    pIdx = 0
-    while True:
-        myTell = theFile.tell()
-        c = theFile.read(1)
-        if len(c) == 0:
-            break
-#        print(ord(c), thePatt[pIdx])
-        if ord(c) == thePatt[pIdx]:
-            pIdx += 1
-            if pIdx == len(thePatt):
-                # Full match
-                hist[thePatt] += 1
-                if showTell:
-                    theS.write('0x{0:08x} {1:6d} [0x{1:04x}]\n'.format(myTell - pIdx, pIdx))
-                pIdx = 0
-        else:
-            pIdx = 0
+    myTail = b''
+    for myTell, myChunk in _genChunks(theFile, theChunkSize):
+        myBytes = myTail + myChunk.tobytes()
+        myBase = myTell - len(myTail)
+        myNext = 0
+        myIdx = myBytes.find(thePatt)
+        while myIdx != -1:
+            # Full match
+            hist[thePatt] += 1
+            if showTell:
+                theS.write('0x{0:08x} {1:6d} [0x{1:04x}]\n'.format(myBase + myIdx, len(thePatt)))
+            myNext = myIdx + len(thePatt)
+            myIdx = myBytes.find(thePatt, myNext)
+        myTail = myBytes[max(myNext, len(myBytes) - len(thePatt) + 1):]
     return hist
 
 
-def _retHistCharRuns(theCharS, theFile, theS=sys.stdout, theMin=DEFAULT_MIN_RUN_LENGTH, showTell=False):
-    hist = collections.defaultdict(int)
+def _retHistCharRuns(theCharS, theFile, theS=sys.stdout, theMin=DEFAULT_MIN_RUN_LENGTH, showTell=False,
+                     theChunkSize=CHUNK_SIZE):
+    """Returns a histogram of {byte : count, ...} of the bytes in theCharS and a histogram of {run_length : count, ...}
+    of runs of those bytes of length >= theMin. A run that continues across a chunk boundary is carried over."""
+    myClass = np.zeros(256, dtype=bool)
+    myClass[np.frombuffer(theCharS, dtype=np.uint8)] = True
+    myCounts = np.zeros(256, dtype=np.int64)
     histRun = collections.defaultdict(int)
-    tellStart = None
-    while True:
-        myTell = theFile.tell()
-        c = theFile.read(1)
-        if len(c) == 0:
-            break
-        if c in theCharS:
-            hist[c] += 1
-            if tellStart is None:
-                tellStart = myTell
-        else:
-            if tellStart is not None:
-                if myTell - tellStart >= theMin:
-                    if showTell:
-                        theS.write('0x{0:08x} {1:6d} [0x{1:04x}]\n'.format(tellStart, myTell - tellStart))
-                    histRun[myTell-tellStart] += 1
-                tellStart = None
+
+    def _addRuns(theStarts, theEnds):
+        myLengths = theEnds - theStarts
+        mySelect = myLengths >= theMin
+        if showTell:
+            for myStart, myLength in zip(theStarts[mySelect], myLengths[mySelect]):
+                theS.write('0x{0:08x} {1:6d} [0x{1:04x}]\n'.format(int(myStart), int(myLength)))
+        for myLength, myCount in zip(*np.unique(myLengths[mySelect], return_counts=True)):
+            histRun[int(myLength)] += int(myCount)
+
+    runStart = None
+    for myTell, myChunk in _genChunks(theFile, theChunkSize):
+        myCounts += np.bincount(myChunk, minlength=256)
+        myMask = np.concatenate(([False], myClass[myChunk], [False]))
+        myEdges = np.diff(myMask.view(np.int8))
+        myStarts = np.flatnonzero(myEdges == 1) + myTell
+        myEnds = np.flatnonzero(myEdges == -1) + myTell
+        if runStart is not None:
+            if len(myStarts) and myStarts[0] == myTell:
+                myStarts[0] = runStart
+            else:
+                # The run ended at the chunk boundary.
+                myStarts = np.insert(myStarts, 0, runStart)
+                myEnds = np.insert(myEnds, 0, myTell)
+            runStart = None
+        if len(myEnds) and myEnds[-1] == myTell + len(myChunk):
+            runStart = myStarts[-1]
+            myStarts = myStarts[:-1]
+            myEnds = myEnds[:-1]
+        _addRuns(myStarts, myEnds)
+    if runStart is not None:
+        # A run to EOF.
+        _addRuns(np.array([runStart]), np.array([myTell + len(myChunk)]))
+    hist = collections.defaultdict(int)
+    for c in np.flatnonzero(myClass & (myCounts > 0)):
+        hist[bytes([c])] = int(myCounts[c])
     return hist, histRun
 
 
@@ -208,11 +264,12 @@ def reportTOOL(theFile, theS=sys.stdout, theMin=DEFAULT_MIN_RUN_LENGTH, showTell
 
 def main():
     print ('Cmd: %s' % ' '.join(sys.argv))
-    op = cmn_cmd_opts.retOptParser(
+    op = cmn_cmd_opts.arg_parser(
         desc='Searches for runs of data in binary files.',
         prog='PatternSearch ',
         version=__version__,
     )
+    cmn_cmd_opts.add_log_level(op)
     op.add_argument("-s", "--show-tell", action="store_true", dest="show_tell", default=False, 
                       help="Show file locations and lengths. Default: %(default)s.")
     op.add_argument("-n", "--number", dest="min_run_length",
@@ -221,13 +278,10 @@ def main():
     op.add_argument('infile', type=argparse.FileType('rb'), help='The file to search')
     args = op.parse_args()
 #    print('TRACE: args', args)
-    clkStart = time.clock()
+    clkStart = time.process_time()
     timStart = time.time()
     # Initialise logging etc.
-    logging.basicConfig(level=args.loglevel,
-                    format='%(asctime)s %(levelname)-8s %(message)s',
-                    #datefmt='%y-%m-%d % %H:%M:%S',
-                    stream=sys.stdout)
+    cmn_cmd_opts.set_log_level(args)
     # Your code here
 #    reportAll(args.infile)
 #    report0x80(args.infile, theMin=args.min_run_length, showTell=args.show_tell)
@@ -239,7 +293,7 @@ def main():
 #    reportIDENT(args.infile, theMin=args.min_run_length, showTell=args.show_tell)
 #    reportSLB(args.infile, showTell=args.show_tell)
     reportTOOL(args.infile, showTell=args.show_tell)
-    print('  CPU time = %8.3f (S)' % (time.clock() - clkStart))
+    print('  CPU time = %8.3f (S)' % (time.process_time() - clkStart))
     print('Exec. time = %8.3f (S)' % (time.time() - timStart))
     print('Bye, bye!')
     return 0
@@ -1,9 +1,24 @@
 """
-Scans a directory and removes duplicate files based on their SHA.
+Scans a directory and removes duplicate files based on their content.
+
+Duplicates are found in stages so that most files are never read in full:
+
+#. Files are grouped by size, a file with a unique size can not have a duplicate.
+#. Files of the same size are grouped by a hash of their first and last :py:data:`PARTIAL_HASH_SIZE` bytes.
+#. Files that are still in a group are compared by a hash of their full content.
+
+Hashing is done in a thread pool as :py:mod:`hashlib` releases the GIL. Digests can be kept in a persistent cache keyed
+by (path, size, mtime) so that re-running over a large archive only hashes new or changed files.
+
+Duplicates can be removed, replaced by a hard link to the original or just reported.
 """
+import collections
+import concurrent.futures
 import hashlib
+import json
 import logging
 import os
+import stat
 import sys
 import time
 import typing
@@ -12,39 +27,220 @@ from TotalDepth.common import cmn_cmd_opts
 
 logger = logging.getLogger(__file__)
 
-__version__ = '0.1.0'
+__version__ = '0.2.0'
 __rights__  = 'Copyright (c) 2019 Paul Ross. All rights reserved.'
 
 
-def remove_dupes(path: str, nervous: bool) -> typing.Tuple[int, int]:
-    """Scans a directory tree removing duplicate files detected by their SHA512."""
-    BLOCK_SIZE = 1024**2
-    file_count = byte_count = 0
-    dupes: typing.Dict[bytes, str] = {}
+#: Block size when reading a file for the full digest.
+BLOCK_SIZE = 1024**2
+#: Number of bytes at the start and end of a file used for the partial digest.
+PARTIAL_HASH_SIZE = 64 * 1024
+#: Just report duplicates.
+MODE_REPORT = 'report'
+#: Remove duplicates.
+MODE_REMOVE = 'remove'
+#: Replace duplicates with a hard link to the original.
+MODE_LINK = 'link'
+MODES = (MODE_REPORT, MODE_REMOVE, MODE_LINK)
+
+
+def _new_digest() -> 'hashlib.blake2b':
+    return hashlib.blake2b(digest_size=32)
+
+
+def partial_digest(file_path: str, size: int) -> str:
+    """Returns the hex digest of the first and last PARTIAL_HASH_SIZE bytes of a file of the given size."""
+    hash_digest = _new_digest()
+    with open(file_path, 'rb') as fobj:
+        hash_digest.update(fobj.read(PARTIAL_HASH_SIZE))
+        if size > PARTIAL_HASH_SIZE:
+            fobj.seek(max(PARTIAL_HASH_SIZE, size - PARTIAL_HASH_SIZE))
+            hash_digest.update(fobj.read(PARTIAL_HASH_SIZE))
+    return hash_digest.hexdigest()
+
+
+def full_digest(file_path: str) -> str:
+    """Returns the hex digest of the full content of a file."""
+    hash_digest = _new_digest()
+    with open(file_path, 'rb') as fobj:
+        while True:
+            data = fobj.read(BLOCK_SIZE)
+            if not data:
+                break
+            hash_digest.update(data)
+    return hash_digest.hexdigest()
+
+
+class FileEntry(typing.NamedTuple):
+    """A file found by the scan. order is the position in the scan, the lowest in a group of duplicates is kept."""
+    order: int
+    path: str
+    size: int
+    mtime_ns: int
+
+
+class DigestCache:
+    """A persistent cache of {path : (size, mtime_ns, {stage : digest, ...}), ...} stored as JSON.
+    An entry is only used if the size and mtime of the file are unchanged."""
+    def __init__(self, cache_path: typing.Optional[str] = None):
+        self.cache_path = cache_path
+        self.hits = self.misses = 0
+        self._entries: typing.Dict[str, typing.List] = {}
+        if cache_path is not None and os.path.isfile(cache_path):
+            with open(cache_path) as fobj:
+                self._entries = json.load(fobj)
+            logger.info(f'Loaded {len(self._entries):,d} digests from cache {cache_path}')
+
+    def get(self, entry: FileEntry, stage: str) -> typing.Optional[str]:
+        """Returns the cached digest for the stage or None."""
+        value = self._entries.get(entry.path)
+        if value is not None and value[0] == entry.size and value[1] == entry.mtime_ns and stage in value[2]:
+            self.hits += 1
+            return value[2][stage]
+        self.misses += 1
+        return None
+
+    def set(self, entry: FileEntry, stage: str, digest: str) -> None:
+        """Records the digest for the stage."""
+        value = self._entries.get(entry.path)
+        if value is None or value[0] != entry.size or value[1] != entry.mtime_ns:
+            value = [entry.size, entry.mtime_ns, {}]
+            self._entries[entry.path] = value
+        value[2][stage] = digest
+
+    def save(self) -> None:
+        """Writes the cache to the cache path, if any."""
+        if self.cache_path is not None:
+            temp_path = self.cache_path + '.tmp'
+            with open(temp_path, 'w') as fobj:
+                json.dump(self._entries, fobj)
+            os.replace(temp_path, self.cache_path)
+            logger.info(f'Saved {len(self._entries):,d} digests to cache {self.cache_path}')
+
+
+def scan_by_size(path: str) -> typing.Dict[int, typing.List[FileEntry]]:
+    """Scans a directory tree and returns a map of {size : [FileEntry, ...], ...} of regular files, ignoring files
+    starting with '.'. Symbolic links are ignored."""
+    ret: typing.Dict[int, typing.List[FileEntry]] = collections.defaultdict(list)
+    order = 0
     for root, dirs, files in os.walk(path):
         for file in sorted(files):
             if not file.startswith('.'):
                 file_path = os.path.join(root, file)
-                logger.debug(f'Checking {file_path}')
-                with open(file_path, 'rb') as fobj:
-                    hash_digest = hashlib.sha512()
-                    while True:
-                        data = fobj.read(BLOCK_SIZE)
-                        if not data:
-                            break
-                        hash_digest.update(data)
-                    hash_digest = hash_digest.digest()
-                    if hash_digest in dupes:
-                        byte_count += os.path.getsize(file_path)
-                        file_count += 1
-                        if nervous:
-                            logger.info(f'Would remove {file_path} as duplicate of {dupes[hash_digest]}')
-                        else:
-                            logger.info(f'Removing {file_path} as duplicate of {dupes[hash_digest]}')
-                            os.remove(file_path)
-                    else:
-                        dupes[hash_digest] = file_path
-    return file_count, byte_count
+                file_stat = os.lstat(file_path)
+                if stat.S_ISREG(file_stat.st_mode):
+                    ret[file_stat.st_size].append(
+                        FileEntry(order, file_path, file_stat.st_size, file_stat.st_mtime_ns)
+                    )
+                    order += 1
+    return ret
+
+
+def _group_by_digest(groups: typing.List[typing.List[FileEntry]],
+                     stage: str,
+                     digest_function: typing.Callable[[FileEntry], str],
+                     cache: DigestCache,
+                     executor: typing.Optional[concurrent.futures.Executor]) -> typing.List[typing.List[FileEntry]]:
+    """Splits each group by the digest of each file and returns the groups of more than one file."""
+    digests: typing.Dict[str, str] = {}
+    to_hash: typing.List[FileEntry] = []
+    for group in groups:
+        for entry in group:
+            digest = cache.get(entry, stage)
+            if digest is None:
+                to_hash.append(entry)
+            else:
+                digests[entry.path] = digest
+    if executor is None:
+        new_digests = map(digest_function, to_hash)
+    else:
+        new_digests = executor.map(digest_function, to_hash)
+    for entry, digest in zip(to_hash, new_digests):
+        cache.set(entry, stage, digest)
+        digests[entry.path] = digest
+    ret = []
+    for group in groups:
+        by_digest: typing.Dict[str, typing.List[FileEntry]] = collections.defaultdict(list)
+        for entry in group:
+            by_digest[digests[entry.path]].append(entry)
+        ret.extend(g for g in by_digest.values() if len(g) > 1)
+    logger.debug(f'Stage {stage}: hashed {len(to_hash):,d} files, {len(ret):,d} groups remain.')
+    return ret
+
+
+def find_dupes(path: str, jobs: int = 1, cache: typing.Optional[DigestCache] = None) \
+        -> typing.List[typing.List[FileEntry]]:
+    """Scans a directory tree and returns a list of groups of files with identical content. Each group is in scan
+    order so the first is the original. jobs is the number of threads used to hash files."""
+    if cache is None:
+        cache = DigestCache()
+    groups = [g for g in scan_by_size(path).values() if len(g) > 1]
+    logger.debug(f'Stage size: {len(groups):,d} groups.')
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    try:
+        groups = _group_by_digest(groups, 'partial', lambda e: partial_digest(e.path, e.size), cache, executor)
+        # The partial digest of a small file is of its full content
+        small_groups = [g for g in groups if g[0].size <= 2 * PARTIAL_HASH_SIZE]
+        groups = [g for g in groups if g[0].size > 2 * PARTIAL_HASH_SIZE]
+        groups = small_groups + _group_by_digest(groups, 'full', lambda e: full_digest(e.path), cache, executor)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return sorted(sorted(g) for g in groups)
+
+
+def _hard_link(original: str, duplicate: str) -> None:
+    """Replaces the duplicate with a hard link to the original.
+    Raises OSError if the link can not be made, for example across devices, in which case the duplicate is unchanged."""
+    temp_path = duplicate + '.tdlink'
+    os.link(original, temp_path)
+    try:
+        os.replace(temp_path, duplicate)
+    except OSError:
+        os.remove(temp_path)
+        raise
+
+
+def remove_dupes(path: str, nervous: bool = False, mode: str = MODE_REMOVE, jobs: int = 1,
+                 cache_path: typing.Optional[str] = None) -> typing.Tuple[int, int, int]:
+    """Scans a directory tree removing duplicate files detected by their content.
+    If nervous is True, or mode is MODE_REPORT, then the duplicates are only reported.
+    If mode is MODE_LINK the duplicates are replaced by hard links to the original, a duplicate that can not be linked
+    is logged and left in place.
+    Returns the count of duplicate files and their total size in bytes, excluding any that could not be linked, and the
+    count of duplicates that could not be linked."""
+    if mode not in MODES:
+        raise ValueError(f'Mode must be one of {MODES} not {mode!r}')
+    if nervous:
+        mode = MODE_REPORT
+    cache = DigestCache(cache_path)
+    try:
+        groups = find_dupes(path, jobs, cache)
+    finally:
+        cache.save()
+    logger.info(f'Digest cache hits: {cache.hits:,d} misses: {cache.misses:,d}')
+    file_count = byte_count = link_error_count = 0
+    for original, *duplicates in groups:
+        for entry in duplicates:
+            if mode == MODE_LINK and os.path.samefile(original.path, entry.path):
+                # Already a hard link
+                continue
+            if mode == MODE_REPORT:
+                logger.info(f'Would remove {entry.path} as duplicate of {original.path}')
+            elif mode == MODE_LINK:
+                logger.info(f'Linking {entry.path} as duplicate of {original.path}')
+                try:
+                    _hard_link(original.path, entry.path)
+                except OSError as err:
+                    logger.error(f'Can not link {entry.path} to {original.path}: {err}')
+                    link_error_count += 1
+                    continue
+            else:
+                logger.info(f'Removing {entry.path} as duplicate of {original.path}')
+                os.remove(entry.path)
+            byte_count += entry.size
+            file_count += 1
+    return file_count, byte_count, link_error_count
 
 
 def main() -> int:
@@ -55,18 +251,36 @@ def main() -> int:
         prog='TotalDepth.RP66V1.util.RemoveDupeFiles.main', version=__version__, epilog=__rights__
     )
     cmn_cmd_opts.add_log_level(parser, level=20)
+    cmn_cmd_opts.add_multiprocessing(parser)
     parser.add_argument('-n', '--nervous',
-                        help='Nervous mode, does not do anything but report [default: %(default)s].',
+                        help='Nervous mode, does not do anything but report, same as --mode=report'
+                             ' [default: %(default)s].',
                         action='store_true')
+    parser.add_argument('-m', '--mode', choices=MODES, default=MODE_REMOVE,
+                        help='Remove duplicates, replace them with hard links or just report them'
+                             ' [default: %(default)s].')
+    parser.add_argument('-c', '--cache', type=str, default='',
+                        help='Path to a persistent digest cache, only new or changed files are hashed'
+                             ' [default: %(default)s].')
     args = parser.parse_args()
     # print(args)
     cmn_cmd_opts.set_log_level(args)
+    if args.jobs < 0:
+        jobs = 1
+    elif args.jobs == 0:
+        jobs = os.cpu_count() or 1
+    else:
+        jobs = args.jobs
     t_start = time.perf_counter()
-    num_files, byte_count = remove_dupes(args.path_in, args.nervous)
+    num_files, byte_count, link_error_count = remove_dupes(
+        args.path_in, args.nervous, args.mode, jobs, args.cache or None
+    )
     t_exec = time.perf_counter() - t_start
     print(f'Execution time: {t_exec:.3f} (s)')
     print(f' Removed Files: {num_files:8,d} rate {num_files / t_exec:,.1f} (files/s)')
     print(f' Removed Bytes: {byte_count:8,d} rate {byte_count / t_exec:,.1f} (bytes/s)')
+    if link_error_count:
+        print(f' Link Failures: {link_error_count:8,d}')
     print('Bye, bye!')
     return 0
 
@@ -37,6 +37,9 @@ from TotalDepth.LIS import ExceptionTotalDepthLIS
 # will be written. These will not mask other Excecptions. 
 RAISE_ON_ERROR = True#False
 
+# Suggested buffer size in characters for XmlStream(..., theBufSize=...)
+DEFAULT_BUFFER_SIZE = 64 * 1024
+
 class ExceptionXml(ExceptionTotalDepthLIS):
     """Exception specialisation for the XML writer."""
     pass
@@ -124,7 +127,19 @@ class XmlStream(object):
                   "'"   : '&apos;', 
                   '"'   : '&quot;',
                   }
-    def __init__(self, theFout, theEnc='utf-8', theDtdLocal=None, theId=0):
+    # str.translate() table for _encode(), control characters are written as
+    # character references, non-ASCII characters are dealt with by the codec.
+    ENTITY_TRANSLATE = str.maketrans(
+        dict(
+            [(chr(c), '&#{:03d};'.format(c)) for c in range(ord(' '))] \
+            + list(ENTITY_MAP.items())
+        )
+    )
+    # Attribute values longer than this are not cached, for example SVG point lists
+    ATTR_CACHE_MAX_VALUE_LEN = 64
+    # Maximum number of attribute strings in the cache
+    ATTR_CACHE_MAX_ENTRIES = 1024
+    def __init__(self, theFout, theEnc='utf-8', theDtdLocal=None, theId=0, theBufSize=0):
         """Initialise with a writable file like object or a file path.
         
         theFout - The file-like object or a string. If the latter it will be
@@ -134,7 +149,11 @@ class XmlStream(object):
         
         theDtdLocal - Any local DTD as a string.
         
-        id - An integer value to use as an ID string."""
+        id - An integer value to use as an ID string.
+        
+        theBufSize - If > 0 the output is accumulated and written to the file
+        in blocks of at least this many characters. The file is only complete
+        after flush() or __exit__."""
         if type(theFout) == type(''):
             self._file = open(theFout, 'w')
             self._fileClose = True
@@ -149,6 +168,29 @@ class XmlStream(object):
         self._canIndentStk = []
         # An integer that represents a unique ID
         self._intId = theId
+        # Output buffer as a list of strings and their total length
+        self._bufSize = theBufSize
+        self._bufS = []
+        self._bufLen = 0
+        # {((name, value), ...) : ' name="encoded value"...', ...}
+        self._attrCache = {}
+    
+    def _write(self, theS):
+        """Writes theS to the output, buffered if required."""
+        if self._bufSize > 0:
+            self._bufS.append(theS)
+            self._bufLen += len(theS)
+            if self._bufLen >= self._bufSize:
+                self.flush()
+        else:
+            self._file.write(theS)
+    
+    def flush(self):
+        """Writes any buffered output to the file."""
+        if len(self._bufS):
+            self._file.write(''.join(self._bufS))
+            self._bufS = []
+            self._bufLen = 0
     
     @property
     def id(self):
@@ -181,39 +223,88 @@ class XmlStream(object):
     def startElement(self, name, attrs):
         self._closeElemIfOpen()
         self._indent()
-        self._file.write('<%s' % name)
-        kS = sorted(attrs.keys())
-        for k in kS:
-            self._file.write(' %s="%s"' % (k, self._encode(attrs[k])))
+        self._write('<%s' % name)
+        self._write(self._attrString(attrs))
         self._inElem = True
         self._canIndentStk.append(True)
         self._elemStk.append(name)
 
+    def _attrString(self, attrs):
+        """Returns the encoded attributes as a string sorted by name.
+        Short attribute sets are cached as they are repeated often, for
+        example SVG stroke attributes."""
+        kS = sorted(attrs.keys())
+        try:
+            myKey = tuple((k, attrs[k]) for k in kS)
+            myCacheable = all(len(v) <= self.ATTR_CACHE_MAX_VALUE_LEN for k, v in myKey)
+        except TypeError:
+            # Not hashable or no len()
+            myCacheable = False
+        if myCacheable:
+            try:
+                return self._attrCache[myKey]
+            except KeyError:
+                pass
+        retVal = ''.join([' %s="%s"' % (k, self._encode(attrs[k])) for k in kS])
+        if myCacheable and len(self._attrCache) < self.ATTR_CACHE_MAX_ENTRIES:
+            self._attrCache[myKey] = retVal
+        return retVal
+
+    @property
+    def renderContext(self):
+        """A hashable value that identifies how renderElements() markup is
+        indented at the current position in the stream."""
+        return len(self._elemStk), self._canIndent
+
+    def renderElements(self, theElemS):
+        """Returns the markup for a sequence of elements without writing it.
+        theElemS is a sequence of (name, attrs, text) where text is None for
+        an empty element. The markup is identical to that written by
+        startElement(), characters(), endElement() for each element at the
+        current position in the stream, so it can be reused with
+        writeRendered() wherever renderContext is the same."""
+        if self._canIndent:
+            myIndent = '\n' + self.INDENT_STR * len(self._elemStk)
+        else:
+            myIndent = ''
+        retL = []
+        for name, attrs, text in theElemS:
+            if text is None:
+                retL.append('%s<%s%s/>' % (myIndent, name, self._attrString(attrs)))
+            else:
+                retL.append('%s<%s%s>%s</%s>' % (myIndent, name, self._attrString(attrs), self._encode(text), name))
+        return ''.join(retL)
+
+    def writeRendered(self, theString):
+        """Writes markup from renderElements() to the output."""
+        self._closeElemIfOpen()
+        self._write(theString)
+
     def characters(self, theString):
         """Encodes the string and writes it to the output."""
         self._closeElemIfOpen()
-        self._file.write(self._encode(theString))
+        self._write(self._encode(theString))
         # mixed content - don't indent
         self._flipIndent(False)
 
     def literal(self, theString):
         """Writes theString to the output without encoding."""
         self._closeElemIfOpen()
-        self._file.write(theString)
+        self._write(theString)
         # mixed content - don't indent
         self._flipIndent(False)
 
     def comment(self, theS):
         """Writes a comment to the output stream."""
         self._closeElemIfOpen()
-        self._file.write('<!--%s-->' % self._encode(theS))
+        self._write('<!--%s-->' % self._encode(theS))
         # mixed content - don't indent
         #self._flipIndent(False)
 
     def pI(self, theS):
         """Writes a Processing Instruction to the output stream."""
         self._closeElemIfOpen()
-        self._file.write('<?%s?>' % self._encode(theS))
+        self._write('<?%s?>' % self._encode(theS))
         self._flipIndent(False)
 
     def endElement(self, name):
@@ -231,11 +322,11 @@ class XmlStream(object):
             logging.error(errMsg)
         myName = self._elemStk.pop()
         if self._inElem:
-            self._file.write('/>')
+            self._write('/>')
             self._inElem = False
         else:
             self._indent()
-            self._file.write('</%s>' % myName)
+            self._write('</%s>' % myName)
         self._canIndentStk.pop()
         
     def writeECMAScript(self, theScript):
@@ -252,42 +343,31 @@ class XmlStream(object):
         self.startElement('script', {'type' : "text/ecmascript"})
         self._closeElemIfOpen()
         self.xmlSpacePreserve()
-        self._file.write('\n//<![CDATA[\n')
-        self._file.write(theScript)
-        self._file.write('\n// ]]>\n')
+        self._write('\n//<![CDATA[\n')
+        self._write(theScript)
+        self._write('\n// ]]>\n')
         self.endElement('script')
     
     def _indent(self, offset=0):
         if self._canIndent:
-            self._file.write('\n')
-            self._file.write(self.INDENT_STR*(len(self._elemStk)-offset))
+            self._write('\n')
+            self._write(self.INDENT_STR*(len(self._elemStk)-offset))
         
     def _closeElemIfOpen(self):
         if self._inElem:
-            self._file.write('>')
+            self._write('>')
             self._inElem = False
 
     def _encode(self, theStr):
         # TODO: This code does not seem to handle theStr bytes objects with '\x00' in them for example
-        retL = []
-        for c in theStr:
-            # assert isinstance(c, str), f'{c} is not a string {theStr}'
-            try:
-                retL.append(self.ENTITY_MAP[c])
-            except KeyError:
-                # Python 2.x code
-                #u = unichr(ord(c))
-                #retL.append(u.encode('ascii', 'xmlcharrefreplace'))
-                # Python 3.x code
-                if ord(c) < ord(' '):
-                    retL.append(f'&#{ord(c):03d};')
-                else:
-                    retL.append(c.encode('ascii', 'xmlcharrefreplace').decode(self._enc))
-        return ''.join(retL)
+        retVal = theStr.translate(self.ENTITY_TRANSLATE)
+        if not retVal.isascii():
+            retVal = retVal.encode('ascii', 'xmlcharrefreplace').decode(self._enc)
+        return retVal
     
     def __enter__(self):
         """Context manager support."""
-        self._file.write("<?xml version='1.0' encoding=\"%s\"?>" % self._enc)
+        self._write("<?xml version='1.0' encoding=\"%s\"?>" % self._enc)
         # Write local DTD?
         return self
     
@@ -295,7 +375,8 @@ class XmlStream(object):
         """Context manager support."""
         while len(self._elemStk):
             self.endElement(self._elemStk[-1])
-        self._file.write('\n')
+        self._write('\n')
+        self.flush()
         if self._fileClose:
             self._file.close()
         return False
@@ -310,7 +391,7 @@ class XhtmlStream(XmlStream):
     def __enter__(self):
         """Context manager support."""
         super(XhtmlStream, self).__enter__()
-        self._file.write("""\n<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Strict//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-strict.dtd">""")
+        self._write("""\n<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Strict//EN" "http://www.w3.org/TR/xhtml1/DTD/xhtml1-strict.dtd">""")
         self.startElement(
                 'html',
                 {
@@ -4,6 +4,7 @@ Extract summary data from archives of log files.
 This is a bit hacked together to help create a good archive of test data. It is not production code.
 """
 import collections
+import concurrent.futures
 import datetime
 import functools
 import logging
@@ -11,6 +12,7 @@ import os
 import pprint
 import shutil
 import sys
+import tempfile
 import time
 import typing
 import zipfile
@@ -55,17 +57,19 @@ class FileBase:
 
 
 class FileOnDisc(FileBase):
-    """Represents an on-disc file."""
+    """Represents an on-disc file. os_stat can be given if already known, for example from os.scandir()."""
 
-    def __init__(self, path: str):
+    def __init__(self, path: str, os_stat: typing.Optional[os.stat_result] = None):
         super().__init__(path)
-        os_stat = os.stat(self.path)
+        if os_stat is None:
+            os_stat = os.stat(self.path)
         self.size = os_stat.st_size
         self.mod_date = datetime.datetime(*(time.localtime(os_stat.st_mtime)[:6]))
         with open(self.path, 'rb') as f:
-            self.bin_type = TotalDepth.util.bin_file_type.binary_file_type(f)
-            f.seek(0)
-            self.bytes = f.read(self.XXD_NUM_BYTES)
+            # Single pass over the file header for the type and the initial bytes.
+            self.bin_type, self.bytes = TotalDepth.util.bin_file_type.binary_file_type_and_bytes(
+                f, self.XXD_NUM_BYTES
+            )
 
 
 class FileInMemory(FileBase):
@@ -100,57 +104,92 @@ class FileMembers:
 class FileArchive(FileOnDisc):
     """Represents a file that is an archive of other files."""
 
-    def __init__(self, archive_path: str, depth: int):
-        super().__init__(archive_path)
+    def __init__(self, archive_path: str, depth: int, os_stat: typing.Optional[os.stat_result] = None):
+        super().__init__(archive_path, os_stat)
         self.members: FileMembers = FileMembers(archive_path, depth)
 
 
+#: Maximum depth of ZIP in ZIP that FileZip will expand.
+ZIP_MAX_DEPTH = 8
+#: Nested ZIP members up to this size are spooled in memory, larger ones to a temporary file.
+ZIP_SPOOL_MAX_MEMORY = 16 * 1024**2
+
+#: A ZIP member as (path, size, binary_type, mod_date, bytes) for FileMembers.append().
+ZipMemberRecord = typing.Tuple[str, int, str, datetime.datetime, bytes]
+
+
 class FileZip(FileArchive):
-    """Represents an on-disc file that is a ZIP file."""
+    """Represents an on-disc file that is a ZIP file.
+    If expand is True the members are classified from the first few kilobytes of their decompressed stream so they
+    are never decompressed in full. Nested ZIP files are spooled to a SpooledTemporaryFile and expanded in turn.
+    Members are classified by jobs threads."""
 
-    def __init__(self, archive_path: str):
+    def __init__(self, archive_path: str, os_stat: typing.Optional[os.stat_result] = None,
+                 expand: bool = False, jobs: int = 1):
         assert zipfile.is_zipfile(archive_path)
-        super().__init__(archive_path, depth=0)
+        super().__init__(archive_path, depth=0, os_stat=os_stat)
         # assert self.bin_type == 'ZIP', f'Binary type is "{self.bin_type}" not ZIP'
         # XXD_NUM_BYTES = 18
-        # Recurse into the archive. This can fail with io.UnsupportedOperation: seek when attempting to determine the
-        # binary file type.
-        # with zipfile.ZipFile(archive_path) as z_archive:
-        #     self._expand_archive(z_archive, 0)
-
-    def _expand_archive(self, z_archive: zipfile.ZipFile, depth: int) -> None:
-        # print()
-        # print(f'TRACE: process_zip_path(): Processing ZIP {archive_path}')  # {z_archive.filename}')
-        for z_info in z_archive.infolist():
-            if z_info.is_dir():
-                # print(f'{str():{xxd_size(XXD_NUM_BYTES)}s} {0:12,d} {"DIR":8s} {z_info.filename}')
-                self.members.append(
-                    z_info.filename, 0, 'DIR', datetime.datetime(*z_info.date_time), b''
+        if expand:
+            try:
+                with zipfile.ZipFile(archive_path) as z_archive:
+                    self._expand_archive(z_archive, jobs)
+            except (zipfile.BadZipFile, OSError, RuntimeError, NotImplementedError) as err:
+                logger.error(f'Can not expand ZIP archive {archive_path}: {err}')
+
+    def _expand_archive(self, z_archive: zipfile.ZipFile, jobs: int) -> None:
+        """Classifies the members of the archive in parallel and appends them in archive order."""
+        z_infos = z_archive.infolist()
+        if jobs > 1 and len(z_infos) > 1:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+                record_lists = list(
+                    executor.map(lambda z_info: self._member_records(z_archive, z_info, 0, ''), z_infos)
                 )
-            else:
-                with z_archive.open(z_info) as z_member_file:
-                    if zipfile.is_zipfile(z_member_file):
-                        # print(f'Found zip in zip: {z_info}')
-                        with zipfile.ZipFile(z_member_file) as z_member_archive:
-                            self._expand_archive(z_member_archive, depth + 1)
-                    else:
-                        try:
-                            bin_file_type = TotalDepth.util.bin_file_type.binary_file_type(z_member_file)
-                        except Exception as err:
-                            logger.exception(
-                                f'Can not determine binary file type for member {z_member_file} of {z_archive}'
-                            )
-                        else:
-                            # by: bytes = z_member_file.read(XXD_NUM_BYTES)
-                            # print(
-                            #     f'{xxd(by):{xxd_size(XXD_NUM_BYTES)}s} {z_info.file_size:12,d}'
-                            #     f' {bin_file_type:8s} {z_info.filename}'
-                            # )
-                            z_member_file.seek(0)
-                            by = z_member_file.read(self.XXD_NUM_BYTES)
-                            self.members.append(
-                                z_info.filename, z_info.file_size, bin_file_type, datetime.datetime(*z_info.date_time), by
-                            )
+        else:
+            record_lists = [self._member_records(z_archive, z_info, 0, '') for z_info in z_infos]
+        for records in record_lists:
+            for record in records:
+                self.members.append(*record)
+
+    def _member_records(self, z_archive: zipfile.ZipFile, z_info: zipfile.ZipInfo,
+                        depth: int, prefix: str) -> typing.List[ZipMemberRecord]:
+        """Returns the records of a member, a nested ZIP gives the records of its members."""
+        path = os.path.join(prefix, z_info.filename)
+        mod_date = datetime.datetime(*z_info.date_time)
+        if z_info.is_dir():
+            return [(path, 0, 'DIR', mod_date, b'')]
+        try:
+            with z_archive.open(z_info) as z_member_file:
+                header = TotalDepth.util.bin_file_type.HeaderBuffer(z_member_file)
+                bin_file_type = TotalDepth.util.bin_file_type.binary_file_type(header)
+                by = header.read(self.XXD_NUM_BYTES)
+                if bin_file_type == 'ZIP' and depth < ZIP_MAX_DEPTH:
+                    return self._nested_records(header, z_info, depth + 1, path)
+        except Exception:
+            logger.exception(f'Can not determine binary file type for member {path} of {z_archive.filename}')
+            return []
+        return [(path, z_info.file_size, bin_file_type, mod_date, by)]
+
+    def _nested_records(self, header: TotalDepth.util.bin_file_type.HeaderBuffer, z_info: zipfile.ZipInfo,
+                        depth: int, path: str) -> typing.List[ZipMemberRecord]:
+        """Spools a ZIP member that is a ZIP and returns the records of its members, their paths are prefixed by the
+        member path without its extension. If it turns out not to be a ZIP it is recorded as a member of its own."""
+        with tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX_MEMORY) as spool:
+            header.copy_to(spool)
+            spool.seek(0)
+            if not zipfile.is_zipfile(spool):
+                spool.seek(0)
+                return [
+                    (path, z_info.file_size, 'ZIP', datetime.datetime(*z_info.date_time),
+                     spool.read(self.XXD_NUM_BYTES))
+                ]
+            ret = []
+            with zipfile.ZipFile(spool) as z_member_archive:
+                for z_member_info in z_member_archive.infolist():
+                    ret.extend(
+                        self._member_records(z_member_archive, z_member_info, depth, os.path.splitext(path)[0])
+                    )
+            return ret
 
     def __str__(self):
         str_self = ' '.join(
@@ -266,31 +305,83 @@ def analyse_archive(files: typing.List[FileBase],
 EXCLUDE_FILENAMES = ('.DS_Store', '.DS_STORE',)
 
 
-def _process_file(dir_name: str, file_name: str, result: typing.List[FileBase]) -> None:
-    if file_name not in EXCLUDE_FILENAMES:
-        path = os.path.join(dir_name, file_name)
-        if os.path.isfile(path):
-            # If this is a ZIP archive then open it a process the contents.
-            if zipfile.is_zipfile(path):
-                # result.extend(process_zip_path(path))
-                result.append(FileZip(path))
-            else:
-                result.append(FileOnDisc(path))
+#: Number of files being classified at any one time per thread by gen_explore_tree().
+EXPLORE_QUEUE_PER_THREAD = 16
 
 
-def explore_tree(path: str, recurse: bool) -> typing.List[FileBase]:
-    result: typing.List[FileBase] = []
+def _process_file(path: str, os_stat: typing.Optional[os.stat_result] = None,
+                  expand_zip: bool = False, zip_jobs: int = 1) -> FileBase:
+    """Returns a FileBase for a file path, if this is a ZIP archive then a FileZip, expanded if expand_zip is True."""
+    if zipfile.is_zipfile(path):
+        # return process_zip_path(path)
+        return FileZip(path, os_stat, expand=expand_zip, jobs=zip_jobs)
+    return FileOnDisc(path, os_stat)
+
+
+def _gen_scandir(path: str, recurse: bool) -> typing.Iterator[typing.Tuple[str, typing.Optional[os.stat_result]]]:
+    """Generates (path, os.stat_result) for files in the directory using os.scandir(), depth first in the same order
+    as os.walk() if recurse, otherwise sorted by name."""
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError as err:
+        logger.error(f'Can not scan directory {path}: {err}')
+        return
+    if not recurse:
+        entries.sort(key=lambda e: e.name)
+    dir_entries = []
+    for entry in entries:
+        try:
+            if entry.is_dir():
+                # Like os.walk() symbolic links to directories are not followed.
+                if not entry.is_symlink():
+                    dir_entries.append(entry)
+            elif entry.name not in EXCLUDE_FILENAMES and entry.is_file():
+                yield entry.path, entry.stat()
+        except OSError as err:
+            logger.error(f'Can not stat {entry.path}: {err}')
+    if recurse:
+        for entry in dir_entries:
+            yield from _gen_scandir(entry.path, recurse)
+
+
+def gen_explore_tree(path: str, recurse: bool, jobs: int = 1, expand_zip: bool = False) -> typing.Iterator[FileBase]:
+    """Generates FileBase objects for the files in the path as they are classified. If jobs > 1 the files are
+    classified by a pool of that many threads, the results are in the same order as the directory scan.
+    If expand_zip is True the members of ZIP files are classified, see FileZip."""
     if os.path.isdir(path):
-        if recurse:
-            for root, dirs, files in os.walk(path):
-                for file in files:
-                    _process_file(root, file, result)
-        else:
-            for file_name in sorted(os.listdir(path)):
-                _process_file(path, file_name, result)
+        path_stats = _gen_scandir(path, recurse)
+    elif os.path.basename(path) not in EXCLUDE_FILENAMES and os.path.isfile(path):
+        # A single ZIP file has its members classified in parallel instead.
+        yield _process_file(path, None, expand_zip, jobs)
+        return
+    else:
+        return
+    if jobs <= 1:
+        for file_path, os_stat in path_stats:
+            yield _process_file(file_path, os_stat, expand_zip)
     else:
-        _process_file(os.path.dirname(path), os.path.basename(path), result)
-    return result
+        with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures: typing.Deque[concurrent.futures.Future] = collections.deque()
+            for file_path, os_stat in path_stats:
+                futures.append(executor.submit(_process_file, file_path, os_stat, expand_zip))
+                if len(futures) >= jobs * EXPLORE_QUEUE_PER_THREAD:
+                    yield futures.popleft().result()
+            while futures:
+                yield futures.popleft().result()
+
+
+def explore_tree(path: str, recurse: bool, jobs: int = 1, expand_zip: bool = False) -> typing.List[FileBase]:
+    """Returns a list of FileBase objects for the files in the path. See gen_explore_tree()."""
+    return list(gen_explore_tree(path, recurse, jobs, expand_zip))
+
+
+def gen_zip_members(files: typing.Iterable[FileBase]) -> typing.Iterator[FileBase]:
+    """Generates the files and, following each FileZip, the members of that ZIP file."""
+    for file in files:
+        yield file
+        if isinstance(file, FileZip):
+            yield from file.members.members
 
 
 def copy_tree(path_from: str, path_to: str, recurse: bool,
@@ -408,6 +499,7 @@ will be copied across."""
         description, prog='TotalDepth.util.archive.main', version=__version__, epilog=__rights__
     )
     cmn_cmd_opts.add_log_level(parser, level=20)
+    cmn_cmd_opts.add_multiprocessing(parser)
     file_types = ', '.join(sorted(TotalDepth.util.bin_file_type.BINARY_FILE_TYPES_SUPPORTED))
     parser.add_argument(
         '--file-type', default=[], action='append',
@@ -418,6 +510,10 @@ will be copied across."""
         '--expand-and-delete', help='Expand and delete archive files, implies --recurse.', action='store_true'
     )
     parser.add_argument('--histogram', help='Include size histogram.', action='store_true')
+    parser.add_argument(
+        '--expand-zip', help='Classify the members of ZIP files, including nested ZIP files, without extracting them.',
+        action='store_true'
+    )
     parser.add_argument('-n', '--nervous', help='Nervous mode, does not do anything but report.', action='store_true')
     parser.add_argument('-o', '--over-write', help='Over write existing files, otherwise warns.', action='store_true')
     # parser.add_argument('copy-to', help='Location to copy the files to.', nargs='?')
@@ -444,7 +540,15 @@ will be copied across."""
             num_files, byte_count = expand_and_delete_archives(args.path_in, args.nervous)
         else:
             print('Analysing archive.')
-            files: typing.List[FileBase] = explore_tree(args.path_in, args.recurse)
+            if args.jobs < 0:
+                jobs = 1
+            elif args.jobs == 0:
+                jobs = os.cpu_count() or 1
+            else:
+                jobs = args.jobs
+            files: typing.List[FileBase] = explore_tree(args.path_in, args.recurse, jobs, args.expand_zip)
+            if args.expand_zip:
+                files = list(gen_zip_members(files))
             analyse_archive(files, args.file_type, args.bytes, args.histogram)
             num_files = len(files)
             byte_count = sum(len(f.bytes) for f in files)
@@ -1,12 +1,111 @@
 """
 Identifies the type of file as a string such as "PDF", "RP66V1" by an analysis (mostly) of the
 initial bytes of the file.
+
+The file types are described by a declarative table of :py:class:`Signature` objects, each has optional magic bytes at
+an offset, the possible first bytes of the file and an optional structural validator.
+The table is compiled into a dispatch table indexed by the first byte of the file so only the signatures that could
+match that byte are tried. Thus the cost of classification does not grow with the number of file types supported.
 """
 
 import re
 import string
 import typing
 
+#: Size of the blocks read by HeaderBuffer, this covers all the detectors with a single read.
+HEADER_BLOCK_SIZE = 8 * 1024
+#: Maximum size of the header of a file that HeaderBuffer reads and keeps in memory. Beyond this it appears to be at EOF
+#: so that detectors that read lines, such as LAS, give up rather than reading the whole file.
+HEADER_BUFFER_MAX_SIZE = 64 * 1024
+
+
+class HeaderBuffer:
+    """A read only, seekable, file like object that reads the underlying file in blocks of HEADER_BLOCK_SIZE and
+    keeps them in memory. All the validators in SIGNATURES seek to the start and read the initial bytes so
+    wrapping the file in this means that, typically, the file is read once for all of them.
+    The underlying file is read sequentially from its current position so it does not need to support seek().
+    Only the first max_size bytes can be read, after that read() and readline() return b'' as at EOF.
+    """
+    def __init__(self, fobj: typing.BinaryIO, block_size: int = HEADER_BLOCK_SIZE,
+                 max_size: int = HEADER_BUFFER_MAX_SIZE):
+        self._fobj = fobj
+        self._block_size = block_size
+        self._max_size = max_size
+        self._buffer = bytearray()
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, size: int) -> None:
+        """Reads the underlying file until the buffer is at least size bytes, max_size bytes or EOF.
+        size < 0 reads to max_size or EOF."""
+        if size < 0 or size > self._max_size:
+            size = self._max_size
+        while len(self._buffer) < size and not self._eof:
+            by = self._fobj.read(self._block_size)
+            if by:
+                self._buffer += by
+            else:
+                self._eof = True
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            self._fill(-1)
+            end = min(len(self._buffer), self._max_size)
+        else:
+            self._fill(self._pos + size)
+            end = min(self._pos + size, len(self._buffer), self._max_size)
+        ret = bytes(self._buffer[self._pos:end])
+        self._pos = max(self._pos, end)
+        return ret
+
+    def readline(self) -> bytes:
+        start = self._pos
+        while True:
+            idx = self._buffer.find(b'\n', start, self._max_size)
+            if idx != -1:
+                return self.read(idx + 1 - self._pos)
+            if self._eof or len(self._buffer) >= self._max_size:
+                return self.read()
+            start = len(self._buffer)
+            self._fill(len(self._buffer) + self._block_size)
+
+    def __iter__(self) -> typing.Iterator[bytes]:
+        while True:
+            line = self.readline()
+            if not line:
+                break
+            yield line
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if whence == 1:
+            offset += self._pos
+        elif whence == 2:
+            self._fill(-1)
+            offset += min(len(self._buffer), self._max_size)
+        self._pos = offset
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def copy_to(self, fobj_out: typing.BinaryIO) -> int:
+        """Writes the whole of the file to fobj_out, the remainder of the underlying file is copied in blocks
+        without being buffered. Returns the number of bytes written. The position is then at EOF."""
+        fobj_out.write(self._buffer)
+        ret = len(self._buffer)
+        while not self._eof:
+            by = self._fobj.read(self._block_size)
+            if by:
+                fobj_out.write(by)
+                ret += len(by)
+            else:
+                self._eof = True
+        # The buffer no longer represents the file so the remainder can not be read again.
+        self._buffer = bytearray()
+        self._pos = 0
+        return ret
+
+
 RE_COMPILED = {
     'RP66V1': {
         'Comment_1': re.compile(b'^[0 ]*([1-9]+)$'),
@@ -422,41 +521,114 @@ EBCDIC_PRINTABLE = set(
 )
 
 
+#: Length of the SEGY textual file header.
+SEGY_TEXT_HEADER_LEN = 3200
+
+
 def _segy(fobj: typing.BinaryIO) -> int:
     """Returns 0 if the file is a SEGY.
     EBCDIC charcters used. Reference: https://en.wikipedia.org/wiki/EBCDIC
     """
     fobj.seek(0)
-    for i in range(3200):
-        by = fobj.read(1)
-        if len(by) != 1 or by[0] not in EBCDIC_PRINTABLE:
-            return 1
+    by = fobj.read(SEGY_TEXT_HEADER_LEN)
+    if len(by) != SEGY_TEXT_HEADER_LEN or not EBCDIC_PRINTABLE.issuperset(by):
+        return 1
     return 0
 
 
+class Signature(typing.NamedTuple):
+    """A declarative description of a file type.
+    magic, if present, must be at offset for the file to match. first_bytes is the set of possible first bytes of the
+    file, if None it is taken from the magic at offset 0 or, if there is none, any byte. empty is True if an empty file
+    can match. validator, if present, takes a HeaderBuffer and returns 0 on a match.
+    confidence is an approximate log2 of the inverse probability of a random file matching."""
+    bin_type: str
+    confidence: int
+    magic: bytes = b''
+    offset: int = 0
+    first_bytes: typing.Optional[typing.FrozenSet[int]] = None
+    validator: typing.Optional[typing.Callable[[typing.BinaryIO], int]] = None
+    empty: bool = False
+
+    @property
+    def detector(self) -> str:
+        """The name of what decides the match."""
+        if self.validator is not None:
+            return self.validator.__name__
+        return 'magic'
+
+    def possible_first_bytes(self) -> typing.FrozenSet[int]:
+        if self.first_bytes is not None:
+            return self.first_bytes
+        if len(self.magic) and self.offset == 0:
+            return frozenset(self.magic[:1])
+        return ANY_FIRST_BYTE
+
+
+#: Any byte can be the first byte.
+ANY_FIRST_BYTE = frozenset(range(256))
+#: The first byte of a TIF marker.
+TIF_MAGIC = b'\x00' * 8
+#: LAS files start with the version section or blank or comment lines.
+LAS_FIRST_BYTES = frozenset(b' \t\n\r\x0b\x0c#~')
+#: The first four bytes of the RP66 Storage Unit Label are a sequence number.
+RP66_FIRST_BYTES = frozenset(b'0 123456789')
+
 # Ordered so that more specific files are earlier in the list, more general ones later.
-# Also, as an optimisation, the more common file formats appear earlier.
-FUNCTION_ID_MAP: typing.Tuple[typing.Tuple[typing.Callable, str], ...] = (
-    (_xml, 'XML'),  # '<?xml ', 6 characters so 2^(6*8) 2^48
-    (_pdf, 'PDF'),  # 2^40
-    (_ps, 'PS'),  # 2^40
-    (_zip, 'ZIP'),  # 2^32
-    (_tiff, 'TIFF'),  # 2^32
-    (_segy, 'SEGY'),  # 3200 EBCDIC characters.
-    (_lis_tif, 'LISt'),  # Tests with TIF markers are much more strict.
-    (_lis_tif_r, 'LIStr'),
-    (_lasv12, 'LAS1.2'),
-    (_lasv20, 'LAS2.0'),
-    (_lasv30, 'LAS3.0'),
-    (_rp66v1, 'RP66V1'),
-    (_rp66v1_tif, 'RP66V1t'),
-    (_rp66v1_tif_r, 'RP66V1tr'),
-    (_rp66v2, 'RP66V2'),
-    (_ascii, 'ASCII'),
-    (_lis, 'LIS'),  # LIS without TIF is potentially the weakest test, around 2^11
+# The first matching signature in this order is the file type.
+SIGNATURES: typing.Tuple[Signature, ...] = (
+    Signature('XML', 48, magic=b'<?xml '),
+    Signature('PDF', 40, magic=b'%PDF-'),
+    Signature('PS', 40, magic=b'%!Ps-'),
+    Signature('ZIP', 32, magic=b'\x50\x4b\x03\x04'),
+    Signature('TIFF', 32, magic=b'II*\x00'),
+    # 3200 EBCDIC characters.
+    Signature('SEGY', 64, first_bytes=frozenset(EBCDIC_PRINTABLE), validator=_segy),
+    # Tests with TIF markers are much more strict.
+    Signature('LISt', 75, magic=TIF_MAGIC, validator=_lis_tif),
+    Signature('LIStr', 75, magic=TIF_MAGIC, validator=_lis_tif_r),
+    Signature('LAS1.2', 24, first_bytes=LAS_FIRST_BYTES, validator=_lasv12),
+    Signature('LAS2.0', 24, first_bytes=LAS_FIRST_BYTES, validator=_lasv20),
+    Signature('LAS3.0', 24, first_bytes=LAS_FIRST_BYTES, validator=_lasv30),
+    Signature('RP66V1', 72, first_bytes=RP66_FIRST_BYTES, validator=_rp66v1),
+    Signature('RP66V1t', 136, magic=TIF_MAGIC, validator=_rp66v1_tif),
+    Signature('RP66V1tr', 136, magic=TIF_MAGIC, validator=_rp66v1_tif_r),
+    Signature('RP66V2', 72, first_bytes=RP66_FIRST_BYTES, validator=_rp66v2),
+    Signature('ASCII', 8, first_bytes=frozenset(range(128)), validator=_ascii, empty=True),
+    # LIS without TIF is potentially the weakest test, around 2^11
+    Signature('LIS', 11, validator=_lis),
 )
-BINARY_FILE_TYPE_CODE_WIDTH: int = max(len(v[1]) for v in FUNCTION_ID_MAP)
-BINARY_FILE_TYPES_SUPPORTED: typing.Set[str] = {v[1] for v in FUNCTION_ID_MAP}
+#: Index into the dispatch table for an empty file.
+DISPATCH_EMPTY = 256
+
+
+def compile_signatures(signatures: typing.Sequence[Signature]) -> typing.Tuple[typing.Tuple[Signature, ...], ...]:
+    """Returns a dispatch table indexed by the first byte of a file, or DISPATCH_EMPTY, of the signatures that could
+    match in the order of signatures."""
+    table: typing.List[typing.List[Signature]] = [[] for _i in range(DISPATCH_EMPTY + 1)]
+    for signature in signatures:
+        for first_byte in signature.possible_first_bytes():
+            table[first_byte].append(signature)
+        if signature.empty:
+            table[DISPATCH_EMPTY].append(signature)
+    return tuple(tuple(v) for v in table)
+
+
+DISPATCH_TABLE = compile_signatures(SIGNATURES)
+#: Number of bytes needed to test all the magic.
+SIGNATURE_PREFIX_LEN = max(s.offset + len(s.magic) for s in SIGNATURES)
+BINARY_FILE_TYPE_CODE_WIDTH: int = max(len(s.bin_type) for s in SIGNATURES)
+BINARY_FILE_TYPES_SUPPORTED: typing.Set[str] = {s.bin_type for s in SIGNATURES}
+
+
+class FileTypeMatch(typing.NamedTuple):
+    """The result of classifying a file. bin_type is '' if there is no match."""
+    bin_type: str
+    detector: str
+    confidence: int
+
+
+NO_MATCH = FileTypeMatch('', '', 0)
 
 
 # TODO: Allow more generic cases such as 'LAS', 'RP66" ?
@@ -496,25 +668,57 @@ def summary_file_types_supported(short: bool) -> str:
     return '\n'.join(lst)
 
 
-def binary_file_type(fobj: typing.BinaryIO) -> str:
-    """Function that takes a file object that supports read() and seek() and returns a file type based on the
-    analysis of the contents of the file.
+def match_signatures(header: HeaderBuffer,
+                     dispatch_table: typing.Tuple[typing.Tuple[Signature, ...], ...] = DISPATCH_TABLE) \
+        -> FileTypeMatch:
+    """Returns the first signature that matches the file in the header, only the signatures in the dispatch table for
+    the first byte are tried."""
+    header.seek(0)
+    prefix = header.read(SIGNATURE_PREFIX_LEN)
+    for signature in dispatch_table[prefix[0] if len(prefix) else DISPATCH_EMPTY]:
+        if signature.magic and prefix[signature.offset:signature.offset + len(signature.magic)] != signature.magic:
+            continue
+        if signature.validator is None or signature.validator(header) == 0:
+            return FileTypeMatch(signature.bin_type, signature.detector, signature.confidence)
+    return NO_MATCH
+
+
+def binary_file_type_match(fobj: typing.BinaryIO) -> FileTypeMatch:
+    """Function that takes a file object that supports read() and seek() and returns a FileTypeMatch based on the
+    analysis of the contents of the file. This gives the file type, what detected it and the confidence.
+    The validators read from a HeaderBuffer, if fobj is not one then it is wrapped in one from the start of the file.
     On success fobj will be at the start of file. On failure fobj will be in an indeterminate state.
     """
-    result = ''
-    for fn, typ in FUNCTION_ID_MAP:
-        if fn(fobj) == 0:
-            result = typ
-            break
+    if isinstance(fobj, HeaderBuffer):
+        header = fobj
+    else:
+        fobj.seek(0)
+        header = HeaderBuffer(fobj)
+    result = match_signatures(header)
     fobj.seek(0)
     return result
 
 
+def binary_file_type(fobj: typing.BinaryIO) -> str:
+    """Function that takes a file object that supports read() and seek() and returns a file type based on the
+    analysis of the contents of the file. See binary_file_type_match().
+    """
+    return binary_file_type_match(fobj).bin_type
+
+
 def binary_file_type_from_path(path: str) -> str:
     with open(path, 'rb') as file_object:
         return binary_file_type(file_object)
 
 
+def binary_file_type_and_bytes(fobj: typing.BinaryIO, num_bytes: int) -> typing.Tuple[str, bytes]:
+    """Returns the binary file type and the initial num_bytes of a file object with a single pass over the header
+    of the file. fobj is read sequentially from its current position and need not support seek()."""
+    header = HeaderBuffer(fobj)
+    result = binary_file_type(header)
+    return result, header.read(num_bytes)
+
+
 def xxd(by: bytes) -> str:
     """Returns an xxd style string of the bytes. For example:
     0084 8000 8400 2647 3546 3239 2020 2020 2020 ......&G5F29     """
@@ -320,8 +320,8 @@ class APIHeaderBase(object):
     def _plotCONS(self, xS, st, theValStr):
         """Print a Static() object with an value as a string e.g. EngVal.pStr()."""
         # No Rectangle
-        myTAttr = st.tAttr
-        myTAttr.update({'font-weight' : "bold",})
+        # Copy so that the bold does not leak into the shared Static attributes
+        myTAttr = dict(st.tAttr, **{'font-weight' : "bold",})
         with SVGWriter.SVGText(
                 xS,
                 self._pt(st.x + 0.05 + st.xMnem, st.y + st.d * 3 / 4),
@@ -236,6 +236,8 @@ import math
 #import numbers
 import collections
 
+import numpy
+
 from TotalDepth.LIS import ExceptionTotalDepthLIS
 from TotalDepth.LIS.core import LogiRec
 from TotalDepth.LIS.core import Mnem
@@ -470,6 +472,12 @@ class LineTransBase(object):
         TODO: Benchmark this, it could be slow."""
         raise NotImplementedError()
     
+    def wrapPosArray(self, valS):
+        """The vectorised equivalent of wrapPos(). For a numpy array of values
+        returns a pair of numpy arrays (wrap, pos) of floats. Where a value can
+        not be plotted the wrap is NaN."""
+        raise NotImplementedError()
+    
     def offScale(self, w):
         """Returns 0 if wrap integer is on scale depending on the backup setting.
         Returns -1 if off scale low, +1 if off scale high."""
@@ -479,6 +487,17 @@ class LineTransBase(object):
             return 1
         return 0
 
+    def offScaleArray(self, wrapS):
+        """The vectorised equivalent of offScale(). For a numpy array of wrap
+        values returns a numpy array of bool that is True where the wrap is off
+        scale either low or high."""
+        retVal = numpy.zeros(wrapS.shape, dtype=bool)
+        if self._bu[0]:
+            retVal |= (wrapS < 0) & (wrapS < self._bu[0])
+        if self._bu[1]:
+            retVal |= (wrapS > 0) & (wrapS > self._bu[1])
+        return retVal
+
     def isOffScaleLeft(self, w):
         """True is wrap integer is off-scale low according to the backup setting."""
         return self.offScale(w) == -1
@@ -516,6 +535,17 @@ class LineTransLin(LineTransBase):
         f = self._lP + (p - w) * self._pWidth
         return w, f
 
+    def wrapPosArray(self, valS):
+        """The vectorised equivalent of wrapPos(). For a numpy array of values
+        returns a pair of numpy arrays (wrap, pos) of floats. Where a value can
+        not be plotted (for example it is infinite) the wrap is NaN."""
+        with numpy.errstate(all='ignore'):
+            p = (valS - self._lL) / self._den
+            w = numpy.floor(p)
+            f = self._lP + (p - w) * self._pWidth
+        w[~numpy.isfinite(w)] = numpy.nan
+        return w, f
+
 class LineTransLog10(LineTransBase):
     """Logrithmic grid."""
     def __init__(self, leftP, rightP, leftL, rightR, backup=BACKUP_ALL):
@@ -549,6 +579,17 @@ class LineTransLog10(LineTransBase):
         w = math.floor(p)
         r = self._lP + (p - w) * self._pWidth
         return w, r
+
+    def wrapPosArray(self, valS):
+        """The vectorised equivalent of wrapPos(). For a numpy array of values
+        returns a pair of numpy arrays (wrap, pos) of floats. Where a value can
+        not be plotted (for example it is zero or -ve) the wrap is NaN."""
+        with numpy.errstate(all='ignore'):
+            p = numpy.log10(valS / self._lL) / self._den
+            w = numpy.floor(p)
+            r = self._lP + (p - w) * self._pWidth
+        w[~(valS > 0.0) | ~numpy.isfinite(w)] = numpy.nan
+        return w, r
 #===============================
 # Section: Line transformations.
 #===============================
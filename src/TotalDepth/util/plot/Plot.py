@@ -36,7 +36,7 @@ User says 'plot this data set with this configuration to this output device'.
 Lacunae
 =======
 Area plotting.
-Caching (e.g. SVG fragments - is this worth it?)
+Caching SVG fragments other than the X axis grid.
     
 PlotConfig
 ==========
@@ -118,7 +118,9 @@ import os
 import logging
 import collections
 import pprint
-#import math
+import math
+
+import numpy
 #from optparse import OptionParser
 
 from TotalDepth.LIS import ExceptionTotalDepthLIS
@@ -145,6 +147,12 @@ COMMENTS_IN_SVG_SECTION_WIDTH = 40
 #: Map of section level to comment padding character
 COMMENTS_IN_SVG_SECTION_LEVEL_TUPLE = ('=', '.', '^',)
 
+#: Maximum number of rendered X axis grids in _xGridCache, it is cleared when full.
+XGRID_CACHE_MAX_ENTRIES = 64
+#: Rendered X axis grid markup shared by all Plot objects in this process.
+#: Map of {key : markup, ...} see Plot._retXGridKey().
+_xGridCache = {}
+
 # TODO: Should remove LIS from name as plotting now also covers LAS files
 class ExceptionTotalDepthLISPlot(ExceptionTotalDepthLIS):
     """Exception for plotting."""
@@ -154,8 +162,39 @@ class ExceptionTotalDepthPlotRoll(ExceptionTotalDepthLISPlot):
     """Exception for plotting."""
     pass
 
+def retDecimatedPoints(theXS, theYS, theTolerance):
+    """Returns a numpy array of the indexes of the points to keep when
+    decimating a polyline given as numpy arrays of view box coordinates theXS,
+    theYS where Y is monotonic.
+    
+    The Y axis is divided into buckets of depth theTolerance and, for each run of
+    points in the same bucket, the first, last, minimum X and maximum X points
+    are kept. Thus a spike, however narrow, is always plotted to its full
+    extent. The indexes are in ascending order so the polyline is traced in its
+    original order. theTolerance is in view box units so a value of 1.0 is
+    about one pixel on a 96 DPI display whatever the X axis scale."""
+    numPts = len(theYS)
+    if theTolerance <= 0 or numPts <= 4:
+        return numpy.arange(numPts)
+    myBucketS = numpy.floor((theYS - theYS[0]) / theTolerance)
+    myIsStart = numpy.empty(numPts, dtype=bool)
+    myIsStart[0] = True
+    myIsStart[1:] = myBucketS[1:] != myBucketS[:-1]
+    myStartS = numpy.flatnonzero(myIsStart)
+    # Segment number for every point
+    mySegS = numpy.cumsum(myIsStart) - 1
+    myKeep = myIsStart.copy()
+    myKeep[myStartS[1:] - 1] = True
+    myKeep[-1] = True
+    for myExtS in (numpy.minimum.reduceat(theXS, myStartS), numpy.maximum.reduceat(theXS, myStartS)):
+        # First point in each segment that is at the extreme
+        myCandS = numpy.flatnonzero(theXS == myExtS[mySegS])
+        myKeep[myCandS[numpy.unique(mySegS[myCandS], return_index=True)[1]]] = True
+    return numpy.flatnonzero(myKeep)
+
 # Describes a curve plots data, fn is the track transfer function, buffer is a
-# list of Coord.Pt() and prevWrap is the previous wrap value.
+# list of strings of formatted points (see SVGWriter.pointsToTxt()) and
+# prevWrap is the previous wrap value.
 class CurvePlotData(object):
     def __init__(self, theId, theFn):
         self._id = theId
@@ -507,6 +546,28 @@ class PlotRoll(object):
             self.xDepth(theX).scale(PlotConstants.VIEW_BOX_UNITS_PER_PLOT_UNITS)
         )
     
+    def xRange(self, theXUnits):
+        """Returns a pair of numbers (lower, upper) that are the X axis range
+        of the plot in theXUnits."""
+        myXStart = self._xStart.getInUnits(theXUnits)
+        myXStop = self._xStop.getInUnits(theXUnits)
+        return min(myXStart, myXStop), max(myXStart, myXStop)
+    
+    def polyLinePtArrays(self, theXS, theXUnits, theTracPosS):
+        """The vectorised equivalent of polyLinePt(). theXS is a numpy array of
+        X axis values in theXUnits and theTracPosS is a numpy array of values in
+        DEFAULT_PLOT_UNITS, for example given by a tracValueFunction.
+        Returns a pair of numpy arrays (x, y) of numbers scaled by
+        VIEW_BOX_UNITS_PER_PLOT_UNITS."""
+        tracDim = self._rollMargin.left
+        xS = tracDim.value + Coord.convert(theTracPosS, PlotConstants.DEFAULT_PLOT_UNITS, tracDim.units)
+        xPropS = (theXS - self._xStart.getInUnits(theXUnits)) / self._xSpan.getInUnits(theXUnits)
+        if self._isUpPlot:
+            xPropS = 1.0 - xPropS
+        depthDim = self._rollMargin.top + self._headDepth + self._legendDepth
+        yS = depthDim.value + Coord.convert(self._plotDepth.value * xPropS, self._plotDepth.units, depthDim.units)
+        return xS * PlotConstants.VIEW_BOX_UNITS_PER_PLOT_UNITS, yS * PlotConstants.VIEW_BOX_UNITS_PER_PLOT_UNITS
+    
     def retMainPaneStart(self):
         """Returns the start Coord.Pt() for the pane where the main log goes.
         For and upPlot this will be pane-bottom-left, for a downPlot this will
@@ -556,7 +617,7 @@ class Plot(object):
     #: See the source of ``_filterCrossLineList()`` for an explanation.
     MAX_BACKUP_TRACK_CROSSING_LINES = 4
     
-    def __init__(self, theFilmCfg, thePresCfg, theScale=0):
+    def __init__(self, theFilmCfg, thePresCfg, theScale=0, theDecimate=0.0):
         # A FILMCfg.FilmCfg() object
         self._filmCfg = theFilmCfg
         # A PRESCfg.PresCfg() object
@@ -570,6 +631,16 @@ class Plot(object):
         if self._scale < 0:
             raise ExceptionTotalDepthLISPlot(
                 'Plot.__init__(): Scale override {:g} is < 0'.format(self._scale))
+        # Curve decimation tolerance in view box units, zero is no decimation.
+        # See retDecimatedPoints().
+        self._decimate = theDecimate
+        if not isinstance(theDecimate, (int, float)):
+            raise ExceptionTotalDepthLISPlot(
+                'Plot.__init__(): Decimation tolerance of type {!r:s} is not'
+                ' a number.'.format(type(self._decimate)))
+        if self._decimate < 0:
+            raise ExceptionTotalDepthLISPlot(
+                'Plot.__init__(): Decimation tolerance {:g} is < 0'.format(self._decimate))
                 
     def xScale(self, theFilmID):
         """Returns the X axis scale as a number given the FILM ID."""
@@ -578,6 +649,34 @@ class Plot(object):
             return self._scale
         return self._filmCfg[theFilmID].xScale
     
+    def genTileXRanges(self, theFilmID, theXStart, theXStop, theTileDepth):
+        """Generates (xStart, xStop) pairs of EngVal that split the X axis range
+        theXStart to theXStop into tiles where the main pane of each tile is
+        theTileDepth, a Coord.Dim(), at the scale for theFilmID. The last tile
+        may be shorter. The EngVal units are those of theXStart. Each tile can
+        be plotted independently with plotLogPassLIS() or plotLogPassLAS()."""
+        if theTileDepth.value <= 0:
+            raise ExceptionTotalDepthLISPlot(
+                'Plot.genTileXRanges(): Tile depth {!r:s} is <= 0'.format(theTileDepth))
+        myUnits = theXStart.uom
+        myTileSpan = EngVal.EngVal(
+            theTileDepth.convert(PlotConstants.DEFAULT_PLOT_UNITS).value * self.xScale(theFilmID),
+            PlotConstants.DEFAULT_PLOT_LIS_UNITS,
+        ).getInUnits(myUnits)
+        myXStart = theXStart.value
+        myXStop = theXStop.getInUnits(myUnits)
+        # Number of tiles, a sliver of less than one part in a million of
+        # a tile is ignored.
+        numTiles = max(1, math.ceil(abs(myXStop - myXStart) / myTileSpan - 1e-6))
+        if myXStop < myXStart:
+            myTileSpan = -myTileSpan
+        for t in range(numTiles):
+            if t == numTiles - 1:
+                myTileStop = myXStop
+            else:
+                myTileStop = myXStart + (t + 1) * myTileSpan
+            yield EngVal.EngVal(myXStart + t * myTileSpan, myUnits), EngVal.EngVal(myTileStop, myUnits)
+    
     def _openOutFile(self, theFp):
         """Returns a writable file-like object. This creates the enclosing
         directory if necessary."""
@@ -645,6 +744,7 @@ class Plot(object):
                     title="",
                     lrCONS=None,    # LIS specific
                     timerS=None,
+                    loadFrameSet=True,
                 ):
         """Plot a part of a LogPass and returns a list of Channel IDs plotted.
                 
@@ -678,6 +778,12 @@ class Plot(object):
         *timerS*
             Optional ``ExecTimer.ExecTimerList`` for performance measurement.
         
+        *loadFrameSet*
+            If False the LogPass FrameSet has already been loaded from
+            *theXStart* to *theXStop* with at least the channels given by
+            ``retFrameSetChIDsLIS()``, for example one FrameSet is shared by
+            the plots of several films.
+        
         TODO: If title is empty do not use the space ``self.LEGEND_DEPTH_SPARE``
         """
         retVal = (None, None)
@@ -691,8 +797,11 @@ class Plot(object):
         # Get the PhysFilmCfg that corresponds to theFilmId, do this first as
         # may raise KeyError.
         myPhsFiCf = self._filmCfg[theFilmId]
-        myLisSize = self._loadFrameSet(theLisFile, theLogPass, theXStart,
-                                       theXStop, theFilmId, frameStep)
+        if loadFrameSet:
+            myLisSize = self._loadFrameSet(theLisFile, theLogPass, theXStart,
+                                           theXStop, theFilmId, frameStep)
+        else:
+            myLisSize = theLogPass.numBytes
         logging.info(
             'Plot.plotLogPassLIS(): LogPass now:\n{:s}'.format(
                 theLogPass.longStr()
@@ -936,7 +1045,7 @@ class Plot(object):
             self._incTimers(timerS, 0, 'Plotting curves')
             logging.info('Plot.plotLogPassLAS(): Plotting Curves...')
             self._insertCommentInSVG(xS, ' Plot Curves START ', 0)
-            retVal = self._plotCurves(theFilmId, theLasFile, myPlRo, xS)
+            retVal = self._plotCurves(theFilmId, theLasFile, myPlRo, xS, clipX=True)
             self._insertCommentInSVG(xS, ' Plot Curves END ', 0)
             # End timer
             self._incTimers(timerS, theLasFile.numDataPoints() * 6, None)
@@ -968,6 +1077,11 @@ class Plot(object):
 #        # Get the list of output curves from the presentation table
 #        return self._presCfg.outpCurveIDs(myPhsFiCf.name, theOutpId)
         
+    def retFrameSetChIDsLIS(self, theLogPass, theFilmId):
+        """Returns a list of the output mnem in theLogPass that are plotted on
+        theFilmId i.e. the channels that the LogPass FrameSet needs."""
+        return [m for m in self._retOutputChIDs(theFilmId) if theLogPass.hasOutpMnem(m)]
+    
     def _loadFrameSet(self, theLisFile, theLogPass, theXStart, theXStop, theFilmId, frameStep=1):
         """Loads the LogPass FrameSet with the output channels that are needed for the plot.
         theLisFile is a File object, theLogPass is a LogPass, theXStart/Stop are
@@ -975,7 +1089,7 @@ class Plot(object):
         Returns number of LIS bytes read."""
         # Load the FrameSet
         logging.info('Plot._loadFrameSet(): Loading LogPass FrameSet...')
-        myChIdS = [m for m in self._retOutputChIDs(theFilmId) if theLogPass.hasOutpMnem(m)]
+        myChIdS = self.retFrameSetChIDsLIS(theLogPass, theFilmId)
         logging.info('Plot._loadFrameSet(): X axis from="{:s}" to="{:s}" frame step={:d}. Channel IDs[{:d}]:\n{:s}'.format(
                 str(theXStart),
                 str(theXStop),
@@ -984,7 +1098,7 @@ class Plot(object):
                 pprint.pformat(list(myChIdS), indent=4, width=80),
             )
         )
-        theLogPass.setFrameSetChX(theLisFile, myChIdS, theXStart, theXStop, frStep=frameStep)
+        theLogPass.setFrameSetX(theLisFile, theXStart, theXStop, myChIdS, frStep=frameStep)
         logging.info('Plot._loadFrameSet(): Loading LogPass FrameSet DONE...')
         return theLogPass.numBytes
     
@@ -992,34 +1106,77 @@ class Plot(object):
     # Section: Plotting the X axis grid and text.
     #============================================
     def _plotXGrid(self, thePhsFiCf, xStart, xStop, xS, refPt):
-        myXg = XGrid.XGrid(self.xScale(thePhsFiCf.name))#thePhsFiCf.xScale)
-        self._plotXGridLines(thePhsFiCf, myXg, xStart, xStop, xS, refPt)
-        self._plotXGridAlpha(thePhsFiCf, myXg, xStart, xStop, xS, refPt)
+        """Plots the X axis grid lines and text to the SVG stream xS.
+        The rendered markup is cached in _xGridCache as it is the same for
+        every film with the same scale, X range and track layout."""
+        myScale = self.xScale(thePhsFiCf.name)#thePhsFiCf.xScale)
+        myKey = self._retXGridKey(myScale, thePhsFiCf, xStart, xStop, xS, refPt)
+        try:
+            myMarkup = _xGridCache[myKey]
+        except KeyError:
+            myXg = XGrid.XGrid(myScale)
+            myElemS = self._retXGridLineElemS(thePhsFiCf, myXg, xStart, xStop, refPt)
+            myElemS.extend(self._retXGridAlphaElemS(thePhsFiCf, myXg, xStart, xStop, refPt))
+            myMarkup = xS.renderElements(myElemS)
+            if myKey is not None:
+                if len(_xGridCache) >= XGRID_CACHE_MAX_ENTRIES:
+                    _xGridCache.clear()
+                _xGridCache[myKey] = myMarkup
+        xS.writeRendered(myMarkup)
+    
+    def _retXGridKey(self, theScale, thePhsFiCf, xStart, xStop, xS, refPt):
+        """Returns a hashable key that identifies the X axis grid markup or
+        None if it is not to be cached."""
+        if xStart.uom != xStop.uom:
+            # XGrid.genXAxisTextRange() converts xStop
+            return None
+        myTrackS = tuple(
+            (t.left.value, t.left.units, t.right.value, t.right.units, t.plotXLines, t.plotXAlpha) \
+                for t in thePhsFiCf.genTracks()
+        )
+        return (
+            theScale,
+            xStart.value, xStart.uom,
+            xStop.value, xStop.uom,
+            myTrackS,
+            refPt.x.value, refPt.x.units, refPt.y.value, refPt.y.units,
+            xS.renderContext,
+        )
         
-    def _plotXGridLines(self, thePhsFiCf, theXg, xStart, xStop, xS, refPt):
-        """Plot an XCrid.XGrid() object to the SVG stream xS and start point
-        startPt (Coord.Pt() object), from EngVal xStart to EngVal xStop."""
+    def _retXGridLineElemS(self, thePhsFiCf, theXg, xStart, xStop, refPt):
+        """Returns a list of SVG line elements for XmlStream.renderElements()
+        for an XCrid.XGrid() object from the start point refPt (Coord.Pt()
+        object), from EngVal xStart to EngVal xStop."""
         # Plot depth lines
         #myXInc = (xStart < xStop)
 #        for t in thePhsFiCf.genTracks():
-#            print('TRACE: _plotXGridLines():', t, 'Grid:', t.hasGrid)
+#            print('TRACE: _retXGridLineElemS():', t, 'Grid:', t.hasGrid)
+        retElemS = []
         for pos, stroke in theXg.genXAxisRange(xStart, xStop):
             for t in thePhsFiCf.genTracks():
                 if t.plotXLines:
-                    with SVGWriter.SVGLine(
-                            xS,
-                            Coord.Pt(t.left+refPt.x, refPt.y+pos),
-                            Coord.Pt(t.right+refPt.x, refPt.y+pos),
-                            attrs=Stroke.retSVGAttrsFromStroke(stroke)
-                        ):
-                        pass
+                    retElemS.append(
+                        (
+                            'line',
+                            SVGWriter.retLineAttrs(
+                                Coord.Pt(t.left+refPt.x, refPt.y+pos),
+                                Coord.Pt(t.right+refPt.x, refPt.y+pos),
+                                attrs=Stroke.retSVGAttrsFromStroke(stroke)
+                            ),
+                            None,
+                        )
+                    )
+        return retElemS
 
-    def _plotXGridAlpha(self, thePhsFiCf, theXg, xStart, xStop, xS, refPt):
+    def _retXGridAlphaElemS(self, thePhsFiCf, theXg, xStart, xStop, refPt):
+        """Returns a list of SVG text elements for XmlStream.renderElements()
+        of the X axis values."""
         # Plot depth text
         textAttrs = {
             'text-anchor'       : 'end',
             'dominant-baseline' : 'middle',
         }
+        retElemS = []
         for pos, val in theXg.genXAxisTextRange(xStart, xStop):
             for t in thePhsFiCf.genTracks():
                 if t.plotXAlpha:
@@ -1027,8 +1184,10 @@ class Plot(object):
                         t.right+refPt.x-Coord.Dim(0.05, 'in'),
                         refPt.y+pos+Coord.Dim(0.05, 'in'),
                     )
-                    with SVGWriter.SVGText(xS, myPt, 'Courier', 12, textAttrs):
-                        xS.characters(str(val))
+                    retElemS.append(
+                        ('text', SVGWriter.retTextAttrs(myPt, 'Courier', 12, textAttrs), str(val))
+                    )
+        return retElemS
     #============================================
     # End: Plotting the X axis grid and text.
     #============================================
@@ -1285,12 +1444,13 @@ class Plot(object):
     #==============================
     # Section: Plotting the curves.
     #==============================
-    def _plotCurves(self, theFilmID, theFrameHolder, thePlRo, xS):
+    def _plotCurves(self, theFilmID, theFrameHolder, thePlRo, xS, clipX=False):
         """Plots curves from a populated log pass to a SVG stream.
         theFilmID - An ID to look up in in the presentation table to see what outputs are to be plotted.
         theFrameHolder - A LogPass or LasFile object containing the frame data, expected to be pre-loaded with channels.
         thePlRo - A plot roll (i.e. canvas) describing the layout of the plot.
         xS - The SVG stream to write to.
+        clipX - If True only frames within the X axis range of thePlRo are plotted.
         """
         curveS = []
         numPoints = 0
@@ -1299,7 +1459,7 @@ class Plot(object):
             self._insertCommentInSVG(xS, ' Output {:s} START '.format(anO.pStr()), 1)
             if self._presCfg.usesOutpChannel(theFilmID, anO):
                 if theFrameHolder.hasOutpMnem(anO):
-                    c, n = self._plotSingleOutput(theFilmID, anO, theFrameHolder, thePlRo, xS)
+                    c, n = self._plotSingleOutput(theFilmID, anO, theFrameHolder, thePlRo, xS, clipX)
                     curveS += c
                     numPoints += n
                 else:
@@ -1309,78 +1469,141 @@ class Plot(object):
             self._insertCommentInSVG(xS, ' Output {:s} END '.format(anO.pStr()), 1)
         return curveS, numPoints
     
-    def _plotSingleOutput(self, theFilmID, theOutpID, theFrameHolder, thePlRo, xS):
+    def _plotSingleOutput(self, theFilmID, theOutpID, theFrameHolder, thePlRo, xS, clipX=False):
         """Takes a single OUTP and plots all curves that use it. Returns the curve IDs.
         theFilmID - The ID of self._filmCfg for this plot.
         theOutpID - The OUTP ID in the DFSR/PRES table, this must be in the LogPass and the PRES table.
         theFrameHolder - The LogPass of LasFile object with the channel data.
         thePlRo - The PlotRoll output configuration.
         xS - The SVG stream to write to. 
+        clipX - If True only frames within the X axis range of thePlRo are plotted.
         """
         logging.info('Plot._plotSingleOutput(theFilmId={!r:s} theOutpId={!r:s}'.format(theFilmID, theOutpID))
         assert(self._presCfg.usesOutpChannel(theFilmID, theOutpID))
         assert(theFrameHolder.hasOutpMnem(theOutpID))
-        # Given an output ID select all curve IDs and iterate through their
-        # X/v points and scale them accordingly; X by the X axis scale and v by
-        # the tracValueFunction() and the track dimensions. Finally assemble
-        # into a SVG polyline in user units and send to the XML stream.
+        # Given an output ID select all curve IDs and transform their X/v points
+        # as arrays; X by the X axis scale and v by the tracValueFunction() and
+        # the track dimensions. The polylines are broken by null values and
+        # changes of wrap, the latter are handled point by point by
+        # _interpolateBackup(). Finally assemble into SVG polylines in user
+        # units and send to the XML stream in the same order as plotting point
+        # by point would.
         #
         myCurvIdS = self._presCfg.outpCurveIDs(theFilmID, theOutpID)
         myCurvPlotS = [CurvePlotData(c, self._presCfg[c].tracValueFunction(theFilmID)) for c in myCurvIdS]
         logging.debug('Plot._plotSingleOutput: myCurvPlotS: {!r:s}'.format([str(c) for c in myCurvPlotS]))
-        xPrev = None
-        ptPrevS = [None] * len(myCurvIdS)
-        numPoints = 0
         numMathErrors = 0
         if COMMENTS_IN_SVG_TRACE: xS.comment(' Plot._plotSingleOutput(theFilmId={!r:s} theOutpId={!r:s} '.format(theFilmID, theOutpID))
-        for x, v in theFrameHolder.genOutpPoints(theOutpID):
-            # If v is a null or absent value then flush the buffer and start again
-            if v == theFrameHolder.nullValue:
-                for cuPlot in myCurvPlotS:
-                    self._flushPolyLineBuffer(cuPlot, xS)
-                continue
-            for cuIdx in range(len(myCurvIdS)):
-                numPoints += 1
-                # myCuPlot is a CurvePlotData object
-                myCuPlot = myCurvPlotS[cuIdx]
-                # Scale v by the track function
-                try:
-                    wr, pt = myCuPlot.fn.wrapPos(v)
-                except PRESCfg.ExceptionLineTransBaseMath:
-                    numMathErrors += 1
-                else:
-                    # print('Plot._plotSingleOutput(): x={:8.3f} v={:8.3f} wr={:4s} pt={:8.3f}'.format(x, v, str(wr), pt))
-                    if wr != myCuPlot.prevWrap and xPrev is not None and ptPrevS[cuIdx] is not None:
-                        # Interpolate wrapping
-                        self._interpolateBackup(
-                            myCuPlot,
-                            xS,
-                            thePlRo,
-                            # theTwd and theLtb
-                            self._presCfg[myCuPlot.id].tracWidthData(theFilmID),
-                            self._presCfg[myCuPlot.id].tracValueFunction(theFilmID),
-                            xPrev,
-                            x,
-                            pt,
-                            myCuPlot.prevWrap,
-                            wr,
-                            theFrameHolder.xAxisUnits,
-                        )
-                    if not myCuPlot.fn.offScale(wr):
-                        # Add to the buffer
-                        myCuPlot.buffer.append(thePlRo.polyLinePt(EngVal.EngVal(x, theFrameHolder.xAxisUnits), pt))
-                    myCuPlot.prevWrap = wr
-                    ptPrevS[cuIdx] = pt
-            xPrev = x
+        myXS, myVS = theFrameHolder.outpPointArrays(theOutpID)
+        myXS = numpy.asarray(myXS, dtype=numpy.float64)
+        myVS = numpy.asarray(myVS, dtype=numpy.float64)
+        if clipX:
+            # Only plot frames within the X range of the plot roll, for example
+            # a LAS file plotted as tiles has all frames loaded.
+            myXLo, myXHi = thePlRo.xRange(theFrameHolder.xAxisUnits)
+            myXTol = (myXHi - myXLo) * 1e-9
+            myInRange = (myXS >= myXLo - myXTol) & (myXS <= myXHi + myXTol)
+            myXS = myXS[myInRange]
+            myVS = myVS[myInRange]
+        if theFrameHolder.nullValue is None:
+            myIsNull = numpy.zeros(myVS.shape, dtype=bool)
+        else:
+            myIsNull = myVS == theFrameHolder.nullValue
+        # Indexes of the frames that are not null
+        myFrIdxS = numpy.flatnonzero(~myIsNull)
+        numPoints = len(myFrIdxS) * len(myCurvIdS)
+        # A null value flushes every buffer but only the first of a run of nulls
+        # that follows a value matters. Events are (frame, curve, point) where
+        # the point is -1 for a flush or the index of a point that is a change
+        # of wrap.
+        myEventS = [
+            (f, c, -1) for f in (numpy.flatnonzero(myIsNull[1:] & ~myIsNull[:-1]) + 1).tolist()
+                for c in range(len(myCurvPlotS))
+        ]
+        myXUnits = theFrameHolder.xAxisUnits
+        myCurvArrayS = []
+        for cuIdx, myCuPlot in enumerate(myCurvPlotS):
+            # Scale v by the track function
+            myWrapS, myPosS = myCuPlot.fn.wrapPosArray(myVS[myFrIdxS])
+            myIsValid = ~numpy.isnan(myWrapS)
+            numMathErrors += len(myIsValid) - int(numpy.count_nonzero(myIsValid))
+            # Index into myFrIdxS of each plottable point
+            myPtIdxS = numpy.flatnonzero(myIsValid)
+            myWrapS = myWrapS[myPtIdxS]
+            myPosS = myPosS[myPtIdxS]
+            myPtXS, myPtYS = thePlRo.polyLinePtArrays(
+                myXS[myFrIdxS[myPtIdxS]], myXUnits, myPosS
+            )
+            myCurvArrayS.append(
+                (
+                    myPtIdxS, myWrapS, myPosS, ~myCuPlot.fn.offScaleArray(myWrapS), myPtXS, myPtYS,
+                    self._presCfg[myCuPlot.id].tracWidthData(theFilmID),
+                )
+            )
+            myEventS.extend(
+                (int(myFrIdxS[myPtIdxS[p]]), cuIdx, p) for p in (numpy.flatnonzero(myWrapS[1:] != myWrapS[:-1]) + 1).tolist()
+            )
+        myEventS.sort()
+        # Index of the next point to add to the buffer for each curve
+        myNextPtS = [0] * len(myCurvPlotS)
+        for fr, cuIdx, p in myEventS:
+            myCuPlot = myCurvPlotS[cuIdx]
+            myPtIdxS, myWrapS, myPosS, myOnScale, myPtXS, myPtYS, myTwd = myCurvArrayS[cuIdx]
+            if p == -1:
+                p = numpy.searchsorted(myFrIdxS[myPtIdxS], fr)
+                self._addPolyLineBufferPts(myCuPlot, myOnScale, myPtXS, myPtYS, myNextPtS[cuIdx], p)
+                self._flushPolyLineBuffer(myCuPlot, xS)
+            else:
+                self._addPolyLineBufferPts(myCuPlot, myOnScale, myPtXS, myPtYS, myNextPtS[cuIdx], p)
+                myCuPlot.prevWrap = int(myWrapS[p - 1])
+                # Interpolate wrapping from the previous non-null frame
+                self._interpolateBackup(
+                    myCuPlot,
+                    xS,
+                    thePlRo,
+                    # theTwd and theLtb
+                    myTwd,
+                    myCuPlot.fn,
+                    float(myXS[myFrIdxS[myPtIdxS[p] - 1]]),
+                    float(myXS[fr]),
+                    float(myPosS[p]),
+                    myCuPlot.prevWrap,
+                    int(myWrapS[p]),
+                    myXUnits,
+                )
+            myNextPtS[cuIdx] = p
         logging.info('DONE: Plot._plotSingleOutput(theFilmId={!r:s} theOutpId={!r:s}'.format(theFilmID, theOutpID))
         if COMMENTS_IN_SVG_TRACE: xS.comment(' DONE: Plot._plotSingleOutput(theFilmId={!r:s} theOutpId={!r:s} '.format(theFilmID, theOutpID))
-        for cuPlot in myCurvPlotS:
+        for cuIdx, cuPlot in enumerate(myCurvPlotS):
+            myPtIdxS, myWrapS, myPosS, myOnScale, myPtXS, myPtYS, myTwd = myCurvArrayS[cuIdx]
+            self._addPolyLineBufferPts(cuPlot, myOnScale, myPtXS, myPtYS, myNextPtS[cuIdx], len(myPtXS))
+            if len(myWrapS) > 0:
+                cuPlot.prevWrap = int(myWrapS[-1])
             self._flushPolyLineBuffer(cuPlot, xS)
         if numMathErrors > 0:
             logging.warning('Plot._plotSingleOutput(): {:d} maths errors plotting output {!r:s}'.format(numMathErrors,
                                                                                                         theOutpID))
         return myCurvIdS, numPoints
     
+    def _addPolyLineBufferPts(self, theCurvPlotData, theOnScale, theXS, theYS, theStart, theStop):
+        """Adds the on scale points from the arrays of view box coordinates
+        theXS, theYS in the range [theStart, theStop) to the buffer.
+        The points are decimated if self._decimate is non-zero."""
+        if theStop > theStart:
+            myOnScale = theOnScale[theStart:theStop]
+            if myOnScale.any():
+                myXS = theXS[theStart:theStop][myOnScale]
+                myYS = theYS[theStart:theStop][myOnScale]
+                if self._decimate > 0:
+                    myIdxS = retDecimatedPoints(myXS, myYS, self._decimate)
+                    myXS = myXS[myIdxS]
+                    myYS = myYS[myIdxS]
+                theCurvPlotData.buffer.append(SVGWriter.pointsToTxt(myXS, myYS))
+    
+    def _appendPolyLinePt(self, theCurvPlotData, thePt):
+        """Appends a single Coord.Pt() to the buffer."""
+        theCurvPlotData.buffer.append(SVGWriter.DEFAULT_VALUE_FORMAT_POINT_PAIR.format(thePt.x.value, thePt.y.value))
+    
     def _flushPolyLineBuffer(self, theCurvPlotData, xS):
         """Flush buffer and plot the points."""
         if len(theCurvPlotData.buffer) > 0:
@@ -1389,7 +1612,7 @@ class Plot(object):
             myAttrs['fill'] = "none"
             with SVGWriter.SVGPolyline(
                     xS,
-                    theCurvPlotData.buffer,
+                    ' '.join(theCurvPlotData.buffer),
                     attrs=myAttrs):
                 pass
             # Now flush the buffer
@@ -1436,7 +1659,7 @@ class Plot(object):
         # End existing polyline
         if polyEnd is not None:
             if COMMENTS_IN_SVG_TRACE: xS.comment(' Plot._interpolateBackup() appending as polyEnd is not None {:s}'.format(thePlRo.polyLinePt(polyEnd[0], polyEnd[1].value)))
-            theCuPlot.buffer.append(thePlRo.polyLinePt(EngVal.EngVal(polyEnd[0], theXUnits), polyEnd[1].value))
+            self._appendPolyLinePt(theCuPlot, thePlRo.polyLinePt(EngVal.EngVal(polyEnd[0], theXUnits), polyEnd[1].value))
         # Flush buffer
         self._flushPolyLineBuffer(theCuPlot, xS)
         if COMMENTS_IN_SVG_TRACE: xS.comment(' Plot.Plot._interpolateBackup() flushed polyline at wrap change ')
@@ -1446,19 +1669,19 @@ class Plot(object):
         for c in range(0, len(wrapLines), 2):
             # Write a line from [c] to [c+1]
             if COMMENTS_IN_SVG_TRACE: xS.comment(' Plot._interpolateBackup() appending cross line[0] {:s}'.format(thePlRo.polyLinePt(wrapLines[c][0], wrapLines[c][1].value)))
-            theCuPlot.buffer.append(thePlRo.polyLinePt(EngVal.EngVal(wrapLines[c][0], theXUnits), wrapLines[c][1].value))
+            self._appendPolyLinePt(theCuPlot, thePlRo.polyLinePt(EngVal.EngVal(wrapLines[c][0], theXUnits), wrapLines[c][1].value))
             if COMMENTS_IN_SVG_TRACE: xS.comment(' Plot._interpolateBackup() appending cross line[1] {:s}'.format(thePlRo.polyLinePt(wrapLines[c+1][0], wrapLines[c+1][1].value)))
-            theCuPlot.buffer.append(thePlRo.polyLinePt(EngVal.EngVal(wrapLines[c+1][0], theXUnits), wrapLines[c+1][1].value))
+            self._appendPolyLinePt(theCuPlot, thePlRo.polyLinePt(EngVal.EngVal(wrapLines[c+1][0], theXUnits), wrapLines[c+1][1].value))
             self._flushPolyLineBuffer(theCuPlot, xS)
             theCuPlot.buffer = []
         if COMMENTS_IN_SVG_TRACE: xS.comment(' Plot.Plot._interpolateBackup() have written crossing lines ')
         # Now start of next polyline
         if len(polyStart) > 0:
             if COMMENTS_IN_SVG_TRACE: xS.comment(' Plot._interpolateBackup() starting new line[0] {:s}'.format(thePlRo.polyLinePt(polyStart[0][0], polyStart[0][1].value)))
-            theCuPlot.buffer.append(thePlRo.polyLinePt(EngVal.EngVal(polyStart[0][0], theXUnits), polyStart[0][1].value))
+            self._appendPolyLinePt(theCuPlot, thePlRo.polyLinePt(EngVal.EngVal(polyStart[0][0], theXUnits), polyStart[0][1].value))
             # Note: polyStart[1][1] is a number not a Dim()
             if COMMENTS_IN_SVG_TRACE: xS.comment(' Plot._interpolateBackup() starting new line[1] {:s}'.format(thePlRo.polyLinePt(polyStart[1][0], polyStart[1][1])))
-            theCuPlot.buffer.append(thePlRo.polyLinePt(EngVal.EngVal(polyStart[1][0], theXUnits), polyStart[1][1]))
+            self._appendPolyLinePt(theCuPlot, thePlRo.polyLinePt(EngVal.EngVal(polyStart[1][0], theXUnits), polyStart[1][1]))
 
     def _retInterpolateWrapPoints(self, theTwd, theLtb, xPrev, xNow, pNow, wrapPrev, wrapNow):
         """This returns a set of generated points when a change in a 'wrap'
@@ -1616,14 +1839,14 @@ class Plot(object):
 
 class PlotReadLIS(Plot):
     """A subclass of Plot that is configured from FILM, PRES and (optionally) AREA, PIP Logical Records."""
-    def __init__(self, lrFILM, lrPRES, lrAREA=None, lrPIP=None, theScale=0):
+    def __init__(self, lrFILM, lrPRES, lrAREA=None, lrPIP=None, theScale=0, theDecimate=0.0):
         myFilmCfg = FILMCfg.FilmCfgLISRead(lrFILM)
         myPresCfg = PRESCfg.PresCfgLISRead(lrPRES, myFilmCfg)
-        super().__init__(myFilmCfg, myPresCfg, theScale)
+        super().__init__(myFilmCfg, myPresCfg, theScale, theDecimate)
 
 class PlotReadXML(Plot):
     """A subclass of Plot that is configured from XML file(s) using LgFormat."""
-    def __init__(self, uniqueId, theScale=0):
+    def __init__(self, uniqueId, theScale=0, theDecimate=0.0):
         myFilmCfg = FILMCfgXML.FilmCfgXMLRead()
         myPresCfg = PRESCfgXML.PresCfgXMLRead(myFilmCfg, uniqueId)
-        super().__init__(myFilmCfg, myPresCfg, theScale)
+        super().__init__(myFilmCfg, myPresCfg, theScale, theDecimate)
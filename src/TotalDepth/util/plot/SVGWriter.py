@@ -39,23 +39,65 @@ class ExceptionSVGWriter(ExceptionTotalDepthLIS):
 DEFAULT_VALUE_FORMAT = '{:.3f}'#'{:.5g}'
 #: Defaults format for points that are specified in pixels
 DEFAULT_VALUE_FORMAT_POINTS = '{:.1f}'#'{:.5g}'
+#: Defaults format for a pair of x,y values in a list of points
+DEFAULT_VALUE_FORMAT_POINT_PAIR = DEFAULT_VALUE_FORMAT_POINTS + ',' + DEFAULT_VALUE_FORMAT_POINTS
 
 def dimToTxt(theDim):
     """Converts a Coord.Dim() object to text for SVG units."""
 #    return '%s%s' % (theDim.value, theDim.units)
     return (DEFAULT_VALUE_FORMAT+'{:s}').format(theDim.value, theDim.units)
 
+def pointsToTxt(theXS, theYS):
+    """Converts two sequences of numbers (for example numpy arrays), that are
+    the x and y values in the User Coordinate System, into the text for a
+    points attribute."""
+    if hasattr(theXS, 'tolist'):
+        theXS = theXS.tolist()
+    if hasattr(theYS, 'tolist'):
+        theYS = theYS.tolist()
+    return ' '.join(map(DEFAULT_VALUE_FORMAT_POINT_PAIR.format, theXS, theYS))
+
+def retLineAttrs(ptFrom, ptTo, attrs=None):
+    """Returns the attributes of a SVG line between two Coord.Pt() objects.
+    This can be used with XmlWrite.XmlStream.renderElements()."""
+    _attrs = {
+                'x1'        : dimToTxt(ptFrom.x),
+                'y1'        : dimToTxt(ptFrom.y),
+                'x2'        : dimToTxt(ptTo.x),
+                'y2'        : dimToTxt(ptTo.y),
+            }
+    if attrs:
+        _attrs.update(attrs)
+    return _attrs
+
+def retTextAttrs(thePoint, theFont, theSize, attrs=None):
+    """Returns the attributes of SVG text at a Coord.Pt() with a font as a
+    string and size as an integer. If thePoint is None then no location will
+    be specified. This can be used with XmlWrite.XmlStream.renderElements()."""
+    _attrs = {
+            'font-family'   : theFont,
+            'font-size'     : '%s' % theSize,
+        }
+    if thePoint is not None:
+        _attrs['x'] = dimToTxt(thePoint.x)
+        _attrs['y'] = dimToTxt(thePoint.y)
+    if attrs:
+        _attrs.update(attrs)
+    return _attrs
+
 class SVGWriter(XmlWrite.XmlStream):
-    def __init__(self, theFile, theViewPort, rootAttrs=None):
+    def __init__(self, theFile, theViewPort, rootAttrs=None, theBufSize=XmlWrite.DEFAULT_BUFFER_SIZE):
         """Initialise the stream with a file and Coord.Box() object.
-        The view port units must be the same for width and depth."""
-        super(SVGWriter, self).__init__(theFile)
+        The view port units must be the same for width and depth.
+        The output is buffered in blocks of theBufSize characters, 0 for
+        no buffering."""
+        super(SVGWriter, self).__init__(theFile, theBufSize=theBufSize)
         self._viewPort = theViewPort
         self._rootAttrs = rootAttrs
             
     def __enter__(self):
         super(SVGWriter, self).__enter__()
-        self._file.write("""\n<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN" "http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd">""")
+        self._write("""\n<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN" "http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd">""")
         _attrs = {
             'xmlns'         : 'http://www.w3.org/2000/svg',
             'version'       : '1.1',
@@ -155,15 +197,7 @@ class SVGLine(XmlWrite.Element):
     """
     def __init__(self, theXmlStream, ptFrom, ptTo, attrs=None):
         """Initialise the line with a stream, and two Coord.Pt() objects."""
-        _attrs = {
-                    'x1'        : dimToTxt(ptFrom.x),
-                    'y1'        : dimToTxt(ptFrom.y),
-                    'x2'        : dimToTxt(ptTo.x),
-                    'y2'        : dimToTxt(ptTo.y),
-                }
-        if attrs:
-            _attrs.update(attrs)
-        super(SVGLine, self).__init__(theXmlStream, 'line', _attrs)
+        super(SVGLine, self).__init__(theXmlStream, 'line', retLineAttrs(ptFrom, ptTo, attrs))
     
 class SVGPointList(XmlWrite.Element):
     """An abstract class that takes a list of points, derived by polyline and polygon.
@@ -173,27 +207,26 @@ class SVGPointList(XmlWrite.Element):
     NOTE: The units of the points are ignored, it is up to the caller to convert
     them to the User Coordinate System.
     
-    TODO: Make the caller supply points as numbers not Coord.Pt as this may be faster??? e.g.::
-    
-        FMT_PAIR_STR = FMT_STR + ',' + FMT_STR
-        ' '.join([self.FMT_PAIR_STR.format(x, y) for x,y in pointS])
+    The points can also be given as a string already formatted by pointsToTxt(),
+    this is much faster for long lists of points.
     """
     def __init__(self, theXmlStream, name, pointS, attrs):
         """Initialise the element with a stream, a name, and a list of Coord.Pt() objects.
         NOTE: The units of the points are ignored, it is up to the caller to convert
         them to the User Coordinate System.
-        TODO: Make the caller supply points as numbers not Coord.Pt as this may be faster???
-        e.g.
-        FMT_PAIR_STR = FMT_STR + ',' + FMT_STR
-        ' '.join([self.FMT_PAIR_STR.format(x, y) for x,y in pointS])
+        If pointS is a string it is used as the points attribute as it is, see pointsToTxt().
         """
-        _attrs = {
-#            'points' : ' '.join(['%s,%s' % (p.x.value, p.y.value) for p in pointS])
-            'points' : ' '.join(
+        if isinstance(pointS, str):
+            myPoints = pointS
+        else:
+            myPoints = ' '.join(
                 [
-                    (DEFAULT_VALUE_FORMAT_POINTS+','+DEFAULT_VALUE_FORMAT_POINTS).format(p.x.value, p.y.value) for p in pointS
+                    DEFAULT_VALUE_FORMAT_POINT_PAIR.format(p.x.value, p.y.value) for p in pointS
                 ]
             )
+        _attrs = {
+#            'points' : ' '.join(['%s,%s' % (p.x.value, p.y.value) for p in pointS])
+            'points' : myPoints,
         }
         if attrs:
             _attrs.update(attrs)
@@ -238,14 +271,5 @@ class SVGText(XmlWrite.Element):
         as a string and size as an integer.
         If thePoint is None then no location will be specified (for example
         for use inside a <defs> element."""
-        _attrs = {
-                'font-family'   : theFont,
-                'font-size'     : '%s' % theSize,
-            }
-        if thePoint is not None:
-            _attrs['x'] = dimToTxt(thePoint.x)
-            _attrs['y'] = dimToTxt(thePoint.y)
-        if attrs:
-            _attrs.update(attrs)
-        super(SVGText, self).__init__(theXmlStream, 'text', _attrs)
+        super(SVGText, self).__init__(theXmlStream, 'text', retTextAttrs(thePoint, theFont, theSize, attrs))
 
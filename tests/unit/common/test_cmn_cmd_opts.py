@@ -24,6 +24,10 @@ Created on Feb 13, 2012
 @author: paulross
 """
 
+import multiprocessing
+import optparse
+import os
+
 import pytest
 
 from TotalDepth.common import cmn_cmd_opts
@@ -183,3 +187,107 @@ def test_basic(args):
 #     # print(myP.format_help())
 #     self.assertEqual("""usage: Program [-h] [--version] [-j JOBS] [-k] [-l LOG_LEVEL] [-g] [-r] in out
 # """, myP.format_usage())
+
+
+def _profile_work(n: int) -> int:
+    return sum(i * i for i in range(n))
+
+
+@pytest.fixture
+def profile_dir(tmpdir):
+    yield str(tmpdir)
+    cmn_cmd_opts.stop_profile()
+
+
+def _profile_files(profile_dir, suffix):
+    return [f for f in os.listdir(profile_dir) if f.endswith(suffix)]
+
+
+def test_add_profile():
+    parser = cmn_cmd_opts.arg_parser("Description of the program", "Name of the program", "0.1.3rc4")
+    args = parser.parse_args([])
+    assert args.profile is None
+    assert args.profile_top == cmn_cmd_opts.DEFAULT_OPT_PROFILE_TOP
+
+
+def test_profile_bad_mode(profile_dir):
+    with pytest.raises(ValueError):
+        cmn_cmd_opts.start_profile('timeit', profile_dir)
+
+
+@pytest.mark.parametrize(
+    'mode, suffix',
+    (('cprofile', '.prof'), ('tracemalloc', '.tracemalloc'), ('sample', '.folded')),
+)
+def test_profile_from_arg_parser(profile_dir, mode, suffix):
+    parser = cmn_cmd_opts.arg_parser("Description of the program", "Name of the program", "0.1.3rc4")
+    parser.parse_args([f'--profile={mode}', f'--profile-dir={profile_dir}', '--profile-top=4'])
+    assert os.environ[cmn_cmd_opts.PROFILE_ENVIRONMENT_VARIABLE]
+    _profile_work(500000)
+    summary = cmn_cmd_opts.stop_profile()
+    assert len(summary) > 0
+    assert cmn_cmd_opts.PROFILE_ENVIRONMENT_VARIABLE not in os.environ
+    assert len(_profile_files(profile_dir, suffix)) == 1
+    assert len(_profile_files(profile_dir, '.txt')) == 1
+    # Second stop does nothing.
+    assert cmn_cmd_opts.stop_profile() == []
+
+
+def test_profile_from_optparse(profile_dir):
+    opt_parser = optparse.OptionParser()
+    cmn_cmd_opts.add_profile_optparse(opt_parser)
+    opts, _args = opt_parser.parse_args([])
+    assert opts.profile is None
+    assert opts.profile_top == cmn_cmd_opts.DEFAULT_OPT_PROFILE_TOP
+    opts, _args = opt_parser.parse_args(['--profile=cprofile', f'--profile-dir={profile_dir}', '--profile-top=4'])
+    cmn_cmd_opts.set_profile(opts)
+    _profile_work(500000)
+    assert len(cmn_cmd_opts.stop_profile()) > 0
+    assert len(_profile_files(profile_dir, '.prof')) == 1
+
+
+def test_profile_optparse_bad_mode():
+    opt_parser = optparse.OptionParser()
+    cmn_cmd_opts.add_profile_optparse(opt_parser)
+    with pytest.raises(SystemExit):
+        opt_parser.parse_args(['--profile=timeit'])
+
+
+def test_profile_sample_summary(profile_dir):
+    cmn_cmd_opts.start_profile('sample', profile_dir, 4)
+    while sum(cmn_cmd_opts._profile_state.profiler.samples.values()) < 4:
+        _profile_work(100000)
+    summary = cmn_cmd_opts.stop_profile()
+    assert summary[0].startswith('Samples: ')
+    assert 'test_cmn_cmd_opts.py' in '\n'.join(summary)
+    with open(os.path.join(profile_dir, _profile_files(profile_dir, '.folded')[0])) as istream:
+        assert 'test_cmn_cmd_opts.py:_profile_work;' in istream.read()
+
+
+@pytest.mark.parametrize('mode', cmn_cmd_opts.PROFILE_MODES)
+def test_profile_multiprocessing(profile_dir, mode):
+    cmn_cmd_opts.start_profile(mode, profile_dir)
+    pool = multiprocessing.Pool(processes=2)
+    assert pool.map(_profile_work, [1000] * 4) == [_profile_work(1000)] * 4
+    pool.close()
+    pool.join()
+    cmn_cmd_opts.stop_profile()
+    # One for this process and one for each worker.
+    assert len(_profile_files(profile_dir, '.txt')) == 3
+
+
+def _profile_files_of_this_process(profile_dir):
+    return [f for f in os.listdir(profile_dir) if f'_{os.getpid()}.' in f]
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason='Requires fork')
+@pytest.mark.parametrize('mode', cmn_cmd_opts.PROFILE_MODES)
+def test_profile_fork_writes_nothing_on_start(profile_dir, mode):
+    cmn_cmd_opts.start_profile(mode, profile_dir)
+    pool = multiprocessing.get_context('fork').Pool(processes=1)
+    # The profiler inherited by the worker is discarded without writing any files.
+    assert pool.apply(_profile_files_of_this_process, (profile_dir,)) == []
+    pool.close()
+    pool.join()
+    cmn_cmd_opts.stop_profile()
+    assert len(_profile_files(profile_dir, '.txt')) == 2
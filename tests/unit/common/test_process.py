@@ -1,5 +1,7 @@
 import datetime
 import io
+import json
+import multiprocessing
 import pprint
 
 import pytest
@@ -141,3 +143,111 @@ def test_extract_json_as_table():
 4.3              46026752   330.924416          4.3       100.0%        98.4% 2019-10-14T17:44:51.019315  24098 # 
 5.3              56565760  2631.550734          5.3        99.4%        96.9% 2019-10-14T17:44:52.024755  24098 # """
     assert result == expected
+
+
+@pytest.fixture
+def stages():
+    process.reset_stages()
+    yield
+    process.reset_stages()
+
+
+def test_stage_nested(stages):
+    with process.stage('index'):
+        with process.stage('decode'):
+            process.count('frames', 8)
+        with process.stage('decode'):
+            process.count('frames', 2)
+    process.count('files')
+    data = process.stage_data()
+    assert list(data['timers'].keys()) == ['index', 'index.decode']
+    assert data['timers']['index']['count'] == 1
+    assert data['timers']['index.decode']['count'] == 2
+    assert data['timers']['index']['wall'] >= data['timers']['index.decode']['wall']
+    assert data['counters'] == {'files': 1, 'index.decode.frames': 10}
+
+
+def test_stage_exception(stages):
+    with pytest.raises(ValueError):
+        with process.stage('index'):
+            raise ValueError()
+    with process.stage('write'):
+        pass
+    assert list(process.stage_data()['timers'].keys()) == ['index', 'write']
+
+
+def test_merge_stage_data(stages):
+    data = {
+        'timers': {'index': {'count': 2, 'wall': 1.0, 'cpu': 0.5}},
+        'counters': {'files': 2},
+    }
+    process.merge_stage_data(data)
+    process.merge_stage_data(data)
+    assert process.stage_data() == {
+        'timers': {'index': {'count': 4, 'wall': 2.0, 'cpu': 1.0}},
+        'counters': {'files': 4},
+    }
+
+
+def _stage_worker(value: int) -> int:
+    with process.stage('work'):
+        process.count('values', value)
+    return value
+
+
+@pytest.mark.parametrize('num_tasks', (10, 5000))
+def test_stage_pool(stages, num_tasks):
+    """Workers return their stages with each result, there is no logging thread."""
+    process.count('parent')
+    pool = multiprocessing.Pool(processes=2)
+    async_results = [pool.apply_async(process.call_with_stages, (_stage_worker, v)) for v in range(num_tasks)]
+    results = []
+    for async_result in async_results:
+        result, stage_data = async_result.get(timeout=60)
+        process.merge_stage_data(stage_data)
+        results.append(result)
+    pool.close()
+    pool.join()
+    assert results == list(range(num_tasks))
+    data = process.stage_data()
+    assert data['timers']['work']['count'] == num_tasks
+    assert data['counters'] == {'parent': 1, 'work.values': sum(range(num_tasks))}
+
+
+def test_call_with_stages_only_returns_that_call(stages):
+    process.count('parent')
+    result, data = process.call_with_stages(_stage_worker, 3)
+    assert result == 3
+    assert data['counters'] == {'work.values': 3}
+    assert process.stage_data() == {'timers': {}, 'counters': {'parent': 1}}
+
+
+def test_log_process_zero_interval():
+    with process.log_process(0.0):
+        pass
+
+
+def test_process_data_has_stages(stages):
+    with process.stage('index'):
+        pass
+    thread = process.ProcessLoggingThread(args=(1.0,))
+    record = json.loads(json.dumps(thread._get_process_data()))
+    assert record[process.KEY_STAGES]['timers']['index']['count'] == 1
+    assert process.extract_stages_from_json([record]) == {record[process.KEY_PROCESS_ID]: record[process.KEY_STAGES]}
+
+
+def test_format_stage_data():
+    data = {
+        'timers': {
+            'index': {'count': 2, 'wall': 1.0, 'cpu': 0.5},
+            'index.decode': {'count': 4, 'wall': 0.5, 'cpu': 0.5},
+        },
+        'counters': {'index.files': 2},
+    }
+    assert process.format_stage_data(data) == [
+        'Stage                                         Count      Wall(s)       CPU(s)   Wall/Count(ms)',
+        'index                                             2        1.000        0.500          500.000',
+        '  decode                                          4        0.500        0.500          125.000',
+        'Counter                                       Value',
+        'index.files                                       2',
+    ]
@@ -1,4 +1,5 @@
 import io
+import os
 
 import pytest
 
@@ -97,3 +98,58 @@ def test_get_errors(file_in, file_size, expected_errors):
     # print(result)
     assert result == expected_errors
 
+
+
+def test_tif_extents():
+    tifs = DeTif.tif_scan_file_object(io.BytesIO(TIF_EIGHT_BYTES_FILE))
+    assert DeTif.tif_extents(tifs, len(TIF_EIGHT_BYTES_FILE)) == [(12, 8)]
+
+
+def test_tif_extents_negative_read_error():
+    with pytest.raises(DeTif.DeTifExceptionRead) as err:
+        DeTif.tif_extents([DeTif.TifMarker(24, 0, 0, 12)], 64)
+    assert err.value.args[0].startswith('TIF marker suggests negative block size: ')
+
+
+def test_scan_next_not_forward():
+    """A TIF marker whose next does not move forward ends the scan rather than looping."""
+    fobj = io.BytesIO(b'\x00\x00\x00\x00' + b'\x00\x00\x00\x00' + b'\x0c\x00\x00\x00'
+                      + b'\x00\x00\x00\x00' + b'\x00\x00\x00\x00' + b'\x00\x00\x00\x00')
+    assert DeTif.tif_scan_file_object(fobj) == [DeTif.TifMarker(0, 0, 0, 12), DeTif.TifMarker(12, 0, 0, 0)]
+
+
+def _write_tif_files(directory, count):
+    os.makedirs(directory)
+    for i in range(count):
+        with open(os.path.join(directory, f'{i}.lis'), 'wb') as fobj:
+            fobj.write(TIF_EIGHT_BYTES_FILE)
+    with open(os.path.join(directory, 'not_tif.txt'), 'wb') as fobj:
+        fobj.write(b'Some text that is long enough.')
+
+
+@pytest.mark.parametrize('content', (TIF_EMPTY_FILE, TIF_EIGHT_BYTES_FILE))
+def test_strip_path(tmpdir, content):
+    path_in = os.path.join(str(tmpdir), 'in.lis')
+    path_out = os.path.join(str(tmpdir), 'out.lis')
+    with open(path_in, 'wb') as fobj:
+        fobj.write(content)
+    file_out = io.BytesIO()
+    expected = DeTif.strip_tif(io.BytesIO(content), file_out)
+    assert DeTif.strip_path(path_in, path_out) == expected
+    with open(path_out, 'rb') as fobj:
+        assert fobj.read() == file_out.getvalue()
+    # strip_tif() with a file on disc uses a memory map.
+    with open(path_in, 'rb') as fobj:
+        assert DeTif.strip_tif(fobj, io.BytesIO()) == expected
+
+
+@pytest.mark.parametrize('jobs', (1, 2))
+def test_de_tif_directory(tmpdir, jobs):
+    path_in = os.path.join(str(tmpdir), 'in')
+    path_out = os.path.join(str(tmpdir), 'out')
+    _write_tif_files(path_in, 5)
+    result = DeTif.de_tif_directory(path_in, path_out, False, False, False, jobs)
+    assert result == (5, 5 * 3, 5 * 8)
+    assert sorted(os.listdir(path_out)) == [f'{i}.lis' for i in range(5)]
+    with open(os.path.join(path_out, '0.lis'), 'rb') as fobj:
+        assert fobj.read() == b'\x01\x02\x03\x04\x05\x06\x07\x08'
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# Part of TotalDepth: Petrophysical data processing and presentation
+# Copyright (C) 1999-2012 Paul Ross
+# 
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+# 
+# Paul Ross: apaulross@gmail.com
+"""Tests ReadLASFiles.
+"""
+
+__author__  = 'Paul Ross'
+__date__    = '2012-01-12'
+__version__ = '0.1.0'
+__rights__  = 'Copyright (c) 2012 Paul Ross.'
+
+import os
+import sys
+import logging
+import time
+import unittest
+import io
+import shutil
+import tempfile
+
+from TotalDepth.LAS import ReadLASFiles
+
+######################
+# Section: Unit tests.
+######################
+class TestReadLASFiles(unittest.TestCase):
+    """Tests ReadLASFiles with and without multiprocessing."""
+    LAS_FILE = """~VERSION INFORMATION
+ VERS.                        2.0: CWLS LOG ASCII STANDARD - VERSION 2.0
+ WRAP.                         NO: ONE LINE PER DEPTH STEP
+~WELL INFORMATION
+ STRT.F                 1700.0000: START DEPTH
+ STOP.F                 1700.5000: STOP DEPTH
+ STEP.F                    0.5000: STEP LENGTH
+ NULL.                  -999.2500: NO VALUE
+ WELL.                   WELL {:d}: WELL NAME
+~CURVE INFORMATION
+ DEPT.F                          : 1 Depth
+ GR  .GAPI           45 310 01 00: {:s}
+~A  DEPT        GR
+ 1700.0000  -999.2500
+ 1700.5000    40.7909
+"""
+    def setUp(self):
+        """Writes LAS files to a temporary directory."""
+        self._dir = tempfile.mkdtemp()
+        for i in range(5):
+            with open(os.path.join(self._dir, 'file_{:d}.las'.format(i)), 'w') as f:
+                f.write(self.LAS_FILE.format(i, 'Gamma Ray' if i % 2 else 'Gamma'))
+
+    def tearDown(self):
+        """Tear down."""
+        shutil.rmtree(self._dir)
+
+    def _retResults(self, theReader):
+        """Returns a string of the results without the timings."""
+        myS = io.StringIO()
+        theReader.pprintMnemDesc(myS)
+        theReader.pprintCurveDesc(myS)
+        theReader.pprintUnitDesc(myS)
+        theReader.pprintWsd(myS)
+        myS.write(theReader.results())
+        return '\n'.join(l for l in myS.getvalue().split('\n') if '/S' not in l and '(S)' not in l)
+
+    def test_00(self):
+        """TestReadLASFiles.test_00(): Read a directory."""
+        myReader = ReadLASFiles.ReadLASFiles(self._dir)
+        self.assertEqual(5, myReader._cntrs['file'])
+        self.assertEqual(10, myReader._cntrs['fram'])
+        self.assertEqual({'Gamma' : 3, 'Gamma Ray' : 2}, dict(myReader._curveDescMap['GR']))
+        self.assertEqual(5, myReader._wsdMnemCount['WELL'])
+        self.assertEqual(5, sum(len(v) for v in myReader._sizeTimeMap.values()))
+
+    def test_01(self):
+        """TestReadLASFiles.test_01(): Merge with +=."""
+        myReader = ReadLASFiles.ReadLASFiles(None)
+        self.assertEqual(0, myReader._cntrs['file'])
+        for i in range(5):
+            myReader += ReadLASFiles.ReadLASFiles(os.path.join(self._dir, 'file_{:d}.las'.format(i)))
+        myExp = self._retResults(ReadLASFiles.ReadLASFiles(self._dir))
+        self.assertEqual(myExp, self._retResults(myReader))
+
+    def test_02(self):
+        """TestReadLASFiles.test_02(): Multiprocessing is the same as a single process."""
+        myExp = self._retResults(ReadLASFiles.ReadLASFiles(self._dir))
+        for jobs in (0, 2):
+            self.assertEqual(myExp, self._retResults(ReadLASFiles.ReadLASFiles(self._dir, jobs=jobs)))
+
+    def test_03(self):
+        """TestReadLASFiles.test_03(): loadArray=False does not count frames."""
+        myReader = ReadLASFiles.ReadLASFiles(self._dir, loadArray=False, jobs=2)
+        self.assertEqual(5, myReader._cntrs['file'])
+        self.assertEqual(0, myReader._cntrs['fram'])
+        self.assertEqual({'Gamma' : 3, 'Gamma Ray' : 2}, dict(myReader._curveDescMap['GR']))
+        self.assertTrue('Frames' not in myReader.results())
+
+class Special(unittest.TestCase):
+    """Special tests."""
+    pass
+
+def unitTest(theVerbosity=2):
+    suite = unittest.TestLoader().loadTestsFromTestCase(Special)
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestReadLASFiles))
+    myResult = unittest.TextTestRunner(verbosity=theVerbosity).run(suite)
+    return (myResult.testsRun, len(myResult.errors), len(myResult.failures))
+##################
+# End: Unit tests.
+##################
+
+def main():
+    """Invoke unit test code."""
+    logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s %(levelname)-8s %(message)s',
+                    stream=sys.stdout)
+    clkStart = time.perf_counter()
+    unitTest()
+    clkExec = time.perf_counter() - clkStart
+    print(('CPU time = %8.3f (S)' % clkExec))
+    print('Bye, bye!')
+
+if __name__ == "__main__":
+    main()
@@ -35,11 +35,18 @@ import time
 import unittest
 import pprint
 import io
+import os
+import tempfile
+
+import pytest
 
 from TotalDepth.LAS.core import LASRead
 from TotalDepth.LIS.core import EngVal
 from TotalDepth.LIS.core import Mnem
 
+sys.path.append(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir))
+import BaseTestClasses
+
 class TestLASReadGenerator(unittest.TestCase):
     """Tests the line generator in the LASRead module."""
     def setUp(self):
@@ -85,6 +92,64 @@ class TestLASReadGenerator(unittest.TestCase):
         ]
         self.assertEqual(exp, result)
 
+class TestLASScanner(unittest.TestCase):
+    """Tests LASScanner."""
+    LAS = """# Preamble
+~V
+ VERS.                        2.0: CWLS LOG ASCII STANDARD - VERSION 2.0
+ WRAP.                         NO: ONE LINE PER DEPTH STEP
+~C ~Curves
+ DEPT.F                          : 
+~A
+ 1700.0
+ 1700.5
+"""
+    EXP = [
+        (1, None, '# Preamble\n'),
+        (2, '~V', """ VERS.                        2.0: CWLS LOG ASCII STANDARD - VERSION 2.0
+ WRAP.                         NO: ONE LINE PER DEPTH STEP
+"""),
+        (5, '~C ~Curves', ' DEPT.F                          : \n'),
+        (7, '~A', ' 1700.0\n 1700.5\n'),
+    ]
+
+    def test_00(self):
+        """TestLASScanner.test_00(): genSections() with a range of chunk sizes."""
+        for chunkSize in (1, 2, 3, 7, 64, LASRead.READ_CHUNK_SIZE):
+            myScan = LASRead.LASScanner(io.StringIO(self.LAS), chunkSize=chunkSize)
+            self.assertEqual(self.EXP, list(myScan.genSections()), 'chunkSize={:d}'.format(chunkSize))
+
+    def test_01(self):
+        """TestLASScanner.test_01(): genSections() no preamble, no trailing newline."""
+        myScan = LASRead.LASScanner(io.StringIO('~V\n VERS. 2.0:\n~A'), chunkSize=3)
+        self.assertEqual([(1, '~V', ' VERS. 2.0:\n'), (3, '~A', '')], list(myScan.genSections()))
+        myScan = LASRead.LASScanner(io.StringIO(''))
+        self.assertEqual([], list(myScan.genSections()))
+
+    def test_02(self):
+        """TestLASScanner.test_02(): genSections(stopAtArray=True)."""
+        for chunkSize in (1, 7, LASRead.READ_CHUNK_SIZE):
+            myF = io.StringIO(self.LAS)
+            myScan = LASRead.LASScanner(myF, chunkSize=chunkSize, theEncoding='ascii')
+            self.assertEqual(self.EXP[:-1] + [(7, '~A', None)], list(myScan.genSections(stopAtArray=True)))
+            self.assertEqual(self.LAS.index(' 1700.0'), myScan.tellBytes())
+            self.assertEqual(' 1700.0\n 1700.5\n', myScan.remainder() + myF.read())
+
+    def test_03(self):
+        """TestLASScanner.test_03(): '~' not at the start of a line is not a section head."""
+        myScan = LASRead.LASScanner(io.StringIO('~V\n  ~C\n#~A\n'), chunkSize=2)
+        self.assertEqual([(1, '~V', '  ~C\n#~A\n')], list(myScan.genSections()))
+
+    def test_04(self):
+        """TestLASScanner.test_04(): tellBytes() counts bytes in the encoding, not characters."""
+        myLAS = self.LAS.replace('# Preamble', '# Pr\u00e9amble \u00b0C')
+        for chunkSize in (1, 7, LASRead.READ_CHUNK_SIZE):
+            myScan = LASRead.LASScanner(io.StringIO(myLAS), chunkSize=chunkSize, theEncoding='utf-8')
+            self.assertEqual('utf-8', myScan.encoding)
+            list(myScan.genSections(stopAtArray=True))
+            self.assertEqual(len(myLAS[:myLAS.index(' 1700.0')].encode('utf-8')), myScan.tellBytes())
+            self.assertEqual(myLAS.index(' 1700.0') + 2, myScan.tellBytes())
+
 class TestLASReadRegex(unittest.TestCase):
     """Tests regular expressions in the LASRead module."""
     def setUp(self):
@@ -404,7 +469,7 @@ class TestLASReadLASSectionArray(unittest.TestCase):
         myLsA = LASRead.LASSectionArray('A', False, myLsC)
         myLsA.finalise()
         self.assertEqual('A', myLsA.type)
-        self.assertEqual([], myLsA._members)
+        self.assertEqual([], myLsA._members.tolist())
         self.assertFalse(myLsA._wrap)
         self.assertEqual(
             [
@@ -446,7 +511,7 @@ class TestLASReadLASSectionArray(unittest.TestCase):
             [1703.0, 52.4264, 0.029, 0.0229, 17.8425],
             [1703.5, 61.1144, 0.0199, 0.0383, 13.2042],
         ]
-        self.assertEqual(exp, myLsA._members)
+        self.assertEqual(exp, myLsA._members.tolist())
 #        print()
 #        print(list(myLsA.keys()))
         self.assertEqual(
@@ -491,7 +556,7 @@ class TestLASReadLASSectionArray(unittest.TestCase):
             [1703.0, 52.4264, 0.029, 0.0229, 17.8425],
             [1703.5, 61.1144, 0.0199, 0.0383, 13.2042],
         ]
-        self.assertEqual(exp, myLsA._members)
+        self.assertEqual(exp, myLsA._members.tolist())
 #        print()
 #        print(list(myLsA.keys()))
         self.assertEqual(
@@ -544,7 +609,7 @@ class TestLASReadLASSectionArray(unittest.TestCase):
             [1703.0, 52.4264, 0.029, 0.0229, 17.8425],
             [1703.5, 61.1144, 0.0199, 0.0383, 13.2042],
         ]
-        self.assertEqual(exp, myLsA._members)
+        self.assertEqual(exp, myLsA._members.tolist())
 #        print()
 #        print(list(myLsA.keys()))
         self.assertEqual(
@@ -581,7 +646,7 @@ class TestLASReadLASSectionArray(unittest.TestCase):
             [1703.0, 52.4264, 0.029, 0.0229, 17.8425],
             [1703.5, 61.1144, 0.0199, 0.0383, 13.2042],
         ]
-        self.assertEqual(exp, myLsA._members)
+        self.assertEqual(exp, myLsA._members.tolist())
 #        print()
 #        print(list(myLsA.keys()))
         self.assertEqual(
@@ -624,7 +689,7 @@ class TestLASReadLASSectionArray(unittest.TestCase):
         for i, l in enumerate(myStr.split('\n')):
             myLsA.addMemberLine(i, l)
         myLsA.finalise()
-        self.assertEqual([[1700.0, -999.25, -999.25, -999.25, -999.25]], myLsA._members)
+        self.assertEqual([[1700.0, -999.25, -999.25, -999.25, -999.25]], myLsA._members.tolist())
         
     def test_12(self):
         """TestLASReadLASSectionArray.test_12(): Populate with array, with wrap +1 fails when missing one value, single line."""
@@ -704,7 +769,109 @@ class TestLASReadLASSectionArray(unittest.TestCase):
 #        print()
 #        pprint.pprint(myLsA._members)
         self.assertEqual([], myLsA._members)
-        
+
+    def test_20(self):
+        """TestLASReadLASSectionArray.test_20(): addMemberText(), no wrap."""
+        myLsC = self._retSimpleCurveSection()
+        myLsA = LASRead.LASSectionArray('A', False, myLsC)
+        myLsA.addMemberText(10, """ 1700.0000  -999.2500  -999.2500  -999.2500  -999.2500
+ 1700.5000    40.7909     0.0218     0.0417    25.9985
+
+ 1701.0000    44.0165     0.0347     0.0333    26.1850
+""")
+        myLsA.finalise()
+        self.assertEqual((3, 5), myLsA.array.shape)
+        self.assertEqual('float64', myLsA.array.dtype.name)
+        self.assertEqual(3, len(myLsA))
+        exp = [
+            [1700.0, -999.25, -999.25, -999.25, -999.25],
+            [1700.5, 40.7909, 0.0218, 0.0417, 25.9985],
+            [1701.0, 44.0165, 0.0347, 0.0333, 26.185],
+        ]
+        self.assertEqual(exp, myLsA.array.tolist())
+        self.assertEqual([1700.0, 1700.5, 1701.0], sorted(list(myLsA.keys())))
+        # Members are views of the array
+        self.assertEqual(exp[1], myLsA[1].tolist())
+        self.assertTrue(myLsA[1].base is not None)
+
+    def test_21(self):
+        """TestLASReadLASSectionArray.test_21(): addMemberText(), with wrap +2 line and multiple blocks."""
+        myLsC = self._retSimpleCurveSection()
+        myLsA = LASRead.LASSectionArray('A', True, myLsC)
+        myLsA.addMemberText(10, """ 1700.0000
+ -999.2500  -999.2500
+ -999.2500  -999.2500
+ 1700.5000
+ 40.7909     0.0218
+""")
+        myLsA.addMemberText(15, """ 0.0417    25.9985
+ 1701.0000
+ 44.0165     0.0347
+ 0.0333    26.1850
+""")
+        myLsA.finalise()
+        exp = [
+            [1700.0, -999.25, -999.25, -999.25, -999.25],
+            [1700.5, 40.7909, 0.0218, 0.0417, 25.9985],
+            [1701.0, 44.0165, 0.0347, 0.0333, 26.185],
+        ]
+        self.assertEqual(exp, myLsA.array.tolist())
+
+    def test_22(self):
+        """TestLASReadLASSectionArray.test_22(): addMemberText(), convert unreadable floats to NULL."""
+        myLsC = self._retSimpleCurveSection()
+        myLsA = LASRead.LASSectionArray('A', False, myLsC, null=-999.0)
+        myLsA.addMemberText(10, """ 1700.0000  -999.2500  -999.2500  -999.2500  -999.2500
+ 1700.5000    40.7909     ******     0.0417    25.9985
+ 1701.0000    44.0165     0.0347     xxxxxx    26.1850
+""")
+        myLsA.finalise()
+        exp = [
+            [1700.0, -999.25, -999.25, -999.25, -999.25],
+            [1700.5, 40.7909, -999.0, 0.0417, 25.9985],
+            [1701.0, 44.0165, 0.0347, -999.0, 26.185],
+        ]
+        self.assertEqual(exp, myLsA.array.tolist())
+
+    def test_23(self):
+        """TestLASReadLASSectionArray.test_23(): addMemberText(), no wrap, short line padded and long line truncated."""
+        myLsC = self._retSimpleCurveSection()
+        myLsA = LASRead.LASSectionArray('A', False, myLsC)
+        myLsA.addMemberText(10, """ 1700.0000  -999.2500  -999.2500  -999.2500  -999.2500
+ 1700.5000    40.7909     0.0218     0.0417
+
+ 1701.0000    44.0165     0.0347     0.0333    26.1850    1.0
+""")
+        myLsA.finalise()
+        self.assertEqual(
+            [
+                [1700.0, -999.25, -999.25, -999.25, -999.25],
+                [1700.5, 40.7909, 0.0218, 0.0417, -999.25],
+                [1701.0, 44.0165, 0.0347, 0.0333, 26.185],
+            ],
+            myLsA._members.tolist(),
+        )
+
+    def test_24(self):
+        """TestLASReadLASSectionArray.test_24(): addMemberText(), with wrap, incomplete frame raises on finalise()."""
+        myLsC = self._retSimpleCurveSection()
+        myLsA = LASRead.LASSectionArray('A', True, myLsC)
+        myLsA.addMemberText(10, """ 1700.0000
+ -999.2500  -999.2500  -999.2500  -999.2500
+ 1700.5000
+ 40.7909     0.0218     0.0417
+""")
+        self.assertRaises(LASRead.ExceptionLASReadSectionArray, myLsA.finalise)
+
+    def test_25(self):
+        """TestLASReadLASSectionArray.test_25(): finalise() with no frames gives an empty array."""
+        myLsC = self._retSimpleCurveSection()
+        myLsA = LASRead.LASSectionArray('A', True, myLsC)
+        myLsA.finalise()
+        self.assertEqual((0, 5), myLsA.array.shape)
+        self.assertEqual(0, len(myLsA))
+        self.assertEqual([], list(myLsA.keys()))
+
 class TestLASRead(unittest.TestCase):
     """Tests high level functionality of the LASRead module."""
     def setUp(self):
@@ -1325,6 +1492,9 @@ Other stuff, whatever....
             ],
             list(myLf.genOutpPoints(Mnem.Mnem('ILD'))),
         )
+        for m in ('GR', 'DPHI', 'NPHI', 'ILD'):
+            myXS, myVS = myLf.outpPointArrays(Mnem.Mnem(m))
+            self.assertEqual(list(myLf.genOutpPoints(Mnem.Mnem(m))), list(zip(myXS.tolist(), myVS.tolist())))
 
     def test_20(self):
         """TestLASRead.test_20(): Tests fail with duplicate well information section."""
@@ -1771,6 +1941,189 @@ Some other stuff that shouldn't be here.
             self.assertTrue(myLf.hasOutpMnem(Mnem.Mnem(m)))
         self.assertFalse(myLf.hasOutpMnem(Mnem.Mnem('WTF')))        
 
+class TestLASReadLazyArray(unittest.TestCase):
+    """Tests reading with loadArray=False."""
+    LAS_HEAD = """~VERSION INFORMATION
+ VERS.                        2.0: CWLS LOG ASCII STANDARD - VERSION 2.0
+ WRAP.                         {:s}: ONE LINE PER DEPTH STEP
+~WELL INFORMATION
+ STRT.F                 1700.0000: START DEPTH
+ STOP.F                 1701.0000: STOP DEPTH
+ STEP.F                    0.5000: STEP LENGTH
+ NULL.                  -999.2500: NO VALUE
+~CURVE INFORMATION
+ DEPT.F                          : 
+ GR  .GAPI           45 310 01 00: 
+ DPHI.V/V            45 890 00 00: 
+~A  DEPT        GR        DPHI
+"""
+    LAS_ARRAY = """ 1700.0000  -999.2500  -999.2500
+# A comment
+ 1700.5000    40.7909     0.0218
+
+ 1701.0000    44.0165     0.0347
+"""
+    LAS_ARRAY_WRAP = """ 1700.0000
+  -999.2500  -999.2500
+ 1700.5000
+    40.7909     0.0218
+ 1701.0000
+    44.0165     0.0347
+"""
+    EXP_GR = [(1700.0, -999.25), (1700.5, 40.7909), (1701.0, 44.0165)]
+
+    def _retPath(self, theStr):
+        fd, myPath = tempfile.mkstemp(suffix='.las')
+        os.write(fd, theStr.encode('ascii'))
+        os.close(fd)
+        self.addCleanup(os.remove, myPath)
+        return myPath
+
+    def test_00(self):
+        """TestLASReadLazyArray.test_00(): loadArray=False from a file like object."""
+        myLf = LASRead.LASRead(io.StringIO(self.LAS_HEAD.format('NO') + self.LAS_ARRAY), 'MyID', loadArray=False)
+        self.assertEqual(4, len(myLf))
+        self.assertFalse(myLf['A'].isLoaded())
+        self.assertEqual(-999.25, myLf.nullValue)
+        self.assertEqual(['DEPT', 'GR', 'DPHI'], myLf.curveMnems(ordered=True))
+        self.assertFalse(myLf['A'].isLoaded())
+        self.assertEqual(3, myLf.numFrames())
+        self.assertTrue(myLf['A'].isLoaded())
+        self.assertEqual(3*3, myLf.numDataPoints())
+        self.assertEqual(self.EXP_GR, list(myLf.genOutpPoints(Mnem.Mnem('GR'))))
+
+    def test_00_01(self):
+        """TestLASReadLazyArray.test_00_01(): loadArray=False from a file like object read from before loading."""
+        myF = io.StringIO(self.LAS_HEAD.format('NO') + self.LAS_ARRAY)
+        myLf = LASRead.LASRead(myF, 'MyID', loadArray=False)
+        self.assertFalse(myLf['A'].isLoaded())
+        myF.seek(0)
+        myF.read(5)
+        self.assertEqual(3, myLf.numFrames())
+        self.assertEqual(self.EXP_GR, list(myLf.genOutpPoints(Mnem.Mnem('GR'))))
+
+    def test_01(self):
+        """TestLASReadLazyArray.test_01(): loadArray=False from a file path is the same as loadArray=True."""
+        myPath = self._retPath(self.LAS_HEAD.format('NO') + self.LAS_ARRAY)
+        myLfEager = LASRead.LASRead(myPath)
+        myLf = LASRead.LASRead(myPath, loadArray=False)
+        self.assertFalse(myLf['A'].isLoaded())
+        self.assertEqual(myLfEager['A'].array.tolist(), myLf['A'].array.tolist())
+        self.assertEqual(sorted(myLfEager['A'].keys()), sorted(myLf['A'].keys()))
+        self.assertEqual(self.EXP_GR, list(myLf.genOutpPoints(Mnem.Mnem('GR'))))
+
+    def test_02(self):
+        """TestLASReadLazyArray.test_02(): loadArray=False from a file path with wrap."""
+        myPath = self._retPath(self.LAS_HEAD.format('YES') + self.LAS_ARRAY_WRAP)
+        myLf = LASRead.LASRead(myPath, loadArray=False)
+        self.assertFalse(myLf['A'].isLoaded())
+        self.assertEqual((3, 3), myLf['A'].array.shape)
+        self.assertEqual(self.EXP_GR, list(myLf.genOutpPoints(Mnem.Mnem('GR'))))
+
+    def test_03(self):
+        """TestLASReadLazyArray.test_03(): loadArray=False, empty array section."""
+        myPath = self._retPath(self.LAS_HEAD.format('NO'))
+        myLf = LASRead.LASRead(myPath, loadArray=False)
+        self.assertEqual(0, myLf.numFrames())
+        self.assertEqual((0, 3), myLf['A'].array.shape)
+
+    def test_04(self):
+        """TestLASReadLazyArray.test_04(): loadArray=False, section after the array section raises on access."""
+        myPath = self._retPath(self.LAS_HEAD.format('NO') + self.LAS_ARRAY + '~O\n')
+        myLf = LASRead.LASRead(myPath, loadArray=False)
+        self.assertEqual(4, len(myLf))
+        self.assertRaises(LASRead.ExceptionLASRead, myLf.numFrames)
+        self.assertFalse(myLf['A'].isLoaded())
+        self.assertRaises(LASRead.ExceptionLASRead, myLf.numFrames)
+
+    def test_05(self):
+        """TestLASReadLazyArray.test_05(): loadArray=False from a file path with CRLF and non-ASCII characters."""
+        myStr = (self.LAS_HEAD.format('NO') + self.LAS_ARRAY).replace(
+            'START DEPTH', 'START DEPTH \u00b0\u00e9').replace('\n', '\r\n')
+        fd, myPath = tempfile.mkstemp(suffix='.las')
+        os.write(fd, myStr.encode('utf-8'))
+        os.close(fd)
+        self.addCleanup(os.remove, myPath)
+        myLfEager = LASRead.LASRead(myPath)
+        myLf = LASRead.LASRead(myPath, loadArray=False)
+        self.assertEqual('START DEPTH \u00b0\u00e9', myLf['W']['STRT'].desc)
+        self.assertEqual(myLfEager['W']['STRT'], myLf['W']['STRT'])
+        self.assertEqual(self.EXP_GR, list(myLfEager.genOutpPoints(Mnem.Mnem('GR'))))
+        self.assertEqual(self.EXP_GR, list(myLf.genOutpPoints(Mnem.Mnem('GR'))))
+
+@pytest.mark.slow
+class TestLASRead_Perf(BaseTestClasses.TestBase):
+    """Benchmarks LASRead with generated LAS 1.2 (wrapped) and 2.0 (unwrapped) files of increasing size."""
+    NUM_CURVES = 16
+    def _retLASPath(self, theVers, theFrames):
+        """Writes a LAS file and returns its path."""
+        myWrap = theVers == '1.2'
+        myL = [
+            '~VERSION INFORMATION',
+            ' VERS.                        {:s}: CWLS LOG ASCII STANDARD'.format(theVers),
+            ' WRAP.                        {:s}: '.format('YES' if myWrap else 'NO'),
+            '~WELL INFORMATION',
+            ' STRT.F                 1000.0000: START DEPTH',
+            ' STOP.F                 {:.4f}: STOP DEPTH'.format(1000.0 + 0.5 * (theFrames - 1)),
+            ' STEP.F                    0.5000: STEP LENGTH',
+            ' NULL.                  -999.2500: NO VALUE',
+            '~CURVE INFORMATION',
+            ' DEPT.F                          : Depth',
+        ]
+        for c in range(1, self.NUM_CURVES):
+            myL.append(' C{:03d}.UNIT                      : Curve {:d}'.format(c, c))
+        myL.append('~A')
+        for f in range(theFrames):
+            myVals = ['{:10.4f}'.format(1000.0 + 0.5 * f)]
+            myVals.extend('{:10.4f}'.format((f * c) % 1000 / 7.0) for c in range(1, self.NUM_CURVES))
+            if myWrap:
+                myL.append(myVals[0])
+                for i in range(1, len(myVals), 5):
+                    myL.append(' '.join(myVals[i:i + 5]))
+            else:
+                myL.append(' '.join(myVals))
+        fd, myPath = tempfile.mkstemp(suffix='.las')
+        os.write(fd, ('\n'.join(myL) + '\n').encode('ascii'))
+        os.close(fd)
+        self.addCleanup(os.remove, myPath)
+        return myPath
+
+    def _timeRead(self, theVers, theFrames, loadArray=True):
+        myPath = self._retLASPath(theVers, theFrames)
+        tStart = time.perf_counter()
+        myLf = LASRead.LASRead(myPath, loadArray=loadArray)
+        if loadArray:
+            self.assertEqual(theFrames, myLf.numFrames())
+        self.writeCostToStderr(tStart, os.path.getsize(myPath), 'Frames', theFrames)
+
+    def test_00(self):
+        """TestLASRead_Perf.test_00(): LAS 2.0, 1,000 frames."""
+        self._timeRead('2.0', 1000)
+
+    def test_01(self):
+        """TestLASRead_Perf.test_01(): LAS 2.0, 10,000 frames."""
+        self._timeRead('2.0', 10000)
+
+    def test_02(self):
+        """TestLASRead_Perf.test_02(): LAS 2.0, 100,000 frames."""
+        self._timeRead('2.0', 100000)
+
+    def test_10(self):
+        """TestLASRead_Perf.test_10(): LAS 1.2 wrapped, 1,000 frames."""
+        self._timeRead('1.2', 1000)
+
+    def test_11(self):
+        """TestLASRead_Perf.test_11(): LAS 1.2 wrapped, 10,000 frames."""
+        self._timeRead('1.2', 10000)
+
+    def test_12(self):
+        """TestLASRead_Perf.test_12(): LAS 1.2 wrapped, 100,000 frames."""
+        self._timeRead('1.2', 100000)
+
+    def test_20(self):
+        """TestLASRead_Perf.test_20(): LAS 2.0, 100,000 frames, headers only."""
+        self._timeRead('2.0', 100000, loadArray=False)
+
 class Special(unittest.TestCase):
     """Special tests."""
     pass
@@ -1778,11 +2131,14 @@ class Special(unittest.TestCase):
 def unitTest(theVerbosity=2):
     suite = unittest.TestLoader().loadTestsFromTestCase(Special)
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestLASReadGenerator))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestLASScanner))
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestLASReadRegex))
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestLASReadLASFields))
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestLASReadLASSection))
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestLASReadLASSectionArray))
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestLASRead))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestLASReadLazyArray))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestLASRead_Perf))
     myResult = unittest.TextTestRunner(verbosity=theVerbosity).run(suite)
     return (myResult.testsRun, len(myResult.errors), len(myResult.failures))
 ##################
@@ -57,6 +57,27 @@ class TestFileLowLevel(BaseTestClasses.TestBaseFile):
         """TestFileLowLevel.test_00(): Tests setUp() and tearDown()."""
         pass
 
+    def test_01(self):
+        """TestFileLowLevel.test_01(): FileRead with useMmap=True reads the same Logical Records with TIF markers."""
+        myLrS = [bytes([0, 0]) + self.randomBytes(length=l) for l in (0, 1, 37, 1024, 3000)]
+        myIo = io.BytesIO()
+        myFw = File.FileWrite(myIo, theFileId='MyFile', hasTif=True, thePrLen=512)
+        myTellS = [myFw.write(lr) for lr in myLrS]
+        myFw._prh.tif.close(myFw._prh.stream)
+        myBytes = myIo.getvalue()
+        for useMmap in (False, True):
+            myFi = File.FileRead(io.BytesIO(myBytes), theFileId='MyFile', useMmap=useMmap)
+            self.assertTrue(myFi._prh.tif.hasTif)
+            # Sequential access
+            for t, lr in zip(myTellS, myLrS):
+                self.assertEqual(lr[:2], myFi.readLrBytes(2))
+                self.assertEqual(t, myFi.tellLr())
+                myFi.skipToNextLr()
+            # Random access
+            for t, lr in reversed(list(zip(myTellS, myLrS))):
+                myFi.seekLr(t)
+                self.assertEqual(lr, myFi.readLrBytes())
+
 
 @pytest.mark.slow
 class TestFileType0Base(BaseTestClasses.TestBaseFile):
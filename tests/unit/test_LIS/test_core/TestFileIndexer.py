@@ -170,7 +170,33 @@ class TestFileIndexerBase(BaseTestClasses.TestBaseLogPass):
         chosen."""
         #print('_retLrRandom()', theLrType)
         return bytes([theLrType, 0]) + LisGen.randomBytes(theLen)
-    
+
+    def _retLogPassGen(self):
+        #print()
+        myEbs = LogiRec.EntryBlockSet()
+        myEbs.setEntryBlock(LogiRec.EntryBlock(LogiRec.EB_TYPE_FRAME_SIZE, 1, 66, 4*4))
+        myEbs.setEntryBlock(LogiRec.EntryBlock(LogiRec.EB_TYPE_FRAME_SPACE, 1, 66, 60))
+        myEbs.setEntryBlock(LogiRec.EntryBlock(LogiRec.EB_TYPE_FRAME_SPACE_UNITS, 4, 65, b'.1IN'))
+        #print('myEbs.lisByteList()')
+        #pprint.pprint(myEbs.lisByteList())
+        myLp = LisGen.LogPassGen(
+            myEbs,
+            # Channel list
+            [
+                LisGen.Channel(
+                    LisGen.ChannelSpec(
+                        b'TEST', b'ServID', b'ServOrdN', b'FEET',
+                        45310011, 256, 16, 4, 68
+                    ),
+                    LisGen.ChValsConst(fOffs=0, waveLen=4, mid=0.0, amp=1.0, numSa=1, noise=None),
+                ),
+            ],
+            xStart=10000.0 * 120,
+            xRepCode=68,
+            xNoise=None,
+        )
+        return myLp
+
 class TestFileIndexerCtor(TestFileIndexerBase):
     """Tests FileIndex construction."""
     def setUp(self):
@@ -271,32 +297,6 @@ class TestIndexUnknownIntFormat(TestFileIndexerBase):
 
 class TestIndex_genPlotRecords(TestFileIndexerBase):
     """Tests indexer genPlotRecords()."""
-    def _retLogPassGen(self):
-        #print()
-        myEbs = LogiRec.EntryBlockSet()
-        myEbs.setEntryBlock(LogiRec.EntryBlock(LogiRec.EB_TYPE_FRAME_SIZE, 1, 66, 4*4))
-        myEbs.setEntryBlock(LogiRec.EntryBlock(LogiRec.EB_TYPE_FRAME_SPACE, 1, 66, 60))
-        myEbs.setEntryBlock(LogiRec.EntryBlock(LogiRec.EB_TYPE_FRAME_SPACE_UNITS, 4, 65, b'.1IN'))
-        #print('myEbs.lisByteList()')
-        #pprint.pprint(myEbs.lisByteList())
-        myLp = LisGen.LogPassGen(
-            myEbs,
-            # Channel list
-            [
-                LisGen.Channel(
-                    LisGen.ChannelSpec(
-                        b'TEST', b'ServID', b'ServOrdN', b'FEET',
-                        45310011, 256, 16, 4, 68
-                    ),
-                    LisGen.ChValsConst(fOffs=0, waveLen=4, mid=0.0, amp=1.0, numSa=1, noise=None),
-                ),
-            ],
-            xStart=10000.0 * 120,
-            xRepCode=68,
-            xNoise=None,
-        )
-        return myLp
-
     def _retFileIndexSingleChannel(self):
         myBa = bytearray(self._retFileHead())
         # Add a log pass
@@ -353,6 +353,63 @@ class TestIndex_genPlotRecords(TestFileIndexerBase):
         print('Index pass[0].logPass.longStr():')
         print(myPasses[0].logPass.longStr())
 
+class TestFileIndexUpdate(TestFileIndexerBase):
+    """Tests FileIndex.update() on a file that is appended to."""
+    def _retBytes(self, numLr, withTail):
+        """Returns the bytes of a file with a single LogPass of numLr IFLRs."""
+        myBa = bytearray(self._retFileHead())
+        myLp = self._retLogPassGen()
+        myBa += self.retPrS(myLp.lrBytesDFSR())
+        for i in range(numLr):
+            myBa += self.retPrS(myLp.lrBytes(i*100, 100))
+        if withTail:
+            myBa += self._retFileTail()
+        return myBa
+
+    def test_00(self):
+        """TestFileIndexUpdate.test_00(): update() with appended IFLRs and File Tail is the same as a full index."""
+        myIdx = FileIndexer.FileIndex(self._retFileFromBytes(self._retBytes(2, False)))
+        self.assertEqual([128, 64], myIdx.lrTypeS)
+        myLp = list(myIdx.genLogPasses())[0].logPass
+        self.assertEqual(200, myLp.totalFrames)
+        # Nothing added
+        self.assertEqual(0, myIdx.update(self._retFileFromBytes(self._retBytes(2, False))))
+        # Three IFLRs and the File Tail added
+        self.assertEqual(4, myIdx.update(self._retFileFromBytes(self._retBytes(5, True))))
+        self.assertEqual([128, 64, 129], myIdx.lrTypeS)
+        # The LogPass is extended in place
+        self.assertTrue(myLp is list(myIdx.genLogPasses())[0].logPass)
+        self.assertEqual(500, myLp.totalFrames)
+        myFullIdx = FileIndexer.FileIndex(self._retFileFromBytes(self._retBytes(5, True)))
+        myFullLp = list(myFullIdx.genLogPasses())[0].logPass
+        self.assertEqual(str(myFullLp.rle), str(myLp.rle))
+        self.assertEqual(myFullLp.xAxisLastVal, myLp.xAxisLastVal)
+
+    def test_01(self):
+        """TestFileIndexUpdate.test_01(): update() of an empty index reads from the start."""
+        myIdx = FileIndexer.FileIndex(self._retFileFromBytes(b''))
+        self.assertEqual(0, len(myIdx))
+        self.assertEqual(8, myIdx.update(self._retFileFromBytes(self._retBytes(5, True))))
+        self.assertEqual([128, 64, 129], myIdx.lrTypeS)
+
+    def test_02(self):
+        """TestFileIndexUpdate.test_02(): update() raises if the last Logical Record indexed has changed."""
+        myBa = self._retBytes(2, False)
+        myIdx = FileIndexer.FileIndex(self._retFileFromBytes(myBa))
+        myBa = self._retBytes(2, False)
+        # Change the last byte of logical data of the last IFLR
+        myBa[-1] ^= 0xFF
+        self.assertRaises(FileIndexer.ExceptionFileIndex, myIdx.update, self._retFileFromBytes(myBa))
+
+    def test_03(self):
+        """TestFileIndexUpdate.test_03(): update() raises on a different file ID."""
+        myIdx = FileIndexer.FileIndex(self._retFileFromBytes(self._retBytes(2, False)))
+        self.assertRaises(
+            FileIndexer.ExceptionFileIndex,
+            myIdx.update,
+            self._retFileFromBytes(self._retBytes(2, False), theId='OtherFile'),
+        )
+
 class Special(unittest.TestCase):
     """Special tests."""
     pass
@@ -365,6 +422,7 @@ def unitTest(theVerbosity=2):
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestIndexMarker))
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestIndexUnknownIntFormat))
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestIndex_genPlotRecords))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestFileIndexUpdate))
     myResult = unittest.TextTestRunner(verbosity=theVerbosity).run(suite)
     return (myResult.testsRun, len(myResult.errors), len(myResult.failures))
 ##################
@@ -1326,6 +1326,25 @@ class TestFrameSet_setFrameBytes(BaseTestClasses.TestBaseFile):
         myFs = FrameSet.FrameSet(self._dfsr, slice(1))
         self.assertRaises(FrameSet.ExceptionFrameSet, myFs.setFrameBytes, b'\x00\x00\x00\x00\x00', 0, 0, 0)
 
+    def test_10(self):
+        """TestFrameSet_setFrameBytes.test_10(): setFrameBuffers() then setFrameBytes() writes to the new buffer."""
+        myFs = FrameSet.FrameSet(self._dfsr, slice(2))
+        myBuf = numpy.zeros((2, 16))
+        myFs.setFrameBuffers(myBuf)
+        by = b'\x44\x4C\x80\x00' * 6 \
+            + b'\x00\x00\x00\x01\x00\x02\x00\x03\x00\x04\x00\x05\x00\x06\x00\x07' \
+            + b'\x00\x00\x01\x00\x00\x00\x01\x01'
+        myFs.setFrameBytes(by, 1, 0, 4)
+        self.assertTrue((myBuf[0] == 0.0).all())
+        self.assertEqual(153., myBuf[1, 0])
+        self.assertEqual(257., myBuf[1, 15])
+
+    def test_11(self):
+        """TestFrameSet_setFrameBytes.test_11(): setFrameBuffers() fails on wrong shape or indirect X vector."""
+        myFs = FrameSet.FrameSet(self._dfsr, slice(2))
+        self.assertRaises(FrameSet.ExceptionFrameSet, myFs.setFrameBuffers, numpy.zeros((3, 16)))
+        self.assertRaises(FrameSet.ExceptionFrameSet, myFs.setFrameBuffers, numpy.zeros((2, 16)), numpy.zeros((2,)))
+
 class TestFrameSet_setFrameBytes_Indirect(BaseTestClasses.TestBaseFile):
     """Tests FrameSet"""
     def setUp(self):
@@ -2651,6 +2670,16 @@ class TestFrameSetgenChScPoints(BaseTestClasses.TestBaseLogPass):
     def testSetUpTearDown(self):
         """TestFrameSetgenChScPoints: Tests setUp() and tearDown()."""
         pass
+
+    def _checkChScPointArrays(self, theFs, theChScS):
+        """Checks that chScPointArrays() gives the same points as genChScPoints()."""
+        for ch, sc in theChScS:
+            myXS, myVS = theFs.chScPointArrays(ch, sc)
+            self.assertEqual(
+                [v for v in theFs.genChScPoints(ch, sc)],
+                list(zip(myXS.tolist(), myVS.tolist())),
+                'ch={:d} sc={:d}'.format(ch, sc),
+            )
     
     def test_00(self):
         """TestFrameSetgenChScPoints.test_00(): 8 frames of 5 channels, using genChScPoints(), +ve indexes."""
@@ -2691,6 +2720,7 @@ class TestFrameSetgenChScPoints(BaseTestClasses.TestBaseLogPass):
         self.assertEqual([(d, v+2) for d,v in baseValS], [v for v in myFs.genChScPoints(-3, 0)])
         self.assertEqual([(d, v+3) for d,v in baseValS], [v for v in myFs.genChScPoints(-2, 0)])
         self.assertEqual([(d, v+4) for d,v in baseValS], [v for v in myFs.genChScPoints(-1, 0)])
+        self._checkChScPointArrays(myFs, [(ch, 0) for ch in range(numCh)])
 
     def test_01(self):
         """TestFrameSetgenChScPoints.test_01(): 8 frames of 5 channels, using genChScPoints(), -ve indexes."""
@@ -2890,6 +2920,7 @@ class TestFrameSetgenChScPoints(BaseTestClasses.TestBaseLogPass):
         for sc in range(5, 15, 1):
             expResult = [(2000.0, sc), (1996.0, sc), (1992.0, sc), (1988.0, sc)]
             self.assertEqual(expResult, [v for v in myFs.genChScPoints(1, sc)])
+        self._checkChScPointArrays(myFs, [(0, 0)] + [(1, sc) for sc in range(15)])
 
     def test_05(self):
         """TestFrameSetgenChScPoints.test_05(): indirect DEPT, 4 frames of Dipmeter 243, using genChScPoints()."""
@@ -3134,6 +3165,7 @@ class TestFrameSetgenChScPoints(BaseTestClasses.TestBaseLogPass):
         # Negative indexing
         self.assertEqual(expChValS[0], [v for v in myFs.genChScPoints(-2, 0)])
         self.assertEqual(expChValS[1], [v for v in myFs.genChScPoints(-1, 0)])
+        self._checkChScPointArrays(myFs, [(0, 0), (1, 0)])
 
     def test_12(self):
         """TestFrameSetgenChScPoints.test_12(): 8 frames of DEPT+1 channel with 1 sample, 1 burst, no declared spacing, frame step=16 using genChScPoints()."""
@@ -3479,6 +3511,14 @@ class TestFrameSetgenChScPoints(BaseTestClasses.TestBaseLogPass):
              ],
             [v for v in myFs.genChScPoints(0, 0)],
         )
+        self._checkChScPointArrays(myFs, [(0, 0)])
+
+    def test_17(self):
+        """TestFrameSetgenChScPoints.test_17(): chScPointArrays() with no frames gives empty arrays."""
+        myFile = self._createFileDFSROnly(2, 1, 1)
+        myFs = FrameSet.FrameSet(LogiRec.LrDFSRRead(myFile), slice(0))
+        myXS, myVS = myFs.chScPointArrays(1, 0)
+        self.assertEqual(([], []), (myXS.tolist(), myVS.tolist()))
 
 class TestFrameSetgenAll(BaseTestClasses.TestBaseLogPass):
     """Test the FrameSet genAll()."""
@@ -31,6 +31,7 @@ import os
 import sys
 import time
 import logging
+import tempfile
 import collections
 
 import numpy
@@ -268,6 +269,12 @@ class TestLogPassFromTestBase(BaseTestClasses.TestBaseLogPass):
         self.assertEqual(myLp.dfsr.frameSize(), 4*9)
         str(myLp)
 
+    def test_01(self):
+        """TestLogPassFromBaseTestClasses.test_01(): frameFromX() with no frames loaded raises."""
+        myF = self._retFileSinglePr(self._retDFSRBytes(9, 1, 1))
+        myLp = LogPass.LogPass(LogiRec.LrDFSRRead(myF), 'FileID')
+        self.assertRaises(LogPass.ExceptionLogPass, myLp.frameFromX, EngVal.EngVal(1000.0, b'FEET'))
+
 class TestLogPassStatic(BaseTestClasses.TestBaseFile):
     """Tests LogPass ctor and some internal functionality"""
     def setUp(self):
@@ -1463,7 +1470,9 @@ class TestLogPass_UpIndirect(BaseTestClasses.TestBaseLogPass):
                     val += 1.0
                 depth -= 60
             myPrS.append(self._retSinglePr(lrBytes))
-        self._file = self._retFileFromBytes(b''.join(myPrS))
+        # Keep the bytes for setFrameSetMP() that needs a file path
+        self._lisBytes = b''.join(myPrS)
+        self._file = self._retFileFromBytes(self._lisBytes)
         # Now read the file
         self._logPass = LogPass.LogPass(LogiRec.LrDFSRRead(self._file), self._file.fileId)
         self._file.skipToNextLr()
@@ -1635,6 +1644,149 @@ class TestLogPass_UpIndirect(BaseTestClasses.TestBaseLogPass):
             list(self._logPass.genFrameSetHeadings())
         )
 
+    def test_20(self):
+        """TestLogPass_UpIndirect.test_20(): setFrameSetX() X axis range within the first two LRs, the frame at the stop is not included."""
+        myUnits = self._logPass.xAxisUnits
+        self._logPass.setFrameSetX(self._file, EngVal.EngVal(119820.0, myUnits), EngVal.EngVal(119700.0, myUnits))
+        expVal = numpy.array(
+            [
+                [ 12.,  13.,  14.,  15.],
+                [ 16.,  17.,  18.,  19.],
+            ]
+        )
+        self.assertTrue((expVal == self._logPass.frameSet._frames).all())
+        expVal = numpy.array([119820., 119760.,])
+        self.assertTrue((expVal == self._logPass.frameSet._indrXVector).all())
+
+    def test_21(self):
+        """TestLogPass_UpIndirect.test_21(): setFrameSetX() X axis range reversed, clipped and a channel list."""
+        myUnits = self._logPass.xAxisUnits
+        self._logPass.setFrameSetX(
+            self._file,
+            EngVal.EngVal(0.0, myUnits),
+            EngVal.EngVal(119290.0, myUnits),
+            [Mnem.Mnem(b'0001'),],
+        )
+        # 119290.0 lies between frames 11 and 12 so frame 11 is included
+        self.assertEqual(4, self._logPass.frameSet.numFrames)
+        expVal = numpy.array([119340., 119280., 119220., 119160.,])
+        self.assertTrue((expVal == self._logPass.frameSet._indrXVector).all())
+        self.assertEqual([1,], list(self._logPass.frameSet.genExtChIndexes()))
+
+    def test_22(self):
+        """TestLogPass_UpIndirect.test_22(): setFrameSetX() X axis range outside the LogPass raises."""
+        myUnits = self._logPass.xAxisUnits
+        self.assertRaises(
+            LogPass.ExceptionLogPass,
+            self._logPass.setFrameSetX,
+            self._file,
+            EngVal.EngVal(130000.0, myUnits),
+            EngVal.EngVal(125000.0, myUnits),
+        )
+
+    def test_22_00(self):
+        """TestLogPass_UpIndirect.test_22_00(): setFrameSetX() is the same as setFrameSetChX() for the whole LogPass."""
+        myUnits = self._logPass.xAxisUnits
+        self._logPass.setFrameSetX(self._file, EngVal.EngVal(120000.0, myUnits), EngVal.EngVal(119160.0, myUnits))
+        self.assertEqual(14, self._logPass.frameSet.numFrames)
+        myFrames = self._logPass.frameSet._frames.copy()
+        self._logPass.setFrameSetChX(self._file, None, EngVal.EngVal(120000.0, myUnits), EngVal.EngVal(119160.0, myUnits))
+        self.assertTrue((myFrames == self._logPass.frameSet._frames).all())
+
+    def test_22_01(self):
+        """TestLogPass_UpIndirect.test_22_01(): setFrameSetX() with the start and stop in the same frame raises."""
+        myUnits = self._logPass.xAxisUnits
+        self.assertRaises(
+            LogPass.ExceptionLogPass,
+            self._logPass.setFrameSetX,
+            self._file,
+            EngVal.EngVal(119820.0, myUnits),
+            EngVal.EngVal(119790.0, myUnits),
+        )
+
+    def test_23(self):
+        """TestLogPass_UpIndirect.test_23(): frameFromX() uses the RLE X axis index."""
+        myUnits = self._logPass.xAxisUnits
+        self.assertEqual(0, self._logPass.frameFromX(EngVal.EngVal(120000.0, myUnits)))
+        self.assertEqual(4, self._logPass.frameFromX(EngVal.EngVal(119760.0, myUnits)))
+        self.assertEqual(5, self._logPass.frameFromX(EngVal.EngVal(119700.0, myUnits)))
+        self.assertEqual(14, self._logPass.frameFromX(EngVal.EngVal(119160.0, myUnits)))
+        self.assertRaises(LogPass.ExceptionLogPass, self._logPass.frameFromX, EngVal.EngVal(120001.0, myUnits))
+
+    def _setFrameSetMP(self, theFrSl, theChList, jobs):
+        """Writes the LIS file to disk and calls setFrameSetMP()."""
+        fd, myPath = tempfile.mkstemp(suffix='.lis')
+        try:
+            os.write(fd, self._lisBytes)
+            os.close(fd)
+            self._logPass.setFrameSetMP(myPath, theFrSl=theFrSl, theChList=theChList, jobs=jobs)
+        finally:
+            os.remove(myPath)
+
+    def test_30(self):
+        """TestLogPass_UpIndirect.test_30(): _retFrameSetRuns() divides on Logical Record boundaries."""
+        myMap = self._logPass._retFrameSetMap(None)
+        myRunS = self._logPass._retFrameSetRuns(myMap, 3)
+        self.assertEqual([0, 5, 10], [r[0] for r in myRunS])
+        self.assertEqual([1, 1, 1], [len(r[1]) for r in myRunS])
+        myRunS = self._logPass._retFrameSetRuns(myMap, 2)
+        self.assertEqual([0, 10], [r[0] for r in myRunS])
+        self.assertEqual(1, len(self._logPass._retFrameSetRuns(myMap, 1)))
+        self.assertEqual(3, len(self._logPass._retFrameSetRuns(myMap, 8)))
+
+    def test_31(self):
+        """TestLogPass_UpIndirect.test_31(): setFrameSetMP() all frames is the same as setFrameSet()."""
+        self._logPass.setFrameSet(self._file, theFrSl=None, theChList=None)
+        expFrames = self._logPass.frameSet.frames.copy()
+        expX = self._logPass.frameSet._indrXVector.copy()
+        for jobs in (1, 2, 3):
+            self._setFrameSetMP(None, None, jobs)
+            self.assertEqual(expFrames.shape, self._logPass.frameSet.frames.shape)
+            self.assertTrue((expFrames == self._logPass.frameSet.frames).all())
+            self.assertTrue((expX == self._logPass.frameSet._indrXVector).all())
+
+    def test_32(self):
+        """TestLogPass_UpIndirect.test_32(): setFrameSetMP() slice(1,15,3) and channels [0, 2]."""
+        self._setFrameSetMP(slice(1,15,3), [0, 2], 3)
+        expVal = numpy.array(
+            [
+                [  4.,   6.],
+                [ 16.,  18.],
+                [ 28.,  30.],
+                [ 40.,  42.],
+                [ 52.,  54.],
+            ]
+        )
+        self.assertTrue((expVal == self._logPass.frameSet.frames).all())
+        # Each X axis value is extrapolated from the start of its Logical Record
+        expVal = numpy.array([119940., 119760., 119580., 119400., 119220.,])
+        self.assertTrue((expVal == self._logPass.frameSet._indrXVector).all())
+
+    def test_33(self):
+        """TestLogPass_UpIndirect.test_33(): setFrameSetMP() with no frames raises."""
+        myLogPass = LogPass.LogPass(self._logPass.dfsr, self._file.fileId)
+        self.assertRaises(LogPass.ExceptionLogPass, myLogPass.setFrameSetMP, 'NoSuchFile.lis')
+
+    def test_40(self):
+        """TestLogPass_UpIndirect.test_40(): setFrameSet() with a compiled plan is the same as with events."""
+        for mySl, myChS in (
+                (None, None),
+                (slice(1, 15, 3), [0, 2]),
+                (slice(3, 12, 2), [3]),
+                (slice(6, 7, 1), [1, 2, 3]),
+            ):
+            self._logPass.setFrameSet(self._file, theFrSl=mySl, theChList=myChS)
+            self.assertTrue(self._logPass._plan.compiledPlan(list(self._logPass.frameSet.genExtChIndexes())) is not None)
+            actFrames = self._logPass.frameSet.frames.copy()
+            actX = self._logPass.frameSet._indrXVector.copy()
+            self._logPass.frameSet.frames.fill(0.0)
+            self._logPass._populateFrameSetFromEvents(
+                self._file,
+                self._logPass._genFrameSetEvents(mySl, list(self._logPass.frameSet.genExtChIndexes())),
+            )
+            self.assertTrue((self._logPass.frameSet.frames == actFrames).all())
+            self.assertTrue((self._logPass.frameSet._indrXVector == actX).all())
+
 
 @pytest.mark.slow
 class TestLogPass_PerfBase(BaseTestClasses.TestBaseFile):
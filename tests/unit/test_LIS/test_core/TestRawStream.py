@@ -30,8 +30,10 @@ import sys
 import io
 import time
 import logging
+import os
 import random
 import struct
+import tempfile
 from TotalDepth.LIS.core import RawStream
 
 ######################
@@ -191,6 +193,57 @@ class TestRawStream(unittest.TestCase):
         tE = time.perf_counter() - tS
         sys.stderr.write('Read rate %10.3f kB/s ' % (myStruct.size * myNum/(1024*tE)))
 
+class TestRawStreamMmap(unittest.TestCase):
+    """Tests RawStreamMmap."""
+    def test_00(self):
+        """TestRawStreamMmap: readAndUnpack(), read(), seek() and tell() on a io.BytesIO."""
+        myStruct = struct.Struct('>I')
+        with RawStream.RawStreamMmap(io.BytesIO(b'ABCDEFGH'), fileId='MyFile') as myRs:
+            self.assertEqual(myRs.tell(), 0)
+            self.assertEqual(myRs.readAndUnpack(myStruct), (0x41424344,))
+            self.assertEqual(myRs.tell(), myStruct.size)
+            self.assertEqual(myRs.read(2), b'EF')
+            myRs.seek(-1, os.SEEK_CUR)
+            self.assertEqual(myRs.read(-1), b'FGH')
+            self.assertEqual(myRs.read(4), b'')
+            myRs.seek(-4, os.SEEK_END)
+            self.assertEqual(myRs.readAndUnpack(myStruct), (0x45464748,))
+            self.assertRaises(RawStream.ExceptionRawStreamEOF, myRs.readAndUnpack, myStruct)
+            myRs.seek(6)
+            self.assertRaises(RawStream.ExceptionRawStreamEOF, myRs.readAndUnpack, myStruct)
+            self.assertEqual(myRs.tell(), 6)
+            self.assertRaises(RawStream.ExceptionRawStream, myRs.seek, -1)
+
+    def test_01(self):
+        """TestRawStreamMmap: memory map a file path, the same values as RawStream."""
+        myInts = [random.randint(0, 0xFFFFFFFF) for i in range(1024)]
+        myStruct = struct.Struct('>L')
+        with tempfile.TemporaryDirectory() as tmpDir:
+            myPath = os.path.join(tmpDir, 'test.bin')
+            with RawStream.RawStream(myPath, mode='wb') as myRs:
+                for anI in myInts:
+                    myRs.packAndWrite(myStruct, anI)
+            with RawStream.RawStreamMmap(myPath) as myRs:
+                self.assertEqual(myPath, myRs._fileId)
+                self.assertEqual(myInts, [myRs.readAndUnpack(myStruct)[0] for _i in myInts])
+                self.assertRaises(RawStream.ExceptionRawStreamEOF, myRs.readAndUnpack, myStruct)
+
+    def test_02(self):
+        """TestRawStreamMmap: empty file."""
+        with tempfile.TemporaryDirectory() as tmpDir:
+            myPath = os.path.join(tmpDir, 'test.bin')
+            open(myPath, 'wb').close()
+            with RawStream.RawStreamMmap(myPath) as myRs:
+                self.assertEqual(b'', myRs.read(4))
+                self.assertRaises(RawStream.ExceptionRawStreamEOF, myRs.readAndUnpack, struct.Struct('>L'))
+
+    def test_03(self):
+        """TestRawStreamMmap: is read only."""
+        self.assertRaises(RawStream.ExceptionRawStream, RawStream.RawStreamMmap, io.BytesIO(), mode='wb')
+        with RawStream.RawStreamMmap(io.BytesIO(b'ABCD'), fileId='MyFile') as myRs:
+            self.assertRaises(RawStream.ExceptionRawStream, myRs.write, b'A')
+            self.assertRaises(RawStream.ExceptionRawStream, myRs.packAndWrite, struct.Struct('>L'), 1)
+
 class Special(unittest.TestCase):
     """Special tests."""
     pass
@@ -198,6 +251,7 @@ class Special(unittest.TestCase):
 def unitTest(theVerbosity=2):
     suite = unittest.TestLoader().loadTestsFromTestCase(Special)
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestRawStream))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestRawStreamMmap))
     myResult = unittest.TextTestRunner(verbosity=theVerbosity).run(suite)
     return (myResult.testsRun, len(myResult.errors), len(myResult.failures))
 ##################
@@ -393,6 +393,54 @@ class TestRleType01XAxis(unittest.TestCase):
         self.assertEqual(128, myR.totalFrames())
 
 
+    def test_02(self):
+        """TestRleType01XAxis.test_02(): frameForXaxis() single range, down log."""
+        myR = Rle.RLEType01(b'FEET')
+        for i, v in enumerate(range(0, 2048, 128)):
+            myR.add(v, 8, 8*0.5*i)
+        self.assertEqual(0, myR.frameForXaxis(0.0))
+        self.assertEqual(0, myR.frameForXaxis(0.25))
+        self.assertEqual(1, myR.frameForXaxis(0.5))
+        self.assertEqual(8, myR.frameForXaxis(4.0))
+        self.assertEqual(127, myR.frameForXaxis(63.5))
+        # Out of range
+        self.assertEqual(-1, myR.frameForXaxis(-0.5))
+        self.assertEqual(128, myR.frameForXaxis(64.0))
+
+    def test_03(self):
+        """TestRleType01XAxis.test_03(): frameForXaxis() single range, up log."""
+        myR = Rle.RLEType01(b'FEET')
+        for i, v in enumerate(range(0, 2048, 128)):
+            myR.add(v, 8, 8*-0.5*i)
+        self.assertEqual(0, myR.frameForXaxis(0.0))
+        self.assertEqual(0, myR.frameForXaxis(-0.25))
+        self.assertEqual(1, myR.frameForXaxis(-0.5))
+        self.assertEqual(8, myR.frameForXaxis(-4.0))
+        self.assertEqual(127, myR.frameForXaxis(-63.5))
+        self.assertEqual(-1, myR.frameForXaxis(0.5))
+
+    def test_04(self):
+        """TestRleType01XAxis.test_04(): frameForXaxis() multiple ranges with variable frames per LR."""
+        myR = Rle.RLEType01(b'FEET')
+        # 2 frames then 1 frame per LR, 0.5 feet per frame
+        myR.add(0, 2, 0.0)
+        myR.add(1000, 1, 1.0)
+        myR.add(1100, 1, 1.5)
+        myR.add(1200, 1, 2.0)
+        myR.add(5000, 2, 2.5)
+        self.assertEqual(3, len(myR))
+        self.assertEqual(7, myR.totalFrames())
+        self.assertEqual(0.5, myR.frameSpacing())
+        for f in range(7):
+            self.assertEqual(f, myR.frameForXaxis(0.5 * f))
+        self.assertEqual((1200, 0), myR.tellLrForFrame(4))
+        self.assertEqual((5000, 1), myR.tellLrForFrame(6))
+        # Adding invalidates the index
+        myR.add(5100, 2, 3.5)
+        self.assertEqual(9, myR.totalFrames())
+        self.assertEqual((5100, 1), myR.tellLrForFrame(8))
+        self.assertEqual(8, myR.frameForXaxis(4.0))
+
 
 class Special(unittest.TestCase):
     """Special tests."""
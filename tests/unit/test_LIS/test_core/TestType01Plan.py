@@ -31,8 +31,13 @@ import sys
 import time
 import logging
 import pprint
+import struct
+
+import numpy
 
 from TotalDepth.LIS.core import Type01Plan
+from TotalDepth.LIS.core import RepCode
+from TotalDepth.LIS.core import cFrameSet
 
 ######################
 # Section: Unit tests.
@@ -49,8 +54,9 @@ class MockEntryBlockSet(object):
         self.depthRepCode = rc
         
 class MockDsb(object):
-    def __init__(self, s):
+    def __init__(self, s, rc=68):
         self.size = s
+        self.repCode = rc
         
 class MockDFSR(object):
     def __init__(self, ebs, dsbS):
@@ -764,6 +770,113 @@ class TestType01PlanGenEventsIndirect(unittest.TestCase):
         self.assertEqual(expList, actList)
 
 
+class TestType01PlanCompiled(unittest.TestCase):
+    """Tests FrameSetPlan.compiledPlan() and applyPlan()."""
+    def setUp(self):
+        """Set up. 5 channels, 68, 79, 73, 68 (4 values), 49, frame size 28 bytes.
+        The values are consecutive integers apart from the Representation Code 49 value."""
+        myDfsr = MockDFSR(
+            MockEntryBlockSet(1, 73),
+            [MockDsb(4, 68), MockDsb(2, 79), MockDsb(4, 73), MockDsb(16, 68), MockDsb(2, 49)],
+        )
+        self._tp = Type01Plan.FrameSetPlan(myDfsr)
+        self.assertEqual(28, self._tp.frameSize)
+        # 3 frames with indirect X
+        self._by = bytearray(RepCode.writeBytes(1000, 73))
+        val = 0
+        for f in range(3):
+            self._by.extend(RepCode.writeBytes(float(val), 68))
+            # RepCode.writeBytes() does not support 79 or 49 so write these directly
+            self._by.extend(struct.pack('>h', val + 1))
+            self._by.extend(RepCode.writeBytes(val + 2, 73))
+            for v in range(4):
+                self._by.extend(RepCode.writeBytes(float(val + 3 + v), 68))
+            # 153.0
+            self._by.extend(b'\x4c\x88')
+            val += 8
+        self._by = bytes(self._by)
+        self.assertEqual(4 + 3 * 28, len(self._by))
+
+    def test_00(self):
+        """TestType01PlanCompiled.test_00(): compiledPlan() all channels."""
+        expVal = [
+            [ 0, 4, 0, 68],
+            [ 4, 2, 1, 79],
+            [ 6, 4, 2, 73],
+            [10, 4, 3, 68],
+            [14, 4, 4, 68],
+            [18, 4, 5, 68],
+            [22, 4, 6, 68],
+            [26, 2, 7, 49],
+        ]
+        self.assertEqual(expVal, self._tp.compiledPlan(list(range(5))).tolist())
+
+    def test_01(self):
+        """TestType01PlanCompiled.test_01(): compiledPlan() channels [4, 1]."""
+        expVal = [
+            [ 4, 2, 0, 79],
+            [26, 2, 1, 49],
+        ]
+        self.assertEqual(expVal, self._tp.compiledPlan([4, 1]).tolist())
+        self.assertEqual((0, 4), self._tp.compiledPlan([]).shape)
+
+    def test_02(self):
+        """TestType01PlanCompiled.test_02(): compiledPlan() returns None for unsupported Representation Codes."""
+        myDfsr = MockDFSR(
+            MockEntryBlockSet(1, 73),
+            [MockDsb(4, 68), MockDsb(4, 234), MockDsb(3, 68)],
+        )
+        myTp = Type01Plan.FrameSetPlan(myDfsr)
+        self.assertTrue(myTp.compiledPlan([0]) is not None)
+        # Dipmeter
+        self.assertTrue(myTp.compiledPlan([1]) is None)
+        # Not a multiple of the word length
+        self.assertTrue(myTp.compiledPlan([0, 2]) is None)
+        self.assertRaises(Type01Plan.ExceptionFrameSetPlanOverrun, myTp.compiledPlan, [3])
+
+    def test_03(self):
+        """TestType01PlanCompiled.test_03(): applyPlan() frames [0, 2] all channels."""
+        frames = numpy.zeros((3, 8))
+        Type01Plan.applyPlan(
+            self._by, 4, 28, numpy.array([0, 2], dtype=numpy.intp),
+            self._tp.compiledPlan(list(range(5))), frames, 1,
+        )
+        expVal = [
+            [ 0.0 for i in range(8)],
+            [ float(i) for i in range(7)] + [153.0],
+            [ float(i) for i in range(16, 23)] + [153.0],
+        ]
+        self.assertEqual(expVal, frames.tolist())
+
+    def test_04(self):
+        """TestType01PlanCompiled.test_04(): cFrameSet.applyPlan() is the same as Type01Plan.applyPlan()."""
+        for chS, frS in (
+                (list(range(5)), [0, 1, 2]),
+                ([1, 3], [1, 2]),
+                ([4], [2]),
+            ):
+            myPlan = self._tp.compiledPlan(chS)
+            myFrNums = numpy.array(frS, dtype=numpy.intp)
+            expFrames = numpy.zeros((len(frS), len(myPlan)))
+            Type01Plan.applyPlan(self._by, 4, 28, myFrNums, myPlan, expFrames, 0)
+            actFrames = numpy.zeros((len(frS), len(myPlan)))
+            cFrameSet.applyPlan(self._by, 4, 28, myFrNums, myPlan, actFrames, 0)
+            self.assertTrue((expFrames == actFrames).all())
+
+    def test_05(self):
+        """TestType01PlanCompiled.test_05(): applyPlan() raises IndexError on overrun."""
+        myPlan = self._tp.compiledPlan(list(range(5)))
+        for fn in (Type01Plan.applyPlan, cFrameSet.applyPlan):
+            # Frame beyond the Logical Data
+            self.assertRaises(
+                IndexError, fn, self._by, 4, 28, numpy.array([3], dtype=numpy.intp), myPlan, numpy.zeros((1, 8)), 0,
+            )
+            # Too many frames for the array
+            self.assertRaises(
+                IndexError, fn, self._by, 4, 28, numpy.array([0, 1], dtype=numpy.intp), myPlan, numpy.zeros((2, 8)), 1,
+            )
+
+
 class TestType01Plan_PerfBase(BaseTestClasses.TestBase):
     """Tests ..."""
     def _timeEvents(self, theFrameSlice, theChRange):
@@ -972,6 +1085,7 @@ def unitTest(theVerbosity=2):
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestType01PlanGenEvents_LowLevel))
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestType01PlanGenEvents))
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestType01PlanGenEventsIndirect))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestType01PlanCompiled))
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestType01Plan_Perf))
     #suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestType01Plan_Perf_Profile))
     myResult = unittest.TextTestRunner(verbosity=theVerbosity).run(suite)
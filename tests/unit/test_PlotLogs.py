@@ -0,0 +1,152 @@
+import argparse
+import json
+import os
+import shutil
+
+import pytest
+
+import TotalDepth
+from TotalDepth import PlotLogs
+from TotalDepth.common import process
+import TotalDepth.LIS.core.File
+import TotalDepth.LIS.core.FileIndexer
+
+
+EXAMPLE_LIS_FILE = os.path.join(
+    os.path.dirname(TotalDepth.__file__), os.path.pardir, os.path.pardir,
+    'example_data', 'LIS', 'data', 'DILLSON-1_WELL_LOGS_FILE-013.LIS',
+)
+
+
+def _opts(jobs, LgFormat_min=0, tile=0.0):
+    return argparse.Namespace(
+        recurse=False, keepGoing=True, LgFormat=[], apiHeader=True, LgFormat_min=LgFormat_min,
+        scale=0, decimate=0.0, tile=tile, jobs=jobs,
+    )
+
+
+def _plot(path_out, jobs, LgFormat_min, tile=0.0):
+    """Plots EXAMPLE_LIS_FILE to path_out and returns ({file_name: bytes, ...}, PlotLogInfo)."""
+    if os.path.exists(path_out):
+        shutil.rmtree(path_out)
+    plp = PlotLogs.PlotLogPasses(EXAMPLE_LIS_FILE, os.path.join(path_out, 'plot'), _opts(jobs, LgFormat_min, tile))
+    files = {}
+    for name in os.listdir(path_out):
+        with open(os.path.join(path_out, name), 'rb') as f:
+            files[name] = f.read()
+    return files, plp.plotLogInfo
+
+
+def _plot_log_info_lines(plot_log_info):
+    # Drop the first line as that has the repr() of the object.
+    return str(plot_log_info).split('\n')[1:]
+
+
+def _log_pass_and_tasks(plp, lis_file, path_out):
+    index = TotalDepth.LIS.core.FileIndexer.FileIndex(lis_file)
+    tasks = []
+    for lp_idx, prs in enumerate(index.genPlotRecords(fromInternalRecords=False)):
+        tasks += plp._retTasksLISUsingLgFormats(lis_file, lp_idx, prs, path_out)
+    return tasks[0].logPass, tasks
+
+
+@pytest.mark.parametrize('LgFormat_min', (0, 3))
+@pytest.mark.parametrize('jobs', (1, 2, 4))
+def test_plot_parallel_same_as_serial(tmpdir, jobs, LgFormat_min):
+    # Same output directory as the SVG titles contain the absolute path.
+    path_out = str(tmpdir.join('out'))
+    serial_files, serial_info = _plot(path_out, -1, LgFormat_min)
+    parallel_files, parallel_info = _plot(path_out, jobs, LgFormat_min)
+    assert len(serial_files) > 1
+    assert sorted(parallel_files.keys()) == sorted(serial_files.keys())
+    for name in serial_files:
+        assert parallel_files[name] == serial_files[name], name
+    assert _plot_log_info_lines(parallel_info) == _plot_log_info_lines(serial_info)
+    assert parallel_info.plotCntr == serial_info.plotCntr == len(serial_files)
+    assert parallel_info.curvePoints == serial_info.curvePoints
+
+
+@pytest.mark.parametrize('LgFormat_min', (0, 3))
+def test_plot_tiles_parallel_same_as_serial(tmpdir, LgFormat_min):
+    path_out = str(tmpdir.join('out'))
+    serial_files, serial_info = _plot(path_out, -1, LgFormat_min, tile=4.0)
+    parallel_files, parallel_info = _plot(path_out, 4, LgFormat_min, tile=4.0)
+    manifests = [name for name in serial_files if name.endswith('.json')]
+    assert len(manifests) > 0
+    assert sorted(parallel_files.keys()) == sorted(serial_files.keys())
+    for name in serial_files:
+        assert parallel_files[name] == serial_files[name], name
+    assert _plot_log_info_lines(parallel_info) == _plot_log_info_lines(serial_info)
+    assert parallel_info.plotCntr == serial_info.plotCntr == len(serial_files) - len(manifests)
+    for name in manifests:
+        manifest = json.loads(serial_files[name].decode('ascii'))
+        assert len(manifest['tiles']) > 1
+        assert all(tile['file'] in serial_files for tile in manifest['tiles'])
+
+
+def test_plot_tasks_one_per_tile(tmpdir):
+    plp = PlotLogs.PlotLogPasses(str(tmpdir.join('none')), str(tmpdir.join('out')), _opts(-1, 3, tile=4.0))
+    lis_file = TotalDepth.LIS.core.File.FileRead(EXAMPLE_LIS_FILE, theFileId=EXAMPLE_LIS_FILE, keepGoing=True)
+    log_pass, tasks = _log_pass_and_tasks(plp, lis_file, str(tmpdir.join('out')))
+    film_ids = []
+    for task in tasks:
+        if task.filmId not in film_ids:
+            film_ids.append(task.filmId)
+    assert len(tasks) > len(film_ids)
+    for film_id in film_ids:
+        tiles = [t.tile for t in tasks if t.filmId == film_id]
+        assert [t.index for t in tiles] == list(range(len(tiles)))
+        assert len(set(t.filePath for t in tiles)) == len(tiles)
+        assert len(set(t.outFilePath for t in tiles)) == 1
+
+
+def test_load_shared_frame_sets_union_of_channels(tmpdir):
+    plp = PlotLogs.PlotLogPasses(str(tmpdir.join('none')), str(tmpdir.join('out')), _opts(-1, 3))
+    lis_file = TotalDepth.LIS.core.File.FileRead(EXAMPLE_LIS_FILE, theFileId=EXAMPLE_LIS_FILE, keepGoing=True)
+    log_pass, tasks = _log_pass_and_tasks(plp, lis_file, str(tmpdir.join('out')))
+    assert len(tasks) > 1
+    assert all(t.logPass is log_pass for t in tasks)
+    channels = set()
+    for task in tasks:
+        channels |= set(task.plot.retFrameSetChIDsLIS(task.logPass, task.filmId))
+    # Each plot needs only some of the channels.
+    assert all(
+        len(t.plot.retFrameSetChIDsLIS(t.logPass, t.filmId)) < len(channels) for t in tasks
+    )
+    plp._loadSharedFrameSets(lis_file, tasks)
+    assert list(log_pass.frameSet.genExtChIndexes()) == log_pass.retExtChIndexList(channels)
+    assert log_pass.frameSet.numFrames == log_pass.totalFrames - 1
+
+
+def test_plot_load_frame_set_frames(tmpdir):
+    """Plot._loadFrameSet() loads the frames from the first X up to, but not including, the last X."""
+    plp = PlotLogs.PlotLogPasses(str(tmpdir.join('none')), str(tmpdir.join('out')), _opts(-1, 3))
+    lis_file = TotalDepth.LIS.core.File.FileRead(EXAMPLE_LIS_FILE, theFileId=EXAMPLE_LIS_FILE, keepGoing=True)
+    log_pass, tasks = _log_pass_and_tasks(plp, lis_file, str(tmpdir.join('out')))
+    assert log_pass.totalFrames == 412
+    assert log_pass.xAxisFirstEngVal.value == 295080.0
+    assert log_pass.xAxisLastEngVal.value == 270420.0
+    task = tasks[0]
+    task.plot._loadFrameSet(lis_file, log_pass, log_pass.xAxisFirstEngVal, log_pass.xAxisLastEngVal, task.filmId)
+    frame_set = log_pass.frameSet
+    assert frame_set.numFrames == 411
+    assert frame_set.xAxisValue(0) == 295080.0
+    assert frame_set.xAxisValue(frame_set.numFrames - 1) == 270480.0
+    # The shared FrameSet has the same frames.
+    plp._loadSharedFrameSets(lis_file, tasks)
+    assert log_pass.frameSet.numFrames == 411
+    assert log_pass.frameSet.xAxisValue(0) == 295080.0
+    assert log_pass.frameSet.xAxisValue(log_pass.frameSet.numFrames - 1) == 270480.0
+
+
+@pytest.mark.parametrize('jobs', (-1, 2))
+def test_plot_stages(tmpdir, jobs):
+    process.reset_stages()
+    files, info = _plot(str(tmpdir.join('out')), jobs, 3)
+    data = process.stage_data()
+    process.reset_stages()
+    assert 'index' in data['timers']
+    assert data['timers']['plot']['count'] == info.plotCntr == len(files)
+    assert data['counters']['plot.files_out'] == len(files)
+    assert data['counters']['files_in'] == 1
+    assert ('frames' in data['timers']) == (jobs > 0)
@@ -34,6 +34,7 @@ import sys
 import os
 import time
 import logging
+import tempfile
 import unittest
 #import io
 
@@ -135,6 +136,78 @@ class TestDirWalk(unittest.TestCase):
         except DirWalk.ExceptionDirWalk:
             pass
 
+class TestDirWalkSize(unittest.TestCase):
+    """Tests the sizes and biggest first order of dirWalk on a known tree."""
+    def setUp(self):
+        """Set up."""
+        self._tempDir = tempfile.TemporaryDirectory()
+        self._dIn = self._tempDir.name
+        for aPath, aSize in (
+                ('a.lis', 10),
+                ('b.lis', 300),
+                ('c.py', 20),
+                (os.path.join('sub', 'd.lis'), 500),
+                (os.path.join('sub', 'e.lis'), 20),
+                (os.path.join('sub', 'sub', 'f.lis'), 100),
+            ):
+            myPath = os.path.join(self._dIn, aPath)
+            os.makedirs(os.path.dirname(myPath), exist_ok=True)
+            with open(myPath, 'wb') as f:
+                f.write(b' ' * aSize)
+
+    def tearDown(self):
+        """Tear down."""
+        self._tempDir.cleanup()
+
+    def _relSizes(self, theFileInOutS):
+        return [(os.path.relpath(v.filePathIn, self._dIn), v.size) for v in theFileInOutS]
+
+    def test_00(self):
+        """TestDirWalkSize.test_00(): Tests setUp() and tearDown()."""
+        pass
+
+    def test_01(self):
+        """TestDirWalkSize.test_01(): Alphanumeric order with sizes and output paths."""
+        myResult = list(DirWalk.dirWalk(self._dIn, theOut='spam', theFnMatch='*.lis', recursive=True))
+        self.assertEqual(
+            [
+                ('a.lis', 10),
+                ('b.lis', 300),
+                (os.path.join('sub', 'd.lis'), 500),
+                (os.path.join('sub', 'e.lis'), 20),
+                (os.path.join('sub', 'sub', 'f.lis'), 100),
+            ],
+            self._relSizes(myResult),
+        )
+        self.assertEqual(os.path.join('spam', 'sub', 'd.lis'), myResult[2].filePathOut)
+
+    def test_02(self):
+        """TestDirWalkSize.test_02(): Biggest first across the whole tree, equal sizes in path order."""
+        myResult = list(DirWalk.dirWalk(self._dIn, theOut='spam', recursive=True, bigFirst=True))
+        self.assertEqual(
+            [
+                (os.path.join('sub', 'd.lis'), 500),
+                ('b.lis', 300),
+                (os.path.join('sub', 'sub', 'f.lis'), 100),
+                ('c.py', 20),
+                (os.path.join('sub', 'e.lis'), 20),
+                ('a.lis', 10),
+            ],
+            self._relSizes(myResult),
+        )
+        self.assertEqual(os.path.join('spam', 'sub', 'sub', 'f.lis'), myResult[2].filePathOut)
+
+    def test_03(self):
+        """TestDirWalkSize.test_03(): Biggest first, not recursive."""
+        myResult = list(DirWalk.dirWalk(self._dIn, recursive=False, bigFirst=True))
+        self.assertEqual([('b.lis', 300), ('c.py', 20), ('a.lis', 10)], self._relSizes(myResult))
+        self.assertEqual('', myResult[0].filePathOut)
+
+    def test_04(self):
+        """TestDirWalkSize.test_04(): gen_big_first() is biggest first."""
+        self.assertEqual(['b.lis', 'c.py', 'a.lis'], list(DirWalk.gen_big_first(self._dIn)))
+
+
 class Special(unittest.TestCase):
     """Special tests."""
     pass
@@ -143,6 +216,7 @@ def unitTest(theVerbosity=2):
     suite = unittest.TestLoader().loadTestsFromTestCase(Special)
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestDirWalk))
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestGenBigFirst))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestDirWalkSize))
     myResult = unittest.TextTestRunner(verbosity=theVerbosity).run(suite)
     return (myResult.testsRun, len(myResult.errors), len(myResult.failures))
 ##################
@@ -273,6 +273,83 @@ this line.""")
 """)
 
 
+class TestXmlWriteBuffered(unittest.TestCase):
+    """Tests XmlWrite with buffered output and the attribute cache."""
+    def _writeDoc(self, theBufSize):
+        myF = io.StringIO()
+        with XmlWrite.XhtmlStream(myF, theBufSize=theBufSize) as xS:
+            with XmlWrite.Element(xS, 'Root', {'version' : '12.0'}):
+                for i in range(8):
+                    with XmlWrite.Element(xS, 'A', {'attr_1' : '1', 'attr_0' : '<&>'}):
+                        xS.characters('Line {:d} \u00e9\t"\'"'.format(i))
+                    xS.comment(' Comment {:d} '.format(i))
+        return myF.getvalue()
+
+    def test_00(self):
+        """TestXmlWriteBuffered.test_00(): buffered output is the same as unbuffered."""
+        myExpected = self._writeDoc(0)
+        self.assertEqual(myExpected.count('<A attr_0="&lt;&amp;&gt;" attr_1="1">Line'), 8)
+        self.assertTrue('Line 3 &#233;&#009;&quot;&apos;&quot;</A>' in myExpected)
+        for aSize in (1, 7, 64, XmlWrite.DEFAULT_BUFFER_SIZE):
+            self.assertEqual(self._writeDoc(aSize), myExpected)
+
+    def test_01(self):
+        """TestXmlWriteBuffered.test_01(): nothing is written until flush()."""
+        myF = io.StringIO()
+        xS = XmlWrite.XmlStream(myF, theBufSize=1024)
+        xS.startElement('Root', {'version' : '12.0'})
+        xS.characters('Text')
+        self.assertEqual(myF.getvalue(), '')
+        xS.flush()
+        self.assertEqual(myF.getvalue(), '\n<Root version="12.0">Text')
+        xS.flush()
+        self.assertEqual(myF.getvalue(), '\n<Root version="12.0">Text')
+
+    def test_02(self):
+        """TestXmlWriteBuffered.test_02(): attribute cache."""
+        myF = io.StringIO()
+        with XmlWrite.XmlStream(myF) as xS:
+            with XmlWrite.Element(xS, 'Root', {'b' : '"', 'a' : '1'}):
+                with XmlWrite.Element(xS, 'A', {'b' : '"', 'a' : '1'}):
+                    pass
+                with XmlWrite.Element(xS, 'A', {'a' : '1', 'b' : '"'}):
+                    pass
+                with XmlWrite.Element(xS, 'A', {'a' : 'x' * (XmlWrite.XmlStream.ATTR_CACHE_MAX_VALUE_LEN + 1)}):
+                    pass
+            self.assertEqual(len(xS._attrCache), 1)
+        self.assertEqual(myF.getvalue(), """<?xml version='1.0' encoding="utf-8"?>
+<Root a="1" b="&quot;">
+  <A a="1" b="&quot;"/>
+  <A a="1" b="&quot;"/>
+  <A a="{:s}"/>
+</Root>
+""".format('x' * (XmlWrite.XmlStream.ATTR_CACHE_MAX_VALUE_LEN + 1)))
+
+    def test_03(self):
+        """TestXmlWriteBuffered.test_03(): renderElements() is the same as writing the elements."""
+        myElemS = [('A', {'b' : '"', 'a' : '1'}, None), ('B', {}, '<text>'), ('C', {'c' : '2'}, '')]
+        myF = io.StringIO()
+        with XmlWrite.XmlStream(myF) as xS:
+            with XmlWrite.Element(xS, 'Root', {}):
+                for name, attrs, text in myElemS:
+                    with XmlWrite.Element(xS, name, attrs):
+                        if text is not None:
+                            xS.characters(text)
+        myExpected = myF.getvalue()
+        myF = io.StringIO()
+        with XmlWrite.XmlStream(myF) as xS:
+            with XmlWrite.Element(xS, 'Root', {}):
+                self.assertEqual((1, True), xS.renderContext)
+                xS.writeRendered(xS.renderElements(myElemS))
+        self.assertEqual(myF.getvalue(), myExpected)
+        self.assertEqual(myExpected, """<?xml version='1.0' encoding="utf-8"?>
+<Root>
+  <A a="1" b="&quot;"/>
+  <B>&lt;text&gt;</B>
+  <C c="2"></C>
+</Root>
+""")
+
 class NullClass(unittest.TestCase):
     pass
 
@@ -280,6 +357,7 @@ def unitTest(theVerbosity=2):
     suite = unittest.TestLoader().loadTestsFromTestCase(NullClass)
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestXmlWrite))
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestXhtmlWrite))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestXmlWriteBuffered))
     myResult = unittest.TextTestRunner(verbosity=theVerbosity).run(suite)
     return (myResult.testsRun, len(myResult.errors), len(myResult.failures))
 ##################
@@ -0,0 +1,167 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from TotalDepth.util import CopyBinFiles
+
+
+def _write(path, content: bytes) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as fobj:
+        fobj.write(content)
+    return path
+
+
+@pytest.fixture
+def copy_tree(tmpdir):
+    """A tree with PDF, XML and text files and a ZIP that contains a PDF and a nested ZIP that contains a PDF."""
+    root = os.path.join(str(tmpdir), 'in')
+    _write(os.path.join(root, 'a.pdf'), b'%PDF-1.4')
+    _write(os.path.join(root, 'b.xml'), b'<?xml version="1.0"?>')
+    _write(os.path.join(root, 'sub', 'c.pdf'), b'%PDF-1.5')
+    _write(os.path.join(root, 'sub', 'd.txt'), b'Some text.')
+    inner = io.BytesIO()
+    with zipfile.ZipFile(inner, 'w') as zip_file:
+        zip_file.writestr('f.pdf', b'%PDF-1.6')
+    os.makedirs(os.path.join(root, 'zip'))
+    with zipfile.ZipFile(os.path.join(root, 'zip', 'e.zip'), 'w') as zip_file:
+        zip_file.writestr('e.pdf', b'%PDF-1.7')
+        zip_file.writestr('e.txt', b'More text.')
+        zip_file.writestr('inner.zip', inner.getvalue())
+    return root
+
+
+def _rel(root, paths):
+    return [os.path.relpath(p, root) for p in paths]
+
+
+EXPECTED_PDF = [
+    'a.pdf',
+    os.path.join('sub', 'c.pdf'),
+    os.path.join('zip', 'e', 'e.pdf'),
+    os.path.join('zip', 'e', 'inner', 'f.pdf'),
+]
+
+
+@pytest.mark.parametrize('jobs', (1, 4))
+def test_copy_files(copy_tree, jobs):
+    path_out = os.path.join(os.path.dirname(copy_tree), 'out')
+    stats = CopyBinFiles.CopyStats()
+    result = CopyBinFiles.copy_files(copy_tree, path_out, {'PDF'}, False, False, jobs=jobs, stats=stats)
+    assert _rel(path_out, result) == EXPECTED_PDF
+    with open(os.path.join(path_out, 'zip', 'e', 'inner', 'f.pdf'), 'rb') as fobj:
+        assert fobj.read() == b'%PDF-1.6'
+    assert os.path.isfile(os.path.join(copy_tree, 'a.pdf'))
+    assert stats.files_scanned == 5
+    assert stats.files_copied == 4
+    assert stats.bytes_copied == 4 * 8
+    assert stats.backlog == 0
+    assert stats.errors == 0
+
+
+def test_copy_files_move(copy_tree):
+    path_out = os.path.join(os.path.dirname(copy_tree), 'out')
+    result = CopyBinFiles.copy_files(copy_tree, path_out, {'XML'}, True, False)
+    assert _rel(path_out, result) == ['b.xml']
+    assert not os.path.exists(os.path.join(copy_tree, 'b.xml'))
+
+
+def test_copy_files_nervous(copy_tree):
+    path_out = os.path.join(os.path.dirname(copy_tree), 'out')
+    CopyBinFiles.copy_files(copy_tree, path_out, {'PDF'}, False, True)
+    assert not os.path.exists(path_out)
+
+
+def test_copy_file_preserves_metadata(copy_tree):
+    path_in = os.path.join(copy_tree, 'a.pdf')
+    os.utime(path_in, ns=(10**18, 10**18))
+    path_out = os.path.join(copy_tree, 'a_copy.pdf')
+    assert CopyBinFiles.copy_file(path_in, path_out, False) == path_out
+    assert os.stat(path_out).st_mtime_ns == 10**18
+    assert not os.path.exists(path_out + CopyBinFiles.TEMP_SUFFIX)
+
+
+@pytest.mark.parametrize('jobs', (1, 4))
+def test_copy_files_resume(copy_tree, jobs):
+    path_out = os.path.join(os.path.dirname(copy_tree), 'out')
+    journal_path = os.path.join(os.path.dirname(copy_tree), 'journal.jsonl')
+    result = CopyBinFiles.copy_files(copy_tree, path_out, {'PDF'}, False, False, jobs=jobs, journal_path=journal_path)
+    # Simulate an interruption with a partial last line
+    with open(journal_path, 'a') as fobj:
+        fobj.write('["partial')
+    os.remove(os.path.join(path_out, 'sub', 'c.pdf'))
+    stats = CopyBinFiles.CopyStats()
+    result_resumed = CopyBinFiles.copy_files(
+        copy_tree, path_out, {'PDF'}, False, False, jobs=jobs, journal_path=journal_path, stats=stats
+    )
+    assert result_resumed == result
+    # Only the file with a missing destination is copied again, a.pdf and e.zip are already done.
+    assert stats.files_copied == 1
+    assert stats.files_resumed == 2
+    stats = CopyBinFiles.CopyStats()
+    assert CopyBinFiles.copy_files(
+        copy_tree, path_out, {'PDF'}, False, False, jobs=jobs, journal_path=journal_path, stats=stats
+    ) == result
+    assert stats.files_copied == 0
+    assert stats.files_resumed == 3
+
+
+@pytest.mark.parametrize('jobs', (1, 4))
+def test_copy_files_resume_other_file_types_or_path_out(copy_tree, jobs):
+    path_out = os.path.join(os.path.dirname(copy_tree), 'out')
+    journal_path = os.path.join(os.path.dirname(copy_tree), 'journal.jsonl')
+    CopyBinFiles.copy_files(copy_tree, path_out, {'PDF'}, False, False, jobs=jobs, journal_path=journal_path)
+    # The journal entries for PDF files do not apply to a copy of XML files.
+    stats = CopyBinFiles.CopyStats()
+    result = CopyBinFiles.copy_files(
+        copy_tree, path_out, {'XML'}, False, False, jobs=jobs, journal_path=journal_path, stats=stats
+    )
+    assert _rel(path_out, result) == ['b.xml']
+    assert stats.files_resumed == 0
+    # Nor to a copy of PDF files to a different destination.
+    other_path_out = os.path.join(os.path.dirname(copy_tree), 'other')
+    stats = CopyBinFiles.CopyStats()
+    result = CopyBinFiles.copy_files(
+        copy_tree, other_path_out, {'PDF'}, False, False, jobs=jobs, journal_path=journal_path, stats=stats
+    )
+    assert _rel(other_path_out, result) == EXPECTED_PDF
+    assert stats.files_copied == 4
+    assert stats.files_resumed == 0
+    # The original copy is still done.
+    stats = CopyBinFiles.CopyStats()
+    CopyBinFiles.copy_files(copy_tree, path_out, {'PDF'}, False, False, jobs=jobs, journal_path=journal_path, stats=stats)
+    assert stats.files_copied == 0
+    assert stats.files_resumed == 3
+
+
+@pytest.mark.parametrize('jobs', (1, 4))
+def test_copy_files_resume_does_not_open_copied_files(copy_tree, jobs, monkeypatch):
+    path_out = os.path.join(os.path.dirname(copy_tree), 'out')
+    journal_path = os.path.join(os.path.dirname(copy_tree), 'journal.jsonl')
+    CopyBinFiles.copy_files(copy_tree, path_out, {'PDF'}, False, False, jobs=jobs, journal_path=journal_path)
+    os.remove(os.path.join(path_out, 'sub', 'c.pdf'))
+    opened = []
+    builtin_open = open
+
+    def _open(file, *args, **kwargs):
+        if isinstance(file, str) and file.startswith(copy_tree):
+            opened.append(os.path.relpath(file, copy_tree))
+        return builtin_open(file, *args, **kwargs)
+
+    monkeypatch.setattr('builtins.open', _open)
+    CopyBinFiles.copy_files(copy_tree, path_out, {'PDF'}, False, False, jobs=jobs, journal_path=journal_path)
+    # a.pdf and e.zip are done, the others are classified and c.pdf is copied again.
+    assert sorted(set(opened)) == sorted(['b.xml', os.path.join('sub', 'c.pdf'), os.path.join('sub', 'd.txt')])
+
+
+def test_zip_member_outside_archive_ignored(tmpdir):
+    root = str(tmpdir)
+    instream = io.BytesIO()
+    with zipfile.ZipFile(instream, 'w') as zip_file:
+        zip_file.writestr('../evil.pdf', b'%PDF-1.4')
+        zip_file.writestr('good.pdf', b'%PDF-1.4')
+    result = CopyBinFiles._recurse_copy_zip_archive(instream, os.path.join(root, 'out'), set(), False)
+    assert _rel(root, result) == [os.path.join('out', 'good.pdf')]
+    assert not os.path.exists(os.path.join(root, 'evil.pdf'))
@@ -0,0 +1,103 @@
+import collections
+import io
+import random
+
+import pytest
+
+from TotalDepth.util import PatternSearch
+
+
+def _random_bytes(length: int, seed: int) -> bytes:
+    """Bytes with runs of spaces, ASCII and binary."""
+    rnd = random.Random(seed)
+    ret = bytearray()
+    while len(ret) < length:
+        ret += rnd.choice((b' ', b'ABC', b'\x04TOOL', b'\x80', bytes([rnd.randrange(256)]))) * rnd.randrange(1, 8)
+    return bytes(ret[:length])
+
+
+def _char_runs(char_s: bytes, by: bytes, min_length: int):
+    """Reference implementation of the run lengths."""
+    hist = collections.Counter(bytes([c]) for c in by if c in char_s)
+    hist_run = collections.Counter()
+    run = 0
+    for c in by:
+        if c in char_s:
+            run += 1
+        else:
+            if run >= min_length:
+                hist_run[run] += 1
+            run = 0
+    # A run to EOF
+    if run >= min_length:
+        hist_run[run] += 1
+    return dict(hist), dict(hist_run)
+
+
+@pytest.fixture
+def disc_file(tmpdir):
+    path = str(tmpdir.join('data.bin'))
+    with open(path, 'wb') as fobj:
+        fobj.write(_random_bytes(10000, 1))
+    with open(path, 'rb') as fobj:
+        yield fobj
+
+
+@pytest.mark.parametrize('chunk_size', (1, 7, 1024, PatternSearch.CHUNK_SIZE))
+def test_ret_hist_all(chunk_size):
+    by = _random_bytes(10000, 2)
+    result = PatternSearch._retHistAll(io.BytesIO(by), chunk_size)
+    assert dict(result) == dict(collections.Counter(bytes([c]) for c in by))
+
+
+def test_ret_hist_all_disc_file(disc_file):
+    disc_file.seek(100)
+    by = disc_file.read()
+    disc_file.seek(100)
+    result = PatternSearch._retHistAll(disc_file, 256)
+    assert dict(result) == dict(collections.Counter(bytes([c]) for c in by))
+    assert disc_file.read() == b''
+
+
+def test_ret_hist_all_empty():
+    assert dict(PatternSearch._retHistAll(io.BytesIO(b''))) == {}
+
+
+@pytest.mark.parametrize('chunk_size', (1, 3, 5, 1024))
+def test_ret_hist_match(chunk_size):
+    by = b'\x04TOOL' + b'\x04\x04TOOL' + b'xx\x04TOO' + b'\x04TOOL'
+    tell = io.StringIO()
+    result = PatternSearch._retHistMatch(b'\x04TOOL', io.BytesIO(by), tell, True, chunk_size)
+    assert dict(result) == {b'\x04TOOL': 3}
+    assert tell.getvalue().splitlines() == [
+        '0x00000000      5 [0x0005]',
+        '0x00000006      5 [0x0005]',
+        '0x00000011      5 [0x0005]',
+    ]
+
+
+def test_ret_hist_match_disc_file(disc_file):
+    by = disc_file.read()
+    disc_file.seek(0)
+    result = PatternSearch._retHistMatch(b'\x04TOOL', disc_file, theChunkSize=100)
+    assert result[b'\x04TOOL'] == by.count(b'\x04TOOL')
+
+
+@pytest.mark.parametrize('chunk_size', (1, 2, 7, 1024))
+@pytest.mark.parametrize('char_s, min_length', ((b' ', 2), (b'\x80', 1), (bytes(range(128)), 3)))
+def test_ret_hist_char_runs(chunk_size, char_s, min_length):
+    by = _random_bytes(5000, 3) + char_s[:1] * 5
+    hist, hist_run = PatternSearch._retHistCharRuns(
+        char_s, io.BytesIO(by), theMin=min_length, theChunkSize=chunk_size
+    )
+    assert (dict(hist), dict(hist_run)) == _char_runs(char_s, by, min_length)
+
+
+def test_ret_hist_char_runs_tell():
+    tell = io.StringIO()
+    hist, hist_run = PatternSearch._retHistCharRuns(
+        b' ', io.BytesIO(b'A   B C  '), tell, 2, True, 4
+    )
+    assert dict(hist) == {b' ': 6}
+    assert dict(hist_run) == {3: 1, 2: 1}
+    assert tell.getvalue().splitlines() == ['0x00000001      3 [0x0003]', '0x00000007      2 [0x0002]']
@@ -0,0 +1,119 @@
+import errno
+import os
+
+import pytest
+
+from TotalDepth.util import RemoveDupeFiles
+
+
+def _write(path, content: bytes) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as fobj:
+        fobj.write(content)
+    return path
+
+
+@pytest.fixture
+def dupe_tree(tmpdir):
+    """A tree with:
+    - a.bin and sub/a.bin identical.
+    - b.bin same size as a.bin but different in the middle, same first and last PARTIAL_HASH_SIZE bytes.
+    - c.bin and d.bin small and identical.
+    - e.bin unique size.
+    """
+    root = str(tmpdir)
+    head = b'H' * RemoveDupeFiles.PARTIAL_HASH_SIZE
+    tail = b'T' * RemoveDupeFiles.PARTIAL_HASH_SIZE
+    _write(os.path.join(root, 'a.bin'), head + b'middle' + tail)
+    _write(os.path.join(root, 'b.bin'), head + b'MIDDLE' + tail)
+    _write(os.path.join(root, 'c.bin'), b'small')
+    _write(os.path.join(root, 'd.bin'), b'small')
+    _write(os.path.join(root, 'e.bin'), b'unique size')
+    _write(os.path.join(root, 'sub', 'a.bin'), head + b'middle' + tail)
+    _write(os.path.join(root, '.hidden'), b'small')
+    return root
+
+
+def _names(root, groups):
+    return [[os.path.relpath(e.path, root) for e in g] for g in groups]
+
+
+@pytest.mark.parametrize('jobs', (1, 4))
+def test_find_dupes(dupe_tree, jobs):
+    groups = RemoveDupeFiles.find_dupes(dupe_tree, jobs)
+    assert _names(dupe_tree, groups) == [['a.bin', os.path.join('sub', 'a.bin')], ['c.bin', 'd.bin']]
+
+
+def test_partial_digest_same_as_full_digest_for_small_files(dupe_tree):
+    path = os.path.join(dupe_tree, 'c.bin')
+    assert RemoveDupeFiles.partial_digest(path, os.path.getsize(path)) == RemoveDupeFiles.full_digest(path)
+    path = os.path.join(dupe_tree, 'a.bin')
+    assert RemoveDupeFiles.partial_digest(path, os.path.getsize(path)) != RemoveDupeFiles.full_digest(path)
+
+
+def test_remove_dupes_report(dupe_tree):
+    result = RemoveDupeFiles.remove_dupes(dupe_tree, nervous=True)
+    assert result == (2, 2 * RemoveDupeFiles.PARTIAL_HASH_SIZE + 6 + 5, 0)
+    assert os.path.exists(os.path.join(dupe_tree, 'sub', 'a.bin'))
+    assert os.path.exists(os.path.join(dupe_tree, 'd.bin'))
+
+
+def test_remove_dupes_remove(dupe_tree):
+    result = RemoveDupeFiles.remove_dupes(dupe_tree, mode=RemoveDupeFiles.MODE_REMOVE)
+    assert result == (2, 2 * RemoveDupeFiles.PARTIAL_HASH_SIZE + 6 + 5, 0)
+    assert not os.path.exists(os.path.join(dupe_tree, 'sub', 'a.bin'))
+    assert not os.path.exists(os.path.join(dupe_tree, 'd.bin'))
+    assert os.path.exists(os.path.join(dupe_tree, 'a.bin'))
+    assert os.path.exists(os.path.join(dupe_tree, 'b.bin'))
+    assert os.path.exists(os.path.join(dupe_tree, 'c.bin'))
+
+
+def test_remove_dupes_link(dupe_tree):
+    result = RemoveDupeFiles.remove_dupes(dupe_tree, mode=RemoveDupeFiles.MODE_LINK)
+    assert result == (2, 2 * RemoveDupeFiles.PARTIAL_HASH_SIZE + 6 + 5, 0)
+    assert os.path.samefile(os.path.join(dupe_tree, 'a.bin'), os.path.join(dupe_tree, 'sub', 'a.bin'))
+    assert os.path.samefile(os.path.join(dupe_tree, 'c.bin'), os.path.join(dupe_tree, 'd.bin'))
+    # Second time the hard links are not duplicates
+    assert RemoveDupeFiles.remove_dupes(dupe_tree, mode=RemoveDupeFiles.MODE_LINK) == (0, 0, 0)
+
+
+def test_remove_dupes_link_failure(dupe_tree, monkeypatch):
+    os_link = os.link
+
+    def _link(src, dst):
+        if os.path.basename(os.path.dirname(dst)) == 'sub':
+            raise OSError(errno.EXDEV, 'Invalid cross-device link')
+        os_link(src, dst)
+
+    monkeypatch.setattr(os, 'link', _link)
+    result = RemoveDupeFiles.remove_dupes(dupe_tree, mode=RemoveDupeFiles.MODE_LINK)
+    # sub/a.bin is left in place and counted, d.bin is still linked.
+    assert result == (1, 5, 1)
+    assert not os.path.samefile(os.path.join(dupe_tree, 'a.bin'), os.path.join(dupe_tree, 'sub', 'a.bin'))
+    assert os.path.samefile(os.path.join(dupe_tree, 'c.bin'), os.path.join(dupe_tree, 'd.bin'))
+    assert sorted(os.listdir(os.path.join(dupe_tree, 'sub'))) == ['a.bin']
+
+
+def test_remove_dupes_bad_mode(dupe_tree):
+    with pytest.raises(ValueError):
+        RemoveDupeFiles.remove_dupes(dupe_tree, mode='delete')
+
+
+def test_digest_cache(dupe_tree, tmpdir):
+    cache_path = os.path.join(str(tmpdir), '.cache.json')
+    RemoveDupeFiles.remove_dupes(dupe_tree, nervous=True, cache_path=cache_path)
+    assert os.path.isfile(cache_path)
+    cache = RemoveDupeFiles.DigestCache(cache_path)
+    groups = RemoveDupeFiles.find_dupes(dupe_tree, cache=cache)
+    assert len(groups) == 2
+    assert cache.misses == 0
+    assert cache.hits == 8
+    # A changed file is hashed again
+    path = os.path.join(dupe_tree, 'd.bin')
+    mtime_ns = os.stat(path).st_mtime_ns
+    _write(path, b'SMALL')
+    os.utime(path, ns=(mtime_ns, mtime_ns + 10**9))
+    cache = RemoveDupeFiles.DigestCache(cache_path)
+    groups = RemoveDupeFiles.find_dupes(dupe_tree, cache=cache)
+    assert _names(dupe_tree, groups) == [['a.bin', os.path.join('sub', 'a.bin')]]
+    assert cache.misses == 1
@@ -0,0 +1,141 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from TotalDepth.util import archive
+
+
+@pytest.fixture
+def archive_tree(tmpdir):
+    root = str(tmpdir)
+    os.makedirs(os.path.join(root, 'sub', 'subsub'))
+    for path, content in (
+        ('b.xml', b'<?xml version="1.0"?>'),
+        ('a.pdf', b'%PDF-1.4'),
+        ('.DS_Store', b''),
+        (os.path.join('sub', 'c.las'), b'~VERSION\n VERS. 2.0: CWLS\n'),
+        (os.path.join('sub', 'subsub', 'd.txt'), b'Some text.'),
+    ):
+        with open(os.path.join(root, path), 'wb') as fobj:
+            fobj.write(content)
+    with zipfile.ZipFile(os.path.join(root, 'sub', 'e.zip'), 'w') as zip_file:
+        zip_file.writestr('member.pdf', b'%PDF-1.4')
+    return root
+
+
+def _types(root, files):
+    return [(os.path.relpath(f.path, root), f.bin_type, type(f).__name__) for f in files]
+
+
+@pytest.mark.parametrize('jobs', (1, 2, 8))
+def test_explore_tree_recursive(archive_tree, jobs):
+    result = _types(archive_tree, archive.explore_tree(archive_tree, True, jobs))
+    expected = _types(archive_tree, archive.explore_tree(archive_tree, True))
+    assert result == expected
+    assert sorted(result) == [
+        ('a.pdf', 'PDF', 'FileOnDisc'),
+        ('b.xml', 'XML', 'FileOnDisc'),
+        (os.path.join('sub', 'c.las'), 'LAS2.0', 'FileOnDisc'),
+        (os.path.join('sub', 'e.zip'), 'ZIP', 'FileZip'),
+        (os.path.join('sub', 'subsub', 'd.txt'), 'ASCII', 'FileOnDisc'),
+    ]
+    # Files in a directory come before files in its sub-directories, like os.walk()
+    assert [r[0] for r in result][-1] == os.path.join('sub', 'subsub', 'd.txt')
+
+
+def test_explore_tree_not_recursive(archive_tree):
+    result = _types(archive_tree, archive.explore_tree(archive_tree, False, 4))
+    assert result == [('a.pdf', 'PDF', 'FileOnDisc'), ('b.xml', 'XML', 'FileOnDisc')]
+
+
+def test_explore_tree_single_file(archive_tree):
+    files = archive.explore_tree(os.path.join(archive_tree, 'sub', 'c.las'), False)
+    assert _types(archive_tree, files) == [(os.path.join('sub', 'c.las'), 'LAS2.0', 'FileOnDisc')]
+    assert files[0].size == 26
+    assert files[0].bytes == b'~VERSION\n VERS. 2.0'[:archive.FileBase.XXD_NUM_BYTES]
+
+
+def test_gen_explore_tree_is_lazy(archive_tree):
+    gen = archive.gen_explore_tree(archive_tree, True, 2)
+    assert isinstance(next(gen), archive.FileBase)
+    gen.close()
+
+
+@pytest.fixture
+def nested_zip(tmpdir):
+    """outer.zip contains a.pdf, big.bin and inner.zip which contains b.xml and innermost.zip which contains c.pdf."""
+    root = str(tmpdir)
+    innermost = io.BytesIO()
+    with zipfile.ZipFile(innermost, 'w') as zip_file:
+        zip_file.writestr('c.pdf', b'%PDF-1.4')
+    inner = io.BytesIO()
+    with zipfile.ZipFile(inner, 'w') as zip_file:
+        zip_file.writestr('b.xml', b'<?xml version="1.0"?>')
+        zip_file.writestr('innermost.zip', innermost.getvalue())
+    path = os.path.join(root, 'outer.zip')
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr('a.pdf', b'%PDF-1.4')
+        zip_file.writestr('big.bin', bytes(range(256)) * (16 * 1024))
+        zip_file.writestr('inner.zip', inner.getvalue())
+    return path
+
+
+def _member_types(zip_path, file_zip):
+    prefix = os.path.splitext(zip_path)[0]
+    return [(os.path.relpath(m.path, prefix), m.bin_type, m.size) for m in file_zip.members.members]
+
+
+def test_file_zip_not_expanded(nested_zip):
+    file_zip = archive.FileZip(nested_zip)
+    assert file_zip.bin_type == 'ZIP'
+    assert file_zip.members.members == []
+
+
+@pytest.mark.parametrize('jobs', (1, 4))
+def test_file_zip_expanded(nested_zip, jobs):
+    file_zip = archive.FileZip(nested_zip, expand=True, jobs=jobs)
+    assert _member_types(nested_zip, file_zip) == [
+        ('a.pdf', 'PDF', 8),
+        ('big.bin', '', 4 * 1024**2),
+        (os.path.join('inner', 'b.xml'), 'XML', 21),
+        (os.path.join('inner', 'innermost', 'c.pdf'), 'PDF', 8),
+    ]
+    assert file_zip.members.members[0].bytes == b'%PDF-1.4'
+
+
+def test_file_zip_member_is_not_decompressed(nested_zip, monkeypatch):
+    """Only the header of a member that is not a ZIP is decompressed."""
+    sizes = []
+    original_read = zipfile.ZipExtFile.read
+
+    def read(self, n=-1):
+        ret = original_read(self, n)
+        sizes.append(len(ret))
+        return ret
+
+    monkeypatch.setattr(zipfile.ZipExtFile, 'read', read)
+    archive.FileZip(nested_zip, expand=True)
+    assert sum(sizes) < 1024**2
+
+
+def test_file_zip_max_depth(nested_zip, monkeypatch):
+    monkeypatch.setattr(archive, 'ZIP_MAX_DEPTH', 1)
+    file_zip = archive.FileZip(nested_zip, expand=True)
+    assert [m[:2] for m in _member_types(nested_zip, file_zip)][2:] == [
+        (os.path.join('inner', 'b.xml'), 'XML'),
+        (os.path.join('inner', 'innermost.zip'), 'ZIP'),
+    ]
+
+
+def test_explore_tree_expand_zip(nested_zip):
+    root = os.path.dirname(nested_zip)
+    files = list(archive.gen_zip_members(archive.explore_tree(root, True, 2, expand_zip=True)))
+    assert [(os.path.relpath(f.path, root), f.bin_type) for f in files] == [
+        ('outer.zip', 'ZIP'),
+        (os.path.join('outer', 'a.pdf'), 'PDF'),
+        (os.path.join('outer', 'big.bin'), ''),
+        (os.path.join('outer', 'inner', 'b.xml'), 'XML'),
+        (os.path.join('outer', 'inner', 'innermost', 'c.pdf'), 'PDF'),
+    ]
@@ -1,4 +1,5 @@
 import io
+import random
 import typing
 
 import TotalDepth.util.bin_file_type
@@ -708,6 +709,77 @@ def test_binary_file_type_from_bytes(fobj: io.BytesIO, expected: str):
 
 
 
+class CountingStream(io.RawIOBase):
+    """A non-seekable stream that counts the calls to read()."""
+    def __init__(self, by: bytes):
+        self._bytes = io.BytesIO(by)
+        self.read_count = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        self.read_count += 1
+        return self._bytes.read(size)
+
+
+def test_header_buffer_read_seek():
+    header = TotalDepth.util.bin_file_type.HeaderBuffer(io.BytesIO(b'0123456789'), block_size=4)
+    assert header.read(3) == b'012'
+    assert header.tell() == 3
+    assert header.read(3) == b'345'
+    assert header.seek(1) == 1
+    assert header.read(2) == b'12'
+    assert header.seek(2, 1) == 5
+    assert header.read() == b'56789'
+    assert header.read(1) == b''
+    assert header.seek(-2, 2) == 8
+    assert header.read(5) == b'89'
+
+
+def test_header_buffer_lines():
+    by = b'~VERSION\r\n VERS. 2.0: CWLS\n\nlast'
+    header = TotalDepth.util.bin_file_type.HeaderBuffer(io.BytesIO(by), block_size=3)
+    assert list(header) == list(io.BytesIO(by))
+
+
+def test_binary_file_type_and_bytes_single_read():
+    by = b'~VERSION\n VERS. 2.0: CWLS\n' + b' ' * 10000
+    fobj = CountingStream(by)
+    assert TotalDepth.util.bin_file_type.binary_file_type_and_bytes(fobj, 8) == ('LAS2.0', b'~VERSION')
+    assert fobj.read_count == 1
+
+
+def test_binary_file_type_las_beyond_header():
+    """LAS detection can read beyond the header block."""
+    by = b'\n' * (2 * TotalDepth.util.bin_file_type.HEADER_BLOCK_SIZE) + b'~VERSION\n VERS. 1.2: CWLS\n'
+    assert TotalDepth.util.bin_file_type.binary_file_type(io.BytesIO(by)) == 'LAS1.2'
+
+
+def test_header_buffer_max_size():
+    header = TotalDepth.util.bin_file_type.HeaderBuffer(io.BytesIO(b'0123456789\n' * 2), block_size=4, max_size=8)
+    assert header.readline() == b'01234567'
+    assert header.readline() == b''
+    assert header.seek(6) == 6
+    assert header.read(10) == b'67'
+    assert header.read() == b''
+    assert header.seek(0, 2) == 8
+    fobj_out = io.BytesIO()
+    assert header.copy_to(fobj_out) == 22
+    assert fobj_out.getvalue() == b'0123456789\n' * 2
+
+
+def test_binary_file_type_las_beyond_max_size():
+    """Detection gives up on LAS beyond HEADER_BUFFER_MAX_SIZE without reading the rest of the file."""
+    max_size = TotalDepth.util.bin_file_type.HEADER_BUFFER_MAX_SIZE
+    by = b'\n' * (16 * max_size) + b'~VERSION\n VERS. 1.2: CWLS\n'
+    fobj = CountingStream(by)
+    header = TotalDepth.util.bin_file_type.HeaderBuffer(fobj)
+    assert TotalDepth.util.bin_file_type._lasv12(header) == 6
+    assert TotalDepth.util.bin_file_type.binary_file_type(header) == 'ASCII'
+    assert fobj.read_count <= 1 + max_size // TotalDepth.util.bin_file_type.HEADER_BLOCK_SIZE
+
+
 # TIF encoded RP66V1:
 # Storage Unit Label is from 0xC to 0xC + 80 = 92 (0x5c)
 # 00000000: 0000 0000 0000 0000 5c00 0000 2020 2031  ........\...   1
@@ -747,3 +819,111 @@ def test_binary_file_type_from_bytes(fobj: io.BytesIO, expected: str):
 # 000000a0: 2d49 4414 340d 4649 4c45 2d53 4554 2d4e  -ID.4.FILE-SET-N
 # 000000b0: 414d 4513 340f 4649 4c45 2d53 4554 2d4e  AME.4.FILE-SET-N
 # Proposal: Ignore this as it is so far from the standard: missing SUL _and_ spurious TIF encoding.
+
+
+def test_header_buffer_copy_to():
+    by = bytes(range(256)) * 256
+    header = TotalDepth.util.bin_file_type.HeaderBuffer(CountingStream(by), 1024)
+    assert header.read(4) == by[:4]
+    fobj_out = io.BytesIO()
+    assert header.copy_to(fobj_out) == len(by)
+    assert fobj_out.getvalue() == by
+    # Only the first block was buffered.
+    assert len(header.read()) == 0
+
+
+def _rp66v1_sul() -> bytes:
+    by = b'   1' + b'V1.00' + b'RECORD' + b' 8192' + b'Default Storage Set'.ljust(60)
+    assert len(by) == 80
+    return by
+
+
+def _rp66v2_label() -> bytes:
+    by = b'   1' + b'V1.00' + b'RECORD' + b'B8  ' + b'      8192' + b'         1' + b'01-JAN-2019' + b'X' * 12 \
+         + b' ' * 6 + b'Storage set'.ljust(60)
+    assert len(by) == 128
+    return by
+
+
+#: A sample of each supported file type.
+SIGNATURE_CORPUS = (
+    (b'<?xml version="1.0"?>', 'XML'),
+    (b'%PDF-1.4', 'PDF'),
+    (b'%!Ps-Adobe-3.0', 'PS'),
+    (b'PK\x03\x04' + bytes(100), 'ZIP'),
+    (b'II*\x00' + bytes(100), 'TIFF'),
+    (b'\xc3\x40' * 1600, 'SEGY'),
+    (b'~VERSION\n VERS. 1.2: CWLS\n', 'LAS1.2'),
+    (b'~VERSION\n VERS. 2.0: CWLS\n', 'LAS2.0'),
+    (b'~VERSION\n VERS. 3.0: CWLS\n', 'LAS3.0'),
+    (LIS_PR_GOOD_BYTES + bytes(56), 'LIS'),
+    (b'\x00' * 8 + b'\x4a\x00\x00\x00' + LIS_PR_GOOD_BYTES + bytes(56), 'LISt'),
+    (b'\x00' * 8 + b'\x00\x00\x00\x4a' + LIS_PR_GOOD_BYTES + bytes(56), 'LIStr'),
+    (_rp66v1_sul(), 'RP66V1'),
+    (b'\x00' * 8 + b'\x5c\x00\x00\x00' + _rp66v1_sul(), 'RP66V1t'),
+    (b'\x00' * 8 + b'\x00\x00\x00\x5c' + _rp66v1_sul(), 'RP66V1tr'),
+    (_rp66v2_label(), 'RP66V2'),
+    (b'Some text.', 'ASCII'),
+    (b'', 'ASCII'),
+)
+
+
+def _linear_match(fobj: io.BytesIO) -> TotalDepth.util.bin_file_type.FileTypeMatch:
+    """Reference implementation that tries every signature in order."""
+    header = TotalDepth.util.bin_file_type.HeaderBuffer(fobj)
+    for signature in TotalDepth.util.bin_file_type.SIGNATURES:
+        header.seek(signature.offset)
+        if signature.magic and header.read(len(signature.magic)) != signature.magic:
+            continue
+        header.seek(0)
+        if signature.validator is None or signature.validator(header) == 0:
+            return TotalDepth.util.bin_file_type.FileTypeMatch(
+                signature.bin_type, signature.detector, signature.confidence
+            )
+    return TotalDepth.util.bin_file_type.NO_MATCH
+
+
+@pytest.mark.parametrize('by, expected', SIGNATURE_CORPUS)
+def test_binary_file_type_match_corpus(by: bytes, expected: str):
+    result = TotalDepth.util.bin_file_type.binary_file_type_match(io.BytesIO(by))
+    assert result.bin_type == expected
+    assert result == _linear_match(io.BytesIO(by))
+
+
+def test_signature_corpus_has_every_type():
+    assert {expected for _by, expected in SIGNATURE_CORPUS} == TotalDepth.util.bin_file_type.BINARY_FILE_TYPES_SUPPORTED
+
+
+def test_binary_file_type_match_random():
+    rnd = random.Random(1)
+    for _i in range(1000):
+        # Bias the first bytes to the interesting ones.
+        by = bytes([rnd.choice(b'\x00 ~%<0\x40\xc3')]) + bytes(rnd.randrange(256) for _j in range(rnd.randrange(200)))
+        assert TotalDepth.util.bin_file_type.binary_file_type_match(io.BytesIO(by)) == _linear_match(io.BytesIO(by))
+
+
+@pytest.mark.parametrize(
+    'by, expected',
+    (
+        (b'%PDF-1.4', ('PDF', 'magic', 40)),
+        (b'\xc3\x40' * 1600, ('SEGY', '_segy', 64)),
+        (b'Some text.', ('ASCII', '_ascii', 8)),
+        (b'', ('ASCII', '_ascii', 8)),
+        (b'\x80' * 3, ('', '', 0)),
+    )
+)
+def test_binary_file_type_match(by: bytes, expected: typing.Tuple[str, str, int]):
+    fobj = io.BytesIO(by)
+    assert TotalDepth.util.bin_file_type.binary_file_type_match(fobj) == expected
+    assert fobj.tell() == 0
+
+
+def test_compile_signatures():
+    table = TotalDepth.util.bin_file_type.compile_signatures(TotalDepth.util.bin_file_type.SIGNATURES)
+    assert len(table) == 257
+    assert [s.bin_type for s in table[ord('%')]] == ['PDF', 'PS', 'ASCII', 'LIS']
+    assert [s.bin_type for s in table[TotalDepth.util.bin_file_type.DISPATCH_EMPTY]] == ['ASCII']
+    assert TotalDepth.util.bin_file_type.BINARY_FILE_TYPES_SUPPORTED == {
+        s.bin_type for s in TotalDepth.util.bin_file_type.SIGNATURES
+    }
+
@@ -305,6 +305,18 @@ class TestLogHeaderLIS(BaseTestClasses.TestBaseFile):
         with SVGWriter.SVGWriter(open(fp, 'w'), viewPort) as xS:
             myLh.plot(xS, tl, [self._lrCONS,])
 
+    def test_12(self):
+        """TestLogHeader.test_12(): Plotting CONS data does not change the next plot."""
+        myResultS = []
+        for i in range(2):
+            myLh = LogHeader.APIHeaderLIS(isTopOfLog=True)
+            tl = Coord.Pt(Coord.Dim(0.25, 'in'), Coord.Dim(0.5, 'in'))
+            myF = io.StringIO()
+            with SVGWriter.SVGWriter(myF, myLh.viewPort(tl)) as xS:
+                myLh.plot(xS, tl, [self._lrCONS,])
+            myResultS.append(myF.getvalue())
+        self.assertEqual(myResultS[0], myResultS[1])
+
     def test_20(self):
         """TestLogHeader.test_20(): Fails with wrong Logical Record type 32."""
         myB = [
@@ -33,6 +33,8 @@ import math
 import random
 import pprint
 
+import numpy
+
 from TotalDepth.LIS.core import RepCode
 from TotalDepth.LIS.core import LogiRec
 from TotalDepth.LIS.core import Mnem
@@ -328,6 +330,50 @@ class TestLineTrans(unittest.TestCase):
         """TestLineTrans.test_40_03(): Linear identity transformation, wrapPos(), physical 8->0, logical scale 64->0 raises ExceptionLineTransBase."""
         self.assertRaises(PRESCfg.ExceptionLineTransBase, PRESCfg.LineTransLin, 8.0, 0.0, 64.0, 0.0, backup=PRESCfg.BACKUP_ONCE)
 
+    def _checkWrapPosArray(self, theT, theValS):
+        """Checks wrapPosArray() against wrapPos() for each value."""
+        myWrapS, myPosS = theT.wrapPosArray(numpy.array(theValS))
+        self.assertEqual(len(theValS), len(myWrapS))
+        self.assertEqual(len(theValS), len(myPosS))
+        for v, w, p in zip(theValS, myWrapS.tolist(), myPosS.tolist()):
+            try:
+                wExp, pExp = theT.wrapPos(v)
+            except (PRESCfg.ExceptionLineTransBaseMath, OverflowError, ValueError):
+                self.assertTrue(math.isnan(w), 'v={!r:s} w={!r:s}'.format(v, w))
+            else:
+                self.assertEqual(wExp, w)
+                self.assertAlmostEqual(pExp, p, places=12)
+
+    def test_50(self):
+        """TestLineTrans.test_50(): Linear transformation, wrapPosArray() matches wrapPos()."""
+        myT = PRESCfg.LineTransLin(0.0, 8.0, -50.0, 150.0)
+        self._checkWrapPosArray(
+            myT,
+            [-1e9, -250.0, -50.0, -49.9, 0.0, 10.0, 149.9, 150.0, 350.1, 1e9, float('inf'), float('-inf'), float('nan')],
+        )
+        self._checkWrapPosArray(myT, [random.uniform(-1000.0, 1000.0) for i in range(1024)])
+
+    def test_51(self):
+        """TestLineTrans.test_51(): Logarithmic transformation, wrapPosArray() matches wrapPos(), zero and -ve values are NaN."""
+        myT = PRESCfg.LineTransLog10(0.0, 8.0, 0.2, 2000.0)
+        self._checkWrapPosArray(
+            myT,
+            [-1.0, 0.0, 0.001, 0.2, 1.0, 20.0, 1999.0, 2000.0, 1e7, float('inf')],
+        )
+        self._checkWrapPosArray(myT, [10.0**random.uniform(-5.0, 8.0) for i in range(1024)])
+
+    def test_52(self):
+        """TestLineTrans.test_52(): offScaleArray() matches offScale() for all backup modes."""
+        myWrapS = list(range(-5, 6))
+        for bu in (PRESCfg.BACKUP_NONE, PRESCfg.BACKUP_ALL, PRESCfg.BACKUP_ONCE, PRESCfg.BACKUP_TWICE,
+                   PRESCfg.BACKUP_LEFT, PRESCfg.BACKUP_RIGHT):
+            myT = PRESCfg.LineTransLin(0.0, 8.0, 0.0, 64.0, backup=bu)
+            self.assertEqual(
+                [myT.offScale(w) != 0 for w in myWrapS],
+                myT.offScaleArray(numpy.array(myWrapS, dtype=numpy.float64)).tolist(),
+                'Backup {!r:s}'.format(bu),
+            )
+
 class TestPRESRead(BaseTestClasses.TestBaseFile):
     """Tests ..."""
     def setUp(self):
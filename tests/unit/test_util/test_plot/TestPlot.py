@@ -33,6 +33,8 @@ import logging
 import pprint
 import io
 import random
+
+import numpy
 #import collections
 try:
     import xml.etree.cElementTree as etree
@@ -627,6 +629,203 @@ class TestPlotRoll(unittest.TestCase):
         except Plot.ExceptionTotalDepthPlotRoll:
             pass
 
+    def test_30(self):
+        """TestPlotRoll.test_30(): polyLinePtArrays() matches polyLinePt() for up and down plots, X in other units."""
+        for plotUp in (True, False):
+            myPr = Plot.PlotRoll(
+                EngVal.EngVal(1000.0, b'FEET'),
+                EngVal.EngVal(900.0, b'FEET'),
+                200,
+                Coord.Dim(2.0, 'in'),
+                theHeadDepth=Coord.Dim(4.5, 'in'),
+                plotUp=plotUp,
+            )
+            myXS = numpy.array([1000.0, 975.5, 950.25, 900.0])
+            myPosS = numpy.array([0.0, 1.5, 3.25, 8.0])
+            for units, factor in ((b'FEET', 1.0), (b'.1IN', 120.0)):
+                ptXS, ptYS = myPr.polyLinePtArrays(myXS * factor, units, myPosS)
+                for x, p, ptX, ptY in zip(myXS.tolist(), myPosS.tolist(), ptXS.tolist(), ptYS.tolist()):
+                    myPt = myPr.polyLinePt(EngVal.EngVal(x * factor, units), p)
+                    self.assertAlmostEqual(myPt.x.value, ptX, places=9)
+                    self.assertAlmostEqual(myPt.y.value, ptY, places=9)
+
+class TestPlotDecimate(unittest.TestCase):
+    """Tests retDecimatedPoints() and its use by Plot."""
+    def test_00(self):
+        """TestPlotDecimate.test_00(): retDecimatedPoints() with no tolerance or few points keeps all points."""
+        myXS = numpy.array([1.0, 5.0, 2.0, 8.0, 3.0, 4.0])
+        myYS = numpy.arange(6, dtype=numpy.float64) / 10.0
+        self.assertEqual(list(range(6)), Plot.retDecimatedPoints(myXS, myYS, 0.0).tolist())
+        self.assertEqual(list(range(4)), Plot.retDecimatedPoints(myXS[:4], myYS[:4], 10.0).tolist())
+        self.assertEqual([], Plot.retDecimatedPoints(myXS[:0], myYS[:0], 10.0).tolist())
+
+    def test_01(self):
+        """TestPlotDecimate.test_01(): retDecimatedPoints() keeps first, last, min and max in order in one bucket."""
+        myXS = numpy.array([3.0, 5.0, 2.0, 8.0, 3.0, 1.0, 4.0, 6.0])
+        myYS = numpy.arange(8, dtype=numpy.float64) / 10.0
+        self.assertEqual([0, 3, 5, 7], Plot.retDecimatedPoints(myXS, myYS, 1.0).tolist())
+
+    def test_02(self):
+        """TestPlotDecimate.test_02(): retDecimatedPoints() keeps a single frame spike."""
+        myXS = numpy.full(1000, 10.0)
+        myXS[501] = 200.0
+        myXS[502] = -50.0
+        myYS = numpy.arange(1000, dtype=numpy.float64) * 0.1
+        myIdxS = Plot.retDecimatedPoints(myXS, myYS, 1.0)
+        self.assertTrue(len(myIdxS) < 250)
+        self.assertTrue(501 in myIdxS.tolist())
+        self.assertTrue(502 in myIdxS.tolist())
+        self.assertEqual(200.0, myXS[myIdxS].max())
+        self.assertEqual(-50.0, myXS[myIdxS].min())
+        self.assertTrue((numpy.diff(myIdxS) > 0).all())
+        self.assertEqual(0, myIdxS[0])
+        self.assertEqual(999, myIdxS[-1])
+
+    def test_03(self):
+        """TestPlotDecimate.test_03(): retDecimatedPoints() with decreasing Y, for an up plot."""
+        myXS = numpy.sin(numpy.arange(100, dtype=numpy.float64))
+        myYS = 100.0 - numpy.arange(100, dtype=numpy.float64) * 0.25
+        myIdxS = Plot.retDecimatedPoints(myXS, myYS, 2.0)
+        self.assertTrue(len(myIdxS) < 100)
+        self.assertTrue((numpy.diff(myIdxS) > 0).all())
+        # Every bucket retains its extremes
+        myBucketS = numpy.floor((myYS - myYS[0]) / 2.0)
+        for b in numpy.unique(myBucketS).tolist():
+            self.assertEqual(myXS[myBucketS == b].max(), myXS[myIdxS][myBucketS[myIdxS] == b].max())
+            self.assertEqual(myXS[myBucketS == b].min(), myXS[myIdxS][myBucketS[myIdxS] == b].min())
+
+    def test_04(self):
+        """TestPlotDecimate.test_04(): Plot() with a decimation tolerance that is not a number or < 0 raises."""
+        self.assertRaises(Plot.ExceptionTotalDepthLISPlot, Plot.Plot, None, None, 0, '1.0')
+        self.assertRaises(Plot.ExceptionTotalDepthLISPlot, Plot.Plot, None, None, 0, -1.0)
+
+    def test_05(self):
+        """TestPlotDecimate.test_05(): Plot._addPolyLineBufferPts() with and without decimation."""
+        myXS = numpy.array([3.0, 5.0, 2.0, 8.0, 3.0, 1.0, 4.0, 6.0])
+        myYS = numpy.arange(8, dtype=numpy.float64) / 10.0
+        myOnScale = numpy.ones(8, dtype=bool)
+        myOnScale[3] = False
+        for decimate, expected in (
+                (0.0, ['3.0,0.0 5.0,0.1 2.0,0.2 3.0,0.4 1.0,0.5 4.0,0.6 6.0,0.7']),
+                (1.0, ['3.0,0.0 1.0,0.5 6.0,0.7']),
+            ):
+            myCpd = Plot.CurvePlotData(None, None)
+            Plot.Plot(None, None, theDecimate=decimate)._addPolyLineBufferPts(myCpd, myOnScale, myXS, myYS, 0, 8)
+            self.assertEqual(expected, myCpd.buffer)
+
+class TestPlotXGridCache(unittest.TestCase):
+    """Tests the X axis grid markup cache."""
+    def _plotLAS(self, theFileName):
+        myLasFile = LASRead.LASRead(io.StringIO(TestPlotLASData.LAS_00_200_FEET_DOWN))
+        myPlot = Plot.PlotReadXML('Triple_Combo')
+        myPlot.plotLogPassLAS(
+            myLasFile,
+            myLasFile.xAxisStart,
+            myLasFile.xAxisStop,
+            'Triple_Combo',
+            TestPlotShared.outPath(theFileName),
+            title='XGrid cache',
+        )
+        with open(TestPlotShared.outPath(theFileName)) as f:
+            return f.read()
+
+    def test_00(self):
+        """TestPlotXGridCache.test_00(): the same X axis grid is rendered once and the plots are identical."""
+        Plot._xGridCache.clear()
+        mySvgFirst = self._plotLAS('XGridCache_00.svg')
+        self.assertEqual(1, len(Plot._xGridCache))
+        mySvgSecond = self._plotLAS('XGridCache_01.svg')
+        self.assertEqual(1, len(Plot._xGridCache))
+        self.assertEqual(mySvgFirst, mySvgSecond)
+        self.assertTrue('>5550</text>' in mySvgSecond)
+
+    def test_01(self):
+        """TestPlotXGridCache.test_01(): the cache is cleared when full."""
+        Plot._xGridCache.clear()
+        for i in range(Plot.XGRID_CACHE_MAX_ENTRIES):
+            Plot._xGridCache[i] = ''
+        self._plotLAS('XGridCache_02.svg')
+        self.assertEqual(1, len(Plot._xGridCache))
+        Plot._xGridCache.clear()
+
+class TestPlotTile(unittest.TestCase):
+    """Tests Plot.genTileXRanges() and plotting LAS tiles."""
+    def _retTileS(self, theXStart, theXStop, theUnits, theTileDepth):
+        myPlot = Plot.Plot(None, None, theScale=200)
+        return [
+            (x0.value, x1.value, x0.uom, x1.uom) for x0, x1 in myPlot.genTileXRanges(
+                None,
+                EngVal.EngVal(theXStart, theUnits),
+                EngVal.EngVal(theXStop, theUnits),
+                theTileDepth,
+            )
+        ]
+
+    def test_00(self):
+        """TestPlotTile.test_00(): genTileXRanges() down log, last tile is short."""
+        self.assertEqual(
+            [
+                (1000.0, 1100.0, b'FEET', b'FEET'),
+                (1100.0, 1200.0, b'FEET', b'FEET'),
+                (1200.0, 1250.0, b'FEET', b'FEET'),
+            ],
+            self._retTileS(1000.0, 1250.0, b'FEET', Coord.Dim(6.0, 'in')),
+        )
+
+    def test_01(self):
+        """TestPlotTile.test_01(): genTileXRanges() up log, exact number of tiles."""
+        self.assertEqual(
+            [
+                (1200.0, 1100.0, b'FEET', b'FEET'),
+                (1100.0, 1000.0, b'FEET', b'FEET'),
+            ],
+            self._retTileS(1200.0, 1000.0, b'FEET', Coord.Dim(432.0, 'pt')),
+        )
+
+    def test_02(self):
+        """TestPlotTile.test_02(): genTileXRanges() in .1IN, interval smaller than a tile."""
+        self.assertEqual(
+            [(120000.0, 120600.0, b'.1IN', b'.1IN')],
+            self._retTileS(120000.0, 120600.0, b'.1IN', Coord.Dim(6.0, 'in')),
+        )
+        self.assertEqual(
+            [(120000.0, 132000.0, b'.1IN', b'.1IN'), (132000.0, 132600.0, b'.1IN', b'.1IN')],
+            self._retTileS(120000.0, 132600.0, b'.1IN', Coord.Dim(6.0, 'in')),
+        )
+
+    def test_03(self):
+        """TestPlotTile.test_03(): genTileXRanges() raises with a tile depth <= 0."""
+        self.assertRaises(Plot.ExceptionTotalDepthLISPlot, self._retTileS, 1000.0, 1250.0, b'FEET', Coord.Dim(0.0, 'in'))
+
+    def test_04(self):
+        """TestPlotTile.test_04(): plotLogPassLAS() tiles only plot the points in the tile."""
+        myLasFile = LASRead.LASRead(io.StringIO(TestPlotLASData.LAS_00_200_FEET_DOWN))
+        myPlot = Plot.PlotReadXML('Triple_Combo')
+        myCurvIDs, numPoints = myPlot.plotLogPassLAS(
+            myLasFile,
+            myLasFile.xAxisStart,
+            myLasFile.xAxisStop,
+            'Triple_Combo',
+            TestPlotShared.outPath('Tile_LAS.svg'),
+        )
+        myTileS = list(myPlot.genTileXRanges('Triple_Combo', myLasFile.xAxisStart, myLasFile.xAxisStop, Coord.Dim(8.0, 'in')))
+        self.assertEqual(3, len(myTileS))
+        myTilePointS = []
+        for t, (x0, x1) in enumerate(myTileS):
+            myTileCurvIDs, numTilePoints = myPlot.plotLogPassLAS(
+                myLasFile,
+                x0,
+                x1,
+                'Triple_Combo',
+                TestPlotShared.outPath('Tile_LAS_{:d}.svg'.format(t)),
+            )
+            self.assertEqual(myCurvIDs, myTileCurvIDs)
+            myTilePointS.append(numTilePoints)
+        # Any frame on the boundary between tiles is plotted in both tiles
+        self.assertTrue(all(n < numPoints for n in myTilePointS))
+        self.assertTrue(numPoints <= sum(myTilePointS))
+        self.assertTrue(sum(myTilePointS) <= numPoints + (len(myTileS) - 1) * len(myCurvIDs))
+
 class TestPlotBase(BaseTestClasses.TestBaseFile):
     pass
 
@@ -4359,6 +4558,9 @@ def unitTest(theVerbosity=2):
     suite = unittest.TestLoader().loadTestsFromTestCase(Special)
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestPlotRollStatic))
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestPlotRoll))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestPlotDecimate))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestPlotXGridCache))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestPlotTile))
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestPlotLowLevelCurvePlotScale))
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestPlotLowLevelCurvePlotScaleXML))
     suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestPlotLowLevel_wrap))
@@ -382,6 +382,24 @@ class TestSVGWriter(unittest.TestCase):
 </svg>
 """)
 
+    def test_08(self):
+        """TestSVGlWriter.test_08(): pointsToTxt() and a polyline with pre-formatted points."""
+        self.assertEqual('', SVGWriter.pointsToTxt([], []))
+        self.assertEqual('1.0,2.0 3.2,-4.6', SVGWriter.pointsToTxt([1.0, 3.25], [2.0, -4.56]))
+        myPtS = [
+            Coord.Pt(Coord.baseUnitsDim(50), Coord.baseUnitsDim(375.04)),
+            Coord.Pt(Coord.baseUnitsDim(150.06), Coord.baseUnitsDim(375)),
+        ]
+        myFS = []
+        for pointS in (myPtS, SVGWriter.pointsToTxt([50, 150.06], [375.04, 375])):
+            myF = io.StringIO()
+            with SVGWriter.SVGWriter(myF, Coord.Box(Coord.Dim(12, 'cm'), Coord.Dim(4, 'cm'))) as xS:
+                with SVGWriter.SVGPolyline(xS, pointS, {'fill' : "none"}):
+                    pass
+            myFS.append(myF.getvalue())
+        self.assertEqual(myFS[0], myFS[1])
+        self.assertTrue('points="50.0,375.0 150.1,375.0"' in myFS[1])
+
 class NullClass(unittest.TestCase):
     pass
 